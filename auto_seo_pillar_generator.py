@@ -30,6 +30,8 @@ if not DB_URL:
 
 # Gemini / Vertex AI kurulumu
 from src.utils.gemini_client import generate_with_rotation
+from src.utils.quota_ledger import set_default_priority
+from src.utils.response_cache import is_content_cache_enabled
 from google.genai import types
 
 _GEMINI_MODEL_NAME = os.getenv("GEMINI_MODEL", "gemini-3.1-flash-lite-preview")
@@ -198,7 +200,8 @@ def generate_pillar_content(keyword: str) -> str:
     html = generate_with_rotation(
         prompt=prompt,
         model=MODEL_NAME,
-        config=config
+        config=config,
+        use_cache=is_content_cache_enabled()
     )
     # Markdown blok kalıntısı temizle
     if html.startswith("```html"):
@@ -220,7 +223,8 @@ def generate_meta_description(keyword: str) -> str:
         temperature=0.0,
         max_output_tokens=6000
     )
-    text = generate_with_rotation(prompt=prompt, model=MODEL_NAME, config=config)
+    text = generate_with_rotation(prompt=prompt, model=MODEL_NAME, config=config,
+                                  use_cache=is_content_cache_enabled())
     return text[:160]
 
 
@@ -236,7 +240,8 @@ def generate_seo_title(keyword: str) -> str:
         temperature=0.0,
         max_output_tokens=6000
     )
-    return generate_with_rotation(prompt=prompt, model=MODEL_NAME, config=config)
+    return generate_with_rotation(prompt=prompt, model=MODEL_NAME, config=config,
+                                  use_cache=is_content_cache_enabled())
 
 
 # ─────────────────────────────────────────────
@@ -273,6 +278,7 @@ def save_pillar_page(title: str, slug: str, html: str, meta: str, image_url: str
 
 def main():
     import random
+    set_default_priority("content")  # ortak Gemini kotasında scraper ve autofix önce gelir
     print("=" * 60)
     print("🤖 Kartavantaj — Otonom SEO Pillar Page Üretici")
     print("=" * 60)
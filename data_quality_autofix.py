@@ -24,9 +24,18 @@ import logging
 logging.getLogger("httpx").setLevel(logging.WARNING)
 logging.getLogger("google_genai.models").setLevel(logging.WARNING)
 
-from src.models import Campaign, Sector, Brand, CampaignBrand # type: ignore
+from src.models import Campaign, Card, Sector, Brand, CampaignBrand # type: ignore
 from src.database import get_db_session # type: ignore
 from src.services.ai_parser import parse_campaign_data, AIParser # type: ignore
+from src.services.bulk_ai import BulkEntry, run_bulk_parse, collect_results, wait_for_job, STATE_SUCCEEDED # type: ignore
+from src.services.quality_checks import ( # type: ignore
+    CHECK_REASONS, CORRUPTED_REGEX, USELESS_PARTICIPATIONS, campaign_fields, find_defects
+)
+from src.services.model_cascade import is_cascade_enabled, get_cascade_stats # type: ignore
+from src.services.sector_classifier import get_sector_classifier, get_sector_stats # type: ignore
+from src.services.gazetteer import get_gazetteer # type: ignore
+from src.utils.hedging import is_hedging_enabled, get_hedge_stats # type: ignore
+from src.utils.quota_ledger import set_default_priority # type: ignore
 from sqlalchemy.orm import joinedload # type: ignore
 
 # Shared cleaner — same preprocessing scrapers use (filters boilerplate, dedup, 6K limit)
@@ -59,6 +68,7 @@ SECTOR_MAP = {
     "Diğer": "diger"
 }
 
+
 def fetch_html(url: str) -> str:
     """Attempts to fetch the HTML content of a URL."""
     try:
@@ -87,8 +97,357 @@ def fetch_html(url: str) -> str:
         print(f"      ⚠️ Failed to fetch HTML for {url}: {e}")
         return ""
 
-def run_autofix(limit: int = 50):
+def get_last_day_of_month(date_obj):
+    import calendar
+    last_day = calendar.monthrange(date_obj.year, date_obj.month)[1]
+    return date_obj.replace(day=last_day)
+
+
+def _text_for_campaign(c) -> str:
+    """Text to re-parse: stored clean_text, fresh HTML, or description/conditions as a last resort ("" if none)."""
+    # Use optimized clean_text from DB if available
+    text_to_parse = ""
+    if c.clean_text and len(c.clean_text) > 50:
+        print(f"   ⚡ Using pre-cleaned text from DB ({len(c.clean_text)} chars)")
+        text_to_parse = c.clean_text
+    else:
+        # Fallback to fetching fresh HTML for old unoptimized campaigns
+        print(f"   🌐 Fetching HTML fallback for old campaign...")
+        html_text = fetch_html(c.tracking_url)
+
+        if html_text and len(html_text) >= 50:
+            # Clean text with the same preprocessor scrapers use
+            text_to_parse = _clean_text(None, html_text)
+            print(f"   ✅ URL fetch successful ({len(text_to_parse)} chars)")
+        else:
+            # SECOND FALLBACK: Use description and conditions if URL fetching fails (likely bot protection or dead link)
+            print(f"   ⚠️ URL fetch failed (possible bot-block or 404).")
+
+            fallback_segments = []
+            if c.description: fallback_segments.append(c.description)
+            if c.conditions: fallback_segments.append(c.conditions)
+
+            fallback_text = " ".join(fallback_segments)
+            if len(fallback_text) > 20: 
+                print(f"   🔄 Using secondary fallback: Existing Description/Conditions ({len(fallback_text)} chars)")
+                text_to_parse = fallback_text
+            else:
+                print(f"   ❌ Could not extract meaningful text from URL or DB fields. Skipping.")
+                return ""
+    return text_to_parse
+
+
+def _apply_ai_data(db, c, ai_data: dict, text_to_parse: str, force_all: bool = False):
+    """
+    Repair the defective fields of `c` from parsed AI data (shared by interactive and bulk modes).
+    Returns True if the campaign should be committed, False if nothing changed,
+    None if an already auto-corrected campaign should be left untouched.
+    """
+    from datetime import datetime
+    # Update logic
+    updated = False
+    is_corrupted = any(
+        value and CORRUPTED_REGEX.search(value)
+        for value in (c.description, c.conditions, c.eligible_cards, c.ai_marketing_text)
+    )
+
+    # Update Description
+    if not c.description or len(c.description.strip()) < 15 or force_all:
+        if ai_data.get("description"):
+            print(f"   ✨ Repaired Description!")
+            c.description = ai_data["description"]
+            updated = True
+
+    # Update Reward Text
+    is_reward_bad = not c.reward_text or c.reward_text.strip() == "" or "Detayları İnceleyin" in c.reward_text
+    if is_reward_bad or force_all:
+        if ai_data.get("reward_text"):
+            print(f"   ✨ Repaired Reward Text: {ai_data['reward_text']}")
+            c.reward_text = ai_data["reward_text"]
+            updated = True
+
+    if c.reward_value is None or force_all:
+        if ai_data.get("reward_value") is not None:
+            print(f"   ✨ Repaired Reward Value: {ai_data['reward_value']}")
+            c.reward_value = ai_data["reward_value"]
+            updated = True
+
+    if not c.reward_type or c.reward_type.strip() == "" or force_all:
+        if ai_data.get("reward_type"):
+            print(f"   ✨ Repaired Reward Type: {ai_data['reward_type']}")
+            c.reward_type = ai_data["reward_type"]
+            updated = True
+
+    # Update Eligible Cards if missing, corrupted or generic
+    if not c.eligible_cards or c.eligible_cards.strip() == "" or "Kampanyaya Dahil Kartlar" in (c.eligible_cards or "") or CORRUPTED_REGEX.search(c.eligible_cards or ""):
+        if ai_data.get("cards") and len(ai_data["cards"]) > 0:
+            cards_str = ", ".join(ai_data["cards"])
+            print(f"   ✨ Repaired Eligible Cards: {cards_str}")
+            c.eligible_cards = cards_str
+            updated = True
+
+    baseline_date = c.created_at or datetime.now()
+
+    # Start Date Repair
+    if not c.start_date or force_all:
+        new_start = None
+        if ai_data.get("start_date"):
+            try:
+                new_start = datetime.strptime(ai_data["start_date"], "%Y-%m-%d").date()
+            except: pass
+
+        # Fallback if AI didn't find it
+        if not new_start:
+            print(f"   🔄 Falling back Start Date to Created At: {baseline_date.date()}")
+            new_start = baseline_date.date()
+
+        if new_start:
+            c.start_date = new_start
+            updated = True
+            print(f"   ✨ Repaired Start Date: {c.start_date}")
+
+    # End Date Repair
+    if not c.end_date or force_all:
+        new_end = None
+        if ai_data.get("end_date"):
+            try:
+                new_end = datetime.strptime(ai_data["end_date"], "%Y-%m-%d").date()
+            except: pass
+
+        # Fallback if AI didn't find it
+        if not new_end:
+            # Baseline as end of the month of (start_date or created_at)
+            reference = c.start_date or baseline_date
+            new_end = get_last_day_of_month(reference).date()
+            print(f"   🔄 Falling back End Date to End of Month: {new_end}")
+
+        if new_end:
+            c.end_date = new_end
+            updated = True
+            print(f"   ✨ Repaired End Date: {c.end_date}")
+
+    # Update Conditions if missing, corrupted or force_all
+    if not c.conditions or c.conditions.strip() == "" or CORRUPTED_REGEX.search(c.conditions) or force_all:
+        if ai_data.get("conditions"):
+            print(f"   ✨ Repaired Conditions!")
+            c.conditions = "\n".join(cond for cond in ai_data.get("conditions", []))
+            updated = True
+
+    # --- Participation and Eligible Cards skip logic bypass ---
+    is_cards_defective = not c.eligible_cards or c.eligible_cards.strip() == "" or "Kampanyaya Dahil Kartlar" in (c.eligible_cards or "")
+    is_participation_defective = not c.participation or c.participation.strip() == "" or any(p in (c.participation or "") for p in USELESS_PARTICIPATIONS)
+
+    # Double check for corruption or generic placeholders
+    mojibake_pattern = re.compile(r'[ÄÃÅ][\u0080-\u00bf]')
+    has_mojibake = False
+    if c.clean_text and mojibake_pattern.search(c.clean_text): has_mojibake = True
+    if c.description and mojibake_pattern.search(c.description): has_mojibake = True
+
+    # If already auto_corrected, skip ONLY IF it has good data for cards and participation
+    # AND it doesn't have corruption/mojibake
+    if not force_all and c.auto_corrected:
+        if not is_cards_defective and not is_participation_defective and not is_corrupted and not has_mojibake:
+            return None
+
+    # Clean and update Participation
+    is_curr_p_bad = not c.participation or c.participation.strip() == "" or any(p in (c.participation or "") for p in USELESS_PARTICIPATIONS) or CORRUPTED_REGEX.search(c.participation)
+    if is_curr_p_bad or force_all:
+        if ai_data.get("participation"):
+            print(f"   ✨ Repaired Participation: {ai_data['participation'][:50]}...")
+            c.participation = ai_data["participation"]
+            updated = True
+
+    # --- AI Marketing Text (Marketing Summary) update ---
+    if ai_data.get("ai_marketing_text"):
+        # We always update this to get fresh summaries
+        c.ai_marketing_text = ai_data["ai_marketing_text"]
+        updated = True
+
+    # --- Clean Text Update ---
+    if not c.clean_text or len(c.clean_text.strip()) < 50:
+        if text_to_parse:
+            c.clean_text = text_to_parse
+            updated = True
+
+    # --- Sektör tamiri ---
+    ai_sector_raw = ai_data.get("sector", "diger")
+    if isinstance(ai_sector_raw, list):
+        ai_sector_raw = ai_sector_raw[0] if len(ai_sector_raw) > 0 else "diger"
+
+    # Try to map if AI returned a display name, otherwise assume it's a slug
+    final_sector_slug = SECTOR_MAP.get(ai_sector_raw, ai_sector_raw)
+
+    if final_sector_slug not in SECTOR_MAP.values():
+        final_sector_slug = "diger"
+
+    needs_sector_fix = (
+        not c.sector_id or
+        (c.sector and c.sector.slug != final_sector_slug)
+    )
+    if needs_sector_fix and final_sector_slug != "diger":
+        sector = db.query(Sector).filter(Sector.slug == final_sector_slug).first()
+        if not sector:
+            sector = db.query(Sector).filter(Sector.slug == 'diger').first()
+        if sector:
+            c.sector_id = sector.id
+            print(f"   ✨ Repaired Sector: {sector.name}")
+            updated = True
+
+    # --- Marka tamiri ---
+    if not c.brands and ai_data.get("brands"):
+        for b_name in ai_data["brands"]:
+            if not isinstance(b_name, str) or len(b_name) < 2:
+                continue
+            b_slug = re.sub(r'[^a-z0-9]+', '-', b_name.lower()).strip('-')  # type: ignore
+            try:
+                brand = db.query(Brand).filter(
+                    (Brand.slug == b_slug) | (Brand.name.ilike(b_name))
+                ).first()
+                if not brand:
+                    brand = Brand(name=b_name, slug=b_slug)
+                    db.add(brand)
+                    db.flush()
+                link = db.query(CampaignBrand).filter(
+                    CampaignBrand.campaign_id == c.id,
+                    CampaignBrand.brand_id == brand.id
+                ).first()
+                if not link:
+                    db.add(CampaignBrand(campaign_id=c.id, brand_id=brand.id))
+                    print(f"   ✨ Added Brand: {b_name}")
+                    updated = True
+            except Exception as be:
+                db.rollback()
+                print(f"   ⚠️ Brand fix failed for {b_name}: {be}")
+
+    # ALWAYS mark as auto_corrected so we don't try again forever (even if Gemini failed to find missing data)
+    c.auto_corrected = True
+    updated = True
+
+    return updated
+
+
+def _has_bad_sector(c) -> bool:
+    valid_slugs = set(SECTOR_MAP.values())
+    return not c.sector_id or (c.sector and (c.sector.slug == "diger" or c.sector.slug not in valid_slugs))
+
+
+def _fix_sectors_locally(db, campaigns) -> int:
+    """
+    Assigns sectors with the local classifier (no Gemini call) where its calibrated
+    confidence is high enough. Campaigns whose only defect was the sector are then no longer queued.
+    """
+    classifier = get_sector_classifier()
+    if classifier is None:
+        return 0
+    todo = [c for c in campaigns if _has_bad_sector(c) and c.clean_text and len(c.clean_text.strip()) >= 50]
+    if not todo:
+        return 0
+    sectors = {s.slug: s for s in db.query(Sector).all()}
+    predictions = classifier.predict_batch([(c.clean_text, c.title) for c in todo])
+    fixed = 0
+    for c, prediction in zip(todo, predictions):
+        slug = classifier.accept(prediction)
+        if not slug or slug not in sectors:
+            continue
+        c.sector = sectors[slug]
+        fixed += 1
+        print(f"   🧭 Local sector fix: [{c.id}] {c.title[:40]} → {sectors[slug].name} ({prediction.confidence:.2f})")
+    if fixed:
+        db.commit()
+    print(f"   📊 Sector classifier: {fixed}/{len(todo)} missing/bad sectors fixed without AI.")
+    return fixed
+
+
+def _fix_brands_and_cards_locally(db, campaigns) -> int:
+    """
+    Fills missing brands and defective eligible-card lists from the gazetteer (no Gemini call).
+    Cards are only taken from the campaign's own bank; nothing is written when nothing is found.
+    """
+    gazetteer = get_gazetteer()
+    if gazetteer is None:
+        return 0
+    bank_by_card = dict(db.query(Card.id, Card.bank_id).all())
+    fixed = 0
+    for c in campaigns:
+        if not c.clean_text or len(c.clean_text.strip()) < 50:
+            continue
+        missing_brands = not c.brands
+        bad_cards = bool(find_defects(campaign_fields(c), checks=("cards",)))
+        if not missing_brands and not bad_cards:
+            continue
+        found = gazetteer.extract(c.clean_text, c.title, bank_id=bank_by_card.get(c.card_id))
+        changed = False
+        if missing_brands and found.brand_ids:
+            for brand_id in found.brand_ids:
+                db.add(CampaignBrand(campaign_id=c.id, brand_id=brand_id))
+            changed = True
+        if bad_cards and found.cards:
+            c.eligible_cards = ", ".join(found.cards)
+            changed = True
+        if changed:
+            fixed += 1
+            print(f"   📇 Gazetteer fix: [{c.id}] {c.title[:40]} → brands={found.brands} cards={found.cards}")
+    if fixed:
+        db.commit()
+    print(f"   📊 Gazetteer: {fixed} campaigns got brands/cards without AI.")
+    return fixed
+
+
+def _run_bulk_fix(to_fix_ids, force_all: bool, bulk_manifest: str = None) -> int:
+    """
+    Bulk mode: re-parse all defective campaigns in one offline batch job and apply
+    the results in a single pass. With `bulk_manifest`, an earlier job is waited for and its results collected instead.
+    """
+    texts = {}
+    if bulk_manifest:
+        print(f"   📥 Collecting results of bulk job: {bulk_manifest}")
+        state = wait_for_job(bulk_manifest)
+        if state != STATE_SUCCEEDED:
+            print(f"   ❌ Bulk job ended with {state}; manifest: {bulk_manifest}")
+            return 0
+        results = collect_results(bulk_manifest)
+    else:
+        entries = []
+        with get_db_session() as db:
+            for c_id, tracking_url, reasons_list in to_fix_ids:
+                c = db.get(Campaign, c_id)
+                if not c:
+                    continue
+                print(f"\n📦 Queuing: [{c.id}] {c.title[:40]}... (Reasons: {', '.join(reasons_list)})")
+                text_to_parse = _text_for_campaign(c)
+                if not text_to_parse:
+                    continue
+                texts[str(c.id)] = text_to_parse
+                entries.append(BulkEntry(str(c.id), text_to_parse, title=c.title))
+        if not entries:
+            return 0
+        results = run_bulk_parse(entries)
+
+    fixed_count = 0
+    ids = [int(k) for k, v in results.items() if not v.get("_ai_failed")]
+    if not ids:
+        return 0
+    with get_db_session() as db:
+        campaigns = (
+            db.query(Campaign)
+            .options(joinedload(Campaign.sector), joinedload(Campaign.brands))
+            .filter(Campaign.id.in_(ids))
+            .all()
+        )
+        for c in campaigns:
+            print(f"\n🛠️ Applying bulk result: [{c.id}] {c.title[:40]}...")
+            # Resumed jobs have no fresh text; clean_text is then left as is
+            updated = _apply_ai_data(db, c, results[str(c.id)], texts.get(str(c.id), ""), force_all)
+            if updated:
+                db.commit()
+                fixed_count += 1
+                print(f"   ✅ Campaign successfully repaired and saved! (Marked as auto_corrected)")
+    return fixed_count
+
+
+def run_autofix(limit: int = 50, bulk: bool = False, bulk_manifest: str = None):
     print(f"🚀 Starting Data Quality Auto-Fixer (Limit: {limit})...")
+    set_default_priority("autofix")  # shared Gemini quota: new campaigns go first
     
     try:
         from datetime import datetime, timedelta
@@ -106,6 +465,8 @@ def run_autofix(limit: int = 50):
                 Campaign.is_active == True
             ).all()
             print(f"   📊 Checking {len(defective_campaigns)} active campaigns for defects.")
+            _fix_sectors_locally(db, defective_campaigns)
+            _fix_brands_and_cards_locally(db, defective_campaigns)
             
             FORCE_ALL = False # If True, will fix all active campaigns regardless of status
             to_fix_ids = []
@@ -115,86 +476,17 @@ def run_autofix(limit: int = 50):
                 is_defective = False
                 reasons = []
                 
-                # New detection pattern: character-level corruption (e.g., 'P, a, r, a, f')
-                corrupted_regex = re.compile(r'([a-zA-ZçğıüşöÇĞİÜŞÖ0-9], ){2,}')
-                generic_participation = "Mobil uygulama üzerinden veya banka kanallarından kampanya detaylarındaki talimatları izleyerek katılabilirsiniz."
-                useless_participations = [
-                    generic_participation, 
-                    "Hemen faydalanabilirsiniz.", 
-                    "Hemen faydalanabilirsiniz", 
-                    "Kampanya dahilinde.",
-                    "Detayları İnceleyin",
-                    "Detayları inceleyin",
-                    "Hemen faydalanmaya başlayın.",
-                    "Axess Mobil uygulama üzerinden katılabilirsiniz.",
-                    "Harcamadan önce mobil uygulama üzerinden katılın.",
-                    "Harcamadan önce Mobilden katılın.",
-                    "Juzdan uygulama üzerinden katılabilirsiniz.",
-                    "Juzdan üzerinden katılabilirsiniz.",
-                    "Mobil Şube üzerinden Kampanyaya Katıl butonuna tıklayın",
-                    "Kampanyaya katılmak için Mobil Şube üzerinden Kampanyaya Katıl butonuna tıklamanız yeterlidir."
-                ]
-                
-                is_corrupted = False
-                if c.description and corrupted_regex.search(c.description): is_corrupted = True
-                if c.conditions and corrupted_regex.search(c.conditions): is_corrupted = True
-                if c.eligible_cards and corrupted_regex.search(c.eligible_cards): is_corrupted = True
-                if c.ai_marketing_text and corrupted_regex.search(c.ai_marketing_text): is_corrupted = True
-                
-                if is_corrupted:
-                    is_defective = True
-                    reasons.append("Character-level Corruption")
-
-                if not c.description or len(c.description.strip()) < 15:
-                    is_defective = True
-                    reasons.append("Missing/Short Description")
-                
-                # Check for Default Reward Text
-                is_reward_bad = not c.reward_text or c.reward_text.strip() == "" or "Detayları İnceleyin" in (c.reward_text or "") or "Hemen Faydalanın" in (c.reward_text or "")
-                if is_reward_bad:
-                    is_defective = True
-                    reasons.append("Missing/Default Reward Text")
-                
-                if c.reward_value is None:
-                    is_defective = True
-                    reasons.append("Missing Reward Value")
-                if not c.reward_type or c.reward_type.strip() == "":
-                    is_defective = True
-                    reasons.append("Missing Reward Type")
-                
-                # Check for Missing/Corrupted/Generic Eligible Cards
-                is_cards_bad = not c.eligible_cards or c.eligible_cards.strip() == "" or "Kampanyaya Dahil Kartlar" in (c.eligible_cards or "") or corrupted_regex.search(c.eligible_cards or "")
-                if is_cards_bad:
-                    is_defective = True
-                    reasons.append("Missing/Corrupted/Generic Eligible Cards")
-                
-                if not c.start_date:
-                    is_defective = True
-                    reasons.append("Missing Start Date")
-                if not c.end_date:
-                    is_defective = True
-                    reasons.append("Missing End Date")
-                if not c.conditions or c.conditions.strip() == "" or corrupted_regex.search(c.conditions or ""):
-                    is_defective = True
-                    reasons.append("Missing/Corrupted Conditions")
-                
-                # Check for Generic/Missing Participation
-                is_participation_bad = not c.participation or c.participation.strip() == "" or any(p in (c.participation or "") for p in useless_participations) or "Detayları İnceleyin" in (c.participation or "")
-                if is_participation_bad:
+                # Field checks shared with the AI model cascade (corruption, reward, cards, dates, participation...)
+                for check in find_defects(campaign_fields(c)):
                     is_defective = True
-                    reasons.append("Missing/Generic Participation Text")
-                
-                if not c.ai_marketing_text or len(c.ai_marketing_text.strip()) < 10:
-                    is_defective = True
-                    reasons.append("Missing Marketing Summary")
+                    reasons.append(CHECK_REASONS[check])
                 
                 if not c.clean_text or len(c.clean_text.strip()) < 50:
                     is_defective = True
                     reasons.append("Missing Clean Text")
 
                 # Sektör ve Marka Kontrolleri
-                valid_slugs = set(SECTOR_MAP.values())
-                if not c.sector_id or (c.sector and (c.sector.slug == "diger" or c.sector.slug not in valid_slugs)):
+                if _has_bad_sector(c):
                     is_defective = True
                     reasons.append("Missing/Bad Sector")
 
@@ -229,6 +521,11 @@ def run_autofix(limit: int = 50):
                 
         fixed_count = 0
             
+        if bulk or bulk_manifest:
+            fixed_count = _run_bulk_fix(to_fix_ids, FORCE_ALL, bulk_manifest)
+            print(f"\n🏁 Auto-fixer (bulk) complete. Successfully repaired {fixed_count}/{len(to_fix_ids)} campaigns.")
+            return
+
         for c_id, tracking_url, reasons_list in to_fix_ids:
             summary_reasons = ", ".join(reasons_list)
             
@@ -241,225 +538,28 @@ def run_autofix(limit: int = 50):
                 print(f"\n🛠️ Fixing: [{c.id}] {c.title[:40]}... (Reasons: {summary_reasons})")
                 print(f"   🔗 URL: {c.tracking_url}")
                 
-                # Use optimized clean_text from DB if available
-                text_to_parse = ""
-                if c.clean_text and len(c.clean_text) > 50:
-                    print(f"   ⚡ Using pre-cleaned text from DB ({len(c.clean_text)} chars)")
-                    text_to_parse = c.clean_text
-                else:
-                    # Fallback to fetching fresh HTML for old unoptimized campaigns
-                    print(f"   🌐 Fetching HTML fallback for old campaign...")
-                    html_text = fetch_html(c.tracking_url)
-                    
-                    if html_text and len(html_text) >= 50:
-                        # Clean text with the same preprocessor scrapers use
-                        text_to_parse = _clean_text(None, html_text)
-                        print(f"   ✅ URL fetch successful ({len(text_to_parse)} chars)")
-                    else:
-                        # SECOND FALLBACK: Use description and conditions if URL fetching fails (likely bot protection or dead link)
-                        print(f"   ⚠️ URL fetch failed (possible bot-block or 404).")
-                        
-                        fallback_segments = []
-                        if c.description: fallback_segments.append(c.description)
-                        if c.conditions: fallback_segments.append(c.conditions)
-                        
-                        fallback_text = " ".join(fallback_segments)
-                        if len(fallback_text) > 20: 
-                            print(f"   🔄 Using secondary fallback: Existing Description/Conditions ({len(fallback_text)} chars)")
-                            text_to_parse = fallback_text
-                        else:
-                            print(f"   ❌ Could not extract meaningful text from URL or DB fields. Skipping.")
-                            continue
+                text_to_parse = _text_for_campaign(c)
+                if not text_to_parse:
+                    continue
 
                 print(f"   🤖 Sending {len(text_to_parse)} characters to AI for re-parsing...")
+                # reuse=False: the near-duplicate index holds this campaign's own defective result
                 ai_data = parse_campaign_data(
                     raw_text=text_to_parse,
                     title=c.title,
+                    reuse=False,
                 )
                 
                 if not ai_data:
                     print(f"   ❌ Gemini AI failed to return data. Skipping.")
                     continue
-                    
-                # Update logic
-                updated = False
-                
-                # Update Description
-                if not c.description or len(c.description.strip()) < 15 or FORCE_ALL:
-                    if ai_data.get("description"):
-                        print(f"   ✨ Repaired Description!")
-                        c.description = ai_data["description"]
-                        updated = True
-                        
-                # Update Reward Text
-                is_reward_bad = not c.reward_text or c.reward_text.strip() == "" or "Detayları İnceleyin" in c.reward_text
-                if is_reward_bad or FORCE_ALL:
-                    if ai_data.get("reward_text"):
-                        print(f"   ✨ Repaired Reward Text: {ai_data['reward_text']}")
-                        c.reward_text = ai_data["reward_text"]
-                        updated = True
-                        
-                if c.reward_value is None or FORCE_ALL:
-                    if ai_data.get("reward_value") is not None:
-                        print(f"   ✨ Repaired Reward Value: {ai_data['reward_value']}")
-                        c.reward_value = ai_data["reward_value"]
-                        updated = True
-                        
-                if not c.reward_type or c.reward_type.strip() == "" or FORCE_ALL:
-                    if ai_data.get("reward_type"):
-                        print(f"   ✨ Repaired Reward Type: {ai_data['reward_type']}")
-                        c.reward_type = ai_data["reward_type"]
-                        updated = True
-                        
-                # Update Eligible Cards if missing, corrupted or generic
-                if not c.eligible_cards or c.eligible_cards.strip() == "" or "Kampanyaya Dahil Kartlar" in (c.eligible_cards or "") or corrupted_regex.search(c.eligible_cards or ""):
-                    if ai_data.get("cards") and len(ai_data["cards"]) > 0:
-                        cards_str = ", ".join(ai_data["cards"])
-                        print(f"   ✨ Repaired Eligible Cards: {cards_str}")
-                        c.eligible_cards = cards_str
-                        updated = True
-
-                def get_last_day_of_month(date_obj):
-                    import calendar
-                    last_day = calendar.monthrange(date_obj.year, date_obj.month)[1]
-                    return date_obj.replace(day=last_day)
-
-                baseline_date = c.created_at or datetime.now()
-
-                # Start Date Repair
-                if not c.start_date or FORCE_ALL:
-                    new_start = None
-                    if ai_data.get("start_date"):
-                        try:
-                            new_start = datetime.strptime(ai_data["start_date"], "%Y-%m-%d").date()
-                        except: pass
-                    
-                    # Fallback if AI didn't find it
-                    if not new_start:
-                        print(f"   🔄 Falling back Start Date to Created At: {baseline_date.date()}")
-                        new_start = baseline_date.date()
-                    
-                    if new_start:
-                        c.start_date = new_start
-                        updated = True
-                        print(f"   ✨ Repaired Start Date: {c.start_date}")
-
-                # End Date Repair
-                if not c.end_date or FORCE_ALL:
-                    new_end = None
-                    if ai_data.get("end_date"):
-                        try:
-                            new_end = datetime.strptime(ai_data["end_date"], "%Y-%m-%d").date()
-                        except: pass
-                    
-                    # Fallback if AI didn't find it
-                    if not new_end:
-                        # Baseline as end of the month of (start_date or created_at)
-                        reference = c.start_date or baseline_date
-                        new_end = get_last_day_of_month(reference).date()
-                        print(f"   🔄 Falling back End Date to End of Month: {new_end}")
-
-                    if new_end:
-                        c.end_date = new_end
-                        updated = True
-                        print(f"   ✨ Repaired End Date: {c.end_date}")
-                        
-                # Update Conditions if missing, corrupted or FORCE_ALL
-                if not c.conditions or c.conditions.strip() == "" or corrupted_regex.search(c.conditions) or FORCE_ALL:
-                    if ai_data.get("conditions"):
-                        print(f"   ✨ Repaired Conditions!")
-                        c.conditions = "\n".join(cond for cond in ai_data.get("conditions", []))
-                        updated = True
-
-                # --- Participation and Eligible Cards skip logic bypass ---
-                is_cards_defective = not c.eligible_cards or c.eligible_cards.strip() == "" or "Kampanyaya Dahil Kartlar" in (c.eligible_cards or "")
-                is_participation_defective = not c.participation or c.participation.strip() == "" or any(p in (c.participation or "") for p in useless_participations)
-                
-                # Double check for corruption or generic placeholders
-                mojibake_pattern = re.compile(r'[ÄÃÅ][\u0080-\u00bf]')
-                has_mojibake = False
-                if c.clean_text and mojibake_pattern.search(c.clean_text): has_mojibake = True
-                if c.description and mojibake_pattern.search(c.description): has_mojibake = True
-
-                # If already auto_corrected, skip ONLY IF it has good data for cards and participation
-                # AND it doesn't have corruption/mojibake
-                if not FORCE_ALL and c.auto_corrected:
-                    if not is_cards_defective and not is_participation_defective and not is_corrupted and not has_mojibake:
-                        continue
-
-                # Clean and update Participation
-                is_curr_p_bad = not c.participation or c.participation.strip() == "" or any(p in (c.participation or "") for p in useless_participations) or corrupted_regex.search(c.participation)
-                if is_curr_p_bad or FORCE_ALL:
-                    if ai_data.get("participation"):
-                        print(f"   ✨ Repaired Participation: {ai_data['participation'][:50]}...")
-                        c.participation = ai_data["participation"]
-                        updated = True
-
-                # --- AI Marketing Text (Marketing Summary) update ---
-                if ai_data.get("ai_marketing_text"):
-                    # We always update this to get fresh summaries
-                    c.ai_marketing_text = ai_data["ai_marketing_text"]
-                    updated = True
+                if ai_data.get("_negative_cached"):
+                    print(f"   ⏭️ Content keeps failing AI parsing ({ai_data['_negative_cached']}). Skipping until its retry time.")
+                    continue
 
-                # --- Clean Text Update ---
-                if not c.clean_text or len(c.clean_text.strip()) < 50:
-                    if text_to_parse:
-                        c.clean_text = text_to_parse
-                        updated = True
-
-                # --- Sektör tamiri ---
-                ai_sector_raw = ai_data.get("sector", "diger")
-                if isinstance(ai_sector_raw, list):
-                    ai_sector_raw = ai_sector_raw[0] if len(ai_sector_raw) > 0 else "diger"
-                
-                # Try to map if AI returned a display name, otherwise assume it's a slug
-                final_sector_slug = SECTOR_MAP.get(ai_sector_raw, ai_sector_raw)
-                
-                if final_sector_slug not in SECTOR_MAP.values():
-                    final_sector_slug = "diger"
-                    
-                needs_sector_fix = (
-                    not c.sector_id or
-                    (c.sector and c.sector.slug != final_sector_slug)
-                )
-                if needs_sector_fix and final_sector_slug != "diger":
-                    sector = db.query(Sector).filter(Sector.slug == final_sector_slug).first()
-                    if not sector:
-                        sector = db.query(Sector).filter(Sector.slug == 'diger').first()
-                    if sector:
-                        c.sector_id = sector.id
-                        print(f"   ✨ Repaired Sector: {sector.name}")
-                        updated = True
-
-                # --- Marka tamiri ---
-                if not c.brands and ai_data.get("brands"):
-                    for b_name in ai_data["brands"]:
-                        if not isinstance(b_name, str) or len(b_name) < 2:
-                            continue
-                        b_slug = re.sub(r'[^a-z0-9]+', '-', b_name.lower()).strip('-')  # type: ignore
-                        try:
-                            brand = db.query(Brand).filter(
-                                (Brand.slug == b_slug) | (Brand.name.ilike(b_name))
-                            ).first()
-                            if not brand:
-                                brand = Brand(name=b_name, slug=b_slug)
-                                db.add(brand)
-                                db.flush()
-                            link = db.query(CampaignBrand).filter(
-                                CampaignBrand.campaign_id == c.id,
-                                CampaignBrand.brand_id == brand.id
-                            ).first()
-                            if not link:
-                                db.add(CampaignBrand(campaign_id=c.id, brand_id=brand.id))
-                                print(f"   ✨ Added Brand: {b_name}")
-                                updated = True
-                        except Exception as be:
-                            db.rollback()
-                            print(f"   ⚠️ Brand fix failed for {b_name}: {be}")
-
-                # ALWAYS mark as auto_corrected so we don't try again forever (even if Gemini failed to find missing data)
-                c.auto_corrected = True
-                updated = True
+                updated = _apply_ai_data(db, c, ai_data, text_to_parse, FORCE_ALL)
+                if updated is None:
+                    continue
 
                 if updated:
                     db.commit()
@@ -472,6 +572,12 @@ def run_autofix(limit: int = 50):
             time.sleep(3)
             
         print(f"\n🏁 Auto-fixer complete. Successfully repaired {fixed_count}/{len(to_fix_ids)} campaigns.")
+        if is_cascade_enabled():
+            print(f"   📊 Model cascade: {get_cascade_stats()}")
+        if is_hedging_enabled():
+            print(f"   📊 Hedged requests: {get_hedge_stats()}")
+        if get_sector_classifier() is not None:
+            print(f"   📊 Sector classifier: {get_sector_stats()}")
             
     except Exception as e:
         print(f"\n📛 CRITICAL ERROR during auto-fix: {e}")
@@ -483,6 +589,10 @@ if __name__ == "__main__":
     import argparse
     parser = argparse.ArgumentParser()
     parser.add_argument("--limit", type=int, default=50, help="Max campaigns to fix in one run")
+    parser.add_argument("--bulk", action="store_true",
+                        help="Re-parse all defective campaigns in one offline batch job instead of one request each")
+    parser.add_argument("--bulk-manifest", default=None,
+                        help="Apply results of a previously submitted bulk job (manifest.json path)")
     args = parser.parse_args()
     
-    run_autofix(limit=args.limit)
+    run_autofix(limit=args.limit, bulk=args.bulk, bulk_manifest=args.bulk_manifest)
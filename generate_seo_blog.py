@@ -15,6 +15,8 @@ if not DB_URL:
 
 # Setup Gemini API (using Vertex AI or legacy fallback)
 from src.utils.gemini_client import generate_with_rotation
+from src.utils.quota_ledger import set_default_priority
+from src.utils.response_cache import is_content_cache_enabled
 from google.genai import types
 
 _GEMINI_MODEL_NAME = os.getenv("GEMINI_MODEL", "gemini-3.1-flash-lite-preview")
@@ -73,7 +75,8 @@ def generate_seo_article(topic):
     html_content = generate_with_rotation(
         prompt=prompt,
         model=MODEL_NAME,
-        config=config
+        config=config,
+        use_cache=is_content_cache_enabled()
     )
     
     # Remove markdown codeblocks if AI messed up
@@ -97,7 +100,8 @@ def generate_meta_description(topic, html_content):
     return generate_with_rotation(
         prompt=prompt,
         model=MODEL_NAME,
-        config=config
+        config=config,
+        use_cache=is_content_cache_enabled()
     )
 
 def save_to_database(topic, html_content, meta_description, image_url):
@@ -165,6 +169,7 @@ def get_existing_titles_and_slugs():
 
 def main():
     print("🚀 Starting Kartavantaj SEO Auto-Blog Generator")
+    set_default_priority("content")  # shared Gemini quota: scrapers and autofix go first
     
     # 1. Fetch existing data to avoid duplicates
     existing_titles, existing_slugs = get_existing_titles_and_slugs()
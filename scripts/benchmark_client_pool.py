@@ -0,0 +1,98 @@
+"""
+Micro-benchmark: per-call overhead of a fresh genai.Client vs the pooled client.
+
+Offline mode (default) measures client construction cost only — what every
+generate_with_rotation call used to pay before any network I/O.
+With --live it also sends N tiny prompts each way with the first configured key,
+so TLS handshake / connection setup shows up in the per-call latency.
+
+Usage:
+    python scripts/benchmark_client_pool.py --iterations 200
+    python scripts/benchmark_client_pool.py --live --iterations 10
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+
+# Add project root to sys.path to ensure src imports work
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from src.utils.client_pool import ClientPool # type: ignore
+from src.utils.key_pool import load_api_keys # type: ignore
+
+
+def _summary(label: str, samples: list) -> None:
+    samples_ms = sorted(s * 1000 for s in samples)
+    p95 = samples_ms[max(0, int(len(samples_ms) * 0.95) - 1)]
+    print(f"   {label:<22} mean={statistics.mean(samples_ms):8.2f} ms  "
+          f"p50={statistics.median(samples_ms):8.2f} ms  p95={p95:8.2f} ms  (n={len(samples_ms)})")
+
+
+def bench_construction(api_key: str, iterations: int) -> None:
+    from google import genai as _sdk # type: ignore
+
+    fresh = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        _sdk.Client(api_key=api_key)
+        fresh.append(time.perf_counter() - started)
+
+    pool = ClientPool()
+    pooled = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        pool.get(api_key)
+        pooled.append(time.perf_counter() - started)
+
+    print("🔧 Client acquisition overhead (no network):")
+    _summary("new Client per call", fresh)
+    _summary("pooled client", pooled)
+
+
+def bench_live(api_key: str, iterations: int, model: str) -> None:
+    from google import genai as _sdk # type: ignore
+
+    prompt = "Sadece 'ok' yaz."
+
+    fresh = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        _sdk.Client(api_key=api_key).models.generate_content(model=model, contents=prompt)
+        fresh.append(time.perf_counter() - started)
+
+    pool = ClientPool()
+    client = pool.get(api_key)
+    client.models.generate_content(model=model, contents=prompt)  # warm-up: open the connection once
+    pooled = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        pool.get(api_key).models.generate_content(model=model, contents=prompt)
+        pooled.append(time.perf_counter() - started)
+
+    print(f"🌐 End-to-end generate_content latency ({model}):")
+    _summary("new Client per call", fresh)
+    _summary("pooled client", pooled)
+    print(f"   Δ mean per call: {(statistics.mean(fresh) - statistics.mean(pooled)) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=100, help="Calls per variant")
+    parser.add_argument("--live", action="store_true", help="Also measure real generate_content calls (uses quota)")
+    parser.add_argument("--model", default=os.getenv("GEMINI_MODEL", "gemini-3.1-flash-lite-preview"))
+    args = parser.parse_args()
+
+    try:
+        key = load_api_keys()[0]
+    except ValueError:
+        if args.live:
+            raise
+        key = "benchmark-dummy-key"  # construction does not validate the key
+
+    bench_construction(key, args.iterations)
+    if args.live:
+        bench_live(key, args.iterations, args.model)
@@ -0,0 +1,111 @@
+"""
+Import-time benchmark: guards startup cost of the core modules.
+
+Each module is imported in a fresh interpreter with `python -X importtime`
+(DATABASE_URL removed from the environment, so an import that needs the DB
+fails the check). The best cumulative time of --repeat runs is compared with
+its budget, and heavy dependencies that must only load on first use
+(google.genai, playwright, bs4, selenium, ...) are reported if they show up.
+
+Exit code is 1 when any module is over budget or pulls a forbidden import.
+
+Usage:
+    python scripts/benchmark_import_time.py
+    python scripts/benchmark_import_time.py --repeat 5 --scale 2.0   # slower CI runner
+    python scripts/benchmark_import_time.py --module src.services.ai_parser --top 15
+"""
+import os
+import re
+import sys
+import argparse
+import subprocess
+from typing import Dict, List, Optional, Tuple
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# module → cumulative import budget in milliseconds
+BUDGETS_MS: Dict[str, float] = {
+    "src.database": 500,
+    "src.models": 600,
+    "src.scrapers": 60,
+    "src.utils.gemini_client": 150,
+    "src.services.ai_parser": 250,
+}
+
+# Dependencies that must not be imported at module import time
+FORBIDDEN = ("google.genai", "playwright", "bs4", "selenium", "undetected_chromedriver", "groq", "lxml")
+
+_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def measure(module: str) -> Tuple[Optional[float], List[Tuple[float, str]], str]:
+    """(cumulative ms of `module` or None on failure, [(cumulative ms, name)] of all imports, error)."""
+    env = {k: v for k, v in os.environ.items() if k != "DATABASE_URL"}
+    env["PYTHONPATH"] = project_root + os.pathsep + env.get("PYTHONPATH", "")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=project_root, env=env, capture_output=True, text=True,
+    )
+    imports: List[Tuple[float, str]] = []
+    total = None
+    for line in proc.stderr.splitlines():
+        match = _LINE.match(line)
+        if not match:
+            continue
+        cumulative_ms = int(match.group(2)) / 1000.0
+        name = match.group(4)
+        imports.append((cumulative_ms, name))
+        if name == module:
+            total = cumulative_ms
+    error = ""
+    if proc.returncode != 0:
+        error = (proc.stderr.strip().splitlines() or ["import failed"])[-1]
+        total = None
+    return total, imports, error
+
+
+def main() -> int:
+    cli = argparse.ArgumentParser()
+    cli.add_argument("--module", action="append", help="Module(s) to check (default: all budgeted modules)")
+    cli.add_argument("--repeat", type=int, default=3, help="Runs per module; the fastest one counts")
+    cli.add_argument("--scale", type=float, default=float(os.getenv("IMPORT_TIME_BUDGET_SCALE", "1.0")),
+                     help="Multiply every budget (slow machines)")
+    cli.add_argument("--top", type=int, default=0, help="Print the N slowest imports of each module")
+    args = cli.parse_args()
+
+    failed = False
+    for module in args.module or list(BUDGETS_MS):
+        budget = BUDGETS_MS.get(module, 100.0) * args.scale
+        best: Optional[float] = None
+        imports: List[Tuple[float, str]] = []
+        error = ""
+        for _ in range(max(1, args.repeat)):
+            total, run_imports, error = measure(module)
+            if total is None:
+                break
+            if best is None or total < best:
+                best, imports = total, run_imports
+
+        loaded = {name for _, name in imports}
+        forbidden = sorted(name for name in loaded if name.split(".")[0] in FORBIDDEN or name in FORBIDDEN)
+        if best is None:
+            status = f"FAIL  import error: {error}"
+        elif best > budget:
+            status = f"FAIL  over budget ({budget:.0f} ms)"
+        elif forbidden:
+            status = "FAIL  heavy imports: " + ", ".join(forbidden[:5])
+        else:
+            status = "ok"
+        failed = failed or status != "ok"
+        shown = f"{best:8.1f} ms" if best is not None else "       - ms"
+        print(f"{module:<28} {shown}  budget {budget:6.0f} ms  {status}")
+
+        if args.top and imports:
+            for cumulative_ms, name in sorted(imports, reverse=True)[1:args.top + 1]:
+                print(f"      {cumulative_ms:8.1f} ms  {name}")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,475 @@
+"""
+Prompt evaluation harness: replays the hand-curated campaigns in final/ through
+the AI parsing pipeline and scores the output against them.
+
+The final/ JSON files are the curated end result per bank (reward, dates,
+eligible cards, merchant, participation, conditions). Each campaign is parsed
+again with AIParser (full-text mode, default) or parse_api_campaign (--mode api)
+and compared field by field:
+
+  - start_date / end_date, reward_value     exact (reward ±0.5%)
+  - reward_text, participation, conditions  word-level F1
+  - cards                                   set F1 (an item matches when either name contains the other)
+  - brands                                  1 when the curated merchant is among the brands
+
+The curated files do not store the source page, so the input text is rebuilt from
+title + description + conditions (the answer fields are left out). --fetch downloads
+the campaign URL instead (cached; falls back to the rebuilt text when it fails).
+
+Every AI call is captured with src.utils.ai_telemetry.capture(), so each campaign
+gets its calls, input/output tokens and latency. Responses from the response cache,
+near-duplicate reuse and the negative cache are turned off so every campaign goes
+through the pipeline; the rule fast-path, sector classifier and gazetteer stay on
+because they are part of what is measured. Eval calls are not written to the
+production telemetry DB.
+
+Backends (GEMINI_BACKEND, src/utils/replay_backend.py):
+    live     real API
+    record   real API, responses saved to --recordings
+    replay   no network: recorded responses, latencies and token counts;
+             requests whose prompt changed since the recording fail as misses
+
+Each run is saved as <out>/<run_id>.json (PROMPT_VERSION, model, --label, per-campaign
+rows); --report compares all saved runs per prompt version / model and per bank.
+
+Usage:
+    python scripts/evaluate_prompts.py --limit 20 --backend record --label baseline
+    python scripts/evaluate_prompts.py --limit 20 --backend replay --label baseline
+    python scripts/evaluate_prompts.py --bank "Yapı Kredi" --model gemini-2.5-flash --label flash
+    python scripts/evaluate_prompts.py --report [--by-bank]
+"""
+import os
+import re
+import sys
+import glob
+import html
+import json
+import time
+import hashlib
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+# Add project root to sys.path to ensure src imports work
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from src.services.rule_extractor import tr_lower # type: ignore
+
+# bank_name passed to the parser (as the scrapers do) → curated files under final/
+GOLDEN_SETS: Dict[str, List[str]] = {
+    "Akbank": ["AKBANK SON/axess/axess_kampanyalar_v28.json", "AKBANK SON/free/axess_free_v28.json"],
+    "Garanti BBVA": ["GARANTİ/bonus_kampanyalar_v13_fixed.json"],
+    "halkbank": ["HALKBANKASI/paraf_restored_v25.json"],
+    "VakıfBank": ["VAKIFBANK/vakifbank_kampanyalar_v37_ultimate.json"],
+    "Yapı Kredi": [
+        "YAPIKREDİ SON/world_v5.5.1_Nihai.json", "YAPIKREDİ SON/crystal_v5.5.1_Nihai.json",
+        "YAPIKREDİ SON/adios_v5.5.1_Nihai.json", "YAPIKREDİ SON/play_v5.4_duzeltilmis.json",
+    ],
+    "ziraat": ["ZİRAAT/ziraat_kampanyalar_v31_ultimate.json"],
+    "İşbankası": ["İŞ BANKASI/maximum_kampanyalar_final_v7.json"],
+}
+
+FIELDS = ("start_date", "end_date", "reward_value", "reward_text", "cards", "brands", "participation", "conditions")
+
+DEFAULT_OUT = os.path.join(".cache", "prompt_eval")
+MIN_TEXT_CHARS = 80
+
+_WORD = re.compile(r"\w+")
+_NUMBER = re.compile(r"\d{1,3}(?:\.\d{3})+(?:,\d+)?|\d+(?:,\d+)?")
+
+
+# ── Golden data ─────────────────────────────────────────────────────────────
+class GoldenCase:
+    """One curated campaign: parser input and the expected field values."""
+
+    __slots__ = ("bank", "source_file", "id", "title", "url", "description", "conditions", "expected")
+
+    def __init__(self, bank: str, source_file: str, record: Dict[str, Any]):
+        self.bank = bank
+        self.source_file = source_file
+        self.id = record.get("id")
+        self.title = (record.get("title") or "").strip()
+        self.url = record.get("url")
+        self.description = (record.get("description") or "").strip()
+        self.conditions = [c.strip() for c in record.get("conditions") or [] if isinstance(c, str) and c.strip()]
+        self.expected = _expected_fields(record)
+
+    def text(self) -> str:
+        """Parser input rebuilt from the narrative fields (the curated answers are left out)."""
+        return "\n".join([self.title, self.description, *self.conditions])
+
+    def content_html(self) -> str:
+        return "<ul>" + "".join(f"<li>{html.escape(c)}</li>" for c in self.conditions) + "</ul>"
+
+
+def _iso(value: Any) -> Optional[str]:
+    return value[:10] if isinstance(value, str) and re.match(r"\d{4}-\d{2}-\d{2}", value) else None
+
+
+def _number(text: Any) -> Optional[float]:
+    """First number in a Turkish-formatted string ("1.500 TL" → 1500, "%2,5" → 2.5)."""
+    match = _NUMBER.search(text) if isinstance(text, str) else None
+    if not match:
+        return None
+    return float(match.group(0).replace(".", "").replace(",", "."))
+
+
+def _expected_fields(record: Dict[str, Any]) -> Dict[str, Any]:
+    reward_value = _number(record.get("earning"))
+    if reward_value is None:
+        for name in ("max_discount", "discount_percentage"):
+            if isinstance(record.get(name), (int, float)) and record[name] > 0:
+                reward_value = float(record[name])
+                break
+    merchant = record.get("merchant")
+    expected = {
+        "start_date": _iso(record.get("valid_from")),
+        "end_date": _iso(record.get("valid_until")),
+        "reward_value": reward_value,
+        "reward_text": record.get("earning"),
+        "cards": [c for c in record.get("eligible_customers") or [] if isinstance(c, str) and c.strip()],
+        "brands": [merchant] if isinstance(merchant, str) and merchant.strip() else [],
+        "participation": record.get("participation_method"),
+        "conditions": [c for c in record.get("conditions") or [] if isinstance(c, str) and c.strip()],
+    }
+    return {name: value for name, value in expected.items() if value not in (None, "", [])}
+
+
+def load_golden(banks: Optional[List[str]] = None, limit: int = 0, final_dir: str = "final") -> List[GoldenCase]:
+    """Curated cases per bank (first `limit` per bank with usable text, duplicate titles skipped)."""
+    cases: List[GoldenCase] = []
+    wanted = {tr_lower(b) for b in banks} if banks else None
+    for bank, files in GOLDEN_SETS.items():
+        if wanted is not None and tr_lower(bank) not in wanted:
+            continue
+        seen, taken = set(), 0
+        for rel in files:
+            path = os.path.join(project_root, final_dir, rel)
+            if not os.path.exists(path):
+                print(f"   ⚠️ Golden file missing: {path}")
+                continue
+            with open(path, encoding="utf-8") as f:
+                records = json.load(f)
+            for record in records:
+                if limit and taken >= limit:
+                    break
+                case = GoldenCase(bank, rel, record)
+                key = tr_lower(case.title)
+                if not case.title or key in seen or len(case.text()) < MIN_TEXT_CHARS or not case.expected:
+                    continue
+                seen.add(key)
+                cases.append(case)
+                taken += 1
+    return cases
+
+
+def fetch_page(url: str, cache_dir: str) -> Optional[str]:
+    """Visible text of the campaign page (cached by URL); None when it cannot be fetched."""
+    path = os.path.join(cache_dir, hashlib.sha1(url.encode("utf-8")).hexdigest() + ".txt")
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            return f.read() or None
+    import requests # type: ignore
+    from bs4 import BeautifulSoup # type: ignore
+
+    text = ""
+    try:
+        response = requests.get(url, timeout=20, headers={"User-Agent": "Mozilla/5.0"})
+        response.raise_for_status()
+        soup = BeautifulSoup(response.text, "html.parser")
+        for tag in soup(["script", "style", "noscript"]):
+            tag.decompose()
+        text = "\n".join(line.strip() for line in soup.get_text("\n").splitlines() if line.strip())
+    except Exception as e:
+        print(f"   ⚠️ Fetch failed ({url}): {e}")
+    os.makedirs(cache_dir, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)  # failures are cached as empty so reruns stay comparable
+    return text if len(text) >= MIN_TEXT_CHARS else None
+
+
+# ── Scoring ─────────────────────────────────────────────────────────────────
+def _words(value: Any) -> List[str]:
+    if isinstance(value, (list, tuple)):
+        value = " ".join(str(v) for v in value)
+    return _WORD.findall(tr_lower(str(value or "")))
+
+
+def _f1(expected: Any, predicted: Any) -> float:
+    exp, pred = _words(expected), _words(predicted)
+    if not exp or not pred:
+        return 0.0
+    remaining: Dict[str, int] = {}
+    for w in exp:
+        remaining[w] = remaining.get(w, 0) + 1
+    common = 0
+    for w in pred:
+        if remaining.get(w):
+            remaining[w] -= 1
+            common += 1
+    if not common:
+        return 0.0
+    precision, recall = common / len(pred), common / len(exp)
+    return 2 * precision * recall / (precision + recall)
+
+
+def _names(value: Any) -> List[str]:
+    items = value.split(",") if isinstance(value, str) else value or []
+    return [" ".join(_words(v)) for v in items if _words(v)]
+
+
+def _same_name(a: str, b: str) -> bool:
+    return a in b or b in a
+
+
+def _set_f1(expected: Any, predicted: Any) -> float:
+    exp, pred = _names(expected), _names(predicted)
+    if not exp or not pred:
+        return 0.0
+    precision = sum(any(_same_name(p, e) for e in exp) for p in pred) / len(pred)
+    recall = sum(any(_same_name(e, p) for p in pred) for e in exp) / len(exp)
+    return 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+
+
+def score_field(name: str, expected: Any, predicted: Any) -> float:
+    """Score in [0, 1] of one predicted field against the curated value."""
+    if name in ("start_date", "end_date"):
+        return float(_iso(predicted) == expected)
+    if name == "reward_value":
+        try:
+            return float(abs(float(predicted) - expected) <= max(0.01, abs(expected) * 0.005))
+        except (TypeError, ValueError):
+            return 0.0
+    if name == "cards":
+        return _set_f1(expected, predicted)
+    if name == "brands":
+        merchant = _names(expected)[0]
+        return float(any(_same_name(merchant, b) for b in _names(predicted)))
+    return _f1(expected, predicted)
+
+
+def score_case(case: GoldenCase, result: Dict[str, Any]) -> Dict[str, float]:
+    return {name: round(score_field(name, value, result.get(name)), 4) for name, value in case.expected.items()}
+
+
+# ── Running ─────────────────────────────────────────────────────────────────
+def _configure_env(args: argparse.Namespace) -> None:
+    """Eval settings; must run before the AI modules are imported (several read env at import)."""
+    os.environ["GEMINI_BACKEND"] = args.backend
+    os.environ["GEMINI_RECORD_PATH"] = args.recordings or os.path.join(args.out, "recordings.jsonl")
+    os.environ["GEMINI_CACHE_ENABLED"] = "true" if args.use_cache else "false"
+    os.environ["AI_DEDUP"] = "false"
+    os.environ["AI_NEGATIVE_CACHE"] = "false"
+    os.environ["AI_TELEMETRY"] = "false"  # calls are captured per campaign instead
+    if args.model:
+        os.environ["GEMINI_MODEL"] = args.model
+    if args.backend == "replay":
+        # Recorded responses: no real quota to respect; fake keys are enough
+        for name in ("GEMINI_RPM", "GEMINI_TPM", "GEMINI_RPD"):
+            os.environ[name] = "0"
+        os.environ.setdefault("GEMINI_REPLAY_LATENCY", "recorded")
+        if not any(k.startswith("GEMINI_API_KEY") for k in os.environ):
+            os.environ["GEMINI_API_KEYS"] = "replay_a,replay_b"
+
+
+def evaluate_case(case: GoldenCase, mode: str, page_text: Optional[str]) -> Dict[str, Any]:
+    from src.services.ai_parser import get_ai_parser, parse_api_campaign # type: ignore
+    from src.utils.ai_telemetry import capture # type: ignore
+
+    started = time.monotonic()
+    error = None
+    with capture() as calls:
+        try:
+            if mode == "api":
+                result = parse_api_campaign(case.title, case.description, page_text or case.content_html(),
+                                            bank_name=case.bank, force=True)
+            else:
+                result = get_ai_parser().parse_campaign_data(page_text or case.text(), title=case.title,
+                                                             bank_name=case.bank, force=True)
+        except Exception as e:
+            result, error = {}, f"{type(e).__name__}: {str(e)[:120]}"
+    wall_ms = (time.monotonic() - started) * 1000
+    live = [c for c in calls if c["cache"] != "hit"]
+    return {
+        "bank": case.bank,
+        "file": case.source_file,
+        "id": case.id,
+        "title": case.title[:120],
+        "source": "page" if page_text else "golden",
+        "scores": score_case(case, result),
+        "ai_failed": bool(result.get("_ai_failed")) or error is not None,
+        "error": error or next((c["error"] for c in calls if c["error"]), None),
+        "calls": len(live),
+        "cache_hits": len(calls) - len(live),
+        "retries": sum(c["retries"] or 0 for c in calls),
+        "input_tokens": sum(c["input_tokens"] or 0 for c in live),
+        "output_tokens": sum(c["output_tokens"] or 0 for c in live),
+        "estimated_tokens": any(c["estimated"] for c in live),
+        "ai_latency_ms": round(sum(c["latency_ms"] or 0 for c in live), 1),
+        "latency_ms": round(wall_ms, 1),
+        "models": sorted({c["model"] for c in live if c["model"]}),
+    }
+
+
+def run(args: argparse.Namespace) -> str:
+    _configure_env(args)
+    from src.services.ai_parser import PROMPT_VERSION, gemini_model_name # type: ignore
+    from src.utils.quota_ledger import set_default_priority # type: ignore
+
+    set_default_priority("content")  # shared Gemini quota: scrapers and autofix go first
+    cases = load_golden(args.bank, args.limit)
+    if not cases:
+        sys.exit("No golden cases selected.")
+    run_id = time.strftime("%Y%m%d-%H%M%S")
+    meta = {
+        "run_id": run_id,
+        "label": args.label or PROMPT_VERSION,
+        "prompt_version": PROMPT_VERSION,
+        "model": gemini_model_name(),
+        "mode": args.mode,
+        "backend": args.backend,
+        "input": "page" if args.fetch else "golden",
+        "started": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    print(f"🧪 Evaluating {len(cases)} campaigns | prompt {meta['prompt_version']} ({meta['label']}) | "
+          f"model {meta['model']} | mode {args.mode} | backend {args.backend}")
+
+    pages_dir = os.path.join(args.out, "pages")
+    done = [0]
+    lock = threading.Lock()
+
+    def one(case: GoldenCase) -> Dict[str, Any]:
+        page_text = fetch_page(case.url, pages_dir) if args.fetch and case.url else None
+        row = evaluate_case(case, args.mode, page_text)
+        with lock:
+            done[0] += 1
+            score = _mean(row["scores"].values())
+            print(f"   [{done[0]}/{len(cases)}] {case.bank:<12.12} {score:5.2f}  {row['calls']} call(s) "
+                  f"{row['input_tokens']}+{row['output_tokens']} tok  {row['latency_ms']:.0f} ms  {case.title[:50]}")
+        return row
+
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        rows = list(pool.map(one, cases))
+
+    os.makedirs(args.out, exist_ok=True)
+    path = os.path.join(args.out, f"{run_id}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"meta": meta, "rows": rows}, f, ensure_ascii=False, indent=1)
+
+    print()
+    print_report([{"meta": meta, "rows": rows}], by_bank=True)
+    print(f"\n💾 Saved: {path}")
+    return path
+
+
+# ── Reporting ───────────────────────────────────────────────────────────────
+def _mean(values) -> float:
+    values = list(values)
+    return sum(values) / len(values) if values else 0.0
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+def summarize(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Field accuracy, cost and latency of a group of evaluated campaigns."""
+    n = len(rows) or 1
+    fields = {}
+    for name in FIELDS:
+        scores = [r["scores"][name] for r in rows if name in r["scores"]]
+        fields[name] = (_mean(scores), len(scores))
+    latencies = [r["latency_ms"] for r in rows]
+    return {
+        "campaigns": len(rows),
+        "score": _mean(_mean(r["scores"].values()) for r in rows if r["scores"]),
+        "fields": fields,
+        "failed": sum(1 for r in rows if r["ai_failed"]),
+        "calls": sum(r["calls"] for r in rows) / n,
+        "in_tokens": sum(r["input_tokens"] for r in rows) / n,
+        "out_tokens": sum(r["output_tokens"] for r in rows) / n,
+        "estimated": any(r["estimated_tokens"] for r in rows),
+        "p50_ms": _percentile(latencies, 50),
+        "p95_ms": _percentile(latencies, 95),
+    }
+
+
+def load_runs(out_dir: str) -> List[Dict[str, Any]]:
+    runs = []
+    for path in sorted(glob.glob(os.path.join(out_dir, "*.json"))):
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if isinstance(data, dict) and "meta" in data and "rows" in data:
+            runs.append(data)
+    return runs
+
+
+def print_report(runs: List[Dict[str, Any]], by_bank: bool = False) -> None:
+    """One line per (label, prompt version, model, mode, backend[, bank]); runs with the same key are pooled."""
+    groups: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+    for data in runs:
+        m = data["meta"]
+        name = m["prompt_version"] if m["label"] == m["prompt_version"] else f"{m['label']}|{m['prompt_version']}"
+        variant = (name, m["model"], f"{m['mode']}/{m['backend']}")
+        for row in data["rows"]:
+            groups.setdefault(variant + ("ALL",), []).append(row)
+            if by_bank:
+                groups.setdefault(variant + (row["bank"],), []).append(row)
+
+    short = {"start_date": "start", "end_date": "end", "reward_value": "rval", "reward_text": "rtext",
+             "cards": "cards", "brands": "brand", "participation": "part", "conditions": "cond"}
+    header = (f"{'variant':<20} {'model':<24} {'mode':<12} {'bank':<12} {'n':>4} {'score':>6} "
+              + " ".join(f"{short[f]:>5}" for f in FIELDS)
+              + f" {'fail':>4} {'calls':>5} {'in_tok':>7} {'out_tok':>7} {'p50ms':>7} {'p95ms':>7}")
+    print(header)
+    print("-" * len(header))
+    for key in sorted(groups, key=lambda k: (k[:3], k[3] != "ALL", k[3])):
+        s = summarize(groups[key])
+        field_cols = " ".join(f"{s['fields'][f][0]:>5.2f}" if s["fields"][f][1] else f"{'-':>5}" for f in FIELDS)
+        estimated = "~" if s["estimated"] else " "
+        print(f"{key[0]:<20.20} {key[1]:<24.24} {key[2]:<12.12} {key[3]:<12.12} {s['campaigns']:>4} {s['score']:>6.3f} "
+              f"{field_cols} {s['failed']:>4} {s['calls']:>5.2f} {s['in_tokens']:>6.0f}{estimated} "
+              f"{s['out_tokens']:>7.0f} {s['p50_ms']:>7.0f} {s['p95_ms']:>7.0f}")
+    print("Field columns: mean score per campaign (exact for dates/reward value, F1 otherwise); "
+          "tokens and calls per campaign; ~ = estimated tokens.")
+
+
+def main() -> None:
+    cli = argparse.ArgumentParser(description="Evaluate AI parsing prompts against the curated final/ datasets")
+    cli.add_argument("--bank", action="append", help="Only this bank (repeatable): " + ", ".join(GOLDEN_SETS))
+    cli.add_argument("--limit", type=int, default=20, help="Campaigns per bank (0 = all)")
+    cli.add_argument("--mode", choices=["html", "api"], default="html",
+                     help="html: AIParser.parse_campaign_data, api: parse_api_campaign")
+    cli.add_argument("--backend", choices=["live", "record", "replay"], default="live")
+    cli.add_argument("--recordings", help="Record/replay file (default <out>/recordings.jsonl)")
+    cli.add_argument("--model", help="Override GEMINI_MODEL for this run")
+    cli.add_argument("--label", help="Name of the prompt variant (default: PROMPT_VERSION)")
+    cli.add_argument("--fetch", action="store_true", help="Use the fetched campaign page as input")
+    cli.add_argument("--use-cache", action="store_true", help="Allow Gemini response cache hits")
+    cli.add_argument("--workers", type=int, default=1, help="Campaigns evaluated in parallel")
+    cli.add_argument("--out", default=DEFAULT_OUT, help="Directory for run files")
+    cli.add_argument("--report", action="store_true", help="Compare all saved runs instead of running")
+    cli.add_argument("--by-bank", action="store_true", help="With --report: one line per bank as well")
+    args = cli.parse_args()
+
+    if args.report:
+        runs = load_runs(args.out)
+        if not runs:
+            sys.exit(f"No runs in {args.out}")
+        print(f"{len(runs)} run(s) in {args.out}\n")
+        print_report(runs, by_bank=args.by_bank)
+        return
+    run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -10,6 +10,8 @@ if project_root not in sys.path:
     sys.path.append(project_root)
 
 from src.utils.gemini_client import generate_with_rotation # type: ignore
+from src.utils.quota_ledger import set_default_priority # type: ignore
+from src.utils.response_cache import is_content_cache_enabled # type: ignore
 
 # ─── Configuration ───────────────────────────────────────────────────────────
 DB_URL = os.getenv("DATABASE_URL")
@@ -65,7 +67,8 @@ def call_ai_with_retry(prompt: str, max_retries: int = 5) -> str:
             response = generate_with_rotation(
                 prompt, 
                 temperature=0.0,
-                model="gemini-2.5-flash-lite"
+                model="gemini-2.5-flash-lite",
+                use_cache=is_content_cache_enabled()
             )
             return response
         except Exception as e:
@@ -222,4 +225,5 @@ def generate_comparisons():
                 print(f"[ERROR] Brand {brand_name} işlenirken hata: {str(e)}")
 
 if __name__ == "__main__":
+    set_default_priority("content")
     generate_comparisons()
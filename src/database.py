@@ -1,32 +1,66 @@
 """
 Database connection and session management for Kartavantaj scraper
+
+The engine and session factory are created on first use, so importing this
+module (or src.models) neither reads .env nor requires DATABASE_URL.
 """
-from sqlalchemy import create_engine
+import os
+import threading
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
-from sqlalchemy import create_engine, event
 from dotenv import load_dotenv
-import os
 
-# Load environment variables
-load_dotenv()
+_engine = None
+_session_factory = None
+_init_lock = threading.Lock()
+
+
+def get_database_url() -> str:
+    """DATABASE_URL from the environment (.env is loaded on first call)."""
+    load_dotenv()
+    url = os.getenv("DATABASE_URL")
+    if not url:
+        raise ValueError("DATABASE_URL environment variable is not set")
+    return url
+
+
+def get_engine():
+    """Shared SQLAlchemy engine, created on first use."""
+    global _engine
+    if _engine is None:
+        with _init_lock:
+            if _engine is None:
+                _engine = create_engine(
+                    get_database_url(),
+                    pool_pre_ping=True,  # Verify connections before using
+                    pool_size=5,
+                    max_overflow=10
+                )
+    return _engine
+
 
-# Database URL from environment
-DATABASE_URL = os.getenv("DATABASE_URL")
+def get_session_factory():
+    """Shared session factory bound to get_engine()."""
+    global _session_factory
+    if _session_factory is None:
+        engine = get_engine()
+        with _init_lock:
+            if _session_factory is None:
+                _session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    return _session_factory
 
-if not DATABASE_URL:
-    raise ValueError("DATABASE_URL environment variable is not set")
 
-# Create SQLAlchemy engine
-engine = create_engine(
-    DATABASE_URL,
-    pool_pre_ping=True,  # Verify connections before using
-    pool_size=5,
-    max_overflow=10
-)
+def __getattr__(name):
+    # Backwards compatibility: `from src.database import engine, SessionLocal, DATABASE_URL`
+    if name == "engine":
+        return get_engine()
+    if name == "SessionLocal":
+        return get_session_factory()
+    if name == "DATABASE_URL":
+        return get_database_url()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-# Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 @event.listens_for(Session, "do_orm_execute")
 def _block_campaign_delete(execute_state):
@@ -49,7 +83,7 @@ def get_db():
             # Use db session
             pass
     """
-    db = SessionLocal()
+    db = get_session_factory()()
     try:
         yield db
     finally:
@@ -67,4 +101,4 @@ def get_db_session():
         finally:
             db.close()
     """
-    return SessionLocal()
+    return get_session_factory()()
@@ -1,41 +1,88 @@
+"""
+Lazy scraper registry.
 
+Scraper modules pull in Playwright, Selenium, bs4 and the AI parser, so nothing
+is imported here until a scraper class is actually requested:
 
+    from src.scrapers import AkbankAxessScraper      # imports only akbank_axess
+    from src.scrapers import get_scraper
+    scraper_cls = get_scraper("akbank_axess")
 
-try:
-    from .garanti_bonus import GarantiBonusScraper  # type: ignore # pyre-ignore[21]
-except ImportError: GarantiBonusScraper = None
+A scraper whose optional dependencies are missing resolves to None, as before.
+"""
+import importlib
+from typing import Dict, List, Optional, Tuple
 
-try:
-    from .garanti_milesandsmiles import GarantiMilesAndSmilesScraper  # type: ignore # pyre-ignore[21]
-except ImportError: GarantiMilesAndSmilesScraper = None
+# module name → scraper class name
+SCRAPERS: Dict[str, str] = {
+    'akbank_axess': 'AkbankAxessScraper',
+    'akbank_business': 'AkbankBusinessScraper',
+    'akbank_free': 'AkbankFreeScraper',
+    'akbank_wings': 'AkbankWingsScraper',
+    'albaraka': 'AlbarakaScraper',
+    'americanexpress': 'AmericanExpressScraper',
+    'chippin': 'ChippinScraper',
+    'denizbank': 'DenizbankScraper',
+    'dunyakatilim': 'DunyaKatilimScraper',
+    'enpara': 'EnparaScraper',
+    'garanti_bonus': 'GarantiBonusScraper',
+    'garanti_milesandsmiles': 'GarantiMilesAndSmilesScraper',
+    'garanti_shopandfly': 'GarantiShopAndFlyScraper',
+    'isbankasi_genc': 'IsbankMaximumGencScraper',
+    'isbankasi_maximiles': 'IsbankMaximilesScraper',
+    'isbankasi_maximum': 'IsbankMaximumScraper',
+    'kuveytturk': 'KuveytTurkScraper',
+    'masterpass': 'MasterpassScraper',
+    'paraf': 'ParafScraper',
+    'paraf_genc': 'ParafGencScraper',
+    'param': 'ParamScraper',
+    'qnb': 'QNBScraper',
+    'teb': 'TEBScraper',
+    'turkcell': 'TurkcellScraper',
+    'turkiyefinans': 'TurkiyeFinansScraper',
+    'turktelekom': 'TurkTelekomScraper',
+    'vakifbank': 'VakifbankScraper',
+    'vodafone': 'VodafoneScraper',
+    'yapikredi_adios': 'YapikrediAdiosScraper',
+    'yapikredi_crystal': 'YapikrediCrystalScraper',
+    'yapikredi_play': 'YapikrediPlayScraper',
+    'yapikredi_world': 'YapikrediWorldScraper',
+    'ziraat': 'ZiraatScraper',
+}
 
-try:
-    from .garanti_shopandfly import GarantiShopAndFlyScraper  # type: ignore # pyre-ignore[21]
-except ImportError: GarantiShopAndFlyScraper = None
+_BY_CLASS: Dict[str, Tuple[str, str]] = {cls: (module, cls) for module, cls in SCRAPERS.items()}
+_loaded: Dict[str, Optional[type]] = {}
 
-try:
-    from .vodafone import VodafoneScraper  # type: ignore # pyre-ignore[21]
-except ImportError: VodafoneScraper = None
 
-try:
-    from .akbank_axess import AkbankAxessScraper  # type: ignore # pyre-ignore[21]
-except ImportError: AkbankAxessScraper = None
+def available_scrapers() -> List[str]:
+    """Registered scraper module names (nothing is imported)."""
+    return sorted(SCRAPERS)
 
-try:
-    from .akbank_free import AkbankFreeScraper  # type: ignore # pyre-ignore[21]
-except ImportError: AkbankFreeScraper = None
 
-try:
-    from .akbank_business import AkbankBusinessScraper  # type: ignore # pyre-ignore[21]
-except ImportError: AkbankBusinessScraper = None
+def _load(module: str, class_name: str) -> Optional[type]:
+    key = f"{module}.{class_name}"
+    if key not in _loaded:
+        try:
+            _loaded[key] = getattr(importlib.import_module(f".{module}", __name__), class_name)
+        except ImportError:
+            _loaded[key] = None
+    return _loaded[key]
 
-try:
-    from .enpara import EnparaScraper  # type: ignore # pyre-ignore[21]
-except ImportError: EnparaScraper = None
 
-try:
-    from .turktelekom import TurkTelekomScraper  # type: ignore # pyre-ignore[21]
-except ImportError: TurkTelekomScraper = None
+def get_scraper(name: str) -> Optional[type]:
+    """Scraper class by module name ("akbank_axess") or class name ("AkbankAxessScraper")."""
+    if name in SCRAPERS:
+        return _load(name, SCRAPERS[name])
+    if name in _BY_CLASS:
+        return _load(*_BY_CLASS[name])
+    raise KeyError(f"Unknown scraper: {name}")
+
+
+def __getattr__(name: str):
+    if name in _BY_CLASS:
+        return _load(*_BY_CLASS[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 __all__ = [
     'GarantiBonusScraper',
@@ -46,5 +93,8 @@ __all__ = [
     'AkbankFreeScraper',
     'AkbankBusinessScraper',
     'EnparaScraper',
-    'TurkTelekomScraper'
+    'TurkTelekomScraper',
+    'SCRAPERS',
+    'available_scrapers',
+    'get_scraper',
 ]
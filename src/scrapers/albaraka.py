@@ -513,7 +513,8 @@ class AlbarakaScraper:
                         raw_text=combined_text[:6000], # Limit to 6k chars  # type: ignore # pyre-ignore[16,6]
                         title=camp["title"],
                         bank_name=self.BANK_NAME,
-                        card_name="Albaraka Kredi Kartı"
+                        card_name="Albaraka Kredi Kartı",
+                        known_fields={"end_date": self._parse_date(camp["end_date_str"], is_end=True)}
                     )
                     
                     res_data = {
@@ -231,7 +231,8 @@ class ChippinScraper:
                             title=title,
                             bank_name=BANK_NAME,
                             card_name=card_def["name"],
-                            tracking_url=tracking_url
+                            tracking_url=tracking_url,
+                            known_fields={"start_date": c.get("campaignStartDate"), "end_date": c.get("campaignEndDate")}
                         ) or {}
                     except Exception as e:
                         print(f"      ⚠️  AI Error: {e}")
@@ -29,7 +29,7 @@ from sqlalchemy import create_engine, text, func  # type: ignore # pyre-ignore[2
 from sqlalchemy.orm import sessionmaker  # type: ignore # pyre-ignore[21]
 
 # Import unified models and database session
-from src.database import engine, get_db_session  # type: ignore # pyre-ignore[21]
+from src.database import get_engine, get_db_session  # type: ignore # pyre-ignore[21]
 from src.models import Bank, Card, Sector, Brand, Campaign, CampaignBrand  # type: ignore # pyre-ignore[21]
 
 # AIParser is lazy-imported in __init__ to avoid google.generativeai hang
@@ -56,7 +56,7 @@ class IsbankMaximilesScraper:
     CARD_SLUG = "maximiles"
 
     def __init__(self):
-        self.engine = engine
+        self.engine = get_engine()
         self.db = get_db_session()
         
         # Lazy import of AIParser to avoid google.generativeai hanging at module import time
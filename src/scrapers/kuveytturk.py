@@ -92,26 +92,31 @@ class KuveytTurkScraper:
                 if len(urls) > self.max_campaigns:
                     urls = urls[:self.max_campaigns]  # type: ignore # pyre-ignore[16,6]
                 
-                # 2. Process Details
-                for i, url in enumerate(urls, 1):
-                    print(f"\n[{i}/{len(urls)}] Processing: {url}")  # type: ignore # pyre-ignore[16,6]
-                    stats['total'] += 1  # type: ignore # pyre-ignore[58]
-                    try:
-                        # Existing check
-                        existing = self.db.query(Campaign).filter_by(tracking_url=url).first()  # type: ignore # pyre-ignore[16]
-                        is_test_mode = os.environ.get('TEST_MODE') == '1'
-                        
-                        if existing and not is_test_mode:
-                            if existing.updated_at and (datetime.utcnow() - existing.updated_at).days < 2:
-                                print(f"   ⏭️  Skipping recently updated campaign.")
-                                continue
-
-                        if await self._scrape_single_detail(context, url, bank_id, card_id, stats):
-                            pass
-                        await asyncio.sleep(random.uniform(1, 2))
-                    except Exception as e:
-                        print(f"      ❌ Error processing {url}: {e}")
-                        stats['failed'] += 1  # type: ignore # pyre-ignore[58]
+                # 2. Process Details (concurrently, so several AI calls are in flight;
+                # bounded like the parser's own AI_ASYNC_CONCURRENCY slots)
+                semaphore = asyncio.Semaphore(max(1, int(os.getenv("AI_ASYNC_CONCURRENCY", "8"))))
+
+                async def process(i: int, url: str):
+                    async with semaphore:
+                        print(f"\n[{i}/{len(urls)}] Processing: {url}")  # type: ignore # pyre-ignore[16,6]
+                        stats['total'] += 1  # type: ignore # pyre-ignore[58]
+                        try:
+                            # Existing check
+                            existing = self.db.query(Campaign).filter_by(tracking_url=url).first()  # type: ignore # pyre-ignore[16]
+                            is_test_mode = os.environ.get('TEST_MODE') == '1'
+
+                            if existing and not is_test_mode:
+                                if existing.updated_at and (datetime.utcnow() - existing.updated_at).days < 2:
+                                    print(f"   ⏭️  Skipping recently updated campaign.")
+                                    return
+
+                            await self._scrape_single_detail(context, url, bank_id, card_id, stats)
+                            await asyncio.sleep(random.uniform(1, 2))
+                        except Exception as e:
+                            print(f"      ❌ Error processing {url}: {e}")
+                            stats['failed'] += 1  # type: ignore # pyre-ignore[58]
+
+                await asyncio.gather(*(process(i, url) for i, url in enumerate(urls, 1)))
                 
                 await browser.close()  # type: ignore # pyre-ignore[16]
                 
@@ -295,7 +300,7 @@ class KuveytTurkScraper:
             full_raw_text += f"TÜM KAMPANYA KOŞULLARI VE KATILIM DETAYLARI:\n{conditions_text}\n\n"  # type: ignore # pyre-ignore[58]
             
             print("   🤖 Parsing with AI...")
-            parsed_data = self.parser.parse_campaign_data(
+            parsed_data = await self.parser.aparse_campaign_data(
                 raw_text=full_raw_text, bank_name=self.BANK_NAME
             )
             
@@ -36,7 +36,7 @@ from sqlalchemy import create_engine, text, func  # type: ignore # pyre-ignore[2
 from sqlalchemy.orm import sessionmaker  # type: ignore # pyre-ignore[21]
 
 # Import unified models and database session
-from src.database import engine, get_db_session  # type: ignore # pyre-ignore[21]
+from src.database import get_engine, get_db_session  # type: ignore # pyre-ignore[21]
 from src.models import Bank, Card, Sector, Brand, Campaign, CampaignBrand  # type: ignore # pyre-ignore[21]
 from src.utils.logger_utils import log_scraper_execution  # type: ignore # pyre-ignore[21]
 
@@ -64,7 +64,7 @@ class ParamScraper:
     BANK_SLUG = "param"
 
     def __init__(self):
-        self.engine = engine
+        self.engine = get_engine()
         self.db = get_db_session()
         self.card_id = None
         
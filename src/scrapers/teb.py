@@ -311,6 +311,7 @@ class TEBScraper:
                     title=title,
                     bank_name=BANK_NAME,
                     card_name=card_name,
+                    known_fields={"start_date": start_date, "end_date": end_date},
                 )
             except Exception as e:
                 print(f"      ⚠️  AI Error: {e}")
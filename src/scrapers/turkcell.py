@@ -23,7 +23,7 @@ from sqlalchemy.orm import Session  # type: ignore # pyre-ignore[21]
 
 from src.database import get_db_session  # type: ignore # pyre-ignore[21]
 from src.models import Bank, Card, Sector, Brand, Campaign, CampaignBrand  # type: ignore # pyre-ignore[21]
-from src.services.ai_parser import parse_api_campaign  # type: ignore # pyre-ignore[21]
+from src.services.ai_parser import aparse_api_campaign  # type: ignore # pyre-ignore[21]
 from src.utils.logger_utils import log_scraper_execution  # type: ignore # pyre-ignore[21]
 from src.services.brand_normalizer import cleanup_brands  # type: ignore # pyre-ignore[21]
 from src.utils.slug_generator import get_unique_slug  # type: ignore # pyre-ignore[21]
@@ -96,20 +96,30 @@ class TurkcellScraper:
                 if links and self.max_campaigns:
                     links = cast(List[str], links)[:self.max_campaigns]  # type: ignore # pyre-ignore[16,6]
                 
-                for i, url in enumerate(links, 1):
-                    try:
-                        res = await self._scrape_detail(context, url)
-                        if res == "saved":
-                            success_count += 1  # type: ignore # pyre-ignore[58]
-                        elif res == "skipped":
-                            pass
-                        else:
-                            failed_count += 1  # type: ignore # pyre-ignore[58]
-                        await asyncio.sleep(random.uniform(1, 2))
-                    except Exception as e:
-                        print(f"      ❌ Error processing {url}: {e}")
+                # Detail pages run concurrently so several AI calls are in flight
+                # (bounded like the parser's own AI_ASYNC_CONCURRENCY slots)
+                semaphore = asyncio.Semaphore(max(1, int(os.getenv("AI_ASYNC_CONCURRENCY", "8"))))
+
+                async def process(url: str):
+                    async with semaphore:
+                        try:
+                            res = await self._scrape_detail(context, url)
+                            await asyncio.sleep(random.uniform(1, 2))
+                            return res, None
+                        except Exception as e:
+                            print(f"      ❌ Error processing {url}: {e}")
+                            return None, e
+
+                outcomes = await asyncio.gather(*(process(url) for url in links))
+                for url, (res, error) in zip(links, outcomes):
+                    if res == "saved":
+                        success_count += 1  # type: ignore # pyre-ignore[58]
+                    elif res == "skipped":
+                        pass
+                    else:
                         failed_count += 1  # type: ignore # pyre-ignore[58]
-                        error_details.append({"url": url, "error": str(e)})
+                        if error is not None:
+                            error_details.append({"url": url, "error": str(error)})
                 
                 await browser.close()  # type: ignore # pyre-ignore[16]
                 
@@ -208,7 +218,7 @@ class TurkcellScraper:
 
             raw_text = "\n\n".join(content_parts)
             
-            ai_data = parse_api_campaign(
+            ai_data = await aparse_api_campaign(
                 title=title,
                 short_description=title,
                 content_html=raw_text,
@@ -18,7 +18,12 @@ from src.utils.slug_generator import get_unique_slug  # type: ignore # pyre-igno
 from src.utils.cache_manager import clear_cache  # type: ignore # pyre-ignore[21]
 from src.services.brand_normalizer import cleanup_brands  # type: ignore # pyre-ignore[21]
 
-class YapikrediAdiosScraper:
+try:
+    from src.scrapers.yapikredi_base import YapikrediApiMixin  # type: ignore # pyre-ignore[21]
+except ImportError:
+    from yapikredi_base import YapikrediApiMixin  # type: ignore # pyre-ignore[21]
+
+class YapikrediAdiosScraper(YapikrediApiMixin):
     """
     Scraper for Yapı Kredi Adios campaigns using the public API.
     Does not require browser automation (Playwright/Selenium).
@@ -71,16 +76,11 @@ class YapikrediAdiosScraper:
             print(f"   Error fetching list page {page}: {e}")
             return []  # type: ignore # pyre-ignore[7]
 
-    def _process_item(self, item: Dict[str, Any]):  # type: ignore # pyre-ignore[16,6]
+    def _process_item(self, item: Dict[str, Any], ai_result: Optional[Dict[str, Any]] = None):  # type: ignore # pyre-ignore[16,6]
         title = item.get('Title') or item.get('PageTitle') or "Başlıksız Kampanya"
-        url_suffix = item.get('Url')
-        if not url_suffix:
+        full_url = self._full_url(item)
+        if not full_url:
             return "skipped"  # type: ignore # pyre-ignore[7]
-
-        if url_suffix.startswith('http'):
-            full_url = url_suffix
-        else:
-            full_url = f"{self.BASE_URL}{url_suffix}"
         
         with get_db_session() as db:
             existing = db.query(Campaign).filter(Campaign.tracking_url == full_url).first()  # type: ignore # pyre-ignore[16]
@@ -104,13 +104,15 @@ class YapikrediAdiosScraper:
         
         scraper_sector = item.get('Category') or item.get('Type') or item.get('SectorName') or None
         
-        ai_result = parse_api_campaign(
-            title=title,
-            short_description=short_description,
-            content_html=content_html,
-            bank_name=self.BANK_NAME,
-            scraper_sector=scraper_sector
-        )
+        if ai_result is None:
+            ai_result = parse_api_campaign(
+                title=title,
+                short_description=short_description,
+                content_html=content_html,
+                bank_name=self.BANK_NAME,
+                scraper_sector=scraper_sector,
+                known_fields={"start_date": start_date, "end_date": end_date}
+            )
         
         display_title = ai_result.get('short_title') or title
         
@@ -214,7 +216,7 @@ class YapikrediAdiosScraper:
             print(f"   Found {len(items)} items on page {page}")
             total_found += len(items)  # type: ignore # pyre-ignore[58]
             
-            active_count = 0
+            active_items = []
             for item in items:
                 # Filter expired
                 end_date_str = item.get('EndDate')
@@ -225,10 +227,16 @@ class YapikrediAdiosScraper:
                             continue
                     except:
                         pass
-                
+                active_items.append(item)
+
+            # One batched AI pass for all new campaigns on this page
+            ai_results = self._prefetch_ai(active_items)
+
+            active_count = 0
+            for item in active_items:
                 active_count += 1  # type: ignore # pyre-ignore[58]
                 try:
-                    res = self._process_item(item)
+                    res = self._process_item(item, ai_results.get(self._full_url(item) or ''))
                     if res == "saved":
                         success_count += 1  # type: ignore # pyre-ignore[58]
                     elif res == "skipped":
@@ -0,0 +1,64 @@
+import sys
+import os
+# Path setup
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from typing import Dict, Any, List, Optional  # type: ignore # pyre-ignore[21]
+
+from src.database import get_db_session  # type: ignore # pyre-ignore[21]
+from src.models import Campaign  # type: ignore # pyre-ignore[21]
+from src.services.ai_parser import parse_api_campaigns  # type: ignore # pyre-ignore[21]
+
+
+class YapikrediApiMixin:
+    """
+    Shared list-API helpers for the Yapı Kredi card scrapers (World, Adios, Crystal, Play).
+    The scraper class provides BASE_URL and BANK_NAME.
+    """
+
+    BASE_URL: str
+    BANK_NAME: str
+
+    def _full_url(self, item: Dict[str, Any]) -> Optional[str]:  # type: ignore # pyre-ignore[16,6]
+        url_suffix = item.get('Url')
+        if not url_suffix:
+            return None  # type: ignore # pyre-ignore[7]
+        if url_suffix.startswith('http'):
+            return url_suffix  # type: ignore # pyre-ignore[7]
+        return f"{self.BASE_URL}{url_suffix}"  # type: ignore # pyre-ignore[7]
+
+    def _prefetch_ai(self, items: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:  # type: ignore # pyre-ignore[16,6]
+        """
+        Parse all new campaigns of a list page with batched AI requests (keyed by full URL).
+        Returns {} on failure; the items are then parsed one by one in _process_item.
+        """
+        try:
+            new_items = []
+            with get_db_session() as db:
+                for item in items:
+                    full_url = self._full_url(item)
+                    if not full_url:
+                        continue
+                    if db.query(Campaign).filter(Campaign.tracking_url == full_url).first():  # type: ignore # pyre-ignore[16]
+                        continue
+                    new_items.append((full_url, item))
+
+            if not new_items:
+                return {}  # type: ignore # pyre-ignore[7]
+
+            results = parse_api_campaigns(
+                [{
+                    "title": item.get('Title') or item.get('PageTitle') or "Başlıksız Kampanya",
+                    "short_description": item.get('ShortDescription') or '',
+                    "content_html": item.get('Content') or '',
+                    "scraper_sector": item.get('Category') or item.get('Type') or item.get('SectorName') or None,
+                    "known_fields": {"start_date": item.get('StartDate'), "end_date": item.get('EndDate')},
+                } for _, item in new_items],
+                bank_name=self.BANK_NAME
+            )
+            return {url: res for (url, _), res in zip(new_items, results)}  # type: ignore # pyre-ignore[7]
+        except Exception as e:
+            print(f"   ⚠️ Batch AI prefetch failed, falling back to per-item parsing: {e}")
+            return {}  # type: ignore # pyre-ignore[7]
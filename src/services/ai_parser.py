@@ -2,49 +2,47 @@
 AI Parser Service - THE BRAIN 🧠
 Uses Gemini or Groq AI to parse campaign data from raw HTML/text
 Replaces 100+ lines of regex with intelligent natural language understanding
+
+Importing this module has no side effects: .env, logging and the Gemini SDK
+are set up when the first AIParser is created.
 """
 import os
 import json
 import re
 import logging
 import decimal
-import signal
-from typing import Dict, Any, Optional, List
-from datetime import datetime, timedelta
+import threading
+from functools import lru_cache
+from typing import Dict, Any, Generator, NamedTuple, Optional, List, Tuple
+from datetime import date, datetime, timedelta
 from dotenv import load_dotenv # type: ignore
 from .text_cleaner import clean_campaign_text # type: ignore
 from .brand_normalizer import cleanup_brands # type: ignore
+from .text_compactor import compact_text # type: ignore
+from .rule_extractor import ( # type: ignore
+    API_REQUIRED_FIELDS, extract_cards, extract_conditions, extract_fields, extract_participation,
+    is_fast_path_enabled, record_decision
+)
+from .dedup_index import get_dedup_index # type: ignore
+from .model_cascade import Stage, cascade_stages, needs_escalation # type: ignore
+from .sector_classifier import get_sector_classifier # type: ignore
+from .gazetteer import get_gazetteer, tr_casefold # type: ignore
+from .extraction_schema import ( # type: ignore
+    API_FIELDS, API_SECTOR_BY_SLUG, API_SECTOR_NAMES, CAMPAIGN_FIELDS, HTML_SECTOR_SLUGS, SCHEMA_MAX_OUTPUT_TOKENS, CampaignExtraction, batch_response_schema,
+    decode_batch, decode_extraction, is_schema_output_enabled, key_legend, response_schema, without
+)
+# Thread-safe timeouts (works outside the main thread, unlike SIGALRM)
+from src.utils.deadline import await_with_timeout, call_with_timeout, TimeoutException # type: ignore
+from src.utils.ai_telemetry import mark_fallback, set_campaigns, traced # type: ignore
+from src.utils.negative_cache import ( # type: ignore
+    content_key, failure_reason, get_negative_cache, is_transient_error
+)
 
 # DB Imports for Caching (Lazy to avoid circularity)
 _SessionLocal = None
 _Campaign = None
 _Sector = None
 
-class TimeoutException(Exception):
-    pass
-
-def timeout_handler(signum, frame):
-    raise TimeoutException("Gemini API call timed out")
-
-def call_with_timeout(func, args=(), kwargs=None, timeout_sec=60):
-    if kwargs is None:
-        kwargs = {}
-    
-    # Set the signal handler and a alarm
-    old_handler = signal.signal(signal.SIGALRM, timeout_handler)
-    signal.alarm(timeout_sec)
-    try:
-        result = func(*args, **kwargs)
-        return result
-    finally:
-        # Disable the alarm
-        signal.alarm(0)
-        signal.signal(signal.SIGALRM, old_handler)
-
-load_dotenv()
-
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Bank Specific Rules (Ported from kartavantaj-scraper)
@@ -378,19 +376,274 @@ BANK_RULES = {
 }
 
 # ── AI Provider Configuration ──────────────────────────────────────────────
-from google.genai import types # type: ignore
-from src.utils.gemini_client import get_gemini_client, generate_with_rotation # type: ignore
-
-_GEMINI_MODEL_NAME = os.getenv("GEMINI_MODEL", "gemini-3.1-flash-lite-preview")
-try:
-    _gemini_client = get_gemini_client()
-    print(f"[DEBUG] Gemini AI initialized via gemini_client module (Model: {_GEMINI_MODEL_NAME}).")
-except Exception as e:
-    print(f"[WARN] Gemini client init failed: {e}")
-    _gemini_client = None
+from src.utils.gemini_client import agenerate_with_rotation, generate_with_rotation # type: ignore
+from src.utils.rate_limiter import RateLimitExhausted, estimate_tokens # type: ignore
+
+# Bump when prompt templates change so cached responses from the old prompt are not reused
+PROMPT_VERSION = "v3"
+
+_runtime_ready = False
+_runtime_lock = threading.Lock()
+
+
+def _init_runtime() -> None:
+    """One-time setup on first parser use (kept out of import time): .env and default logging."""
+    global _runtime_ready
+    if _runtime_ready:
+        return
+    with _runtime_lock:
+        if not _runtime_ready:
+            load_dotenv()
+            logging.basicConfig(level=logging.INFO)
+            _runtime_ready = True
+
+
+def gemini_model_name() -> str:
+    """Model used for parsing (GEMINI_MODEL, read at call time so .env is honoured)."""
+    return os.getenv("GEMINI_MODEL", "gemini-3.1-flash-lite-preview")
 # ────────────────────────────────────────────────────────────────────────────
 
 
+# ── Precompiled prompt prefixes ─────────────────────────────────────────────
+@lru_cache(maxsize=None)
+def _resolve_bank_key(bank_name: Optional[str]) -> Optional[str]:
+    """BANK_RULES key for bank_name (first substring match), resolved once per name."""
+    if bank_name:
+        bank_name_lower = bank_name.lower()
+        for bank_key in BANK_RULES:
+            if bank_key in bank_name_lower:
+                return bank_key
+    return None
+
+
+@lru_cache(maxsize=64)
+def _html_system_prompt(bank_key: Optional[str], current_date: str, schema_output: bool = False) -> str:
+    """
+    Static prefix of the full-HTML prompt for one bank (recompiled when the date changes).
+    With schema_output the compact key legend is appended; otherwise the JSON example goes into
+    the campaign prompt (_build_prompt_parts) so locked / known fields can be left out of it.
+    """
+    today = datetime.strptime(current_date, "%Y-%m-%d")
+    bank_instructions = BANK_RULES.get(bank_key, "") if bank_key else ""
+    return f"""
+Sen uzman bir kampanya analistisin. Aşağıdaki kampanya metnini analiz et ve JSON formatında yapısal veriye dönüştür.
+Bugünün tarihi: {current_date} (Yıl: {today.year})
+
+{bank_instructions}
+
+VALID- SECTOR (CRITICAL):
+    Valid Sectors for Validation:
+    {{
+        "Market & Gıda": "market-gida",
+        "Akaryakıt": "akaryakit",
+        "Giyim & Aksesuar": "giyim-aksesuar",
+        "Restoran & Kafe": "restoran-kafe",
+        "Elektronik": "elektronik",
+        "Mobilya, Dekorasyon & Yapı Market": "mobilya-dekorasyon",
+        "Sağlık, Kozmetik & Kişisel Bakım": "kozmetik-saglik",
+        "E-Ticaret": "e-ticaret",
+        "Ulaşım": "ulasim",
+        "Dijital Platform & Oyun": "dijital-platform",
+        "Spor, Kültür & Eğlence": "kultur-sanat",
+        "Eğitim": "egitim",
+        "Sigorta": "sigorta",
+        "Otomotiv": "otomotiv",
+        "Vergi & Kamu": "vergi-kamu",
+        "Turizm, Konaklama & Seyahat": "turizm-konaklama",
+        "Mücevherat, Optik & Saat": "kuyum-optik-ve-saat",
+        "Fatura & Telekomünikasyon": "fatura-telekomunikasyon",
+        "Anne, Bebek & Oyuncak": "anne-bebek-oyuncak",
+        "Kitap, Kırtasiye & Ofis": "kitap-kirtasiye-ofis",
+        "Evcil Hayvan & Petshop": "evcil-hayvan-petshop",
+        "Hizmet & Bireysel Gelişim": "hizmet-bireysel-gelisim",
+        "Finans & Yatırım": "finans-yatirim",
+        "Diğer": "diger"
+    }}
+    🚨 NOTE: If the campaign is about Sports, Matches, Football, Theatre, or Concerts (e.g., UEFA, Galatasaray, tiyatro, sinema), it MUST be categorized as 'kultur-sanat', NOT 'diger'.
+    🚨 NOTE: If the campaign is about "yeni müşteri" (new customer), "kredi kartı başvurusu" (credit card application), "ihtiyaç kredisi" (loan) or any banking/financial product sale, you MUST categorize it as 'finans-yatirim'.
+    🚨 SECTOR OUTPUT RULE: Your JSON `"sector"` value must ONLY be one of the slugs above (e.g. "market-gida", NOT "Market & Gıda").
+
+⭐⭐⭐ KRİTİK KURALLAR (DOKUNULMAZ) ⭐⭐⭐
+1. **DİL**: Tamamı TÜRKÇE olmalı.
+2. **BRANDS**: Metinde geçen markayı TAM OLARAK al. 
+    - 🚨 ÖNEMLİ YASAK: Asla kampanya sahibi bankayı (İş Bankası, Akbank, Garanti vb.) veya kart programını (Maximum, Axess, Bonus, World, Wings vb.) MARKA olarak ekleme. Sadece ortak markayı (ör. Trendyol, Migros, THY) ekle.
+    - 🚨 FORMAT KURALI: Marka veya kart isimlerini asla "P, a, r, a, f" veya "A, x, e, s, s" gibi her harfi virgülle ayrılmış şekilde yazma. Sadece tam ve okunabilir ismi yaz ("Paraf", "Axess").
+    - Bilinmeyen marka varsa UYDURMA, metindeki ismini kullan.
+3. **SECTOR**: Yukarıdaki VALID SECTORS listesinden EN UYGUN olanı seç. Asla bu liste dışına çıkma.
+4. **MARKETING**: 'description' alanı MUTLAKA 2 cümle olmalı. Samimi ve kullanıcıyı teşvik edici olmalı.
+    - 🚨 KESİN YASAK: 'description' alanına tarih, kart veya katılım bilgisi ASLA EKLEME.
+5. **REWARD TEXT (PUNCHY)**: 
+    - 'reward_text' kısmına en kısa ve çarpıcı ödülü yaz.
+    - "Peşin fiyatına" gibi detayları yazma, sadece "150 TL Puan", "+4 Taksit", "%20 İndirim" yaz.
+    - Eğer "100 TL Worldpuan" diyorsa "100 TL Worldpuan" yaz. (Değer + Tür)
+6. **CONDITIONS (STRICT REDUNDANCY & BOILERPLATE REMOVAL)**: 
+    - 🚨 🚨 **YASAK**: Aşağıdaki alanlarda zaten olan bilgileri 'conditions' içine yazmak KESİNLİKLE YASAKTIR:
+        - 'start_date' ve 'end_date' (Örn: "Şubat ayı boyunca" yazma!)
+        - 'cards' (Örn: "Axess sahipleri" yazma!)
+        - 'participation' (Örn: "Jüzdan'dan katılın" yazma!)
+        - 'title' (Başlıkta olan bilgiyi tekrarlama!)
+    - 🚨 **JURIDICAL BOILERPLATE REMOVAL (ULTRA STRICT)**: Aşağıdaki jenerik metinleri KESİNLİKLE SİL:
+        - "Taksit sayısı ürün gruplarına göre yasal mevzuat çerçevesinde belirlenir."
+        - "Bireysel kredi kartlarıyla gerçekleştirilecek basılı ve külçe altın, kuyum, telekomünikasyon, akaryakıt, yemek, gıda, kozmetik vb. harcamalarda taksit uygulanamaz."
+        - "Yasal mevzuat gereği azami taksit sayısı..."
+        - "Kampanya farklı kampanyalarla birleştirilemez."
+    - ✅ SADECE SADECE KAMPANYAYA ÖZEL ŞARTLARI YAZ: "Maksimum 500 TL", "Harcama alt sınırı 2000 TL", "İade/İptal hariçtir".
+    - Eğer tüm sayfa içeriği zaten bu 4 alanda varsa 'conditions' boş (boş liste) olabilir. Gereksiz kalabalık yapma.
+
+7. **DATES**: 
+    - Tüm tarihleri 'YYYY-MM-DD' formatında ver.
+    - 🚨 YIL KURALI: Eğer yıl belirtilmemişse:
+      * Bugünün tarihi: {current_date} (Yıl: {today.year}, Ay: {today.month})
+      * Kampanya ayı < Bugünün ayı → Yıl: {today.year + 1}
+      * Kampanya ayı >= Bugünün ayı → Yıl: {today.year}
+    - Sadece bitiş tarihi varsa, başlangıç tarihi olarak bugünü ({current_date}) al.
+
+8. **KATILIM (PARTICIPATION)**: 
+    - 🚨 KRİTİK: SMS, Mobil, Uygulama, Katıl, Gönder gibi teknik katılım mekanizmalarını ara.
+    - 🚨 ULTRA YASAK: "Hemen faydalanabilirsiniz", "Detayları inceleyin", "Mobil uygulama üzerinden katılabilirsiniz" gibi anlamsız/jenerik metinleri ASLA yazma.
+    - Bulamadığında bankanın mobil uygulaması üzerinden katılımı vurgula (Örn: "BonusFlaş üzerinden Hemen Katıl butonuna tıklayarak katılın").
+    - 🚨 ÖZEL: Eğer katılım için "Rezervasyon", "Axess POS terminali" gibi teknik bir şart varsa bunu 'participation' alanına yaz.
+    - 🚨 DOĞRULAMA: İş Bankası için ASLA "World Mobil" yazma, "Maximum Mobil" olarak düzelt. Akbank için "Jüzdan", Garanti için "BonusFlaş", Yapı Kredi için "World Mobil" ifadelerini doğrula.
+    - Varsa tam talimatı yaz: "KAZAN yazıp 4455'e SMS gönderin" veya "Maximum Mobil üzerinden Hemen Katıl butonuna tıklayın".
+    - Yoksa ve metinde teknik bir detay bulunamıyorsa; bankanın mobil uygulaması üzerinden katılımı vurgula (Örn: "BonusFlaş üzerinden katılabilirsiniz").
+
+9. **REWARD_TEXT**: 
+    - 🚨 ASLA YAZMA: "Detayları İnceleyin", "Hemen Faydalanın" gibi jenerik ifadeler yasaktır. 
+    - 🚨 SOURCE PRIORITY: Ödül metin içinde yoksa MUTLAKA BAŞLIKTAN (TITLE) çıkar (Örn: "3 Taksit", "%20 İndirim"). 
+    - Hiçbir somut değer bulamazsan "Kampanya Fırsatı" yaz.
+
+10. **PAZARLAMA ÖZETİ (MARKETING TEXT)**:
+    - 'ai_marketing_text' alanı için: Kampanyanın avantajını özetleyen, kullanıcıyı tıklamaya teşvik eden, emojisiz, samimi ve kısa bir cümle oluştur. (Örn: "Market harcamalarınızda 500 TL'ye varan puan kazanma fırsatını kaçırmayın!")
+    - Max 120 karakter.
+
+11. **HARCAMA-KAZANÇ KURALLARI (MATHEMATIC LOGIC)**:
+    - **discount**: SADECE "{{N}} Taksit" veya "+{{N}} Taksit"
+    - **reward_text**: 
+      - 🚨 YÜZDE + MAX LİMİT KURALI: "%10 (max 200TL)" formatında yaz.
+      - 🚨 PUAN: "100 TL Worldpuan" veya "500 Mil".
+      - 🚨 İNDİRİM: "200 TL İndirim".
+      - 🚨 ULTRA YASAK: "Detayları İnceleyin", "Hemen Faydalanın", "Kampanyaya Dahil Kartlar" gibi jenerik ifadeler yasaktır. 
+      - Metinde veya Başlıkta kampanya ödülü neyse onu yaz. Hiç bulamazsan ödülü "Kampanya Fırsatı" olarak belirt ama jenerik ibare kullanma. Bulunamayan her alanı BOŞ/NULL bırak, uydurma metin yazma.
+    - **min_spend**: Kampanyadan faydalanmak için gereken minimum harcama tutarı. (Sayısal)
+{key_legend(CAMPAIGN_FIELDS) if schema_output else ""}
+"""
+
+
+_HTML_JSON_FORMAT = """
+JSON Formatı:
+{
+  "title": "Kısa ve çarpıcı başlık",
+  "description": "2 cümlelik detaylı açıklama metni",
+  "ai_marketing_text": "Kısa ve davetkar pazarlama özeti",
+  "reward_value": 0.0,
+  "reward_type": "puan/indirim/taksit/mil",
+  "reward_text": "150 TL Puan",
+  "min_spend": 0.0,
+  "start_date": "YYYY-MM-DD",
+  "end_date": "YYYY-MM-DD",
+  "sector": "Sektör Slug'ı",
+  "brands": ["Marka1", "Marka2"],
+  "cards": ["Kart1", "Kart2"],
+  "participation": "Katılım talimatı (SMS/App)",
+  "conditions": ["Madde 1", "Madde 2"] // 🚨 ASLA madde işareti (- , * , •) kullanma, sadece metni yaz.
+}
+"""
+
+
+@lru_cache(maxsize=8)
+def _lite_system_prompt(kind: str, current_date: str, schema_output: bool = False) -> str:
+    """
+    Short prefix for the cascade's lite stage: core field rules and the sector list only,
+    no bank rule block. `kind` is "html" (sector slugs) or "api" (sector names).
+    """
+    today = datetime.strptime(current_date, "%Y-%m-%d")
+    if kind == "api":
+        sectors = ", ".join(API_SECTOR_NAMES)
+        title_rule = "short_title: 40-70 karakter, çarpıcı başlık."
+        output = key_legend(API_FIELDS) if schema_output else ""  # the JSON shape is in the campaign prompt
+    else:
+        sectors = ", ".join(HTML_SECTOR_SLUGS)
+        title_rule = "title: kısa başlık; ai_marketing_text: max 120 karakter emojisiz tek cümle."
+        output = key_legend(CAMPAIGN_FIELDS) if schema_output else ""  # the JSON shape is in the campaign prompt
+    return f"""Kampanya metnini analiz et ve JSON'a dönüştür. Tamamı TÜRKÇE. Bugün: {current_date}.
+KURALLAR:
+- {title_rule} description: 2 samimi cümle, tarih/kart/katılım içermez.
+- reward_text: en kısa somut ödül ("150 TL Puan", "+4 Taksit", "%20 İndirim"); reward_value sayısal; "Detayları İnceleyin" YASAK.
+- sector SADECE şu listeden: {sectors}
+- brands: yalnızca ortak marka (banka/kart programı değil).
+- cards: metinde geçen kart adlarını tam yaz, "Kampanyaya Dahil Kartlar" YASAK.
+- participation: SMS / uygulama talimatını aynen yaz ("KEYWORD yazıp 4455'e SMS gönderin"); yoksa "Otomatik katılım". Jenerik ifade YASAK.
+- conditions: kampanyaya özel en fazla 5 kısa madde, yasal kalıp metinleri yazma.
+- Tarihler YYYY-MM-DD; yıl yoksa ay < {today.month} ise {today.year + 1}, değilse {today.year}.
+- Bulunamayan alanları null / boş bırak, uydurma.
+{output}
+"""
+
+class _AIRequest(NamedTuple):
+    """One AI call requested by a parse step generator (answered by AIParser._drive / _adrive)."""
+    prompt: str
+    system_instruction: Optional[str]
+    config: Optional[Any]
+    model: Optional[str]
+    max_attempts: int = 1
+    timeout_sec: int = 65
+
+
+# Parse logic as a generator: yields _AIRequest, receives the response text, returns the result
+_ParseSteps = Generator[_AIRequest, str, Dict[str, Any]]
+
+
+def _advance(steps: _ParseSteps, text: Optional[str] = None,
+             error: Optional[Exception] = None) -> Tuple[bool, Any]:
+    """
+    Run a step generator up to its next AI request: (False, request) or (True, result).
+    StopIteration is turned into a value so the step can run in a worker thread (it cannot
+    cross a Future).
+    """
+    try:
+        return False, steps.throw(error) if error is not None else steps.send(text)  # type: ignore
+    except StopIteration as done:
+        return True, done.value
+
+# Full-HTML calls wait out exhausted quota / 503 this many times before falling back
+_HTML_MAX_ATTEMPTS = 5
+
+
+def _is_retryable(error: Exception) -> bool:
+    error_str = str(error)
+    return ("429" in error_str or "Resource exhausted" in error_str
+            or "rate_limit" in error_str.lower() or "503" in error_str)
+
+
+def _retry_wait(error: Exception, attempt: int, max_attempts: int) -> Optional[float]:
+    """Seconds to wait before retrying after `error`, None if it must be raised."""
+    if attempt + 1 >= max_attempts or not _is_retryable(error):
+        return None
+    # Key rotation is natively handled by gemini_client. If we drop here, ALL keys failed.
+    wait_time = (attempt + 1) * 3
+    print(f"   ⚠️ API limit across all keys or 503 error. Waiting {wait_time}s... (Attempt {attempt+1}/{max_attempts}) | {str(error)[:100]}")
+    return wait_time
+
+
+_async_limits: Dict[Any, Any] = {}
+_async_limits_lock = threading.Lock()
+
+
+def _async_slot() -> Any:
+    """Per-event-loop semaphore bounding in-flight async AI calls (AI_ASYNC_CONCURRENCY, default 8)."""
+    import asyncio
+    loop = asyncio.get_running_loop()
+    with _async_limits_lock:
+        semaphore = _async_limits.get(loop)
+        if semaphore is None:
+            # Closed loops (one asyncio.run per scraper) are dropped so the map does not grow
+            for old in [l for l in _async_limits if l.is_closed()]:
+                del _async_limits[old]
+            semaphore = asyncio.Semaphore(max(1, int(os.getenv("AI_ASYNC_CONCURRENCY", "8"))))
+            _async_limits[loop] = semaphore
+    return semaphore
+
+
 class AIParser:
     """
     Gemini AI-powered campaign parser.
@@ -399,38 +652,126 @@ class AIParser:
     """
 
     def __init__(self, model_name: Optional[str] = None):
-        self._client = _gemini_client
+        _init_runtime()
         self.model = None
-        print(f"[DEBUG] AIParser using Gemini | model: {_GEMINI_MODEL_NAME}")
+        print(f"[DEBUG] AIParser using Gemini | model: {gemini_model_name()}")
 
     # ── Unified call helper ──────────────────────────────────────────────────
-    def _call_ai(self, prompt: str, timeout_sec: int = 65) -> str:
-        """Send prompt to active AI provider."""
-        import time
-        # Intentional delay to avoid violent RPM spikes across workers
-        time.sleep(1.0) 
-        
+    def _call_ai(self, prompt: str, timeout_sec: int = 65, config: Optional[Any] = None,
+                 system_instruction: Optional[str] = None, model: Optional[str] = None) -> str:
+        """
+        Send prompt to active AI provider. system_instruction carries the static (cacheable) prefix;
+        model overrides GEMINI_MODEL (cascade stages).
+        """
+        # RPM spikes are smoothed by the shared per-key token bucket in
+        # src.utils.rate_limiter (inside generate_with_rotation), no fixed sleep here.
+
         # Token optimization settings (AI Studio web settings do NOT apply to raw API keys)
-        config = types.GenerateContentConfig(
-            temperature=0.0,
-            top_p=0.1,
-            top_k=1,
-            response_mime_type="application/json",
-            max_output_tokens=6000
-        )
+        if config is None:
+            config = self._json_config()
 
         result = call_with_timeout(
             generate_with_rotation,
             kwargs={
                 "prompt": prompt,
-                "model": _GEMINI_MODEL_NAME, 
-                "config": config
+                "model": model or gemini_model_name(),
+                "config": config,
+                "prompt_version": PROMPT_VERSION,
+                "system_instruction": system_instruction
             },
             timeout_sec=timeout_sec,
         )
         return str(result) if result else "{}"  # type: ignore
+
+    async def _acall_ai(self, prompt: str, timeout_sec: int = 65, config: Optional[Any] = None,
+                        system_instruction: Optional[str] = None, model: Optional[str] = None) -> str:
+        """Async twin of _call_ai; at most AI_ASYNC_CONCURRENCY calls are in flight per event loop."""
+        if config is None:
+            config = self._json_config()
+
+        async with _async_slot():
+            result = await await_with_timeout(
+                agenerate_with_rotation(
+                    prompt=prompt,
+                    model=model or gemini_model_name(),
+                    config=config,
+                    prompt_version=PROMPT_VERSION,
+                    system_instruction=system_instruction,
+                ),
+                timeout_sec=timeout_sec,
+            )
+        return str(result) if result else "{}"  # type: ignore
+
+    # ── Step drivers (parse logic is shared by the sync and async entry points) ──
+    def _drive(self, steps: "_ParseSteps") -> Dict[str, Any]:
+        """Run a parse step generator, answering each _AIRequest with a blocking AI call."""
+        done, value = _advance(steps)
+        while not done:
+            try:
+                text = self._request_text(value)
+            except Exception as e:
+                done, value = _advance(steps, error=e)
+            else:
+                done, value = _advance(steps, text)
+        return value
+
+    async def _adrive(self, steps: "_ParseSteps") -> Dict[str, Any]:
+        """
+        Async twin of _drive: AI calls and retry waits do not block the event loop. The segments
+        between AI calls (text cleaning, negative cache, near-duplicate index, classifier and
+        gazetteer loads - SQL round-trips with DATABASE_URL) run in a worker thread.
+        """
+        import asyncio
+        done, value = await asyncio.to_thread(_advance, steps)
+        while not done:
+            try:
+                text = await self._arequest_text(value)
+            except Exception as e:
+                done, value = await asyncio.to_thread(_advance, steps, None, e)
+            else:
+                done, value = await asyncio.to_thread(_advance, steps, text)
+        return value
+
+    def _request_text(self, request: "_AIRequest") -> str:
+        for attempt in range(request.max_attempts):
+            try:
+                return self._call_ai(request.prompt, timeout_sec=request.timeout_sec, config=request.config,
+                                     system_instruction=request.system_instruction, model=request.model)
+            except Exception as e:
+                wait_time = _retry_wait(e, attempt, request.max_attempts)
+                if wait_time is None:
+                    raise
+                import time
+                time.sleep(wait_time)
+        raise RuntimeError("unreachable")
+
+    async def _arequest_text(self, request: "_AIRequest") -> str:
+        import asyncio
+        for attempt in range(request.max_attempts):
+            try:
+                return await self._acall_ai(request.prompt, timeout_sec=request.timeout_sec, config=request.config,
+                                            system_instruction=request.system_instruction, model=request.model)
+            except Exception as e:
+                wait_time = _retry_wait(e, attempt, request.max_attempts)
+                if wait_time is None:
+                    raise
+                await asyncio.sleep(wait_time)
+        raise RuntimeError("unreachable")
+
+    def _json_config(self, max_output_tokens: int = 6000, schema: Optional[Dict[str, Any]] = None) -> Any:
+        """Deterministic JSON generation config; `schema` constrains the response shape."""
+        from google.genai import types # type: ignore
+        return types.GenerateContentConfig(
+            temperature=0.0,
+            top_p=0.1,
+            top_k=1,
+            response_mime_type="application/json",
+            response_schema=schema,
+            max_output_tokens=max_output_tokens
+        )
     # ────────────────────────────────────────────────────────────────────────
         
+    @traced("parse_campaign_data")
     def parse_campaign_data(
         self,
         raw_text: str,
@@ -438,7 +779,9 @@ class AIParser:
         bank_name: Optional[str] = None,
         card_name: Optional[str] = None,
         tracking_url: Optional[str] = None,
-        force: bool = False
+        force: bool = False,
+        known_fields: Optional[Dict[str, Any]] = None,
+        reuse: bool = True
     ) -> Dict[str, Any]:
         """
         Parse campaign data using Gemini AI
@@ -450,6 +793,11 @@ class AIParser:
             card_name: Card name (optional, for context)
             tracking_url: URL to check in cache (Madde 1)
             force: If True, skip cache and force AI call
+            known_fields: Field values the source already provides (dates, sector slug, cards...);
+                          they are not requested from the AI and are merged into the result
+            reuse: If False, skip the near-duplicate index and re-parse with AI (autofix re-parses
+                   the stored text, whose own earlier result the index would return); the new
+                   result replaces the indexed one
             
         Returns:
             Dictionary with structured campaign data
@@ -463,52 +811,143 @@ class AIParser:
                 print(f"   ✨ Using cached AI data for: {safe_url[:60]}...")  # type: ignore
                 return cached_data
 
-        # Clean text
-        clean_text = self._clean_text(raw_text)
-        
-        # Build prompt
-        prompt = self._build_prompt(clean_text, datetime.now().strftime("%Y-%m-%d"), bank_name, title)
-        
-        max_retries = 5
-        for attempt in range(max_retries):
-            try:
-                result_text = self._call_ai(prompt, timeout_sec=65)
+        return self._drive(self._html_steps(raw_text, title, bank_name, known_fields, reuse))
 
-                if not result_text:
-                    print("   ⚠️ Empty response text.")
-                    result_text = "{}"
-
-                # Extract JSON from response
-                json_data = self._extract_json(result_text)
+    @traced("aparse_campaign_data")
+    async def aparse_campaign_data(
+        self,
+        raw_text: str,
+        title: Optional[str] = None,
+        bank_name: Optional[str] = None,
+        card_name: Optional[str] = None,
+        tracking_url: Optional[str] = None,
+        force: bool = False,
+        known_fields: Optional[Dict[str, Any]] = None,
+        reuse: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Async variant of parse_campaign_data for asyncio scrapers.
+        Same caches, fast-path, cascade and fallbacks; AI calls use the async Gemini client.
+        """
+        import asyncio
 
-                # Validate and normalize
-                normalized = self._normalize_data(json_data)
-                
-                # INJECT cleaned text into the result dictionary for scrapers to save to DB
-                normalized["_clean_text"] = clean_text
+        if tracking_url and not force:
+            cached_data = await asyncio.to_thread(self._check_db_cache, tracking_url)
+            if cached_data:
+                print(f"   ✨ Using cached AI data for: {str(tracking_url)[:60]}...")
+                return cached_data
 
-                return normalized
+        return await self._adrive(self._html_steps(raw_text, title, bank_name, known_fields, reuse))
 
+    def _html_steps(self, raw_text: str, title: Optional[str], bank_name: Optional[str],
+                    known_fields: Optional[Dict[str, Any]], reuse: bool = True) -> "_ParseSteps":
+        """Full-HTML parse logic; yields one _AIRequest per AI call and returns the result."""
+        # Clean text
+        clean_text = self._clean_text(raw_text, bank_name)
+
+        # Negative cache: content that keeps failing is not sent again before its retry time
+        neg = get_negative_cache()
+        neg_key = content_key("html", clean_text) if neg is not None else ""
+        neg_entry = neg.check(neg_key) if neg is not None else None
+        if neg_entry is not None and neg_entry.blocked:
+            retry = datetime.fromtimestamp(neg_entry.retry_at).strftime("%Y-%m-%d %H:%M")
+            print(f"   ⏭️ Known-bad content ({neg_entry.reason}, {neg_entry.attempts} failures), AI skipped until {retry}")
+            fallback = self._get_fallback_data(str(title or "Kampanya")) # type: ignore
+            fallback["_clean_text"] = clean_text
+            fallback["_negative_cached"] = neg_entry.reason
+            return fallback
+
+        # Near-duplicate of an already parsed campaign (same text under another card/program)
+        known = _known_fields(known_fields, CAMPAIGN_FIELDS)
+        hits = _gazetteer_hits([(clean_text, title)], bank_name)[0]
+        duplicate = _reuse_near_duplicate("html", clean_text, title, bank_name) if reuse else None
+        if duplicate is not None:
+            duplicate.update(known)
+            _merge_hits(duplicate, hits)
+            duplicate["_clean_text"] = clean_text
+            return duplicate
+        # Sector classifier: a confident sector is not requested (caller values win)
+        known = {**_known_fields(_local_fields("html", [(clean_text, title)], bank_name)[0], CAMPAIGN_FIELDS), **known}
+
+        # Rule fast-path: lock fields the rules are sure about (sector slugs differ here, so not locked)
+        locked: Dict[str, Any] = {}
+        if is_fast_path_enabled():
+            rules = extract_fields(clean_text, title, bank_name)
+            locked = {k: v for k, v in rules.confident().items() if k not in ("sector", "brands") and k not in known}
+            record_decision(skipped=False, locked_fields=len(locked) + len(known))
+        locked_block = _locked_fields_block(locked) if locked else ""
+        locked.update(known)
+
+        # Build prompt (static bank prefix goes as system instruction, locked / known fields left out of the JSON shape)
+        system_prompt, prompt = self._build_prompt_parts(clean_text, datetime.now().strftime("%Y-%m-%d"), bank_name, title,
+                                                         masked=locked, locked_block=locked_block)
+        
+        # Schema mode: compact keys enforced by response_schema, locked / known fields are not requested at all
+        config = None
+        fields = without(CAMPAIGN_FIELDS, locked)
+        if is_schema_output_enabled():
+            config = self._json_config(SCHEMA_MAX_OUTPUT_TOKENS, response_schema(fields))
+
+        # Model cascade: a lite pass first, escalated to the full prompt only if it fails the quality checks
+        for stage in cascade_stages():
+            stage_system = system_prompt
+            if not stage.is_last:
+                stage_system = _lite_system_prompt("html", datetime.now().strftime("%Y-%m-%d"), config is not None)
+            try:
+                # Exhausted quota / 503 is waited out and retried by the driver (_HTML_MAX_ATTEMPTS)
+                result_text = yield _AIRequest(prompt, stage_system, config, stage.model, _HTML_MAX_ATTEMPTS)
+                normalized = self._decode_html(result_text, config, fields, locked)
             except Exception as e:
-                error_str = str(e)
-                if "429" in error_str or "Resource exhausted" in error_str or "rate_limit" in error_str.lower() or "503" in error_str:
-                    # Key rotation is natively handled by gemini_client. If we drop here, ALL keys failed.
-                    wait_time = (attempt + 1) * 3 
-                    print(f"   ⚠️ API limit across all keys or 503 error. Waiting {wait_time}s... (Attempt {attempt+1}/{max_retries}) | {str(error_str)[:100]}") # type: ignore
-                    import time
-                    time.sleep(wait_time)
+                if not stage.is_last and not is_transient_error(e):
+                    print(f"   ⤴️ Lite stage failed ({failure_reason(e)}), escalating to full prompt")
+                    needs_escalation("html", stage, None, e)
                     continue
-
+                if _is_retryable(e):
+                    print("   ❌ Max retries reached for AI Parser.")
                 logger.error(f"AI Parser Error: {e}")
+                mark_fallback()
+                if neg is not None and not is_transient_error(e):
+                    neg.record_failure(neg_key, failure_reason(e), title)
                 fallback = self._get_fallback_data(str(title) if title else "Kampanya") # type: ignore
-                fallback["_clean_text"] = clean_text
+                fallback["_clean_text"] = clean_text  # Inject to save even if AI fails
                 return fallback
 
-        print("   ❌ Max retries reached for AI Parser.")
+            reasons = needs_escalation("html", stage, normalized)
+            if reasons:
+                print(f"   ⤴️ Lite result failed checks ({', '.join(reasons)}), escalating to full prompt")
+                continue
+
+            # INJECT cleaned text into the result dictionary for scrapers to save to DB
+            normalized["_clean_text"] = clean_text
+            if stage.name != "full":
+                normalized["_cascade_stage"] = stage.name
+
+            if neg_entry is not None:
+                neg.record_success(neg_key)  # type: ignore
+            _merge_hits(normalized, hits)
+            _index_parsed("html", clean_text, normalized, bank_name, title, replace=not reuse)
+            return normalized
+
+        mark_fallback()
         fallback = self._get_fallback_data(str(title or "Kampanya")) # type: ignore
-        fallback["_clean_text"] = clean_text  # Inject to save even if AI fails
+        fallback["_clean_text"] = clean_text
         return fallback
 
+    def _decode_html(self, result_text: str, config: Optional[Any], fields,
+                     locked: Dict[str, Any]) -> Dict[str, Any]:
+        """Decode and normalize one full-HTML response; locked fields win over the model's values."""
+        if not result_text or result_text.strip() == "{}":
+            print("   ⚠️ Empty response text.")
+            raise ValueError("empty_response")
+
+        if config is not None:
+            normalized = self._normalize_extraction(decode_extraction(result_text, fields))
+        else:
+            # Extract JSON from response, then validate and normalize
+            normalized = self._normalize_data(self._extract_json(result_text))
+        normalized.update(locked)
+        return normalized
+
     def _check_db_cache(self, tracking_url: str) -> Optional[Dict[str, Any]]:
         """Check database if this URL was already parsed successfully."""
         global _SessionLocal, _Campaign, _Sector
@@ -561,7 +1000,7 @@ class AIParser:
             print(f"   ⚠️ Cache check failed: {e}")
         return None
 
-    def _clean_text(self, text: str) -> str:
+    def _clean_text(self, text: str, bank_name: Optional[str] = None) -> str:
         """
         Clean and normalize text before sending to AI.
         Relaxed strategy to prevent stripping critical reward/participation data.
@@ -612,24 +1051,24 @@ class AIParser:
         text = re.sub(r'\n{3,}', '\n\n', text)
         text = re.sub(r'[^\w\s\.,;:!?%₺\-/()İıĞğÜüŞşÖöÇç\n]', ' ', text)
 
-        # ── Step 3: Length limit (reverting to a safer 8000) ──────────
-        if len(text) > 8000:
-            text = text[:8000] # type: ignore
-
+        # Not compacted here: this text is stored as Campaign.clean_text and the boilerplate
+        # learner needs the full page; the token budget is applied in _build_prompt_parts.
         return text.strip()
     
-    def _build_prompt(self, raw_text: str, current_date: str, bank_name: Optional[str], page_title: Optional[str] = None) -> str:
-        # 1. Clean Text (Remove boilerplate)
-        cleaned_text = clean_campaign_text(raw_text)
-        
-        # 2. Get Bank Specific Instructions
-        bank_instructions = ""
-        if bank_name:
-            bank_name_lower = bank_name.lower()
-            for bank_key, rules in BANK_RULES.items():
-                if bank_key in bank_name_lower:
-                    bank_instructions = rules
-                    break
+    def _build_prompt_parts(self, raw_text: str, current_date: str, bank_name: Optional[str], page_title: Optional[str] = None,
+                            masked=(), locked_block: str = "") -> Tuple[str, str]:
+        """
+        (static system instruction, per-campaign prompt). The system part is compiled once per bank and day.
+        Without schema output the prompt ends with the JSON shape minus the `masked` fields.
+        """
+        # 1. Clean Text (Remove boilerplate), then token budget (relevance-ranked lines, not a blind cut)
+        cleaned_text = compact_text(clean_campaign_text(raw_text), bank_name,
+                                    int(os.getenv("AI_INPUT_TOKEN_BUDGET", "2000")))
+
+        # 2. Precompiled bank prefix (bank rules, valid sectors, field rules; key legend in schema mode)
+        schema_output = is_schema_output_enabled()
+        system_prompt = _html_system_prompt(_resolve_bank_key(bank_name), current_date, schema_output)
+        shape = "" if schema_output else _json_shape_without(_HTML_JSON_FORMAT.strip(), masked)
 
         # 3. If page h1 title provided, lock it in the prompt
         title_instruction = ""
@@ -640,146 +1079,28 @@ class AIParser:
 'title' alanına SADECE bu başlığı yaz. Metinden farklı bir başlık TÜRETME. Kısaltabilir veya dilbilgisi düzeltmesi yapabilirsin ama anlamı değiştirme.
 """
 
-        return f"""
-Sen uzman bir kampanya analistisin. Aşağıdaki kampanya metnini analiz et ve JSON formatında yapısal veriye dönüştür.
-Bugünün tarihi: {current_date} (Yıl: {datetime.now().year})
+        return system_prompt, f"""{title_instruction}
+ANALİZ EDİLECEK METİN:
+"{cleaned_text}"
+{locked_block}
+{shape}"""
 
-{bank_instructions}
-{title_instruction}
-
-VALID- SECTOR (CRITICAL):
-    Valid Sectors for Validation:
-    {{
-        "Market & Gıda": "market-gida",
-        "Akaryakıt": "akaryakit",
-        "Giyim & Aksesuar": "giyim-aksesuar",
-        "Restoran & Kafe": "restoran-kafe",
-        "Elektronik": "elektronik",
-        "Mobilya, Dekorasyon & Yapı Market": "mobilya-dekorasyon",
-        "Sağlık, Kozmetik & Kişisel Bakım": "kozmetik-saglik",
-        "E-Ticaret": "e-ticaret",
-        "Ulaşım": "ulasim",
-        "Dijital Platform & Oyun": "dijital-platform",
-        "Spor, Kültür & Eğlence": "kultur-sanat",
-        "Eğitim": "egitim",
-        "Sigorta": "sigorta",
-        "Otomotiv": "otomotiv",
-        "Vergi & Kamu": "vergi-kamu",
-        "Turizm, Konaklama & Seyahat": "turizm-konaklama",
-        "Mücevherat, Optik & Saat": "kuyum-optik-ve-saat",
-        "Fatura & Telekomünikasyon": "fatura-telekomunikasyon",
-        "Anne, Bebek & Oyuncak": "anne-bebek-oyuncak",
-        "Kitap, Kırtasiye & Ofis": "kitap-kirtasiye-ofis",
-        "Evcil Hayvan & Petshop": "evcil-hayvan-petshop",
-        "Hizmet & Bireysel Gelişim": "hizmet-bireysel-gelisim",
-        "Finans & Yatırım": "finans-yatirim",
-        "Diğer": "diger"
-    }}
-    🚨 NOTE: If the campaign is about Sports, Matches, Football, Theatre, or Concerts (e.g., UEFA, Galatasaray, tiyatro, sinema), it MUST be categorized as 'kultur-sanat', NOT 'diger'.
-    🚨 NOTE: If the campaign is about "yeni müşteri" (new customer), "kredi kartı başvurusu" (credit card application), "ihtiyaç kredisi" (loan) or any banking/financial product sale, you MUST categorize it as 'finans-yatirim'.
-    🚨 SECTOR OUTPUT RULE: Your JSON `"sector"` value must ONLY be one of the slugs above (e.g. "market-gida", NOT "Market & Gıda").
-
-⭐⭐⭐ KRİTİK KURALLAR (DOKUNULMAZ) ⭐⭐⭐
-1. **DİL**: Tamamı TÜRKÇE olmalı.
-2. **BRANDS**: Metinde geçen markayı TAM OLARAK al. 
-    - 🚨 ÖNEMLİ YASAK: Asla kampanya sahibi bankayı (İş Bankası, Akbank, Garanti vb.) veya kart programını (Maximum, Axess, Bonus, World, Wings vb.) MARKA olarak ekleme. Sadece ortak markayı (ör. Trendyol, Migros, THY) ekle.
-    - 🚨 FORMAT KURALI: Marka veya kart isimlerini asla "P, a, r, a, f" veya "A, x, e, s, s" gibi her harfi virgülle ayrılmış şekilde yazma. Sadece tam ve okunabilir ismi yaz ("Paraf", "Axess").
-    - Bilinmeyen marka varsa UYDURMA, metindeki ismini kullan.
-3. **SECTOR**: Yukarıdaki VALID SECTORS listesinden EN UYGUN olanı seç. Asla bu liste dışına çıkma.
-4. **MARKETING**: 'description' alanı MUTLAKA 2 cümle olmalı. Samimi ve kullanıcıyı teşvik edici olmalı.
-    - 🚨 KESİN YASAK: 'description' alanına tarih, kart veya katılım bilgisi ASLA EKLEME.
-5. **REWARD TEXT (PUNCHY)**: 
-    - 'reward_text' kısmına en kısa ve çarpıcı ödülü yaz.
-    - "Peşin fiyatına" gibi detayları yazma, sadece "150 TL Puan", "+4 Taksit", "%20 İndirim" yaz.
-    - Eğer "100 TL Worldpuan" diyorsa "100 TL Worldpuan" yaz. (Değer + Tür)
-6. **CONDITIONS (STRICT REDUNDANCY & BOILERPLATE REMOVAL)**: 
-    - 🚨 🚨 **YASAK**: Aşağıdaki alanlarda zaten olan bilgileri 'conditions' içine yazmak KESİNLİKLE YASAKTIR:
-        - 'start_date' ve 'end_date' (Örn: "Şubat ayı boyunca" yazma!)
-        - 'cards' (Örn: "Axess sahipleri" yazma!)
-        - 'participation' (Örn: "Jüzdan'dan katılın" yazma!)
-        - 'title' (Başlıkta olan bilgiyi tekrarlama!)
-    - 🚨 **JURIDICAL BOILERPLATE REMOVAL (ULTRA STRICT)**: Aşağıdaki jenerik metinleri KESİNLİKLE SİL:
-        - "Taksit sayısı ürün gruplarına göre yasal mevzuat çerçevesinde belirlenir."
-        - "Bireysel kredi kartlarıyla gerçekleştirilecek basılı ve külçe altın, kuyum, telekomünikasyon, akaryakıt, yemek, gıda, kozmetik vb. harcamalarda taksit uygulanamaz."
-        - "Yasal mevzuat gereği azami taksit sayısı..."
-        - "Kampanya farklı kampanyalarla birleştirilemez."
-    - ✅ SADECE SADECE KAMPANYAYA ÖZEL ŞARTLARI YAZ: "Maksimum 500 TL", "Harcama alt sınırı 2000 TL", "İade/İptal hariçtir".
-    - Eğer tüm sayfa içeriği zaten bu 4 alanda varsa 'conditions' boş (boş liste) olabilir. Gereksiz kalabalık yapma.
-
-7. **DATES**: 
-    - Tüm tarihleri 'YYYY-MM-DD' formatında ver.
-    - 🚨 YIL KURALI: Eğer yıl belirtilmemişse:
-      * Bugünün tarihi: {current_date} (Yıl: {datetime.now().year}, Ay: {datetime.now().month})
-      * Kampanya ayı < Bugünün ayı → Yıl: {datetime.now().year + 1}
-      * Kampanya ayı >= Bugünün ayı → Yıl: {datetime.now().year}
-    - Sadece bitiş tarihi varsa, başlangıç tarihi olarak bugünü ({current_date}) al.
-
-8. **KATILIM (PARTICIPATION)**: 
-    - 🚨 KRİTİK: SMS, Mobil, Uygulama, Katıl, Gönder gibi teknik katılım mekanizmalarını ara.
-    - 🚨 ULTRA YASAK: "Hemen faydalanabilirsiniz", "Detayları inceleyin", "Mobil uygulama üzerinden katılabilirsiniz" gibi anlamsız/jenerik metinleri ASLA yazma.
-    - Bulamadığında bankanın mobil uygulaması üzerinden katılımı vurgula (Örn: "BonusFlaş üzerinden Hemen Katıl butonuna tıklayarak katılın").
-    - 🚨 ÖZEL: Eğer katılım için "Rezervasyon", "Axess POS terminali" gibi teknik bir şart varsa bunu 'participation' alanına yaz.
-    - 🚨 DOĞRULAMA: İş Bankası için ASLA "World Mobil" yazma, "Maximum Mobil" olarak düzelt. Akbank için "Jüzdan", Garanti için "BonusFlaş", Yapı Kredi için "World Mobil" ifadelerini doğrula.
-    - Varsa tam talimatı yaz: "KAZAN yazıp 4455'e SMS gönderin" veya "Maximum Mobil üzerinden Hemen Katıl butonuna tıklayın".
-    - Yoksa ve metinde teknik bir detay bulunamıyorsa; bankanın mobil uygulaması üzerinden katılımı vurgula (Örn: "BonusFlaş üzerinden katılabilirsiniz").
-
-9. **REWARD_TEXT**: 
-    - 🚨 ASLA YAZMA: "Detayları İnceleyin", "Hemen Faydalanın" gibi jenerik ifadeler yasaktır. 
-    - 🚨 SOURCE PRIORITY: Ödül metin içinde yoksa MUTLAKA BAŞLIKTAN (TITLE) çıkar (Örn: "3 Taksit", "%20 İndirim"). 
-    - Hiçbir somut değer bulamazsan "Kampanya Fırsatı" yaz.
-
-10. **PAZARLAMA ÖZETİ (MARKETING TEXT)**:
-    - 'ai_marketing_text' alanı için: Kampanyanın avantajını özetleyen, kullanıcıyı tıklamaya teşvik eden, emojisiz, samimi ve kısa bir cümle oluştur. (Örn: "Market harcamalarınızda 500 TL'ye varan puan kazanma fırsatını kaçırmayın!")
-    - Max 120 karakter.
-
-11. **HARCAMA-KAZANÇ KURALLARI (MATHEMATIC LOGIC)**:
-    - **discount**: SADECE "{{N}} Taksit" veya "+{{N}} Taksit"
-    - **reward_text**: 
-      - 🚨 YÜZDE + MAX LİMİT KURALI: "%10 (max 200TL)" formatında yaz.
-      - 🚨 PUAN: "100 TL Worldpuan" veya "500 Mil".
-      - 🚨 İNDİRİM: "200 TL İndirim".
-      - 🚨 ULTRA YASAK: "Detayları İnceleyin", "Hemen Faydalanın", "Kampanyaya Dahil Kartlar" gibi jenerik ifadeler yasaktır. 
-      - Metinde veya Başlıkta kampanya ödülü neyse onu yaz. Hiç bulamazsan ödülü "Kampanya Fırsatı" olarak belirt ama jenerik ibare kullanma. Bulunamayan her alanı BOŞ/NULL bırak, uydurma metin yazma.
-    - **min_spend**: Kampanyadan faydalanmak için gereken minimum harcama tutarı. (Sayısal)
-
-JSON Formatı:
-{{
-  "title": "Kısa ve çarpıcı başlık",
-  "description": "2 cümlelik detaylı açıklama metni",
-  "ai_marketing_text": "Kısa ve davetkar pazarlama özeti",
-  "reward_value": 0.0,
-  "reward_type": "puan/indirim/taksit/mil",
-  "reward_text": "150 TL Puan",
-  "min_spend": 0.0,
-  "start_date": "YYYY-MM-DD",
-  "end_date": "YYYY-MM-DD",
-  "sector": "Sektör Slug'ı",
-  "brands": ["Marka1", "Marka2"],
-  "cards": ["Kart1", "Kart2"],
-  "participation": "Katılım talimatı (SMS/App)",
-  "conditions": ["Madde 1", "Madde 2"] // 🚨 ASLA madde işareti (- , * , •) kullanma, sadece metni yaz.
-}}
-
-ANALİZ EDİLECEK METİN:
-"{cleaned_text}"
-"""
-    
-    def _extract_json(self, text: str) -> Dict[str, Any]:
-        """Extract JSON from AI response"""
-        # Try to find JSON in response
-        json_match = re.search(r'\{.*\}', text, re.DOTALL)
-        if json_match:
-            json_str = json_match.group(0)
-            return json.loads(json_str)
-        
-        # If no JSON found, try parsing entire response
-        return json.loads(text)
-    
-    def _get_last_day_of_month(self, date_obj: datetime) -> datetime:
-        """Helper to get the last day of the month for a given date."""
-        import calendar
-        last_day = calendar.monthrange(date_obj.year, date_obj.month)[1]
-        return date_obj.replace(day=last_day)
+    def _extract_json(self, text: str) -> Dict[str, Any]:
+        """Extract JSON from AI response"""
+        # Try to find JSON in response
+        json_match = re.search(r'\{.*\}', text, re.DOTALL)
+        if json_match:
+            json_str = json_match.group(0)
+            return json.loads(json_str)
+        
+        # If no JSON found, try parsing entire response
+        return json.loads(text)
+    
+    def _get_last_day_of_month(self, date_obj: datetime) -> datetime:
+        """Helper to get the last day of the month for a given date."""
+        import calendar
+        last_day = calendar.monthrange(date_obj.year, date_obj.month)[1]
+        return date_obj.replace(day=last_day)
 
     def _normalize_data(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Normalize and validate parsed data"""
@@ -817,25 +1138,9 @@ ANALİZ EDİLECEK METİN:
             return [cleaned] if cleaned else []
 
         # Get dates
-        parsed_start = self._safe_date(data.get("start_date"))
-        parsed_end = self._safe_date(data.get("end_date"))
-        
-        # Fallback Logic (Madde 1, 2, 3)
-        now = datetime.now()
-        if not parsed_start and not parsed_end:
-            # 1. Tarih hiç yok ise
-            parsed_start = now.strftime("%Y-%m-%d")
-            parsed_end = self._get_last_day_of_month(now).strftime("%Y-%m-%d")
-        elif not parsed_start and parsed_end:
-            # 2. başlangıc tarihi yok-bitiş tarihi var ise
-            parsed_start = now.strftime("%Y-%m-%d")
-        elif parsed_start and not parsed_end:
-            # 3. başlangıc tarihi var-bitiş tarihi yok ise
-            try:
-                start_dt = datetime.strptime(parsed_start, "%Y-%m-%d")
-                parsed_end = self._get_last_day_of_month(start_dt).strftime("%Y-%m-%d")
-            except:
-                parsed_end = self._get_last_day_of_month(now).strftime("%Y-%m-%d")
+        parsed_start, parsed_end = self._fill_dates(
+            self._safe_date(data.get("start_date")), self._safe_date(data.get("end_date"))
+        )
 
         normalized = {
             "title": data.get("title") or "Kampanya",
@@ -855,6 +1160,57 @@ ANALİZ EDİLECEK METİN:
         }
         
         return normalized
+
+    def _normalize_extraction(self, ex: CampaignExtraction) -> Dict[str, Any]:
+        """Same dict shape as _normalize_data for a schema-decoded result (types are already enforced)."""
+        parsed_start, parsed_end = self._fill_dates(ex.start_date, ex.end_date)
+        return {
+            "title": ex.title or "Kampanya",
+            "description": ex.description or "",
+            "ai_marketing_text": ex.ai_marketing_text or "",
+            "reward_value": ex.reward_value,
+            "reward_type": ex.reward_type,
+            "reward_text": ex.reward_text or "Kampanya Fırsatı",
+            "min_spend": int(ex.min_spend) if ex.min_spend is not None else None,
+            "start_date": parsed_start,
+            "end_date": parsed_end,
+            "sector": ex.sector or "Diğer",
+            "brands": ex.brands or [],
+            "cards": ex.cards or [],
+            "participation": ex.participation or "",
+            "conditions": ex.conditions or []
+        }
+
+    def _decode_response(self, text: str, schema_output: Optional[bool] = None) -> Dict[str, Any]:
+        """
+        Normalized dict from a full-HTML response (compact schema JSON or legacy free-form JSON).
+        schema_output: format the request was sent with (default: current AI_SCHEMA_OUTPUT).
+        """
+        if schema_output is None:
+            schema_output = is_schema_output_enabled()
+        if schema_output:
+            return self._normalize_extraction(decode_extraction(text, CAMPAIGN_FIELDS))
+        return self._normalize_data(self._extract_json(text))
+
+    def _fill_dates(self, parsed_start: Optional[str], parsed_end: Optional[str]) -> Tuple[str, str]:
+        """Fill missing start/end dates (today / end of month)."""
+        # Fallback Logic (Madde 1, 2, 3)
+        now = datetime.now()
+        if not parsed_start and not parsed_end:
+            # 1. Tarih hiç yok ise
+            parsed_start = now.strftime("%Y-%m-%d")
+            parsed_end = self._get_last_day_of_month(now).strftime("%Y-%m-%d")
+        elif not parsed_start and parsed_end:
+            # 2. başlangıc tarihi yok-bitiş tarihi var ise
+            parsed_start = now.strftime("%Y-%m-%d")
+        elif parsed_start and not parsed_end:
+            # 3. başlangıc tarihi var-bitiş tarihi yok ise
+            try:
+                start_dt = datetime.strptime(parsed_start, "%Y-%m-%d")
+                parsed_end = self._get_last_day_of_month(start_dt).strftime("%Y-%m-%d")
+            except:
+                parsed_end = self._get_last_day_of_month(now).strftime("%Y-%m-%d")
+        return parsed_start, parsed_end
     
     def _safe_decimal(self, value: Any) -> Optional[float]:
         """Safely convert to decimal"""
@@ -907,13 +1263,16 @@ ANALİZ EDİLECEK METİN:
 
 # Singleton instance
 _parser_instance = None
+_parser_lock = threading.Lock()
 
 
 def get_ai_parser() -> AIParser:
-    """Get singleton AI parser instance"""
+    """Get singleton AI parser instance (safe to call from worker threads)"""
     global _parser_instance
     if _parser_instance is None:
-        _parser_instance = AIParser()
+        with _parser_lock:
+            if _parser_instance is None:
+                _parser_instance = AIParser()
     return _parser_instance
 
 
@@ -923,85 +1282,62 @@ def parse_campaign_data(
     bank_name: Optional[str] = None,
     card_name: Optional[str] = None,
     tracking_url: Optional[str] = None,
-    force: bool = False
+    force: bool = False,
+    known_fields: Optional[Dict[str, Any]] = None,
+    reuse: bool = True
 ) -> Dict[str, Any]:
     """
     Convenience function to parse campaign data (full HTML mode)
     """
     parser = get_ai_parser()
-    return parser.parse_campaign_data(raw_text, title, bank_name, card_name, tracking_url, force)
+    return parser.parse_campaign_data(raw_text, title, bank_name, card_name, tracking_url, force, known_fields, reuse)
 
 
-def parse_api_campaign(
-    title: str,
-    short_description: str,
-    content_html: str,
-    bank_name: Optional[str] = None,
-    scraper_sector: Optional[str] = None,
-    tracking_url: Optional[str] = None,
-    force: bool = False
-) -> Dict[str, Any]:
-    """
-    API-First Lightweight Parser.
-    ...
-    Args:
-        scraper_sector: Optional sector hint from bank website/API (will be mapped to our 18 sectors)
-        tracking_url: URL to check in cache (Madde 1)
-        force: If True, skip cache and force AI call
-    """
-    parser = get_ai_parser()
+def _get_bank_instructions(bank_name: Optional[str]) -> str:
+    """Return the BANK_RULES block matching bank_name (first substring match)."""
+    bank_key = _resolve_bank_key(bank_name)
+    return BANK_RULES[bank_key] if bank_key else ""
 
-    # 1. Check Cache
-    if tracking_url and not force:
-        cached = parser._check_db_cache(tracking_url)
-        if cached:
-            # Type-safe slicing for linter
-            safe_url = str(tracking_url)
-            print(f"   ✨ Using cached AI data for API campaign: {safe_url[:60]}...")  # type: ignore
-            return cached
-    
-    # Clean HTML tags from content to get plain text conditions
-    import re as _re
-    clean_content = _re.sub(r'<[^>]+>', '\n', content_html or '')
-    clean_content = _re.sub(r'\n+', '\n', clean_content).strip()
-    # Limit content length
+
+def _clean_api_content(content_html: str, bank_name: Optional[str]) -> str:
+    """Strip HTML tags from API content and compact it to the per-bank token budget."""
+    clean_content = re.sub(r'<[^>]+>', '\n', content_html or '')
+    clean_content = re.sub(r'\n+', '\n', clean_content).strip()
     # For Garanti BBVA, we need more context (sidebar info often gets cut off)
-    # User requested no limit for Garanti
-    limit = 25000 if bank_name == "Garanti BBVA" else 6000
-    
-    if len(clean_content) > limit:
-        clean_content = str(clean_content)[:limit] # type: ignore
-        
-    clean_text = clean_content
-    
-    # Get bank-specific rules
-    bank_instructions = ""
-    if bank_name:
-        bank_name_lower = bank_name.lower()
-        for bank_key, rules in BANK_RULES.items():
-            if bank_key in bank_name_lower:
-                bank_instructions = rules
-                break
-    
-    today = datetime.now()
-    current_date = today.strftime("%Y-%m-%d")
-    
-    # Add scraper sector hint if available
-    sector_hint = ""
+    if bank_name == "Garanti BBVA":
+        budget = int(os.getenv("AI_API_INPUT_TOKEN_BUDGET_GARANTI", "6250"))
+    else:
+        budget = int(os.getenv("AI_API_INPUT_TOKEN_BUDGET", "1500"))
+    return compact_text(clean_content, bank_name, budget)
+
+
+def _api_sector_hint(scraper_sector: Optional[str]) -> str:
     if scraper_sector and scraper_sector.strip():
-        sector_hint = f"""
+        return f"""
 🎯 SEKTÖR İPUCU (Banka Sitesinden):
 Banka bu kampanyayı "{scraper_sector}" kategorisinde gösteriyor.
-Bu ipucunu kullanarak aşağıdaki VALID SECTORS listesinden EN UYGUN olanı seç.
+Bu ipucunu kullanarak VALID SECTORS listesinden EN UYGUN olanı seç.
 """
-    
-    prompt = f"""Sen uzman bir kampanya analistisin. Aşağıdaki kampanya bilgilerini analiz et.
+    return ""
+
+
+def _api_system_prompt(bank_name: Optional[str]) -> str:
+    """Static part of the API prompt (bank rules, valid sectors, field rules), compiled once per bank and day."""
+    return _compile_api_system_prompt(
+        _resolve_bank_key(bank_name), datetime.now().strftime("%Y-%m-%d"), is_schema_output_enabled()
+    )
+
+
+@lru_cache(maxsize=64)
+def _compile_api_system_prompt(bank_key: Optional[str], current_date: str, schema_output: bool = False) -> str:
+    today = datetime.strptime(current_date, "%Y-%m-%d")
+    bank_instructions = BANK_RULES.get(bank_key, "") if bank_key else ""
+
+    return f"""Sen uzman bir kampanya analistisin. Aşağıdaki kampanya bilgilerini analiz et.
 Bugünün tarihi: {current_date} (Yıl: {today.year})
 
 {bank_instructions}
 
-{sector_hint}
-
 VALID SECTORS (BİRİNİ SEÇ — SADECE bu listeden, PARANTEZ İÇİNDEKİLERİ YAZMA):
 - Market & Gıda
 - Akaryakıt
@@ -1046,15 +1382,10 @@ KURALLAR:
    - Her ikisi de varsa: "World Mobil'den Katıl butonuna tıklayın veya KEYWORD yazıp NUMARA'ya SMS gönderin" yaz.
    - Hiçbiri yoksa: "Otomatik katılım" yaz.
 10. dates: Metinde geçen başlangıç ve bitiş tarihlerini bul. Format: "YYYY-MM-DD". Bulamazsan null yap.
+{key_legend(API_FIELDS) if schema_output else ""}"""
 
-KAMPANYA BİLGİLERİ:
-Başlık: "{title}"
-Açıklama: "{short_description}"
-Detay İçerik:
-{clean_content}
 
-JSON olarak cevap ver:
-{{
+_API_JSON_SHAPE = """{
   "short_title": "40-70 karakter kısa başlık",
   "description": "2 cümlelik pazarlama metni",
   "reward_value": 0.0,
@@ -1067,41 +1398,732 @@ JSON olarak cevap ver:
   "participation": "Katılım talimatı",
   "start_date": "YYYY-MM-DD",
   "end_date": "YYYY-MM-DD"
-}}}}"""
+}"""
+
+
+def _json_shape_without(shape: str, fields) -> str:
+    """Drop the lines of `fields` from a JSON shape template (fields already known from rules)."""
+    lines = [l for l in shape.split("\n") if not any(l.strip().startswith(f'"{f}"') for f in fields)]
+    if len(lines) >= 2:
+        lines[-2] = lines[-2].rstrip(",")
+    return "\n".join(lines)
+
+
+def _locked_fields_block(locked: Dict[str, Any]) -> str:
+    """Prompt block listing rule-extracted fields Gemini must not re-derive."""
+    return f"""
+
+🔒 KURAL TABANLI KESİN ALANLAR (metinden birebir çıkarıldı, AYNEN kabul et, bu alanları tekrar üretme):
+{json.dumps(locked, ensure_ascii=False)}
+"""
+
+
+def _apply_locked(result: Dict[str, Any], locked: Dict[str, Any]) -> Dict[str, Any]:
+    """Overwrite AI fields with confident rule fields; brands are merged instead."""
+    for key, value in locked.items():
+        if key == "brands":
+            result["brands"] = list(dict.fromkeys(list(result.get("brands") or []) + list(value)))
+        elif key in result:
+            result[key] = value
+    return result
+
+
+def _iso_date(value: Any) -> Optional[str]:
+    if isinstance(value, (datetime, date)):
+        return value.strftime("%Y-%m-%d")
+    text = str(value or "").strip()[:10]
+    return text if re.match(r"^\d{4}-\d{2}-\d{2}$", text) else None
+
+
+def _known_fields(known: Optional[Dict[str, Any]], fields) -> Dict[str, Any]:
+    """
+    Caller-supplied field values (structured source API data) that replace AI output.
+    Unknown names, empty values and sectors outside the prompt's sector list are dropped;
+    dates are normalized to YYYY-MM-DD.
+    """
+    if not known:
+        return {}
+    by_name = {f.name: f for f in fields}
+    result: Dict[str, Any] = {}
+    for name, value in known.items():
+        field = by_name.get(name)
+        if field is None or value is None or value == "" or value == []:
+            continue
+        if field.kind == "date":
+            value = _iso_date(value)
+            if value is None:
+                continue
+        elif field.enum and value not in field.enum:
+            continue
+        elif field.kind == "list" and isinstance(value, str):
+            value = [value]
+        result[name] = value
+    return result
+
+
+def _local_fields(kind: str, docs: List[Tuple[str, Optional[str]]],
+                  bank_name: Optional[str]) -> List[Dict[str, Any]]:
+    """
+    Known-field dicts from the sector classifier, one per (text, title): a confident sector
+    (kind "api" maps the slug to its API sector name), else an empty dict.
+    """
+    found: List[Dict[str, Any]] = [{} for _ in docs]
+    classifier = get_sector_classifier()
+    if classifier is not None and docs:
+        for fields, prediction in zip(found, classifier.predict_batch(docs)):
+            value = classifier.accept(prediction)
+            if value is not None and kind == "api":
+                value = API_SECTOR_BY_SLUG.get(value)
+            if value:
+                fields["sector"] = value
+    return found
+
+
+def _gazetteer_hits(docs: List[Tuple[str, Optional[str]]], bank_name: Optional[str]) -> List[Dict[str, List[str]]]:
+    """
+    Brands / eligible cards the gazetteer finds, one dict per (text, title). They are not masked
+    from the prompt (the gazetteer only knows names already in the DB, so the AI is still asked
+    and can discover new brands); _merge_hits adds them to the AI's answer.
+    """
+    found: List[Dict[str, List[str]]] = [{} for _ in docs]
+    gazetteer = get_gazetteer()
+    if gazetteer is not None:
+        bank_id = gazetteer.resolve_bank(bank_name)
+        for fields, (text, title) in zip(found, docs):
+            hits = gazetteer.extract(text, title, bank_id=bank_id)
+            if hits.brands:
+                fields["brands"] = hits.brands
+            if hits.cards:
+                fields["cards"] = hits.cards
+    return found
+
+
+def _merge_hits(result: Dict[str, Any], hits: Dict[str, List[str]]) -> Dict[str, Any]:
+    """Union of gazetteer hits and the result's brands / cards (gazetteer names first, case-insensitive)."""
+    for name, names in hits.items():
+        current = result.get(name)
+        merged = list(names)
+        seen = {tr_casefold(n) for n in merged}
+        for value in current if isinstance(current, list) else []:
+            if value and tr_casefold(str(value)) not in seen:
+                seen.add(tr_casefold(str(value)))
+                merged.append(value)
+        result[name] = merged
+    return result
+
+
+def _rule_api_result(title: str, short_description: str, clean_content: str, fields: Dict[str, Any]) -> Dict[str, Any]:
+    """API campaign result built from rules only (no AI call)."""
+    return {
+        "_rule_based": True,
+        "short_title": title,
+        "description": short_description,
+        "reward_value": fields.get("reward_value"),
+        "reward_type": fields.get("reward_type"),
+        "reward_text": fields.get("reward_text") or "Detayları İnceleyin",
+        "sector": fields.get("sector") or "Diğer",
+        "brands": fields.get("brands") or [],
+        "conditions": extract_conditions(clean_content),
+        "cards": fields.get("cards") or [],
+        "participation": fields.get("participation") or "Detayları İnceleyin",
+        "start_date": fields.get("start_date"),
+        "end_date": fields.get("end_date")
+    }
+
+
+def _api_fast_path(title: str, short_description: str, clean_content: str, bank_name: Optional[str],
+                   known: Optional[Dict[str, Any]] = None) -> Tuple[Optional[Dict[str, Any]], Dict[str, Any]]:
+    """
+    (rule-only result if every required field is confident or known, fields to lock).
+    Caller-known fields take precedence over rule-extracted ones.
+    """
+    known = known or {}
+    if not is_fast_path_enabled():
+        return None, dict(known)
+    rules = extract_fields(f"{short_description}\n{clean_content}", title, bank_name)
+    locked = {**rules.confident(), **known}
+    if not [f for f in rules.missing(API_REQUIRED_FIELDS) if f not in known]:
+        return _rule_api_result(title, short_description, clean_content, locked), locked
+    return None, locked
+
+
+def _api_negative_check(title: str, short_description: str, clean_content: str,
+                        bank_name: Optional[str]) -> Tuple[str, Any, Optional[Dict[str, Any]]]:
+    """
+    (content key, failure entry or None, replacement result if the content is known-bad).
+    Known-bad content gets a rule-only result when the rules find a reward, else the fallback.
+    """
+    neg = get_negative_cache()
+    if neg is None:
+        return "", None, None
+    key = content_key("api", title, short_description, clean_content)
+    entry = neg.check(key)
+    if entry is None or not entry.blocked:
+        return key, entry, None
+    print(f"   ⏭️ Known-bad API content ({entry.reason}, {entry.attempts} failures), AI skipped for: {title[:60]}")
+    fields = extract_fields(f"{short_description}\n{clean_content}", title, bank_name).fields
+    if fields.get("reward_text"):
+        result = _rule_api_result(title, short_description, clean_content, fields)
+    else:
+        result = _api_fallback(title, short_description)
+    result["_negative_cached"] = entry.reason
+    return key, entry, result
+
+
+def _reuse_near_duplicate(kind: str, text: str, title: Optional[str],
+                          bank_name: Optional[str]) -> Optional[Dict[str, Any]]:
+    """
+    AI fields of an already parsed near-duplicate campaign, or None.
+    Card-specific fields are re-derived from this text: cards and participation by
+    rules (stored values kept only for the same bank), title from the caller.
+    A stored result that lacks one of the other fields (seeded from the DB) is not reused;
+    neither is one that fails the quality checks (checked by the index).
+    """
+    index = get_dedup_index()
+    if index is None or not text:
+        return None
+    match = index.find(kind, text)
+    if match is None:
+        return None
+    title_key = "short_title" if kind == "api" else "title"
+    rederived = ("cards", "participation", title_key)
+    fields = API_FIELDS if kind == "api" else CAMPAIGN_FIELDS
+    if any(f.name not in match.result for f in fields if f.name not in rederived):
+        return None
+    same_bank = (match.bank_name or "") == (bank_name or "")
+    result = dict(match.result)
+    cards, _ = extract_cards(f"{title or ''}\n{text}")
+    result["cards"] = cards or (result.get("cards") if same_bank else []) or []
+    participation, _ = extract_participation(text)
+    if participation or not same_bank:
+        result["participation"] = participation or "Detayları İnceleyin"
+    if title and title != match.title:
+        result[title_key] = title
+    result["_near_duplicate_of"] = match.key[:16]
+    print(f"   ♻️ Near-duplicate ({match.similarity:.0%}) of '{str(match.title or '')[:40]}', AI skipped for: {str(title or '')[:60]}")
+    return result
+
+
+def _index_parsed(kind: str, text: str, result: Dict[str, Any], bank_name: Optional[str], title: Optional[str],
+                  replace: bool = False) -> None:
+    """Add a successful AI result to the near-duplicate index (never fails the parse; defective results are skipped)."""
+    index = get_dedup_index()
+    if index is None:
+        return
+    try:
+        index.add(kind, text, result, bank_name=bank_name, title=title, replace=replace)
+    except Exception as e:
+        logger.warning(f"Near-duplicate index update failed: {e}")
+
+
+def _map_api_result(parser: "AIParser", json_data: Dict[str, Any], title: str, short_description: str) -> Dict[str, Any]:
+    """Map raw AI JSON for an API campaign to the scraper-facing dict."""
+    return {
+        "short_title": json_data.get("short_title") or title,
+        "description": json_data.get("description") or short_description,
+        "reward_value": parser._safe_decimal(json_data.get("reward_value")),
+        "reward_type": json_data.get("reward_type"),
+        "reward_text": json_data.get("reward_text") or "Detayları İnceleyin",
+        "sector": json_data.get("sector") or "Diğer",
+        "brands": json_data.get("brands") or [],
+        "conditions": json_data.get("conditions") or [],
+        "cards": json_data.get("cards") or [],
+        "participation": json_data.get("participation") or "Detayları İnceleyin",
+        "start_date": parser._safe_date(json_data.get("start_date")),
+        "end_date": parser._safe_date(json_data.get("end_date"))
+    }
+
+
+def _map_api_extraction(ex: CampaignExtraction, title: str, short_description: str) -> Dict[str, Any]:
+    """Scraper-facing dict for a schema-decoded API campaign (same shape as _map_api_result)."""
+    return {
+        "short_title": ex.short_title or title,
+        "description": ex.description or short_description,
+        "reward_value": ex.reward_value,
+        "reward_type": ex.reward_type,
+        "reward_text": ex.reward_text or "Detayları İnceleyin",
+        "sector": ex.sector or "Diğer",
+        "brands": ex.brands or [],
+        "conditions": ex.conditions or [],
+        "cards": ex.cards or [],
+        "participation": ex.participation or "Detayları İnceleyin",
+        "start_date": ex.start_date,
+        "end_date": ex.end_date
+    }
+
+
+def _api_fallback(title: str, short_description: str) -> Dict[str, Any]:
+    return {
+        "_ai_failed": True,
+        "title": title,
+        "short_title": title,
+        "description": short_description,
+        "reward_value": None,
+        "reward_type": None,
+        "reward_text": "Detayları İnceleyin",
+        "sector": "Diğer",
+        "brands": [],
+        "conditions": [],
+        "cards": [],
+        "participation": "Detayları İnceleyin",
+        "start_date": None,
+        "end_date": None
+    }
+
+
+@traced("parse_api_campaign")
+def parse_api_campaign(
+    title: str,
+    short_description: str,
+    content_html: str,
+    bank_name: Optional[str] = None,
+    scraper_sector: Optional[str] = None,
+    tracking_url: Optional[str] = None,
+    force: bool = False,
+    cascade: bool = True,
+    known_fields: Optional[Dict[str, Any]] = None,
+    reuse: bool = True
+) -> Dict[str, Any]:
+    """
+    API-First Lightweight Parser.
+    ...
+    Args:
+        scraper_sector: Optional sector hint from bank website/API (will be mapped to our 18 sectors)
+        tracking_url: URL to check in cache (Madde 1)
+        force: If True, skip cache and force AI call
+        cascade: If False, skip the model cascade's lite stage (AI_CASCADE) and use the full prompt
+        known_fields: Field values the source API already provides (e.g. start_date, end_date,
+                      sector); they are not requested from the AI and are merged into the result
+        reuse: If False, skip the near-duplicate index (re-parse of a stored campaign); the new
+               result replaces the indexed one
+    """
+    parser = get_ai_parser()
+
+    # 1. Check Cache
+    if tracking_url and not force:
+        cached = parser._check_db_cache(tracking_url)
+        if cached:
+            # Type-safe slicing for linter
+            safe_url = str(tracking_url)
+            print(f"   ✨ Using cached AI data for API campaign: {safe_url[:60]}...")  # type: ignore
+            return cached
+
+    return parser._drive(_api_steps(parser, title, short_description, content_html, bank_name,
+                                    scraper_sector, cascade, known_fields, reuse))
+
+
+@traced("aparse_api_campaign")
+async def aparse_api_campaign(
+    title: str,
+    short_description: str,
+    content_html: str,
+    bank_name: Optional[str] = None,
+    scraper_sector: Optional[str] = None,
+    tracking_url: Optional[str] = None,
+    force: bool = False,
+    cascade: bool = True,
+    known_fields: Optional[Dict[str, Any]] = None,
+    reuse: bool = True
+) -> Dict[str, Any]:
+    """
+    Async variant of parse_api_campaign for asyncio scrapers (same arguments and result).
+    AI calls use the async Gemini client and never block the event loop; at most
+    AI_ASYNC_CONCURRENCY of them run at once per loop.
+    """
+    import asyncio
+
+    parser = get_ai_parser()
+    if tracking_url and not force:
+        cached = await asyncio.to_thread(parser._check_db_cache, tracking_url)
+        if cached:
+            print(f"   ✨ Using cached AI data for API campaign: {str(tracking_url)[:60]}...")
+            return cached
+
+    return await parser._adrive(_api_steps(parser, title, short_description, content_html, bank_name,
+                                           scraper_sector, cascade, known_fields, reuse))
+
+
+async def aparse_campaign_data(
+    raw_text: str,
+    title: Optional[str] = None,
+    bank_name: Optional[str] = None,
+    card_name: Optional[str] = None,
+    tracking_url: Optional[str] = None,
+    force: bool = False,
+    known_fields: Optional[Dict[str, Any]] = None,
+    reuse: bool = True
+) -> Dict[str, Any]:
+    """
+    Async convenience function to parse campaign data (full HTML mode)
+    """
+    parser = get_ai_parser()
+    return await parser.aparse_campaign_data(raw_text, title, bank_name, card_name, tracking_url, force, known_fields,
+                                             reuse)
+
+
+def _api_steps(
+    parser: "AIParser",
+    title: str,
+    short_description: str,
+    content_html: str,
+    bank_name: Optional[str],
+    scraper_sector: Optional[str],
+    cascade: bool,
+    known_fields: Optional[Dict[str, Any]],
+    reuse: bool = True
+) -> _ParseSteps:
+    """API-first parse logic; yields one _AIRequest per cascade stage and returns the result."""
+    known = _known_fields(known_fields, API_FIELDS)
     
+    # Clean HTML tags from content to get plain text conditions
+    clean_content = _clean_api_content(content_html, bank_name)
+    doc = (f"{short_description}\n{clean_content}", title)
+    known = {**_known_fields(_local_fields("api", [doc], bank_name)[0], API_FIELDS), **known}
+    hits = _gazetteer_hits([doc], bank_name)[0]
+
+    # Rule fast-path: skip AI when every required field is certain, else ask only for the rest
+    rule_result, locked = _api_fast_path(title, short_description, clean_content, bank_name, known)
+    record_decision(skipped=rule_result is not None, locked_fields=len(locked))
+    if rule_result is not None:
+        print(f"   ⚡ Rule fast-path: all fields confident, AI skipped for: {title[:60]}")
+        return _merge_hits(rule_result, hits)
+    neg_key, neg_entry, neg_result = _api_negative_check(title, short_description, clean_content, bank_name)
+    if neg_result is not None:
+        return _apply_locked(neg_result, known)
+    dedup_text = f"{short_description}\n{clean_content}"
+    duplicate = _reuse_near_duplicate("api", dedup_text, title, bank_name) if reuse else None
+    if duplicate is not None:
+        return _merge_hits(_apply_locked(duplicate, known), hits)
+    # Rule-locked fields are shown to the model; caller-known fields are simply not requested
+    prompt_locked = {k: v for k, v in locked.items() if k != "brands" and k not in known}
+    locked_block = _locked_fields_block(prompt_locked) if prompt_locked else ""
+    masked = set(prompt_locked) | set(known)
+
+    schema_output = is_schema_output_enabled()
+    fields = without(API_FIELDS, masked)
+    shape = "" if schema_output else _json_shape_without(_API_JSON_SHAPE, masked)
+    prompt = f"""{_api_sector_hint(scraper_sector)}
+KAMPANYA BİLGİLERİ:
+Başlık: "{title}"
+Açıklama: "{short_description}"
+Detay İçerik:
+{clean_content}
+{locked_block}
+JSON olarak cevap ver:
+{shape}"""
+    
+    config = parser._json_config(SCHEMA_MAX_OUTPUT_TOKENS, response_schema(fields)) if schema_output else None
+    for stage in cascade_stages() if cascade else cascade_stages()[-1:]:
+        system_prompt = _api_system_prompt(bank_name) if stage.is_last else \
+            _lite_system_prompt("api", datetime.now().strftime("%Y-%m-%d"), schema_output)
+        try:
+            set_campaigns(1)
+            result_text = yield _AIRequest(prompt, system_prompt, config, stage.model)
+            if not result_text or result_text.strip() == "{}":
+                raise ValueError("empty_response")
+            if schema_output:
+                result = _map_api_extraction(decode_extraction(result_text, fields), title, short_description)
+            else:
+                result = _map_api_result(parser, parser._extract_json(result_text), title, short_description)
+        except Exception as e:
+            if not stage.is_last and not is_transient_error(e):
+                print(f"   ⤴️ Lite stage failed ({failure_reason(e)}), escalating: {title[:60]}")
+                needs_escalation("api", stage, None, e)
+                continue
+            print(f"API Parser Error: {e}")
+            mark_fallback()
+            neg = get_negative_cache()
+            if neg is not None and neg_key and not is_transient_error(e):
+                neg.record_failure(neg_key, failure_reason(e), title)
+            return _api_fallback(title, short_description)
+
+        result = _apply_locked(result, locked)
+        reasons = needs_escalation("api", stage, result)
+        if reasons:
+            print(f"   ⤴️ Lite result failed checks ({', '.join(reasons)}), escalating: {title[:60]}")
+            continue
+        if neg_entry is not None:
+            get_negative_cache().record_success(neg_key)  # type: ignore
+        _merge_hits(result, hits)
+        _index_parsed("api", dedup_text, result, bank_name, title, replace=not reuse)
+        if stage.name != "full":
+            result["_cascade_stage"] = stage.name
+        return result
+    return _api_fallback(title, short_description)
+
+
+# ── Batched API parsing ─────────────────────────────────────────────────────
+# Output tokens reserved per campaign in a batch (12 short fields)
+_BATCH_OUTPUT_TOKENS_PER_ITEM = 600
+_BATCH_MAX_OUTPUT_TOKENS = 8192
+
+
+def _pack_batches(blocks: List[str], token_budget: int, max_batch_size: int) -> List[List[int]]:
+    """Greedily pack item indices into batches that fit token_budget / max_batch_size."""
+    batches: List[List[int]] = []
+    current: List[int] = []
+    used = 0
+    for idx, block in enumerate(blocks):
+        cost = estimate_tokens(block)
+        if current and (used + cost > token_budget or len(current) >= max_batch_size):
+            batches.append(current)
+            current, used = [], 0
+        current.append(idx)
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+
+@traced("parse_api_campaigns")
+def parse_api_campaigns(
+    items: List[Dict[str, Any]],
+    bank_name: Optional[str] = None,
+    token_budget: Optional[int] = None,
+    max_batch_size: Optional[int] = None,
+    force: bool = False
+) -> List[Dict[str, Any]]:
+    """
+    Batched variant of parse_api_campaign for list-API scrapers.
+
+    Packs several campaigns of the same bank into one Gemini request so the
+    bank rules / valid sectors block is sent once per batch instead of once
+    per campaign. Results are returned in the same order as `items`.
+
+    Args:
+        items: dicts with keys title, short_description, content_html and
+               optional scraper_sector, tracking_url, known_fields (see parse_api_campaign)
+        bank_name: Bank name shared by all items (selects BANK_RULES)
+        token_budget: Max estimated input tokens of campaign content per batch
+                      (env AI_BATCH_TOKEN_BUDGET, default 12000)
+        max_batch_size: Max campaigns per request (env AI_BATCH_MAX_SIZE, default 8)
+        force: If True, skip DB cache
+    """
+    parser = get_ai_parser()
+    if token_budget is None:
+        token_budget = int(os.getenv("AI_BATCH_TOKEN_BUDGET", "12000"))
+    if max_batch_size is None:
+        max_batch_size = int(os.getenv("AI_BATCH_MAX_SIZE", "8"))
+    max_batch_size = max(1, min(max_batch_size, _BATCH_MAX_OUTPUT_TOKENS // _BATCH_OUTPUT_TOKENS_PER_ITEM))
+
+    results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+    pending: List[int] = []
+    for idx, item in enumerate(items):
+        tracking_url = item.get("tracking_url")
+        if tracking_url and not force:
+            cached = parser._check_db_cache(tracking_url)
+            if cached:
+                print(f"   ✨ Using cached AI data for API campaign: {str(tracking_url)[:60]}...")  # type: ignore
+                results[idx] = cached
+                continue
+        pending.append(idx)
+
+    # A confident classifier sector becomes a known field; gazetteer hits are merged into the answers
+    clean_by_idx = {idx: _clean_api_content(items[idx].get("content_html") or "", bank_name) for idx in pending}
+    docs = [(f"{items[idx].get('short_description') or ''}\n{clean_by_idx[idx]}", items[idx].get("title") or "")
+            for idx in pending]
+    local = _local_fields("api", docs, bank_name)
+    hits_by_idx = dict(zip(pending, _gazetteer_hits(docs, bank_name)))
+    items = list(items)
+    for idx, fields in zip(pending, local):
+        if fields:
+            items[idx] = dict(items[idx], known_fields={**fields, **(items[idx].get("known_fields") or {})})
+
+    blocks: Dict[int, str] = {}
+    locked_by_idx: Dict[int, Dict[str, Any]] = {}
+    neg_by_idx: Dict[int, Tuple[str, Any]] = {}
+    dedup_texts: Dict[int, str] = {}
+    ai_pending: List[int] = []
+    for idx in pending:
+        item = items[idx]
+        clean_content = clean_by_idx[idx]
+        rule_result, locked_by_idx[idx] = _api_fast_path(
+            item.get("title") or "", item.get("short_description") or "", clean_content, bank_name,
+            _known_fields(item.get("known_fields"), API_FIELDS)
+        )
+        if rule_result is not None:
+            record_decision(skipped=True)
+            results[idx] = rule_result
+            continue
+        neg_key, neg_entry, neg_result = _api_negative_check(
+            item.get("title") or "", item.get("short_description") or "", clean_content, bank_name
+        )
+        neg_by_idx[idx] = (neg_key, neg_entry)
+        known = _known_fields(item.get("known_fields"), API_FIELDS)
+        if neg_result is not None:
+            results[idx] = _apply_locked(neg_result, known)
+            continue
+        dedup_texts[idx] = f"{item.get('short_description') or ''}\n{clean_content}"
+        duplicate = _reuse_near_duplicate("api", dedup_texts[idx], item.get("title") or "", bank_name)
+        if duplicate is not None:
+            results[idx] = _apply_locked(duplicate, known)
+            continue
+        ai_pending.append(idx)
+        sector_line = ""
+        if item.get("scraper_sector"):
+            sector_line = f'Banka Kategorisi (SEKTÖR İPUCU): "{item["scraper_sector"]}"\n'
+        blocks[idx] = (
+            f'### KAMPANYA id={idx}\n'
+            f'Başlık: "{item.get("title") or ""}"\n'
+            f'Açıklama: "{item.get("short_description") or ""}"\n'
+            f'{sector_line}'
+            f'Detay İçerik:\n{clean_content}\n'
+        )
+
+    if len(ai_pending) < len(pending):
+        print(f"   ⚡ Rule fast-path / near-duplicates: {len(pending) - len(ai_pending)}/{len(pending)} campaigns resolved without AI")
+    todo = ai_pending
+    for stage in cascade_stages():
+        batches = _pack_batches([blocks[i] for i in todo], token_budget, max_batch_size)
+        print(f"   📦 Batch AI ({stage.name}): {len(todo)} campaigns → {len(batches)} requests (bank: {bank_name})")
+        for batch in batches:
+            _parse_api_batch(parser, items, [todo[i] for i in batch], blocks, bank_name, results, locked_by_idx, stage,
+                             neg_by_idx)
+        if stage.is_last:
+            break
+        # Cascade: only campaigns whose lite result fails the quality checks go to the full prompt
+        escalated = []
+        for idx in todo:
+            if results[idx] is not None and results[idx].get("_ai_failed"):  # type: ignore
+                continue  # quota / 503 outlasted the retries: the full stage would only double the load
+            if needs_escalation("api", stage, results[idx]):
+                results[idx] = None
+                escalated.append(idx)
+            else:
+                results[idx]["_cascade_stage"] = stage.name  # type: ignore
+        if not escalated:
+            break
+        print(f"   ⤴️ Cascade: {len(escalated)}/{len(todo)} campaigns escalated to the full prompt")
+        todo = escalated
+    for idx in pending:
+        if results[idx] is not None and not results[idx].get("_ai_failed"):  # type: ignore
+            _merge_hits(results[idx], hits_by_idx[idx])  # type: ignore
+    for idx in ai_pending:
+        if results[idx] is not None and not results[idx].get("_ai_failed"):  # type: ignore
+            _index_parsed("api", dedup_texts[idx], results[idx], bank_name, items[idx].get("title"))  # type: ignore
+
+    return [r if r is not None else _api_fallback(items[i].get("title") or "", items[i].get("short_description") or "")
+            for i, r in enumerate(results)]
+
+
+def _is_transient_batch_error(error: Exception) -> bool:
+    """Quota / 503 / timeout: the content is not the problem, splitting the batch would only multiply requests."""
+    return isinstance(error, (TimeoutException, RateLimitExhausted)) or is_transient_error(error) or _is_retryable(error)
+
+
+def _parse_api_single(parser: "AIParser", item: Dict[str, Any], bank_name: Optional[str]) -> Dict[str, Any]:
+    """One campaign through the per-item path (retry, negative cache and near-duplicate index included)."""
+    return parser._drive(_api_steps(
+        parser, item.get("title") or "", item.get("short_description") or "", item.get("content_html") or "",
+        bank_name, item.get("scraper_sector"), False, item.get("known_fields")
+    ))
+
+
+def _parse_api_batch(
+    parser: "AIParser",
+    items: List[Dict[str, Any]],
+    indices: List[int],
+    blocks: Dict[int, str],
+    bank_name: Optional[str],
+    results: List[Optional[Dict[str, Any]]],
+    locked_by_idx: Optional[Dict[int, Dict[str, Any]]] = None,
+    stage: Optional[Stage] = None,
+    neg_by_idx: Optional[Dict[int, Tuple[str, Any]]] = None
+) -> None:
+    """
+    Parse one batch in a single request. A response that cannot be decoded (or misses campaigns)
+    is split in half and retried; a single campaign goes through the per-item path, which records
+    content failures in the negative cache. Transient errors (quota, 503) are waited out and the
+    same batch is re-sent (_HTML_MAX_ATTEMPTS, as for full-HTML calls); when they persist, or on a
+    timeout / daily quota exhausted on every key, the campaigns get the fallback result in every
+    stage - splitting or escalating would only multiply requests while quota is tight.
+    In a cascade lite stage a campaign that fails on its own is left empty (escalated by the caller).
+    """
+    if stage is None:
+        stage = cascade_stages()[-1]
+    if len(indices) == 1:
+        if stage.is_last:
+            results[indices[0]] = _parse_api_single(parser, items[indices[0]], bank_name)
+        return
+
+    sector_hint = """
+🎯 SEKTÖR İPUCU: Bazı kampanyalarda "Banka Kategorisi" verilmiştir. Bu ipucunu kullanarak VALID SECTORS listesinden EN UYGUN olanı seç.
+"""
+    schema_output = is_schema_output_enabled()
+    campaigns_text = "\n".join(blocks[i] for i in indices)
+    # Fields the source API supplied for every campaign of the batch are not requested
+    masked = set.intersection(*(set(_known_fields(items[i].get("known_fields"), API_FIELDS)) for i in indices))
+    fields = without(API_FIELDS, masked)
+    shape = "" if schema_output else f"""
+Nesne formatı ("id" alanına ek olarak):
+{_json_shape_without(_API_JSON_SHAPE, masked)}"""
+    prompt = f"""{sector_hint}
+Aşağıda {len(indices)} ayrı kampanya var. HER KAMPANYAYI BAĞIMSIZ analiz et; bir kampanyanın bilgisini diğerine taşıma.
+
+{campaigns_text}
+
+JSON olarak cevap ver: Her kampanya için bir nesne içeren bir DİZİ (array). Her nesnede kampanyanın "id" değeri MUTLAKA olsun:
+[
+  {{"id": 0, ...}},
+  ...
+]{shape}"""
+
     try:
-        result_text = parser._call_ai(prompt, timeout_sec=65)
-        json_data = parser._extract_json(result_text)
-        
-        return {
-            "short_title": json_data.get("short_title") or title,
-            "description": json_data.get("description") or short_description,
-            "reward_value": parser._safe_decimal(json_data.get("reward_value")),
-            "reward_type": json_data.get("reward_type"),
-            "reward_text": json_data.get("reward_text") or "Detayları İnceleyin",
-            "sector": json_data.get("sector") or "Diğer",
-            "brands": json_data.get("brands") or [],
-            "conditions": json_data.get("conditions") or [],
-            "cards": json_data.get("cards") or [],
-            "participation": json_data.get("participation") or "Detayları İnceleyin",
-            "start_date": parser._safe_date(json_data.get("start_date")),
-            "end_date": parser._safe_date(json_data.get("end_date"))
-        }
+        set_campaigns(len(indices))
+        config = parser._json_config(
+            min(_BATCH_MAX_OUTPUT_TOKENS, _BATCH_OUTPUT_TOKENS_PER_ITEM * len(indices) + 200),
+            batch_response_schema(fields) if schema_output else None
+        )
+        system_prompt = _api_system_prompt(bank_name) if stage.is_last else \
+            _lite_system_prompt("api", datetime.now().strftime("%Y-%m-%d"), schema_output)
+        result_text = parser._request_text(
+            _AIRequest(prompt, system_prompt, config, stage.model, _HTML_MAX_ATTEMPTS, timeout_sec=65 + 15 * len(indices))
+        )
+        by_id: Dict[int, Any] = {}
+        if schema_output:
+            by_id = decode_batch(result_text, fields)
+        else:
+            data = json.loads(result_text[result_text.find('['):result_text.rfind(']') + 1])
+            for obj in data if isinstance(data, list) else []:
+                if isinstance(obj, dict) and obj.get("id") is not None:
+                    try:
+                        by_id[int(obj["id"])] = obj
+                    except (TypeError, ValueError):
+                        continue
+
+        missing = [i for i in indices if i not in by_id]
+        for idx in indices:
+            if idx in by_id:
+                item = items[idx]
+                locked = (locked_by_idx or {}).get(idx, {})
+                record_decision(skipped=False, locked_fields=len(locked))
+                title, short_description = item.get("title") or "", item.get("short_description") or ""
+                if schema_output:
+                    mapped = _map_api_extraction(by_id[idx], title, short_description)
+                else:
+                    mapped = _map_api_result(parser, by_id[idx], title, short_description)
+                results[idx] = _apply_locked(mapped, locked)
+                if stage.is_last:
+                    needs_escalation("api", stage, results[idx])
+                    neg_key, neg_entry = (neg_by_idx or {}).get(idx, ("", None))
+                    if neg_entry is not None:
+                        get_negative_cache().record_success(neg_key)  # type: ignore
+        if not missing or not stage.is_last:
+            return
+        print(f"   ⚠️ Batch response missing {len(missing)}/{len(indices)} campaigns, re-parsing them.")
+        indices = missing
     except Exception as e:
-        print(f"API Parser Error: {e}")
-        return {
-            "_ai_failed": True,
-            "title": title,
-            "short_title": title,
-            "description": short_description,
-            "reward_value": None,
-            "reward_type": None,
-            "reward_text": "Detayları İnceleyin",
-            "sector": "Diğer",
-            "brands": [],
-            "conditions": [],
-            "cards": [],
-            "participation": "Detayları İnceleyin",
-            "start_date": None,
-            "end_date": None
-        }
+        if _is_transient_batch_error(e):
+            print(f"   ⚠️ Batch API quota / transient error persisted ({len(indices)} campaigns): {e}. Using fallback results.")
+            mark_fallback()
+            for idx in indices:
+                results[idx] = _api_fallback(items[idx].get("title") or "", items[idx].get("short_description") or "")
+            return
+        if not stage.is_last:
+            print(f"   ⚠️ Lite batch failed ({len(indices)} campaigns): {e}. Escalating them.")
+            return
+        print(f"   ⚠️ Batch API Parser Error ({len(indices)} campaigns): {e}. Splitting batch...")
+
+    mid = len(indices) // 2
+    _parse_api_batch(parser, items, indices[:mid], blocks, bank_name, results, locked_by_idx, stage, neg_by_idx)
+    _parse_api_batch(parser, items, indices[mid:], blocks, bank_name, results, locked_by_idx, stage, neg_by_idx)
@@ -0,0 +1,405 @@
+"""
+Offline bulk mode for large AI reprocessing jobs.
+
+Instead of sending one interactive request per campaign (and competing with
+the live scrapers for RPM), prompts for many campaigns are written to a JSONL
+job file and submitted to a batch backend. The job is polled until it finishes
+and the parsed results are returned keyed by the entry key (campaign id), so
+the caller can apply them to `Campaign` rows in one pass.
+
+Backends (env AI_BULK_BACKEND):
+    gemini  Gemini Batch API (files.upload + batches.create), default
+    local   file-based stand-in: processes the job file on disk without network,
+            answering each request with the rule-based extractor (for tests/dry runs)
+
+Every submitted job writes a manifest next to its JSONL file, so a long-running
+job can be resumed after the process exits:
+
+    python -m src.services.bulk_ai --status .cache/bulk_jobs/<job>/manifest.json
+    python -m src.services.bulk_ai --collect .cache/bulk_jobs/<job>/manifest.json
+    python data_quality_autofix.py --bulk-manifest .cache/bulk_jobs/<job>/manifest.json
+
+The default wait (AI_BULK_TIMEOUT_SEC, 4h) stays under the 6h GitHub Actions
+job limit so the workflow can exit cleanly and leave the job to a later run.
+
+Usage:
+    from src.services.bulk_ai import BulkEntry, run_bulk_parse
+
+    results = run_bulk_parse([BulkEntry("42", raw_text, title="...")])
+    results["42"]  # normalized AIParser dict (or fallback with _ai_failed=True)
+"""
+import os
+import json
+import time
+import shutil
+import uuid
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from src.services.rule_extractor import extract_fields # type: ignore
+from src.services.extraction_schema import ( # type: ignore
+    CAMPAIGN_FIELDS, SCHEMA_MAX_OUTPUT_TOKENS, is_schema_output_enabled, response_schema
+)
+
+BULK_DIR = os.getenv("AI_BULK_DIR", os.path.join(".cache", "bulk_jobs"))
+
+STATE_PENDING = "JOB_STATE_PENDING"
+STATE_RUNNING = "JOB_STATE_RUNNING"
+STATE_SUCCEEDED = "JOB_STATE_SUCCEEDED"
+DONE_STATES = {STATE_SUCCEEDED, "JOB_STATE_FAILED", "JOB_STATE_CANCELLED", "JOB_STATE_EXPIRED"}
+
+
+class BulkEntry:
+    """One campaign to parse in a bulk job."""
+
+    __slots__ = ("key", "raw_text", "title", "bank_name")
+
+    def __init__(self, key: str, raw_text: str, title: Optional[str] = None, bank_name: Optional[str] = None):
+        self.key = str(key)
+        self.raw_text = raw_text
+        self.title = title
+        self.bank_name = bank_name
+
+
+# ─── Job files ───────────────────────────────────────────────────────────────
+def build_request_line(parser: Any, entry: BulkEntry, current_date: str,
+                       schema_output: Optional[bool] = None) -> Dict[str, Any]:
+    """JSONL line for one entry: same prompt/system prefix/config as the interactive path."""
+    if schema_output is None:
+        schema_output = is_schema_output_enabled()
+    clean_text = parser._clean_text(entry.raw_text, entry.bank_name)
+    system_prompt, prompt = parser._build_prompt_parts(clean_text, current_date, entry.bank_name, entry.title)
+    generation_config: Dict[str, Any] = {
+        "temperature": 0.0,
+        "top_p": 0.1,
+        "top_k": 1,
+        "response_mime_type": "application/json",
+        "max_output_tokens": 6000,
+    }
+    if schema_output:
+        generation_config["response_schema"] = response_schema(CAMPAIGN_FIELDS)
+        generation_config["max_output_tokens"] = SCHEMA_MAX_OUTPUT_TOKENS
+    return {
+        "key": entry.key,
+        "request": {
+            "contents": [{"role": "user", "parts": [{"text": prompt}]}],
+            "system_instruction": {"parts": [{"text": system_prompt}]},
+            "generation_config": generation_config,
+        },
+    }
+
+
+def write_job_file(lines: List[Dict[str, Any]], path: str) -> str:
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        for line in lines:
+            f.write(json.dumps(line, ensure_ascii=False) + "\n")
+    return path
+
+
+def response_text(line: Dict[str, Any]) -> Optional[str]:
+    """Text of a batch output line ({"key", "response": {...}} or {"key", "error"})."""
+    response = line.get("response") or {}
+    for candidate in response.get("candidates") or []:
+        parts = (candidate.get("content") or {}).get("parts") or []
+        text = "".join(p.get("text", "") for p in parts)
+        if text:
+            return text
+    return None
+
+
+# ─── Backends ────────────────────────────────────────────────────────────────
+class BulkBackend:
+    name = "base"
+
+    def submit(self, path: str, model: str, display_name: str) -> str:
+        """Submit a JSONL job file; returns the backend job name."""
+        raise NotImplementedError
+
+    def state(self, job_name: str) -> str:
+        raise NotImplementedError
+
+    def results(self, job_name: str, keys: Optional[List[str]] = None) -> Iterator[Dict[str, Any]]:
+        """Output lines of a finished job; `keys` is the submitted key order (manifest)."""
+        raise NotImplementedError
+
+
+class GeminiBatchBackend(BulkBackend):
+    """Gemini Batch API. Jobs are bound to the API key they were created with (manifest stores its index)."""
+
+    name = "gemini"
+
+    def __init__(self, key_index: int = 0):
+        self.key_index = key_index
+
+    def _client(self) -> Any:
+        from src.utils.key_pool import load_api_keys # type: ignore
+        from src.utils.client_pool import get_client_pool # type: ignore
+        return get_client_pool().get(load_api_keys()[self.key_index])
+
+    def submit(self, path: str, model: str, display_name: str) -> str:
+        from google.genai import types as _types # type: ignore
+        client = self._client()
+        uploaded = client.files.upload(
+            file=path, config=_types.UploadFileConfig(display_name=display_name, mime_type="jsonl")
+        )
+        job = client.batches.create(model=model, src=uploaded.name, config={"display_name": display_name})
+        return job.name
+
+    def state(self, job_name: str) -> str:
+        job = self._client().batches.get(name=job_name)
+        return getattr(job.state, "name", str(job.state))
+
+    def results(self, job_name: str, keys: Optional[List[str]] = None) -> Iterator[Dict[str, Any]]:
+        client = self._client()
+        job = client.batches.get(name=job_name)
+        dest = getattr(job, "dest", None)
+        if dest is not None and getattr(dest, "file_name", None):
+            content = client.files.download(file=dest.file_name)
+            for raw in content.decode("utf-8").splitlines():
+                if raw.strip():
+                    yield json.loads(raw)
+        elif dest is not None and getattr(dest, "inlined_responses", None):
+            # Inlined responses carry no key, only the request order: map positions to the submitted keys
+            inlined = list(dest.inlined_responses)
+            if not keys or len(keys) != len(inlined):
+                raise ValueError(
+                    f"Bulk job {job_name}: {len(inlined)} inlined responses for {len(keys or [])} submitted keys; "
+                    "cannot map results to campaigns"
+                )
+            for key, inline in zip(keys, inlined):
+                error = getattr(inline, "error", None)
+                if error is not None:
+                    yield {"key": key, "error": {"message": str(getattr(error, "message", error))}}
+                    continue
+                text = getattr(getattr(inline, "response", None), "text", None)
+                yield {"key": key, "response": {"candidates": [{"content": {"parts": [{"text": text or ""}]}}]}}
+
+
+def _rule_responder(request: Dict[str, Any]) -> str:
+    """Local stand-in answer: the rule-based fields for the prompt text, in the AI JSON shape."""
+    prompt = "".join(p.get("text", "") for c in request.get("contents", []) for p in c.get("parts", []))
+    # The JSON shape example at the end of the prompt is not campaign text
+    fields = extract_fields(prompt.split("JSON Formatı:")[0]).fields
+    return json.dumps({
+        "title": None,
+        "description": "",
+        "reward_value": fields.get("reward_value"),
+        "reward_type": fields.get("reward_type"),
+        "reward_text": fields.get("reward_text"),
+        "min_spend": fields.get("min_spend"),
+        "start_date": fields.get("start_date"),
+        "end_date": fields.get("end_date"),
+        "sector": None,
+        "brands": fields.get("brands") or [],
+        "cards": fields.get("cards") or [],
+        "participation": fields.get("participation"),
+        "conditions": [],
+    }, ensure_ascii=False)
+
+
+class LocalBatchBackend(BulkBackend):
+    """
+    File-based stand-in for the Batch API. A job is a directory with input.jsonl,
+    state.json and (once finished) output.jsonl. The job completes on the
+    `complete_after_polls`-th state() call so polling code paths are exercised.
+    """
+
+    name = "local"
+
+    def __init__(self, root: Optional[str] = None, responder: Optional[Callable[[Dict[str, Any]], str]] = None,
+                 complete_after_polls: int = 1):
+        self.root = root or os.path.join(BULK_DIR, "_local_backend")
+        self.responder = responder or _rule_responder
+        self.complete_after_polls = complete_after_polls
+
+    def _dir(self, job_name: str) -> str:
+        return os.path.join(self.root, job_name.replace("/", "_"))
+
+    def _write_state(self, job_name: str, state: Dict[str, Any]) -> None:
+        with open(os.path.join(self._dir(job_name), "state.json"), "w", encoding="utf-8") as f:
+            json.dump(state, f)
+
+    def submit(self, path: str, model: str, display_name: str) -> str:
+        job_name = f"batches/local-{uuid.uuid4().hex[:12]}"
+        os.makedirs(self._dir(job_name), exist_ok=True)
+        shutil.copyfile(path, os.path.join(self._dir(job_name), "input.jsonl"))
+        self._write_state(job_name, {"state": STATE_PENDING, "polls": 0, "model": model, "display_name": display_name})
+        return job_name
+
+    def state(self, job_name: str) -> str:
+        with open(os.path.join(self._dir(job_name), "state.json"), encoding="utf-8") as f:
+            state = json.load(f)
+        if state["state"] in DONE_STATES:
+            return state["state"]
+        state["polls"] += 1
+        if state["polls"] >= self.complete_after_polls:
+            self._process(job_name)
+            state["state"] = STATE_SUCCEEDED
+        else:
+            state["state"] = STATE_RUNNING
+        self._write_state(job_name, state)
+        return state["state"]
+
+    def _process(self, job_name: str) -> None:
+        directory = self._dir(job_name)
+        with open(os.path.join(directory, "input.jsonl"), encoding="utf-8") as src, \
+                open(os.path.join(directory, "output.jsonl"), "w", encoding="utf-8") as dst:
+            for raw in src:
+                if not raw.strip():
+                    continue
+                line = json.loads(raw)
+                try:
+                    text = self.responder(line["request"])
+                    out = {"key": line["key"], "response": {"candidates": [{"content": {"parts": [{"text": text}]}}]}}
+                except Exception as e:
+                    out = {"key": line["key"], "error": {"message": str(e)}}
+                dst.write(json.dumps(out, ensure_ascii=False) + "\n")
+
+    def results(self, job_name: str, keys: Optional[List[str]] = None) -> Iterator[Dict[str, Any]]:
+        with open(os.path.join(self._dir(job_name), "output.jsonl"), encoding="utf-8") as f:
+            for raw in f:
+                if raw.strip():
+                    yield json.loads(raw)
+
+
+def get_bulk_backend(name: Optional[str] = None, **kwargs) -> BulkBackend:
+    name = (name or os.getenv("AI_BULK_BACKEND", "gemini")).strip().lower()
+    if name == "local":
+        return LocalBatchBackend(**kwargs)
+    if name == "gemini":
+        return GeminiBatchBackend(**kwargs)
+    raise ValueError(f"Unknown bulk backend: {name}")
+
+
+# ─── Job lifecycle ───────────────────────────────────────────────────────────
+def submit_bulk_parse(entries: List[BulkEntry], backend: Optional[BulkBackend] = None,
+                      job_dir: Optional[str] = None, model: Optional[str] = None) -> str:
+    """Write the JSONL job, submit it and return the manifest path."""
+    from src.services.ai_parser import get_ai_parser, gemini_model_name # type: ignore
+
+    backend = backend or get_bulk_backend()
+    model = model or gemini_model_name()
+    parser = get_ai_parser()
+    current_date = datetime.now().strftime("%Y-%m-%d")
+    job_id = datetime.now().strftime("%Y%m%d-%H%M%S") + "-" + uuid.uuid4().hex[:6]
+    job_dir = job_dir or os.path.join(BULK_DIR, job_id)
+
+    schema_output = is_schema_output_enabled()
+    lines = [build_request_line(parser, e, current_date, schema_output) for e in entries]
+    input_path = write_job_file(lines, os.path.join(job_dir, "input.jsonl"))
+    job_name = backend.submit(input_path, model, display_name=f"kasaonu-bulk-{job_id}")
+
+    manifest = {
+        "job_id": job_id,
+        "job_name": job_name,
+        "backend": backend.name,
+        "model": model,
+        "input": input_path,
+        "count": len(lines),
+        "schema_output": schema_output,
+        "keys": [e.key for e in entries],
+        "titles": {e.key: e.title for e in entries},
+        "submitted_at": datetime.now().isoformat(timespec="seconds"),
+    }
+    if isinstance(backend, GeminiBatchBackend):
+        manifest["key_index"] = backend.key_index
+    if isinstance(backend, LocalBatchBackend):
+        manifest["local_root"] = backend.root
+    manifest_path = os.path.join(job_dir, "manifest.json")
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+    print(f"   📤 Bulk job submitted: {len(lines)} campaigns → {job_name} ({backend.name})")
+    return manifest_path
+
+
+def _load_manifest(manifest_path: str) -> Dict[str, Any]:
+    with open(manifest_path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _backend_for(manifest: Dict[str, Any], backend: Optional[BulkBackend]) -> BulkBackend:
+    if backend is not None:
+        return backend
+    if manifest["backend"] == "local":
+        return LocalBatchBackend(root=manifest.get("local_root"))
+    return GeminiBatchBackend(key_index=manifest.get("key_index", 0))
+
+
+def wait_for_job(manifest_path: str, backend: Optional[BulkBackend] = None,
+                 poll_interval: Optional[float] = None, timeout: Optional[float] = None) -> str:
+    """Poll until the job reaches a final state (or timeout); returns the last state."""
+    manifest = _load_manifest(manifest_path)
+    backend = _backend_for(manifest, backend)
+    if poll_interval is None:
+        poll_interval = float(os.getenv("AI_BULK_POLL_SEC", "30"))
+    if timeout is None:
+        timeout = float(os.getenv("AI_BULK_TIMEOUT_SEC", str(4 * 3600)))
+    started = time.monotonic()
+    while True:
+        state = backend.state(manifest["job_name"])
+        if state in DONE_STATES:
+            print(f"   📥 Bulk job {manifest['job_name']}: {state} ({time.monotonic() - started:.0f}s)")
+            return state
+        if time.monotonic() - started >= timeout:
+            print(f"   ⏳ Bulk job {manifest['job_name']} still {state} after {timeout:.0f}s; apply it later with "
+                  f"python data_quality_autofix.py --bulk-manifest {manifest_path}")
+            return state
+        time.sleep(poll_interval)
+
+
+def collect_results(manifest_path: str, backend: Optional[BulkBackend] = None) -> Dict[str, Dict[str, Any]]:
+    """Normalized AIParser dicts keyed by entry key; failed/missing entries get the parser fallback."""
+    from src.services.ai_parser import get_ai_parser # type: ignore
+
+    manifest = _load_manifest(manifest_path)
+    backend = _backend_for(manifest, backend)
+    parser = get_ai_parser()
+    titles: Dict[str, Optional[str]] = manifest.get("titles", {})
+    # Decode in the format the job was submitted with, not the current env
+    schema_output = manifest.get("schema_output", is_schema_output_enabled())
+
+    results: Dict[str, Dict[str, Any]] = {}
+    for line in backend.results(manifest["job_name"], manifest.get("keys")):
+        key = str(line.get("key"))
+        text = response_text(line)
+        try:
+            if text is None:
+                raise ValueError(line.get("error") or "empty response")
+            results[key] = parser._decode_response(text, schema_output)
+        except Exception as e:
+            print(f"   ⚠️ Bulk result {key} unusable: {str(e)[:100]}")
+            results[key] = parser._get_fallback_data(titles.get(key) or "Kampanya")
+    for key, title in titles.items():
+        if key not in results:
+            results[key] = parser._get_fallback_data(title or "Kampanya")
+    return results
+
+
+def run_bulk_parse(entries: List[BulkEntry], backend: Optional[BulkBackend] = None,
+                   poll_interval: Optional[float] = None, timeout: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+    """Submit, wait and collect in one call. Returns {} if the job did not finish in time."""
+    if not entries:
+        return {}
+    manifest_path = submit_bulk_parse(entries, backend)
+    state = wait_for_job(manifest_path, backend, poll_interval, timeout)
+    if state != STATE_SUCCEEDED:
+        print(f"   ❌ Bulk job ended with {state}; manifest: {manifest_path}")
+        return {}
+    return collect_results(manifest_path, backend)
+
+
+if __name__ == "__main__":
+    import argparse
+    cli = argparse.ArgumentParser()
+    cli.add_argument("--status", metavar="MANIFEST", help="Print the state of a submitted job")
+    cli.add_argument("--collect", metavar="MANIFEST", help="Print parsed results of a finished job as JSON")
+    args = cli.parse_args()
+
+    if args.status:
+        m = _load_manifest(args.status)
+        print(f"{m['job_name']}: {_backend_for(m, None).state(m['job_name'])}")
+    if args.collect:
+        print(json.dumps(collect_results(args.collect), ensure_ascii=False, indent=1, default=str))
@@ -0,0 +1,376 @@
+"""
+Near-duplicate campaign detection ahead of the AI parser.
+
+The same campaign text is published under several cards and programs (Akbank
+Axess / Free / Wings / Business, the Yapı Kredi programs, Paraf and Paraf
+Genç, Masterpass / Troy campaigns mirrored by banks). This module keeps a
+MinHash LSH index over the cleaned text of campaigns that were already parsed.
+When a new text is a near-duplicate of one of them, its AI fields are reused
+and only the card-specific fields (cards, participation, title) are
+re-derived, so Gemini is not called again for the copy.
+
+Two texts count as duplicates only if
+  - their estimated Jaccard similarity over word 3-shingles reaches the threshold, and
+  - they contain exactly the same numbers (dates, amounts, limits, SMS numbers),
+    so a monthly re-run of a campaign with new dates is never mistaken for a copy.
+
+Results that fail the data-quality checks the autofixer uses (quality_checks) are
+neither indexed nor reused, so a defective parse never spreads to its copies.
+
+The signatures and results are kept in the ai_near_duplicates table of
+DATABASE_URL so every GitHub Actions runner shares one index; the SQLite file
+is used for local runs (no DATABASE_URL) or when the table is unreachable.
+
+Settings (env):
+    AI_DEDUP            true/false (default: true)
+    AI_DEDUP_THRESHOLD  minimum estimated Jaccard similarity (default 0.85)
+    AI_DEDUP_BACKEND    auto | postgres | sqlite (default auto: postgres when DATABASE_URL is set)
+    AI_DEDUP_PATH       local index file (default .cache/near_duplicates.sqlite3)
+
+Usage:
+    from src.services.dedup_index import get_dedup_index
+
+    index = get_dedup_index()
+    match = index.find("html", clean_text)
+    if match is None:
+        result = ...  # AI call
+        index.add("html", clean_text, result, bank_name="Akbank", title=title)
+
+    # Seed the index from campaigns already stored in the DB
+    python -m src.services.dedup_index --build
+    python -m src.services.dedup_index --stats
+"""
+import os
+import re
+import json
+import time
+import random
+import hashlib
+import threading
+from collections import defaultdict
+from typing import Any, Dict, FrozenSet, List, Optional, Set, Tuple
+
+from .quality_checks import find_defects # type: ignore
+from .rule_extractor import DEFAULT_MIN_CONFIDENCE, extract_min_spend, tr_lower # type: ignore
+from src.utils.sql_store import backend_mode, open_backend # type: ignore
+
+NUM_PERM = 128
+BANDS = 32  # 32 bands x 4 rows: candidate pairs from ~0.42 similarity, verified against the threshold
+SHINGLE_SIZE = 3
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_WORD = re.compile(r"\w+", re.UNICODE)
+_NUMBER = re.compile(r"\d+(?:[.,]\d+)*")
+
+# Quality checks a stored result must pass to be indexed / reused; cards and participation
+# are re-derived for every copy, the marketing summary only exists in full-HTML results
+REUSE_CHECKS = {
+    "html": ("corruption", "description", "reward_text", "reward_value", "reward_type",
+             "start_date", "end_date", "conditions", "marketing"),
+    "api": ("corruption", "description", "reward_text", "reward_value", "reward_type",
+            "start_date", "end_date", "conditions"),
+}
+_BAD_SECTORS = ("", "diger", "Diğer")
+
+
+def is_dedup_enabled() -> bool:
+    return os.getenv("AI_DEDUP", "true").lower() == "true"
+
+
+def shingles(text: str, k: int = SHINGLE_SIZE) -> Set[str]:
+    words = _WORD.findall(tr_lower(text or ""))
+    if len(words) < k:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + k]) for i in range(len(words) - k + 1)}
+
+
+def numbers_fingerprint(text: str) -> FrozenSet[str]:
+    return frozenset(_NUMBER.findall(text or ""))
+
+
+class MinHasher:
+    """Universal-hash MinHash: one 64-bit hash per shingle, NUM_PERM affine permutations of it."""
+
+    def __init__(self, num_perm: int = NUM_PERM, seed: int = 1):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self._perms = [(rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME))
+                       for _ in range(num_perm)]
+
+    def signature(self, items: Set[str]) -> Tuple[int, ...]:
+        if not items:
+            return tuple([_MAX_HASH] * self.num_perm)
+        hashes = [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little")
+                  for s in items]
+        return tuple(
+            min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes)
+            for a, b in self._perms
+        )
+
+
+def reuse_defects(kind: str, result: Dict[str, Any]) -> List[str]:
+    """Failed quality checks that keep a parsed result out of the index ([] = reusable)."""
+    defects = find_defects(result, REUSE_CHECKS.get(kind, REUSE_CHECKS["api"]))
+    if (result.get("sector") or "") in _BAD_SECTORS:
+        defects.append("sector")
+    return defects
+
+
+def similarity(sig_a: Tuple[int, ...], sig_b: Tuple[int, ...]) -> float:
+    """Estimated Jaccard similarity of two MinHash signatures."""
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / float(len(sig_a))
+
+
+class DuplicateMatch:
+    """A previously parsed campaign whose text is a near-duplicate of the query."""
+
+    __slots__ = ("key", "similarity", "result", "bank_name", "title")
+
+    def __init__(self, key: str, similarity: float, result: Dict[str, Any],
+                 bank_name: Optional[str], title: Optional[str]):
+        self.key = key
+        self.similarity = similarity
+        self.result = result
+        self.bank_name = bank_name
+        self.title = title
+
+
+_DDL = (
+    "CREATE TABLE IF NOT EXISTS ai_near_duplicates ("
+    " doc_key TEXT PRIMARY KEY,"
+    " kind TEXT NOT NULL,"
+    " bank TEXT,"
+    " title TEXT,"
+    " numbers TEXT NOT NULL,"
+    " signature TEXT NOT NULL,"
+    " result TEXT NOT NULL,"
+    " created_at DOUBLE PRECISION NOT NULL)",
+)
+
+
+class NearDuplicateIndex:
+    """
+    MinHash LSH index (in memory) backed by a table holding signatures and parsed results:
+    ai_near_duplicates in DATABASE_URL, or a local SQLite file (see sql_store).
+    Without a backend the index lives in memory only.
+    """
+
+    def __init__(self, backend: Optional[Any] = None, threshold: float = 0.85, num_perm: int = NUM_PERM,
+                 bands: int = BANDS):
+        self.backend = backend
+        self.threshold = threshold
+        self.hasher = MinHasher(num_perm)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self._lock = threading.Lock()
+        self._docs: Dict[str, Tuple[str, Tuple[int, ...], FrozenSet[str], Optional[str], Optional[str]]] = {}
+        self._buckets: Dict[Tuple[str, int, Tuple[int, ...]], List[str]] = defaultdict(list)
+        self._memory_results: Dict[str, Dict[str, Any]] = {}  # used when there is no backend
+        self._loaded = False
+        self._counters = {"lookups": 0, "hits": 0, "rejected_numbers": 0, "rejected_defects": 0, "adds": 0}
+
+    # ── persistence ──────────────────────────────────────────────────────────
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        if self.backend is None:
+            return
+        try:
+            with self.backend.transaction() as query:
+                rows = query("SELECT doc_key, kind, bank, title, numbers, signature FROM ai_near_duplicates")
+        except Exception as e:
+            print(f"[Dedup] ⚠️ Index could not be loaded ({self.backend.name}): {e}. Using memory only.")
+            self.backend = None
+            return
+        for key, kind, bank, title, numbers, signature in rows:
+            self._index_locked(key, kind, tuple(json.loads(signature)), frozenset(json.loads(numbers)), bank, title)
+
+    def _index_locked(self, key: str, kind: str, sig: Tuple[int, ...], numbers: FrozenSet[str],
+                      bank: Optional[str], title: Optional[str]) -> None:
+        if key in self._docs:
+            self._docs[key] = (kind, sig, numbers, bank, title)  # same text: buckets unchanged
+            return
+        self._docs[key] = (kind, sig, numbers, bank, title)
+        for band in range(self.bands):
+            self._buckets[(kind, band, sig[band * self.rows:(band + 1) * self.rows])].append(key)
+
+    def _result(self, key: str) -> Optional[Dict[str, Any]]:
+        if self.backend is None:
+            return self._memory_results.get(key)
+        with self.backend.transaction() as query:
+            rows = query("SELECT result FROM ai_near_duplicates WHERE doc_key = :k", k=key)
+        return json.loads(rows[0][0]) if rows else None
+
+    # ── API ──────────────────────────────────────────────────────────────────
+    @staticmethod
+    def doc_key(kind: str, text: str) -> str:
+        return hashlib.sha256(f"{kind}\x1f{text}".encode("utf-8")).hexdigest()
+
+    def find(self, kind: str, text: str) -> Optional[DuplicateMatch]:
+        """Best near-duplicate of `text` among indexed documents of the same kind, or None."""
+        sig = self.hasher.signature(shingles(text))
+        numbers = numbers_fingerprint(text)
+        best: Optional[Tuple[float, str]] = None
+        with self._lock:
+            self._ensure_loaded()
+            self._counters["lookups"] += 1
+            candidates: Set[str] = set()
+            for band in range(self.bands):
+                candidates.update(self._buckets.get((kind, band, sig[band * self.rows:(band + 1) * self.rows]), ()))
+            for key in candidates:
+                _, other_sig, other_numbers, _, _ = self._docs[key]
+                score = similarity(sig, other_sig)
+                if score < self.threshold:
+                    continue
+                if other_numbers != numbers:
+                    self._counters["rejected_numbers"] += 1
+                    continue
+                if best is None or score > best[0]:
+                    best = (score, key)
+            if best is None:
+                return None
+            result = self._result(best[1])
+            if result is None:
+                return None
+            if reuse_defects(kind, result):
+                self._counters["rejected_defects"] += 1  # indexed before the checks existed
+                return None
+            self._counters["hits"] += 1
+            _, _, _, bank, title = self._docs[best[1]]
+        return DuplicateMatch(best[1], best[0], result, bank, title)
+
+    def add(self, kind: str, text: str, result: Dict[str, Any],
+            bank_name: Optional[str] = None, title: Optional[str] = None, replace: bool = False) -> bool:
+        """
+        Index a successfully parsed campaign (private "_" keys are not stored); False if it was
+        skipped: failed parse, defective result (see reuse_defects) or already indexed.
+        replace: overwrite the stored result of the same text (a re-parse by the autofixer).
+        """
+        if not text or result.get("_ai_failed") or reuse_defects(kind, result):
+            return False
+        stored = {k: v for k, v in result.items() if not k.startswith("_")}
+        key = self.doc_key(kind, text)
+        sig = self.hasher.signature(shingles(text))
+        numbers = numbers_fingerprint(text)
+        with self._lock:
+            self._ensure_loaded()
+            if key in self._docs and not replace:
+                return False
+            self._index_locked(key, kind, sig, numbers, bank_name, title)
+            self._counters["adds"] += 1
+            if self.backend is None:
+                self._memory_results[key] = stored
+                return True
+            conflict = ("DO UPDATE SET bank = excluded.bank, title = excluded.title, result = excluded.result,"
+                        " created_at = excluded.created_at") if replace else "DO NOTHING"
+            with self.backend.transaction() as query:
+                query(
+                    "INSERT INTO ai_near_duplicates"
+                    " (doc_key, kind, bank, title, numbers, signature, result, created_at)"
+                    " VALUES (:k, :kind, :bank, :title, :numbers, :signature, :result, :created_at)"
+                    f" ON CONFLICT (doc_key) {conflict}",
+                    k=key, kind=kind, bank=bank_name, title=title, numbers=json.dumps(sorted(numbers)),
+                    signature=json.dumps(list(sig)), result=json.dumps(stored, ensure_ascii=False, default=str),
+                    created_at=time.time(),
+                )
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters: Dict[str, Any] = dict(self._counters)
+            counters["documents"] = len(self._docs)
+        counters["hit_rate"] = round(counters["hits"] / counters["lookups"], 3) if counters["lookups"] else 0.0
+        return counters
+
+
+_index_instance: Optional[NearDuplicateIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_dedup_index() -> Optional[NearDuplicateIndex]:
+    """Process-wide index, or None when AI_DEDUP is off."""
+    global _index_instance
+    if not is_dedup_enabled():
+        return None
+    if _index_instance is None:
+        with _index_lock:
+            if _index_instance is None:
+                path = os.getenv("AI_DEDUP_PATH", os.path.join(".cache", "near_duplicates.sqlite3"))
+                try:
+                    backend = open_backend(backend_mode("AI_DEDUP_BACKEND"), path, _DDL, label="Dedup")
+                except Exception as e:
+                    print(f"[Dedup] ⚠️ Index file could not be opened ({path}): {e}. Using memory only.")
+                    backend = None
+                _index_instance = NearDuplicateIndex(backend, threshold=float(os.getenv("AI_DEDUP_THRESHOLD", "0.85")))
+    return _index_instance
+
+
+def build_from_db(limit: int = 20000) -> int:
+    """
+    Seed the index with stored campaigns (Campaign.clean_text + their parsed fields).
+    Brands come from campaign_brands; min_spend has no column, so it is taken from the rules
+    on the stored text and left out when they are unsure (such documents are not reused).
+    Campaigns that fail the reuse checks (the autofixer's defects) are skipped.
+    """
+    from src.database import get_db_session # type: ignore
+    from src.models import Campaign, CampaignBrand, Card, Bank # type: ignore
+    from sqlalchemy.orm import joinedload # type: ignore
+
+    index = get_dedup_index()
+    if index is None:
+        print("Near-duplicate index is disabled (AI_DEDUP=false).")
+        return 0
+    added = 0
+    with get_db_session() as db:
+        rows = (
+            db.query(Campaign, Bank.name)
+            .join(Card, Card.id == Campaign.card_id)
+            .join(Bank, Bank.id == Card.bank_id)
+            .options(joinedload(Campaign.sector), joinedload(Campaign.brands).joinedload(CampaignBrand.brand))
+            .filter(Campaign.clean_text.isnot(None), Campaign.reward_text.isnot(None))
+            .order_by(Campaign.id.desc())
+            .limit(limit)
+            .all()
+        )
+        for c, bank_name in rows:
+            fields = {
+                "title": c.title,
+                "description": c.description or "",
+                "ai_marketing_text": c.ai_marketing_text or "",
+                "reward_value": float(c.reward_value) if c.reward_value is not None else None,
+                "reward_type": c.reward_type,
+                "reward_text": c.reward_text,
+                "start_date": c.start_date.strftime("%Y-%m-%d") if c.start_date else None,
+                "end_date": c.end_date.strftime("%Y-%m-%d") if c.end_date else None,
+                "sector": c.sector.slug if c.sector else "diger",
+                "brands": [cb.brand.name for cb in c.brands if cb.brand is not None],
+                "cards": c.eligible_cards.split(", ") if c.eligible_cards else [],
+                "participation": c.participation or "",
+                "conditions": c.conditions.split("\n") if c.conditions else [],
+            }
+            min_spend, confidence = extract_min_spend(c.clean_text)
+            if min_spend is not None and confidence >= DEFAULT_MIN_CONFIDENCE:
+                fields["min_spend"] = min_spend
+            elif confidence == 0.0:
+                fields["min_spend"] = None  # no minimum-spend phrase in the text
+            if index.add("html", c.clean_text, fields, bank_name=bank_name, title=c.title):
+                added += 1
+    print(f"✅ Indexed {added}/{len(rows)} stored campaigns → {index.backend.name if index.backend else 'memory'}")
+    return added
+
+
+if __name__ == "__main__":
+    import argparse
+    cli = argparse.ArgumentParser()
+    cli.add_argument("--build", action="store_true", help="Seed the index from Campaign.clean_text in the DB")
+    cli.add_argument("--limit", type=int, default=20000)
+    cli.add_argument("--stats", action="store_true", help="Print index statistics")
+    args = cli.parse_args()
+
+    if args.build:
+        build_from_db(args.limit)
+    if args.stats:
+        index = get_dedup_index()
+        print(json.dumps(index.stats() if index else {}, ensure_ascii=False, indent=1))
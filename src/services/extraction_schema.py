@@ -0,0 +1,318 @@
+"""
+Single declaration of the AI extraction schema.
+
+Every field the parser asks Gemini for is declared once here with a short
+output key. From that declaration we derive
+  - the `response_schema` passed to Gemini (types, enums, nullability), so the
+    model can only emit well-formed JSON with valid sector / reward_type values,
+  - a key legend for the system prompt (field rules keep their long names),
+  - `CampaignExtraction`, a slots-based result decoded straight from the
+    compact response and mapped back to the current dict shape.
+
+Compact keys cut output tokens (keys are repeated in every response and in
+every item of a batch) and the schema removes the need for regex JSON
+extraction and most type coercion. Decoding also accepts the long field names,
+so recorded legacy responses and the local bulk backend keep working.
+
+Settings (env):
+    AI_SCHEMA_OUTPUT   "1" (default) to request schema-constrained compact JSON,
+                       "0" for the legacy free-form JSON prompt
+
+Usage:
+    from src.services.extraction_schema import CAMPAIGN_FIELDS, decode_extraction, response_schema
+
+    config = types.GenerateContentConfig(response_mime_type="application/json",
+                                         response_schema=response_schema(CAMPAIGN_FIELDS))
+    extraction = decode_extraction(response_text, CAMPAIGN_FIELDS)
+    extraction.to_dict(CAMPAIGN_FIELDS)
+
+    # Output-token / parse-time gains on recorded responses (see src.utils.replay_backend)
+    python -m src.services.extraction_schema --measure
+"""
+import os
+import re
+import json
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from src.utils.rate_limiter import estimate_tokens # type: ignore
+
+# Output budget per campaign when the response is schema-constrained compact JSON
+SCHEMA_MAX_OUTPUT_TOKENS = 2048
+
+_DATE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+_BULLET = re.compile(r'^[\s\-_•*\\.]+')
+
+REWARD_TYPES = ["puan", "indirim", "taksit", "mil"]
+
+# Slugs listed in the full-HTML prompt's VALID SECTORS block
+HTML_SECTOR_SLUGS = [
+    "market-gida", "akaryakit", "giyim-aksesuar", "restoran-kafe", "elektronik", "mobilya-dekorasyon",
+    "kozmetik-saglik", "e-ticaret", "ulasim", "dijital-platform", "kultur-sanat", "egitim", "sigorta",
+    "otomotiv", "vergi-kamu", "turizm-konaklama", "kuyum-optik-ve-saat", "fatura-telekomunikasyon",
+    "anne-bebek-oyuncak", "kitap-kirtasiye-ofis", "evcil-hayvan-petshop", "hizmet-bireysel-gelisim",
+    "finans-yatirim", "diger",
+]
+# Names listed in the API prompt's VALID SECTORS block
+API_SECTOR_NAMES = [
+    "Market & Gıda", "Akaryakıt", "Giyim & Aksesuar", "Restoran & Kafe", "Elektronik", "Mobilya & Dekorasyon",
+    "Kozmetik & Sağlık", "E-Ticaret", "Ulaşım", "Dijital Platform", "Kültür & Sanat", "Eğitim", "Sigorta",
+    "Otomotiv", "Vergi & Kamu", "Turizm & Konaklama", "Kuyum, Optik ve Saat", "Diğer",
+]
+# Slug → API sector name (slugs without an API counterpart are absent)
+API_SECTOR_BY_SLUG = dict(zip(HTML_SECTOR_SLUGS[:17], API_SECTOR_NAMES[:17]), diger="Diğer")
+
+
+def is_schema_output_enabled() -> bool:
+    return os.getenv("AI_SCHEMA_OUTPUT", "1").strip() not in ("0", "false", "False", "")
+
+
+class Field:
+    """One extraction field: long name (dict key used by scrapers), compact output key and type."""
+
+    __slots__ = ("name", "key", "kind", "nullable", "enum", "description")
+
+    def __init__(self, name: str, key: str, kind: str, nullable: bool = False,
+                 enum: Optional[List[str]] = None, description: str = ""):
+        self.name = name
+        self.key = key
+        self.kind = kind            # "string" | "number" | "date" | "list"
+        self.nullable = nullable
+        self.enum = enum
+        self.description = description
+
+    def schema(self) -> Dict[str, Any]:
+        if self.kind == "list":
+            prop: Dict[str, Any] = {"type": "ARRAY", "items": {"type": "STRING"}}
+        elif self.kind == "number":
+            prop = {"type": "NUMBER"}
+        else:
+            prop = {"type": "STRING"}
+        if self.enum:
+            prop["enum"] = list(self.enum)
+            if self.kind == "string":
+                prop["format"] = "enum"
+        if self.nullable:
+            prop["nullable"] = True
+        if self.description:
+            prop["description"] = self.description
+        return prop
+
+
+_DESCRIPTION = Field("description", "d", "string", description="2 cümlelik pazarlama metni")
+_REWARD_VALUE = Field("reward_value", "rv", "number", nullable=True)
+_REWARD_TYPE = Field("reward_type", "ry", "string", nullable=True, enum=REWARD_TYPES)
+_REWARD_TEXT = Field("reward_text", "rt", "string", description="Kısa ödül metni")
+_START = Field("start_date", "sd", "date", nullable=True, description="YYYY-MM-DD")
+_END = Field("end_date", "ed", "date", nullable=True, description="YYYY-MM-DD")
+_BRANDS = Field("brands", "b", "list")
+_CARDS = Field("cards", "c", "list")
+_PARTICIPATION = Field("participation", "p", "string", description="Katılım talimatı")
+_CONDITIONS = Field("conditions", "k", "list", description="Madde işaretsiz koşullar")
+
+# Full-HTML parser (AIParser.parse_campaign_data)
+CAMPAIGN_FIELDS = (
+    Field("title", "t", "string"),
+    _DESCRIPTION,
+    Field("ai_marketing_text", "m", "string", description="Max 120 karakter pazarlama özeti"),
+    _REWARD_VALUE, _REWARD_TYPE, _REWARD_TEXT,
+    Field("min_spend", "ms", "number", nullable=True),
+    _START, _END,
+    Field("sector", "s", "string", enum=HTML_SECTOR_SLUGS),
+    _BRANDS, _CARDS, _PARTICIPATION, _CONDITIONS,
+)
+
+# API-first parser (parse_api_campaign / parse_api_campaigns)
+API_FIELDS = (
+    Field("short_title", "st", "string", description="40-70 karakter kısa başlık"),
+    _DESCRIPTION, _REWARD_VALUE, _REWARD_TYPE, _REWARD_TEXT,
+    Field("sector", "s", "string", enum=API_SECTOR_NAMES),
+    _BRANDS, _CONDITIONS, _CARDS, _PARTICIPATION, _START, _END,
+)
+
+
+def without(fields: Tuple[Field, ...], names: Iterable[str]) -> Tuple[Field, ...]:
+    """Fields minus the ones already known (e.g. locked by the rule fast-path)."""
+    names = set(names)
+    return tuple(f for f in fields if f.name not in names)
+
+
+def _object_schema(fields: Tuple[Field, ...], with_id: bool = False) -> Dict[str, Any]:
+    properties = {f.key: f.schema() for f in fields}
+    order = [f.key for f in fields]
+    if with_id:
+        properties = dict({"id": {"type": "INTEGER"}}, **properties)
+        order = ["id"] + order
+    return {
+        "type": "OBJECT",
+        "properties": properties,
+        "required": order,
+        "property_ordering": order,
+    }
+
+
+def response_schema(fields: Tuple[Field, ...]) -> Dict[str, Any]:
+    return _object_schema(fields)
+
+
+def batch_response_schema(fields: Tuple[Field, ...]) -> Dict[str, Any]:
+    """Array of objects, each carrying the campaign "id" of its batch block."""
+    return {"type": "ARRAY", "items": _object_schema(fields, with_id=True)}
+
+
+def key_legend(fields: Tuple[Field, ...]) -> str:
+    """Prompt block mapping compact output keys to the field names the rules refer to."""
+    lines = "\n".join(f"  {f.key} = {f.name}" for f in fields)
+    return f"""
+ÇIKTI FORMATI: Yanıt, verilen JSON şemasına uyan KISA anahtarlar kullanır. Kurallardaki alan adları şu anahtarlara yazılır:
+{lines}
+Bulunamayan sayısal/tarih alanlarını null bırak, listeleri boş liste yap.
+"""
+
+
+class CampaignExtraction:
+    """Typed extraction result decoded from a (compact or legacy) response object."""
+
+    __slots__ = (
+        "title", "short_title", "description", "ai_marketing_text", "reward_value", "reward_type",
+        "reward_text", "min_spend", "start_date", "end_date", "sector", "brands", "cards",
+        "participation", "conditions",
+    )
+
+    def __init__(self, **values: Any):
+        for name in self.__slots__:
+            setattr(self, name, values.get(name))
+
+    @classmethod
+    def from_obj(cls, obj: Dict[str, Any], fields: Tuple[Field, ...]) -> "CampaignExtraction":
+        values = {}
+        for f in fields:
+            raw = obj.get(f.key, obj.get(f.name))
+            values[f.name] = _coerce(f, raw)
+        return cls(**values)
+
+    def to_dict(self, fields: Tuple[Field, ...]) -> Dict[str, Any]:
+        return {f.name: getattr(self, f.name) for f in fields}
+
+    def to_compact(self, fields: Tuple[Field, ...]) -> Dict[str, Any]:
+        return {f.key: getattr(self, f.name) for f in fields}
+
+
+def _coerce(field: Field, value: Any) -> Any:
+    """Light type guard; the response schema already enforces the shape."""
+    if field.kind == "list":
+        if not value:
+            return []
+        items = value if isinstance(value, list) else [value]
+        cleaned = []
+        for item in items:
+            text = _BULLET.sub("", str(item).strip()).strip() if item is not None else ""
+            if text:
+                cleaned.append(text)
+        return cleaned
+    if value is None or value == "":
+        return None
+    if field.kind == "number":
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return float(value)
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return None
+    if field.kind == "date":
+        return value if isinstance(value, str) and _DATE.match(value) else None
+    if isinstance(value, list):
+        value = "\n".join(str(v).strip() for v in value if v)
+    return str(value).strip() or None
+
+
+def decode_extraction(text: str, fields: Tuple[Field, ...]) -> CampaignExtraction:
+    """Decode one schema-constrained response. Raises ValueError on malformed JSON."""
+    obj = json.loads(text)
+    if not isinstance(obj, dict):
+        raise ValueError(f"Expected a JSON object, got {type(obj).__name__}")
+    return CampaignExtraction.from_obj(obj, fields)
+
+
+def decode_batch(text: str, fields: Tuple[Field, ...]) -> Dict[int, CampaignExtraction]:
+    """Decode a batch response into {campaign id: extraction}; items without a valid id are dropped."""
+    data = json.loads(text)
+    by_id: Dict[int, CampaignExtraction] = {}
+    for obj in data if isinstance(data, list) else []:
+        if isinstance(obj, dict) and obj.get("id") is not None:
+            try:
+                by_id[int(obj["id"])] = CampaignExtraction.from_obj(obj, fields)
+            except (TypeError, ValueError):
+                continue
+    return by_id
+
+
+def encode_compact(extraction: CampaignExtraction, fields: Tuple[Field, ...]) -> str:
+    """Compact JSON as the model emits it under the schema (used to measure output tokens)."""
+    return json.dumps(extraction.to_compact(fields), ensure_ascii=False, separators=(",", ":"))
+
+
+# ─── Measurement on recorded responses ──────────────────────────────────────
+def measure(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Output tokens and parse cost of the legacy free-form path vs the compact schema path,
+    computed on recorded responses (GEMINI_BACKEND=record). Legacy responses are re-encoded
+    with compact keys to estimate the token saving.
+    """
+    from src.services.ai_parser import get_ai_parser # type: ignore
+    parser = get_ai_parser()
+
+    stats = {"responses": 0, "legacy_failures": 0, "schema_failures": 0,
+             "tokens_legacy": 0, "tokens_compact": 0, "legacy_parse_us": 0.0, "schema_parse_us": 0.0}
+    for rec in records:
+        text = rec.get("text")
+        if not text or not text.lstrip().startswith("{"):
+            continue  # batch arrays and non-JSON answers are not comparable one-to-one
+        stats["responses"] += 1
+
+        started = time.perf_counter()
+        try:
+            parser._normalize_data(parser._extract_json(text))
+        except Exception:
+            stats["legacy_failures"] += 1
+        stats["legacy_parse_us"] += (time.perf_counter() - started) * 1e6
+
+        started = time.perf_counter()
+        try:
+            extraction = decode_extraction(text, CAMPAIGN_FIELDS)
+            parser._normalize_extraction(extraction)
+        except Exception:
+            stats["schema_failures"] += 1
+            continue
+        finally:
+            stats["schema_parse_us"] += (time.perf_counter() - started) * 1e6
+
+        stats["tokens_legacy"] += estimate_tokens(text)
+        stats["tokens_compact"] += estimate_tokens(encode_compact(extraction, CAMPAIGN_FIELDS))
+
+    n = stats["responses"] or 1
+    ok = max(1, n - stats["schema_failures"])
+    return {
+        "responses": stats["responses"],
+        "legacy_failure_rate": round(stats["legacy_failures"] / n, 3),
+        "schema_failure_rate": round(stats["schema_failures"] / n, 3),
+        "avg_output_tokens_legacy": round(stats["tokens_legacy"] / ok, 1),
+        "avg_output_tokens_compact": round(stats["tokens_compact"] / ok, 1),
+        "output_tokens_saved_pct": round(100.0 * (1 - stats["tokens_compact"] / stats["tokens_legacy"]), 1)
+        if stats["tokens_legacy"] else 0.0,
+        "avg_parse_us_legacy": round(stats["legacy_parse_us"] / n, 1),
+        "avg_parse_us_schema": round(stats["schema_parse_us"] / n, 1),
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    from src.utils.replay_backend import RecordingStore, RECORD_PATH # type: ignore
+
+    cli = argparse.ArgumentParser()
+    cli.add_argument("--measure", action="store_true", help="Compare legacy vs compact output on recorded responses")
+    cli.add_argument("--path", default=RECORD_PATH, help="Recording file (GEMINI_BACKEND=record)")
+    args = cli.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(RecordingStore(args.path).records()), ensure_ascii=False, indent=1))
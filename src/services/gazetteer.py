@@ -0,0 +1,375 @@
+"""
+Gazetteer: single-pass brand and eligible-card extraction ahead of the AI parser.
+
+Brands and eligible cards used to be asked from Gemini and then cleaned by
+cleanup_brands, and data_quality_autofix re-invoked the AI only for "Missing
+Brands" or "Missing/Corrupted/Generic Eligible Cards". Both are lookups of
+names the DB already knows, so this module matches them directly:
+
+  - patterns: Brand.name + Brand.aliases, Card.name (scoped to the card's bank,
+    which is resolved from Bank.name / Bank.aliases)
+  - matching: one Aho-Corasick automaton over the whole text, Turkish-casefold
+    aware (İ/I/ı fold to i, so "MİGROS", "MIGROS" and "Migros'ta" all match),
+    whole words only, longest match wins on overlaps
+  - card mentions in sentences that exclude them ("... hariç") are skipped
+  - incremental updates: brands and cards inserted through SQLAlchemy are added
+    to the live automaton (after_insert events); only the failure links are
+    recomputed, lazily on the next scan (scans and inserts share one lock)
+
+The gazetteer only knows names that are already in the DB, so ai_parser still
+asks the AI for brands / cards and merges its answer with the gazetteer hits
+(union, gazetteer names first). Brands the AI discovers are inserted by the
+scrapers and matched locally from then on.
+
+Settings (env):
+    AI_GAZETTEER   true/false (default: true; needs the DB to load the names)
+
+Usage:
+    from src.services.gazetteer import get_gazetteer
+
+    gazetteer = get_gazetteer()
+    if gazetteer is not None:
+        found = gazetteer.extract(clean_text, title=title, bank_name="Akbank")
+        found.brands, found.brand_ids, found.cards
+        for m in gazetteer.scan(text):
+            print(m.kind, m.key, m.name, m.start, m.end)
+
+    python -m src.services.gazetteer --stats
+    python -m src.services.gazetteer --scan "Migros'ta Axess ile 100 TL chip-para" --bank Akbank
+"""
+import os
+import json
+import threading
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .brand_normalizer import cleanup_brands # type: ignore
+from .rule_extractor import excludes_cards, tr_lower # type: ignore
+
+MIN_PATTERN_CHARS = 3
+
+_FOLD = {"İ": "i", "I": "i", "ı": "i"}
+_SENTENCE_ENDS = ("\n", ".", "!", "?", ";")
+
+
+def is_gazetteer_enabled() -> bool:
+    return os.getenv("AI_GAZETTEER", "true").lower() == "true"
+
+
+def tr_casefold(text: str) -> str:
+    """Turkish-aware casefold that keeps every character at its offset (İ/I/ı → i)."""
+    out = []
+    for ch in text:
+        folded = _FOLD.get(ch)
+        if folded is None:
+            folded = ch.lower()
+            if len(folded) != 1:
+                folded = ch
+        out.append(folded)
+    return "".join(out)
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+def _sentence(text: str, start: int, end: int) -> str:
+    """The sentence / line around text[start:end] (context for card exclusions)."""
+    left = max(text.rfind(ch, 0, start) for ch in _SENTENCE_ENDS) + 1
+    rights = [i for i in (text.find(ch, end) for ch in _SENTENCE_ENDS) if i >= 0]
+    return text[left:min(rights) if rights else len(text)]
+
+
+class AhoCorasick:
+    """Multi-pattern automaton; patterns can be added after it was built."""
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+        self._patterns: List[Tuple[int, Any]] = []   # (length, payload)
+        self._built = True
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._patterns)
+
+    def add(self, pattern: str, payload: Any) -> None:
+        """Insert an already casefolded pattern; failure links are rebuilt on the next search."""
+        if not pattern:
+            return
+        with self._lock:
+            node = 0
+            for ch in pattern:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                node = nxt
+            self._out[node].append(len(self._patterns))
+            self._patterns.append((len(pattern), payload))
+            self._built = False
+
+    def _build(self) -> None:
+        """BFS over the trie: failure links and merged outputs (suffix patterns)."""
+        # A node's own patterns are those as long as the node is deep (earlier builds merged in suffixes)
+        own = [[p for p in out if self._patterns[p][0] == depth] for out, depth in zip(self._out, self._depths())]
+        fail = [0] * len(self._goto)
+        out = [list(o) for o in own]
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                state = fail[node]
+                while state and ch not in self._goto[state]:
+                    state = fail[state]
+                target = self._goto[state].get(ch, 0)
+                fail[child] = target if target != child else 0
+                out[child] = own[child] + out[fail[child]]
+                queue.append(child)
+        self._fail, self._out = fail, out
+        self._built = True
+
+    def _depths(self) -> List[int]:
+        depth = [0] * len(self._goto)
+        queue = deque([0])
+        while queue:
+            node = queue.popleft()
+            for child in self._goto[node].values():
+                depth[child] = depth[node] + 1
+                queue.append(child)
+        return depth
+
+    def iter(self, text: str) -> List[Tuple[int, int, Any]]:
+        """
+        (start, end, payload) of every pattern occurrence in the casefolded text. Runs under
+        the lock: add() mutates the trie in place (new brands / cards from after_insert events).
+        """
+        hits: List[Tuple[int, int, Any]] = []
+        with self._lock:
+            if not self._built:
+                self._build()
+            goto, fail, out, patterns = self._goto, self._fail, self._out, self._patterns
+            node = 0
+            for i, ch in enumerate(text):
+                while node and ch not in goto[node]:
+                    node = fail[node]
+                node = goto[node].get(ch, 0)
+                for p in out[node]:
+                    length, payload = patterns[p]
+                    hits.append((i + 1 - length, i + 1, payload))
+        return hits
+
+
+class Match:
+    """One gazetteer hit; `key` is the Brand / Card id, start/end are offsets in the scanned text."""
+
+    __slots__ = ("kind", "key", "name", "start", "end", "surface")
+
+    def __init__(self, kind: str, key: Any, name: str, start: int, end: int, surface: str):
+        self.kind = kind
+        self.key = key
+        self.name = name
+        self.start = start
+        self.end = end
+        self.surface = surface
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"kind": self.kind, "key": str(self.key), "name": self.name,
+                "start": self.start, "end": self.end, "surface": self.surface}
+
+
+class Extraction:
+    """Brands and eligible cards found in one campaign text (first mention order)."""
+
+    __slots__ = ("brands", "brand_ids", "cards", "card_ids", "matches")
+
+    def __init__(self):
+        self.brands: List[str] = []
+        self.brand_ids: List[Any] = []
+        self.cards: List[str] = []
+        self.card_ids: List[Any] = []
+        self.matches: List[Match] = []
+
+
+class Gazetteer:
+    """Brand / card names of the DB in one automaton."""
+
+    def __init__(self):
+        self._automaton = AhoCorasick()
+        self._lock = threading.Lock()
+        self._brands: Dict[Any, str] = {}
+        self._cards: Dict[Any, Tuple[str, Any]] = {}    # card id → (name, bank id)
+        self._banks: Dict[str, Any] = {}                # casefolded bank name / alias → bank id
+        self._seen: set = set()                         # (kind, key, pattern) already inserted
+
+    def _add_pattern(self, kind: str, key: Any, term: str) -> None:
+        pattern = tr_casefold(term.strip())
+        if len(pattern) < MIN_PATTERN_CHARS or (kind, key, pattern) in self._seen:
+            return
+        self._seen.add((kind, key, pattern))
+        self._automaton.add(pattern, (kind, key))
+
+    def add_brand(self, brand_id: Any, name: str, aliases: Optional[Iterable[str]] = None) -> None:
+        """Brand name + aliases; generic words cleanup_brands rejects ("bonus", "market"...) are skipped."""
+        with self._lock:
+            self._brands[brand_id] = name
+            for term in [name, *(aliases or [])]:
+                if term and cleanup_brands([term]):
+                    self._add_pattern("brand", brand_id, term)
+
+    def add_card(self, card_id: Any, name: str, bank_id: Any) -> None:
+        with self._lock:
+            self._cards[card_id] = (name, bank_id)
+            if name:
+                self._add_pattern("card", card_id, name)
+
+    def add_bank(self, bank_id: Any, name: str, aliases: Optional[Iterable[str]] = None) -> None:
+        with self._lock:
+            for term in [name, *(aliases or [])]:
+                if term:
+                    self._banks[tr_casefold(term.strip())] = bank_id
+
+    def resolve_bank(self, bank_name: Optional[str]) -> Optional[Any]:
+        """Bank id for a scraper's bank name (exact name / alias, else the longest alias it contains)."""
+        if not bank_name:
+            return None
+        folded = tr_casefold(bank_name.strip())
+        if folded in self._banks:
+            return self._banks[folded]
+        contained = [alias for alias in list(self._banks) if alias and (alias in folded or folded in alias)]
+        return self._banks[max(contained, key=len)] if contained else None
+
+    def scan(self, text: str) -> List[Match]:
+        """All whole-word brand / card mentions; overlapping hits keep the longest."""
+        if not text:
+            return []
+        folded = tr_casefold(text)
+        hits = []
+        for start, end, (kind, key) in self._automaton.iter(folded):
+            if start > 0 and _is_word_char(folded[start - 1]):
+                continue
+            if end < len(folded) and _is_word_char(folded[end]):
+                continue
+            hits.append((start, end, kind, key))
+        hits.sort(key=lambda h: (h[0], -(h[1] - h[0])))
+        matches: List[Match] = []
+        covered_until = -1
+        for start, end, kind, key in hits:
+            if start < covered_until:
+                continue
+            name = self._brands.get(key) if kind == "brand" else self._cards.get(key, ("", None))[0]
+            matches.append(Match(kind, key, name or text[start:end], start, end, text[start:end]))
+            covered_until = end
+        return matches
+
+    def extract(self, text: str, title: Optional[str] = None, bank_name: Optional[str] = None,
+                bank_id: Optional[Any] = None) -> Extraction:
+        """
+        Brands and eligible cards of one campaign. Cards are only taken from the
+        campaign's bank (bank_id, or resolved from bank_name); without a bank none are returned.
+        """
+        full = f"{title}\n{text or ''}" if title else (text or "")
+        if bank_id is None:
+            bank_id = self.resolve_bank(bank_name)
+        result = Extraction()
+        for m in self.scan(full):
+            if m.kind == "brand":
+                if m.key not in result.brand_ids:
+                    result.brand_ids.append(m.key)
+                    result.brands.append(m.name)
+            elif bank_id is not None and self._cards.get(m.key, ("", None))[1] == bank_id:
+                if excludes_cards(tr_lower(_sentence(full, m.start, m.end))):
+                    continue
+                if m.name not in result.cards:
+                    result.card_ids.append(m.key)
+                    result.cards.append(m.name)
+            else:
+                continue
+            result.matches.append(m)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "brands": len(self._brands),
+            "cards": len(self._cards),
+            "bank_names": len(self._banks),
+            "patterns": len(self._automaton),
+        }
+
+
+def build_from_db() -> Gazetteer:
+    """Load active brands, cards and bank aliases from the DB."""
+    from src.database import get_db_session # type: ignore
+    from src.models import Bank, Brand, Card # type: ignore
+
+    gazetteer = Gazetteer()
+    with get_db_session() as db:
+        for bank_id, name, aliases in db.query(Bank.id, Bank.name, Bank.aliases).all():
+            gazetteer.add_bank(bank_id, name, aliases)
+        for card_id, name, bank_id in db.query(Card.id, Card.name, Card.bank_id).filter(Card.is_active == True).all():
+            gazetteer.add_card(card_id, name, bank_id)
+        for brand_id, name, aliases in db.query(Brand.id, Brand.name, Brand.aliases).filter(Brand.is_active == True).all():
+            gazetteer.add_brand(brand_id, name, aliases)
+    return gazetteer
+
+
+def _listen_for_inserts() -> None:
+    """New Brand / Card rows (scrapers, auto-fixer) are matched without reloading the gazetteer."""
+    from sqlalchemy import event # type: ignore
+    from src.models import Brand, Card # type: ignore
+
+    def on_brand(mapper, connection, target) -> None:
+        if _gazetteer_instance is not None and target.is_active is not False:
+            _gazetteer_instance.add_brand(target.id, target.name, target.aliases)
+
+    def on_card(mapper, connection, target) -> None:
+        if _gazetteer_instance is not None and target.is_active is not False:
+            _gazetteer_instance.add_card(target.id, target.name, target.bank_id)
+
+    event.listen(Brand, "after_insert", on_brand)
+    event.listen(Card, "after_insert", on_card)
+
+
+# ─── Process-wide instance ───────────────────────────────────────────────────
+_gazetteer_instance: Optional[Gazetteer] = None
+_gazetteer_loaded = False
+_gazetteer_lock = threading.Lock()
+
+
+def get_gazetteer() -> Optional[Gazetteer]:
+    """Gazetteer loaded from the DB, or None when AI_GAZETTEER is off or the DB is unavailable."""
+    global _gazetteer_instance, _gazetteer_loaded
+    if not is_gazetteer_enabled():
+        return None
+    if _gazetteer_loaded:
+        return _gazetteer_instance
+    with _gazetteer_lock:
+        if not _gazetteer_loaded:
+            try:
+                _gazetteer_instance = build_from_db()
+                _listen_for_inserts()
+            except Exception as e:
+                print(f"[WARN] Gazetteer disabled, brand/card names could not be loaded: {e}")
+                _gazetteer_instance = None
+            _gazetteer_loaded = True
+    return _gazetteer_instance
+
+
+if __name__ == "__main__":
+    import argparse
+    cli = argparse.ArgumentParser()
+    cli.add_argument("--stats", action="store_true", help="Print pattern counts")
+    cli.add_argument("--scan", default=None, help="Text to scan")
+    cli.add_argument("--bank", default=None, help="Bank name for card matching")
+    args = cli.parse_args()
+
+    gazetteer = get_gazetteer()
+    if args.stats:
+        print(json.dumps(gazetteer.stats() if gazetteer else {}, ensure_ascii=False, indent=1))
+    if args.scan and gazetteer is not None:
+        found = gazetteer.extract(args.scan, bank_name=args.bank)
+        print(json.dumps([m.as_dict() for m in found.matches], ensure_ascii=False, indent=1))
@@ -0,0 +1,125 @@
+"""
+Two-stage model cascade for AI campaign parsing.
+
+Stage "lite" sends a short prompt (no bank rule block, compact sector list)
+to a cheap model. Its result is validated with the data-quality checks the
+autofixer uses (quality_checks); only campaigns that fail them, or whose lite
+call errors, are escalated to stage "full": the complete bank-specific prompt
+on the stronger model. Escalation rates per stage and the failing checks are
+counted so the lite prompt can be tuned.
+
+Settings (env):
+    AI_CASCADE               true/false (default: false)
+    AI_CASCADE_LITE_MODEL    model of the lite stage (default: GEMINI_MODEL)
+    AI_CASCADE_STRONG_MODEL  model of the full stage (default: GEMINI_MODEL)
+    AI_CASCADE_CHECKS        comma-separated quality checks that trigger escalation
+                             (default: corruption,reward_text,reward_value,cards,participation)
+
+Usage:
+    from src.services.model_cascade import cascade_stages, needs_escalation, get_cascade_stats
+
+    for stage in cascade_stages():
+        result = ...  # AI call with stage.model and the stage's prompt
+        if stage.is_last or not needs_escalation("html", stage, result):
+            break
+"""
+import os
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Mapping, Optional
+
+from .quality_checks import ALL_CHECKS, find_defects # type: ignore
+
+DEFAULT_CHECKS = ("corruption", "reward_text", "reward_value", "cards", "participation")
+
+
+def is_cascade_enabled() -> bool:
+    return os.getenv("AI_CASCADE", "false").lower() == "true"
+
+
+def escalation_checks() -> List[str]:
+    raw = os.getenv("AI_CASCADE_CHECKS", "")
+    checks = [c.strip() for c in raw.split(",") if c.strip()] or list(DEFAULT_CHECKS)
+    return [c for c in checks if c in ALL_CHECKS]
+
+
+class Stage:
+    """One cascade step: name ("lite" / "full"), model override and whether it is the final step."""
+
+    __slots__ = ("name", "model", "is_last")
+
+    def __init__(self, name: str, model: Optional[str], is_last: bool):
+        self.name = name
+        self.model = model
+        self.is_last = is_last
+
+    def __repr__(self) -> str:
+        return f"Stage({self.name}, model={self.model})"
+
+
+def cascade_stages() -> List[Stage]:
+    """Stages to run in order; a single full stage (default model) when the cascade is off."""
+    if not is_cascade_enabled():
+        return [Stage("full", None, True)]
+    return [
+        Stage("lite", os.getenv("AI_CASCADE_LITE_MODEL") or None, False),
+        Stage("full", os.getenv("AI_CASCADE_STRONG_MODEL") or None, True),
+    ]
+
+
+class CascadeStats:
+    """Thread-safe per-kind (html / api) counters of stage outcomes."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._runs: Dict[str, Counter] = {}
+        self._reasons: Dict[str, Counter] = {}
+
+    def record(self, kind: str, stage: str, outcome: str, reasons: Optional[List[str]] = None) -> None:
+        with self._lock:
+            self._runs.setdefault(kind, Counter())[f"{stage}_{outcome}"] += 1
+            if reasons:
+                self._reasons.setdefault(kind, Counter()).update(reasons)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            result: Dict[str, Any] = {}
+            for kind, runs in self._runs.items():
+                lite = runs["lite_accepted"] + runs["lite_escalated"]
+                result[kind] = {
+                    **dict(runs),
+                    "lite_escalation_rate": round(runs["lite_escalated"] / lite, 3) if lite else 0.0,
+                    "full_defective_rate": round(
+                        runs["full_defective"] / (runs["full_accepted"] + runs["full_defective"]), 3
+                    ) if runs["full_accepted"] + runs["full_defective"] else 0.0,
+                    "escalation_reasons": dict(self._reasons.get(kind, Counter()).most_common()),
+                }
+            return result
+
+
+_stats = CascadeStats()
+
+
+def needs_escalation(kind: str, stage: Stage, result: Optional[Mapping[str, Any]],
+                     error: Optional[BaseException] = None) -> List[str]:
+    """
+    Failed checks of a stage result ([] = accept) and record the outcome.
+    A lite-stage error escalates with reason "error"; the last stage never escalates
+    but its remaining defects are counted.
+    """
+    if error is not None or result is None:
+        reasons = ["error"]
+    elif result.get("_ai_failed"):
+        reasons = ["ai_failed"]
+    else:
+        reasons = find_defects(result, escalation_checks())
+    if stage.is_last:
+        _stats.record(kind, stage.name, "defective" if reasons else "accepted")
+        return []
+    _stats.record(kind, stage.name, "escalated" if reasons else "accepted", reasons)
+    return reasons
+
+
+def get_cascade_stats() -> Dict[str, Any]:
+    """Per-kind stage counters, escalation rates and failing checks."""
+    return _stats.snapshot()
@@ -0,0 +1,124 @@
+"""
+Campaign data quality checks shared by the data-quality autofixer and the
+AI model cascade.
+
+The same rules decide whether a stored campaign needs repair
+(data_quality_autofix.py) and whether a cheap first-pass AI result is good
+enough or must be escalated (model_cascade.py).
+
+Usage:
+    from src.services.quality_checks import find_defects, campaign_fields, CHECK_REASONS
+
+    find_defects(ai_result, checks=("reward_value", "cards", "participation"))
+    [CHECK_REASONS[c] for c in find_defects(campaign_fields(campaign))]
+"""
+import re
+from typing import Any, Iterable, List, Mapping
+
+CORRUPTED_REGEX = re.compile(r'([a-zA-ZçğıüşöÇĞİÜŞÖ0-9], ){2,}')
+GENERIC_PARTICIPATION = "Mobil uygulama üzerinden veya banka kanallarından kampanya detaylarındaki talimatları izleyerek katılabilirsiniz."
+USELESS_PARTICIPATIONS = [
+    GENERIC_PARTICIPATION,
+    "Hemen faydalanabilirsiniz.",
+    "Hemen faydalanabilirsiniz",
+    "Kampanya dahilinde.",
+    "Detayları İnceleyin",
+    "Detayları inceleyin",
+    "Hemen faydalanmaya başlayın.",
+    "Axess Mobil uygulama üzerinden katılabilirsiniz.",
+    "Harcamadan önce mobil uygulama üzerinden katılın.",
+    "Harcamadan önce Mobilden katılın.",
+    "Juzdan uygulama üzerinden katılabilirsiniz.",
+    "Juzdan üzerinden katılabilirsiniz.",
+    "Mobil Şube üzerinden Kampanyaya Katıl butonuna tıklayın",
+    "Kampanyaya katılmak için Mobil Şube üzerinden Kampanyaya Katıl butonuna tıklamanız yeterlidir."
+]
+GENERIC_REWARD_TEXTS = ("Detayları İnceleyin", "Hemen Faydalanın")
+GENERIC_CARDS = "Kampanyaya Dahil Kartlar"
+
+# check name → reason reported by the autofixer (in scan order)
+CHECK_REASONS = {
+    "corruption": "Character-level Corruption",
+    "description": "Missing/Short Description",
+    "reward_text": "Missing/Default Reward Text",
+    "reward_value": "Missing Reward Value",
+    "reward_type": "Missing Reward Type",
+    "cards": "Missing/Corrupted/Generic Eligible Cards",
+    "start_date": "Missing Start Date",
+    "end_date": "Missing End Date",
+    "conditions": "Missing/Corrupted Conditions",
+    "participation": "Missing/Generic Participation Text",
+    "marketing": "Missing Marketing Summary",
+}
+ALL_CHECKS = tuple(CHECK_REASONS)
+
+
+def _text(value: Any, separator: str = ", ") -> str:
+    """Field value as text (AI results hold lists where the DB holds joined strings)."""
+    if value is None:
+        return ""
+    if isinstance(value, (list, tuple)):
+        return separator.join(str(v) for v in value if v)
+    return str(value)
+
+
+def is_generic_participation(participation: Any) -> bool:
+    text = _text(participation, " ")
+    return not text.strip() or any(p in text for p in USELESS_PARTICIPATIONS)
+
+
+def find_defects(fields: Mapping[str, Any], checks: Iterable[str] = ALL_CHECKS) -> List[str]:
+    """
+    Names of the failed checks for a campaign-shaped mapping (AI result or
+    campaign_fields(row)): description, reward_*, cards, dates, conditions,
+    participation, ai_marketing_text.
+    """
+    description = _text(fields.get("description"))
+    conditions = _text(fields.get("conditions"), "\n")
+    cards = _text(fields.get("cards"))
+    marketing = _text(fields.get("ai_marketing_text"))
+    reward_text = _text(fields.get("reward_text"))
+
+    failed: List[str] = []
+    for check in checks:
+        if check == "corruption":
+            bad = any(v and CORRUPTED_REGEX.search(v) for v in (description, conditions, cards, marketing))
+        elif check == "description":
+            bad = len(description.strip()) < 15
+        elif check == "reward_text":
+            bad = not reward_text.strip() or any(g in reward_text for g in GENERIC_REWARD_TEXTS)
+        elif check == "reward_value":
+            bad = fields.get("reward_value") is None
+        elif check == "reward_type":
+            bad = not _text(fields.get("reward_type")).strip()
+        elif check == "cards":
+            bad = not cards.strip() or GENERIC_CARDS in cards or bool(CORRUPTED_REGEX.search(cards))
+        elif check in ("start_date", "end_date"):
+            bad = not fields.get(check)
+        elif check == "conditions":
+            bad = not conditions.strip() or bool(CORRUPTED_REGEX.search(conditions))
+        elif check == "participation":
+            bad = is_generic_participation(fields.get("participation"))
+        elif check == "marketing":
+            bad = len(marketing.strip()) < 10
+        else:
+            raise ValueError(f"Unknown quality check: {check}")
+        if bad:
+            failed.append(check)
+    return failed
+
+
+def campaign_fields(c: Any) -> dict:
+    """Checkable fields of a Campaign row."""
+    return {
+        "description": c.description,
+        "reward_text": c.reward_text,
+        "reward_value": c.reward_value,
+        "reward_type": c.reward_type,
+        "cards": c.eligible_cards,
+        "start_date": c.start_date,
+        "end_date": c.end_date,
+        "conditions": c.conditions,
+        "participation": c.participation,
+        "ai_marketing_text": c.ai_marketing_text,
+    }
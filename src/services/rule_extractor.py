@@ -0,0 +1,506 @@
+"""
+Deterministic fast-path extractor that runs before the AI parser.
+
+Compiled rules (ported and generalised from final/VAKIFBANK/vakifparalel.py:
+extract_dates, extract_financials, get_category, extract_cards) pull the fields
+that can be found reliably without a model: Turkish date ranges, "X TL'ye
+varan puan", "%N indirim", "N taksit", SMS keyword + short number, app
+participation, cards, sector and well-known brands. Every field gets a
+confidence in [0, 1].
+
+AIParser uses the result to
+  - skip Gemini entirely when every required field is confident, or
+  - lock the confident fields and ask Gemini only for the rest.
+
+Settings (env):
+    AI_RULE_FASTPATH        "1" (default) to enable, "0" to disable
+    AI_RULE_MIN_CONFIDENCE  confidence needed to trust a field (default 0.8)
+
+Usage:
+    from src.services.rule_extractor import extract_fields
+
+    rules = extract_fields(text, title="Market'te 300 TL'ye varan puan", bank_name="Akbank")
+    rules.confident()          # {"reward_text": "300 TL'ye Varan Puan", ...}
+    rules.missing(("start_date", "end_date"))
+"""
+import os
+import re
+import threading
+from collections import Counter
+from datetime import datetime, date
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_MIN_CONFIDENCE = 0.8
+
+# Fields parse_api_campaign must have before the AI call can be skipped
+API_REQUIRED_FIELDS = (
+    "reward_text", "reward_value", "reward_type",
+    "start_date", "end_date", "participation", "cards", "sector",
+)
+
+
+def tr_lower(text: str) -> str:
+    return text.replace('I', 'ı').replace('İ', 'i').lower()
+
+
+def is_fast_path_enabled() -> bool:
+    return os.getenv("AI_RULE_FASTPATH", "1").strip().lower() not in ("0", "false", "no", "off")
+
+
+def min_confidence() -> float:
+    return float(os.getenv("AI_RULE_MIN_CONFIDENCE", str(DEFAULT_MIN_CONFIDENCE)))
+
+
+# ─── Compiled rules ──────────────────────────────────────────────────────────
+_MONTHS = {'ocak': 1, 'şubat': 2, 'mart': 3, 'nisan': 4, 'mayıs': 5, 'haziran': 6,
+           'temmuz': 7, 'ağustos': 8, 'eylül': 9, 'ekim': 10, 'kasım': 11, 'aralık': 12}
+_MONTH = r"(ocak|şubat|mart|nisan|mayıs|haziran|temmuz|ağustos|eylül|ekim|kasım|aralık)[a-zçğıöşü'’]*"
+_SEP = r"\s*(?:-|–|ile|ve)\s*"
+_NUM = r"(\d{1,3}(?:\.\d{3})+|\d+)(?:,\d+)?"
+
+_RE_NUMERIC_RANGE = re.compile(r"(\d{1,2})[./](\d{1,2})[./](\d{4})" + _SEP + r"(\d{1,2})[./](\d{1,2})[./](\d{4})")
+_RE_DAY_RANGE = re.compile(r"\b(\d{1,2})" + _SEP + r"(\d{1,2})\s+" + _MONTH + r"(?:\s+(\d{4}))?")
+_RE_MONTH_RANGE = re.compile(r"\b(\d{1,2})\s+" + _MONTH + r"(?:\s+(\d{4}))?" + _SEP + r"(\d{1,2})\s+" + _MONTH + r"(?:\s+(\d{4}))?")
+_RE_UNTIL = re.compile(r"\b(\d{1,2})\s+" + _MONTH + r"\s+(\d{4})[a-zçğıöşü'’]*\s+(?:tarihine\s+)?kadar")
+_RE_UNTIL_NUMERIC = re.compile(r"(\d{1,2})[./](\d{1,2})[./](\d{4})[a-zçğıöşü'’]*\s+(?:tarihine\s+)?kadar")
+
+_UNITS = [
+    ("worldpuan", "Worldpuan", "puan"), ("maxipuan", "MaxiPuan", "puan"), ("chip-?para", "chip-para", "puan"),
+    ("parafpara", "ParafPara", "puan"), ("bonus", "Bonus", "puan"), ("puan", "Puan", "puan"),
+    ("mil", "Mil", "mil"), ("nakit iade", "Nakit İade", "indirim"), ("iade", "İade", "indirim"),
+    ("indirim", "İndirim", "indirim"),
+]
+_UNIT = "(" + "|".join(u for u, _, _ in _UNITS) + ")"
+_RE_UP_TO = re.compile(_NUM + r"\s*tl[a-zçğıöşü'’]*\s+(?:a\s+)?varan\s+(?:(?:ek|toplam|toplamda)\s+)?" + _UNIT)
+_RE_FIXED = re.compile(_NUM + r"\s*tl\s+(?:değerinde\s+)?" + _UNIT + r"\b")
+_RE_PERCENT = re.compile(r"%\s*(\d{1,2})\s*(?:[a-zçğıöşü'’]*\s+)?(?:varan\s+)?" + _UNIT)
+_RE_PERCENT_MAX = re.compile(r"(?:en fazla|maksimum|max\.?|toplamda|toplam)\s*" + _NUM + r"\s*tl")
+_RE_INSTALLMENT = re.compile(r"(\+\s*|ek\s+)?(\d{1,2})\s*(?:aya\s+varan\s+)?(?:ek\s+)?taksit")
+_RE_MIN_SPEND = [
+    re.compile(r"(?:her|tek seferde|tek seferlik)\s+" + _NUM + r"\s*tl"),
+    re.compile(_NUM + r"\s*tl\s*(?:ve\s+)?(?:üzeri|üstü)"),
+    re.compile(_NUM + r"\s*tl['’]?(?:lik|lık)\s+(?:ve\s+üzeri\s+)?harcama"),
+]
+_LEGAL_LINE = re.compile(r"yasal mevzuat|azami taksit|taksit uygulanamaz|taksit sayısı", re.IGNORECASE)
+
+_RE_SMS = re.compile(
+    r"[\"“'‘]?\b([A-ZÇĞİÖŞÜ0-9]{2,20}(?:\s+[A-ZÇĞİÖŞÜ0-9]{2,20})?)\b[\"”'’]?\s+(?:yazıp|yazarak|yazıp,?)\s+"
+    r"(?:boşluk bırak[a-zıp]*\s+)?(\d{4})(['’][a-zçğıöşü]+)?\s+(?:numaralı\s+)?(?:hatta\s+|numaraya\s+)?(?i:sms|mesaj|kısa mesaj)"
+)
+_KNOWN_SHORT_NUMBERS = {"4454", "3404", "2273", "4757", "4455", "4663", "5800", "3340", "4402", "7979"}
+_APPS = [
+    ("jüzdan", "Jüzdan"), ("juzdan", "Jüzdan"), ("bonusflaş", "BonusFlaş"), ("bonus flaş", "BonusFlaş"),
+    ("maximum mobil", "Maximum Mobil"), ("world mobil", "World Mobil"), ("paraf mobil", "Paraf Mobil"),
+    ("vakıfbank mobil", "VakıfBank Mobil"), ("cepte kazan", "Cepte Kazan"), ("halkbank mobil", "Halkbank Mobil"),
+    ("ziraat mobil", "Ziraat Mobil"), ("qnb mobil", "QNB Mobil"), ("enpara", "Enpara.com Cep Şubesi"),
+]
+_RE_AUTO = re.compile(r"katılım gerektirmez|otomatik olarak (?:dahil|katıl)|ayrıca (?:bir )?katılım|kayıt (?:olmanıza )?gerek (?:yok|bulunmamaktadır)")
+
+_CARDS = [
+    (r"\baxess\b", "Axess"), (r"\bwings\b", "Wings"), (r"\bbonus (?:kart|card|platinum)", "Bonus"),
+    (r"\bmiles&smiles\b|\bmiles & smiles\b", "Miles&Smiles"), (r"\bshop&fly\b", "Shop&Fly"),
+    (r"\bmoney bonus\b", "Money Bonus"), (r"\bmaximiles\b", "Maximiles"),
+    (r"\bmaximum\b(?!\s*mobil)", "Maximum"), (r"\bworld\b(?!\s*mobil)", "World"), (r"\bplay\b", "Play"),
+    (r"\bcrystal\b", "Crystal"), (r"\badios\b", "Adios"), (r"\bparaf\b(?!\s*mobil)", "Paraf"),
+    (r"\bbankkart\b", "Bankkart"), (r"\bworldcard\b", "VakıfBank Worldcard"), (r"\bbankomat\b", "Bankomat Kart"),
+    (r"\bsağlam kart\b", "Sağlam Kart"), (r"\bticari\b|\bbusiness\b", "Ticari Kartlar"),
+]
+_RE_CARDS = [(re.compile(p), name) for p, name in _CARDS]
+_RE_CARD_EXCLUDED = re.compile(r"hariç|dahil değil|geçerli değil|kapsam dışı|yararlanamaz")
+# "kart" + any suffix ending in the instrumental -la/-le: kartla, kartınızla, kartlarınızla, kartlarıyla ...
+_RE_CARD_CONTEXT = re.compile(r"dahil|geçerli|ile yapılan|sahipleri|kart\w*l[ae]\b")
+
+# Sector names as listed in the API prompt's VALID SECTORS (keywords are regex fragments)
+_SECTOR_KEYWORDS = {
+    "Market & Gıda": ["market", "migros", "carrefour", "a101", "bim", "şok", "macrocenter", "gıda", "getir"],
+    "Akaryakıt": ["akaryakıt", "benzin", "opet", "shell", "petrol ofisi", "aytemiz", "totalenergies"],
+    "Giyim & Aksesuar": ["giyim", "moda", "lc waikiki", "defacto", "koton", "boyner", "ayakkabı", "aksesuar"],
+    "Restoran & Kafe": ["restoran", "kafe", "cafe", "yemeksepeti", "starbucks", "burger", "pizza"],
+    "Elektronik": ["elektronik", "teknoloji", "mediamarkt", "teknosa", "vatan bilgisayar", "beyaz eşya"],
+    "Mobilya & Dekorasyon": ["mobilya", "dekorasyon", "ikea", "koçtaş", "bauhaus", "yapı market", "english home"],
+    "Kozmetik & Sağlık": ["kozmetik", "gratis", "watsons", "sephora", "eczane", "hastane", "rossmann"],
+    "E-Ticaret": ["trendyol", "hepsiburada", "amazon", "n11", "pazarama", "çiçeksepeti", "online alışveriş"],
+    "Ulaşım": ["ulaşım", "taksi(?!t)", "bitaksi", "otopark", "hgs", "ogs", "toplu taşıma"],
+    "Dijital Platform": ["netflix", "spotify", "youtube", "disney", "steam", "playstation", "dijital platform"],
+    "Kültür & Sanat": ["sinema", "tiyatro", "konser", "biletix", "passo", "müze"],
+    "Eğitim": ["eğitim", "okul", "kurs", "üniversite"],
+    "Sigorta": ["sigorta", "kasko"],
+    "Otomotiv": ["otomotiv", "lastik", "oto servis"],
+    "Vergi & Kamu": ["vergi", "mtv", "sgk", "belediye"],
+    "Turizm & Konaklama": ["otel", "tatil", "uçak bileti", "thy", "pegasus", "seyahat", "turizm", "jolly", "etstur"],
+    "Kuyum, Optik ve Saat": ["kuyum", "mücevher", "optik", "saat mağaza", "kol saati"],
+}
+_RE_SECTORS = {
+    sector: re.compile(r"\b(?:" + "|".join(keywords) + r")")
+    for sector, keywords in _SECTOR_KEYWORDS.items()
+}
+
+_BRANDS = {
+    "migros": "Migros", "carrefoursa": "CarrefourSA", "a101": "A101", "opet": "Opet", "shell": "Shell",
+    "petrol ofisi": "Petrol Ofisi", "lc waikiki": "LC Waikiki", "defacto": "DeFacto", "koton": "Koton",
+    "boyner": "Boyner", "yemeksepeti": "Yemeksepeti", "starbucks": "Starbucks", "mediamarkt": "MediaMarkt",
+    "teknosa": "Teknosa", "ikea": "IKEA", "koçtaş": "Koçtaş", "gratis": "Gratis", "watsons": "Watsons",
+    "trendyol": "Trendyol", "hepsiburada": "Hepsiburada", "amazon": "Amazon", "n11": "n11",
+    "pazarama": "Pazarama", "çiçeksepeti": "Çiçeksepeti", "netflix": "Netflix", "spotify": "Spotify",
+    "thy": "THY", "pegasus": "Pegasus", "getir": "Getir", "biletix": "Biletix", "passo": "Passo",
+}
+_RE_BRANDS = [(re.compile(r"\b" + re.escape(k) + r"\b"), v) for k, v in _BRANDS.items()]
+
+_RE_CONDITION = re.compile(r"harcama|minimum|maksimum|en az|en fazla|üzeri|sınır|iade|iptal|birleştirilemez|taksitli", re.IGNORECASE)
+
+
+# ─── Helpers ─────────────────────────────────────────────────────────────────
+def _to_number(text: str) -> float:
+    return float(text.replace(".", "").replace(",", "."))
+
+
+def format_amount(value: float) -> str:
+    """1500 → '1.500' (Turkish thousands separator)."""
+    if value == int(value):
+        return f"{int(value):,}".replace(",", ".")
+    return f"{value:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+def _safe_date(year: int, month: int, day: int) -> Optional[date]:
+    try:
+        return date(year, month, day)
+    except ValueError:
+        return None
+
+
+def _infer_year(month: int, today: date) -> int:
+    """Same rule the prompt gives Gemini: an earlier month means next year."""
+    return today.year + 1 if month < today.month else today.year
+
+
+def _dative_suffix(number: str) -> str:
+    """Turkish dative suffix for a short number as it is read aloud ('4454' → "'e", '2273' → "'e")."""
+    digits = number.lstrip("0") or "0"
+    ones = {"1": "e", "2": "ye", "3": "e", "4": "e", "5": "e", "6": "ya", "7": "ye", "8": "e", "9": "a"}
+    tens = {"1": "a", "2": "ye", "3": "a", "4": "a", "5": "ye", "6": "a", "7": "e", "8": "e", "9": "a"}
+    if digits[-1] != "0":
+        return "'" + ones[digits[-1]]
+    if len(digits) >= 2 and digits[-2] != "0":
+        return "'" + tens[digits[-2]]
+    if len(digits) >= 3 and digits[-3] != "0":
+        return "'e"  # yüz'e
+    return "'e"  # bin'e
+
+
+class RuleExtraction:
+    """Field values found by the rules plus a confidence per field."""
+
+    __slots__ = ("fields", "confidence")
+
+    def __init__(self):
+        self.fields: Dict[str, Any] = {}
+        self.confidence: Dict[str, float] = {}
+
+    def set(self, names: Iterable[str], values: Iterable[Any], confidence: float) -> None:
+        for name, value in zip(names, values):
+            self.fields[name] = value
+            self.confidence[name] = round(confidence, 2)
+
+    def confident(self, threshold: Optional[float] = None) -> Dict[str, Any]:
+        threshold = min_confidence() if threshold is None else threshold
+        return {k: v for k, v in self.fields.items() if self.confidence.get(k, 0.0) >= threshold}
+
+    def missing(self, required: Iterable[str], threshold: Optional[float] = None) -> List[str]:
+        confident = self.confident(threshold)
+        return [f for f in required if f not in confident]
+
+    def __repr__(self) -> str:
+        return f"RuleExtraction({ {k: (v, self.confidence[k]) for k, v in self.fields.items()} })"
+
+
+# ─── Field extractors ────────────────────────────────────────────────────────
+def extract_dates(text: str, today: Optional[date] = None) -> Tuple[Optional[str], Optional[str], float]:
+    """(start, end, confidence) from Turkish date ranges; ISO YYYY-MM-DD."""
+    today = today or datetime.now().date()
+    t = tr_lower(text)
+    ranges: List[Tuple[Optional[date], Optional[date], float, int]] = []
+
+    for m in _RE_NUMERIC_RANGE.finditer(t):
+        d1, m1, y1, d2, m2, y2 = map(int, m.groups())
+        ranges.append((_safe_date(y1, m1, d1), _safe_date(y2, m2, d2), 0.95, m.start()))
+    for m in _RE_MONTH_RANGE.finditer(t):
+        d1, a1, y1, d2, a2, y2 = m.groups()
+        year2 = int(y2) if y2 else _infer_year(_MONTHS[a2], today)
+        year1 = int(y1) if y1 else (year2 if _MONTHS[a1] <= _MONTHS[a2] else year2 - 1)
+        ranges.append((_safe_date(year1, _MONTHS[a1], int(d1)), _safe_date(year2, _MONTHS[a2], int(d2)),
+                       0.9 if y2 else 0.65, m.start()))
+    for m in _RE_DAY_RANGE.finditer(t):
+        d1, d2, month, year = m.groups()
+        y = int(year) if year else _infer_year(_MONTHS[month], today)
+        ranges.append((_safe_date(y, _MONTHS[month], int(d1)), _safe_date(y, _MONTHS[month], int(d2)),
+                       0.9 if year else 0.65, m.start()))
+    if not ranges:
+        for m in _RE_UNTIL.finditer(t):
+            d, month, year = m.groups()
+            ranges.append((None, _safe_date(int(year), _MONTHS[month], int(d)), 0.85, m.start()))
+        for m in _RE_UNTIL_NUMERIC.finditer(t):
+            d, mo, y = map(int, m.groups())
+            ranges.append((None, _safe_date(y, mo, d), 0.85, m.start()))
+
+    ranges = [r for r in ranges if r[1] is not None and (r[0] is None or r[0] <= r[1])]
+    if not ranges:
+        return None, None, 0.0
+    distinct = {(r[0], r[1]) for r in ranges}
+    start, end, confidence, _ = sorted(ranges, key=lambda r: (-r[2], r[3]))[0]
+    if len(distinct) > 1:
+        confidence *= 0.6  # several ranges (e.g. spend period vs. reward loading date)
+    if (today - end).days > 31:
+        confidence *= 0.5  # most likely a stale/unrelated date
+    return (start.isoformat() if start else None), end.isoformat(), confidence
+
+
+def extract_reward(text: str, title: str = "") -> Tuple[Optional[str], Optional[float], Optional[str], float]:
+    """(reward_text, reward_value, reward_type, confidence). Title matches win over body matches."""
+    for source, base_conf in ((title, 0.9), (text, 0.8)):
+        if not source:
+            continue
+        t = tr_lower(source.replace("’", "'"))
+        candidates: List[Tuple[str, float, str]] = []
+
+        for m in _RE_UP_TO.finditer(t):
+            label, rtype = _unit(m.group(2))
+            value = _to_number(m.group(1))
+            candidates.append((f"{format_amount(value)} TL'ye Varan {label}", value, rtype))
+        for m in _RE_FIXED.finditer(t):
+            label, rtype = _unit(m.group(2))
+            value = _to_number(m.group(1))
+            candidates.append((f"{format_amount(value)} TL {label}", value, rtype))
+        for m in _RE_PERCENT.finditer(t):
+            label, rtype = _unit(m.group(2))
+            value = float(m.group(1))
+            cap = _RE_PERCENT_MAX.search(t, m.end())
+            reward = f"%{int(value)} (max {format_amount(_to_number(cap.group(1)))} TL)" if cap else f"%{int(value)} {label}"
+            candidates.append((reward, value, rtype))
+        if not candidates:
+            for line in t.split("\n"):
+                if _LEGAL_LINE.search(line):
+                    continue
+                for m in _RE_INSTALLMENT.finditer(line):
+                    n = int(m.group(2))
+                    if 2 <= n <= 36:
+                        candidates.append((f"+{n} Taksit" if m.group(1) else f"{n} Taksit", float(n), "taksit"))
+
+        if candidates:
+            distinct = {c[0] for c in candidates}
+            reward_text, value, rtype = max(candidates, key=lambda c: c[1]) if len(distinct) > 1 else candidates[0]
+            confidence = base_conf if len(distinct) == 1 else base_conf * 0.65
+            return reward_text, value, rtype, confidence
+    return None, None, None, 0.0
+
+
+def _unit(word: str) -> Tuple[str, str]:
+    for pattern, label, rtype in _UNITS:
+        if re.fullmatch(pattern, word):
+            return label, rtype
+    return word.title(), "puan"
+
+
+def extract_min_spend(text: str) -> Tuple[Optional[int], float]:
+    t = tr_lower(text)
+    values = {int(_to_number(m.group(1))) for rx in _RE_MIN_SPEND for m in rx.finditer(t)}
+    if not values:
+        return None, 0.0
+    if len(values) == 1:
+        return values.pop(), 0.8
+    return min(values), 0.5
+
+
+def extract_participation(text: str) -> Tuple[Optional[str], float]:
+    t = tr_lower(text)
+    parts: List[str] = []
+    confidence = 0.0
+
+    sms = _RE_SMS.search(text)
+    if sms:
+        keyword, number, suffix = sms.group(1), sms.group(2), sms.group(3)
+        suffix = suffix.replace("’", "'") if suffix else _dative_suffix(number)
+        parts.append(f"{keyword} yazıp {number}{suffix} SMS gönderin")
+        confidence = 0.95 if number in _KNOWN_SHORT_NUMBERS else 0.9
+
+    apps = [label for key, label in _APPS if key in t]
+    if apps and "katıl" in t:
+        app = apps[0]
+        if parts:
+            parts.insert(0, f"{app}'den Katıl butonuna tıklayın veya")
+        else:
+            parts.append(f"{app} uygulamasından Katıl butonuna tıklayın")
+            confidence = 0.8
+
+    if parts:
+        return " ".join(parts), confidence
+    if _RE_AUTO.search(t):
+        return "Otomatik katılım", 0.85
+    return None, 0.0
+
+
+def excludes_cards(line: str) -> bool:
+    """True if a (lowercased) line excludes the cards it names ("... hariç", "geçerli değil")."""
+    return bool(_RE_CARD_EXCLUDED.search(line))
+
+
+def extract_cards(text: str) -> Tuple[List[str], float]:
+    """
+    Card names from lines that do not exclude them; high confidence only in an eligibility context.
+
+    >>> extract_cards("Axess kartlarınızla yapacağınız harcamalara puan")
+    (['Axess'], 0.85)
+    >>> extract_cards("Axess kartlar")
+    (['Axess'], 0.6)
+    """
+    found: List[str] = []
+    in_context = False
+    for line in tr_lower(text).split("\n"):
+        if excludes_cards(line):
+            continue
+        hits = [name for rx, name in _RE_CARDS if rx.search(line)]
+        if hits and _RE_CARD_CONTEXT.search(line):
+            in_context = True
+        for name in hits:
+            if name not in found:
+                found.append(name)
+    if not found:
+        return [], 0.0
+    return found, 0.85 if in_context else 0.6
+
+
+def get_category(text: str, title: str = "") -> Tuple[str, float]:
+    """Best matching API sector name; title hits weigh double."""
+    t_title, t_text = tr_lower(title), tr_lower(text)
+    scores: Counter = Counter()
+    title_hit = set()
+    for sector, rx in _RE_SECTORS.items():
+        n_title = len(rx.findall(t_title))
+        scores[sector] += 2 * n_title + len(rx.findall(t_text))
+        if n_title:
+            title_hit.add(sector)
+    ranked = [s for s in scores.most_common(2) if s[1] > 0]
+    if not ranked:
+        return "Diğer", 0.3
+    best, best_score = ranked[0]
+    clear = len(ranked) == 1 or best_score >= 2 * ranked[1][1]
+    if best in title_hit and clear:
+        return best, 0.85
+    return best, 0.7 if clear else 0.45
+
+
+def extract_brands(text: str, title: str = "") -> Tuple[List[str], float]:
+    t = tr_lower(f"{title}\n{text}")
+    brands = [name for rx, name in _RE_BRANDS if rx.search(t)]
+    return brands, (0.85 if brands else 0.0)
+
+
+def extract_conditions(text: str, limit: int = 5) -> List[str]:
+    """Short condition lines (spend limits, exclusions) for the AI-free result."""
+    conditions = []
+    for line in text.split("\n"):
+        line = line.strip(" -•*\t")
+        low = tr_lower(line)
+        if not (20 <= len(line) <= 220) or not _RE_CONDITION.search(line) or _LEGAL_LINE.search(line):
+            continue
+        if any(rx.search(low) for rx, _ in _RE_CARDS) or _RE_SMS.search(line):
+            continue
+        conditions.append(line)
+        if len(conditions) >= limit:
+            break
+    return conditions
+
+
+# ─── Engine ──────────────────────────────────────────────────────────────────
+def extract_fields(text: str, title: Optional[str] = None, bank_name: Optional[str] = None,
+                   today: Optional[date] = None) -> RuleExtraction:
+    """Run all rules over `text` (+ `title`) and return values with per-field confidence."""
+    title = title or ""
+    result = RuleExtraction()
+    full = f"{title}\n{text or ''}"
+
+    start, end, conf = extract_dates(full, today)
+    if end:
+        result.set(("end_date",), (end,), conf)
+        if start:
+            result.set(("start_date",), (start,), conf)
+        else:
+            # Only an end date: start defaults to today, exactly as the prompt tells Gemini
+            result.set(("start_date",), ((today or datetime.now().date()).isoformat(),), conf)
+
+    reward_text, value, rtype, conf = extract_reward(text or "", title)
+    if reward_text:
+        result.set(("reward_text", "reward_value", "reward_type"), (reward_text, value, rtype), conf)
+
+    min_spend, conf = extract_min_spend(full)
+    if min_spend is not None:
+        result.set(("min_spend",), (min_spend,), conf)
+
+    participation, conf = extract_participation(full)
+    if participation:
+        result.set(("participation",), (participation,), conf)
+
+    cards, conf = extract_cards(full)
+    if cards:
+        result.set(("cards",), (cards,), conf)
+
+    sector, conf = get_category(text or "", title)
+    result.set(("sector",), (sector,), conf)
+
+    brands, conf = extract_brands(text or "", title)
+    if brands:
+        result.set(("brands",), (brands,), conf)
+
+    _stats.record_fields(result)
+    return result
+
+
+class FastPathStats:
+    """How many AI calls the rules avoided (fully) or shrank (partial)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.extractions = 0
+        self.skipped = 0
+        self.partial = 0
+        self.full = 0
+        self.field_hits: Counter = Counter()
+
+    def record_fields(self, result: RuleExtraction) -> None:
+        threshold = min_confidence()
+        with self._lock:
+            self.extractions += 1
+            for name, conf in result.confidence.items():
+                if conf >= threshold:
+                    self.field_hits[name] += 1
+
+    def record_decision(self, skipped: bool, locked_fields: int) -> None:
+        with self._lock:
+            if skipped:
+                self.skipped += 1
+            elif locked_fields:
+                self.partial += 1
+            else:
+                self.full += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            decided = self.skipped + self.partial + self.full
+            return {
+                "extractions": self.extractions,
+                "ai_calls_avoided": self.skipped,
+                "ai_calls_partial": self.partial,
+                "ai_calls_full": self.full,
+                "avoided_pct": round(100.0 * self.skipped / decided, 1) if decided else 0.0,
+                "confident_field_hits": dict(self.field_hits),
+            }
+
+
+_stats = FastPathStats()
+
+
+def get_fast_path_stats() -> Dict[str, Any]:
+    return _stats.snapshot()
+
+
+def record_decision(skipped: bool, locked_fields: int = 0) -> None:
+    _stats.record_decision(skipped, locked_fields)
@@ -0,0 +1,481 @@
+"""
+Local sector classifier trained on the campaigns already stored in the DB.
+
+Sector assignment is one of the main reasons for AI calls and re-calls: the
+VALID SECTORS list is part of every prompt and data_quality_autofix re-parses
+campaigns only because their sector is missing or "diger". The DB holds
+thousands of labelled examples (Campaign.clean_text + Sector.slug), so a small
+CPU-only text classifier can settle most of these cases without Gemini:
+
+  - features: word unigrams + bigrams (Turkish lowercasing, title counted twice),
+    sublinear TF-IDF, L2 normalised
+  - model: Complement Naive Bayes, a linear model that stays accurate on the
+    skewed sector distribution (market / e-ticaret dominate)
+  - confidence: softmax over the class scores with a temperature fitted on a
+    held-out split (every 5th campaign), so 0.9 means ~90% of such predictions
+    were right on unseen campaigns
+  - persistence: gzipped JSON (vocabulary, idf, weights, temperature, metrics)
+    in a local file, and in the ai_models table of DATABASE_URL so the scraper
+    workflows use the model the autofix workflow trained
+
+Predictions below AI_SECTOR_MIN_CONFIDENCE are ignored and the AI decides as before.
+
+Settings (env):
+    AI_SECTOR_CLASSIFIER       true/false (default: true; inactive until a model is trained)
+    AI_SECTOR_MODEL_PATH       model file (default .cache/sector_model.json.gz)
+    AI_SECTOR_MODEL_STORE      auto | postgres | off (default auto: ai_models table when DATABASE_URL is set)
+    AI_SECTOR_MIN_CONFIDENCE   calibrated confidence needed to use a prediction (default 0.9)
+
+Usage:
+    from src.services.sector_classifier import get_sector_classifier
+
+    classifier = get_sector_classifier()
+    if classifier is not None:
+        slug = classifier.confident_slug(clean_text, title)          # "market-gida" or None
+        predictions = classifier.predict_batch([(text, title), ...])
+
+    # Train from the DB / inspect the held-out metrics
+    python -m src.services.sector_classifier --train
+    python -m src.services.sector_classifier --stats
+"""
+import os
+import re
+import gzip
+import base64
+import json
+import math
+import time
+import threading
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .rule_extractor import tr_lower # type: ignore
+from .extraction_schema import HTML_SECTOR_SLUGS # type: ignore
+from src.utils.sql_store import fetch_newer_model_payload, model_store, publish_model_payload # type: ignore
+
+MODEL_VERSION = 1
+MAX_FEATURES = 20000
+MIN_DF = 2
+MIN_CLASS_SAMPLES = 5
+MAX_TEXT_CHARS = 4000
+SMOOTHING = 1.0
+HOLDOUT_EVERY = 5
+
+_TOKEN = re.compile(r"[^\W\d_]{2,}", re.UNICODE)
+
+# Sectors the classifier may predict ("diger" is what it is meant to replace)
+TRAINABLE_SLUGS = [s for s in HTML_SECTOR_SLUGS if s != "diger"]
+
+
+def is_classifier_enabled() -> bool:
+    return os.getenv("AI_SECTOR_CLASSIFIER", "true").lower() == "true"
+
+
+def min_confidence() -> float:
+    return float(os.getenv("AI_SECTOR_MIN_CONFIDENCE", "0.9"))
+
+
+def features(text: str, title: str = "") -> Counter:
+    """Unigram + bigram counts; the title is counted twice (it names the merchant / category)."""
+    counts: Counter = Counter()
+    for part, weight in ((title or "", 2), ((text or "")[:MAX_TEXT_CHARS], 1)):
+        words = _TOKEN.findall(tr_lower(part))
+        for word in words:
+            counts[word] += weight
+        for a, b in zip(words, words[1:]):
+            counts[f"{a} {b}"] += weight
+    return counts
+
+
+class SectorPrediction:
+    """Best sector slug with its calibrated confidence and the runner-up."""
+
+    __slots__ = ("slug", "confidence", "runner_up", "runner_up_confidence")
+
+    def __init__(self, slug: str, confidence: float, runner_up: Optional[str] = None,
+                 runner_up_confidence: float = 0.0):
+        self.slug = slug
+        self.confidence = confidence
+        self.runner_up = runner_up
+        self.runner_up_confidence = runner_up_confidence
+
+    def __repr__(self) -> str:
+        return f"SectorPrediction({self.slug!r}, {self.confidence:.3f})"
+
+
+class SectorClassifier:
+    """TF-IDF + Complement Naive Bayes with temperature-scaled confidence."""
+
+    def __init__(self, labels: List[str], vocab: List[str], idf: List[float], weights: List[List[float]],
+                 beta: float = 1.0, metrics: Optional[Dict[str, Any]] = None, trained_at: Optional[float] = None):
+        self.labels = labels
+        self.vocab = vocab
+        self.index = {term: i for i, term in enumerate(vocab)}
+        self.idf = idf
+        self.weights = weights      # per feature: one weight per label
+        self.beta = beta            # inverse softmax temperature
+        self.metrics = metrics or {}
+        self.trained_at = trained_at
+        self._lock = threading.Lock()
+        self._stats = {"predictions": 0, "confident": 0}
+
+    # ── Vectorising / scoring ───────────────────────────────────────────────
+    def vectorize(self, text: str, title: str = "") -> Dict[int, float]:
+        """Sparse sublinear TF-IDF vector, L2 normalised."""
+        return _vectorize_counts(self, features(text, title))
+
+    def _scores(self, vec: Dict[int, float]) -> List[float]:
+        scores = [0.0] * len(self.labels)
+        weights = self.weights
+        for i, value in vec.items():
+            row = weights[i]
+            for k in range(len(scores)):
+                scores[k] -= value * row[k]   # CNB: low complement likelihood = good fit
+        return scores
+
+    def _probabilities(self, scores: List[float]) -> List[float]:
+        return _softmax(scores, self.beta)
+
+    def predict_batch(self, docs: Sequence[Tuple[str, Optional[str]]]) -> List[Optional[SectorPrediction]]:
+        """Predictions for (text, title) pairs; None for texts without a known term."""
+        results: List[Optional[SectorPrediction]] = []
+        confident = 0
+        threshold = min_confidence()
+        for text, title in docs:
+            vec = self.vectorize(text or "", title or "")
+            if not vec:
+                results.append(None)
+                continue
+            probs = self._probabilities(self._scores(vec))
+            order = sorted(range(len(probs)), key=probs.__getitem__, reverse=True)
+            best = order[0]
+            second = order[1] if len(order) > 1 else None
+            prediction = SectorPrediction(
+                self.labels[best], probs[best],
+                self.labels[second] if second is not None else None,
+                probs[second] if second is not None else 0.0,
+            )
+            if prediction.confidence >= threshold:
+                confident += 1
+            results.append(prediction)
+        with self._lock:
+            self._stats["predictions"] += len(docs)
+            self._stats["confident"] += confident
+        return results
+
+    def predict(self, text: str, title: Optional[str] = None) -> Optional[SectorPrediction]:
+        return self.predict_batch([(text, title)])[0]
+
+    @staticmethod
+    def accept(prediction: Optional[SectorPrediction]) -> Optional[str]:
+        """Slug of a prediction that clears AI_SECTOR_MIN_CONFIDENCE, else None."""
+        if prediction is None or prediction.confidence < min_confidence():
+            return None
+        return prediction.slug
+
+    def confident_slug(self, text: str, title: Optional[str] = None) -> Optional[str]:
+        return self.accept(self.predict(text, title))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            result: Dict[str, Any] = dict(self._stats)
+        result["confident_rate"] = round(result["confident"] / result["predictions"], 3) if result["predictions"] else 0.0
+        result["labels"] = len(self.labels)
+        result["features"] = len(self.vocab)
+        result["heldout"] = {k: v for k, v in self.metrics.items() if k != "per_class"}
+        return result
+
+    # ── Persistence ─────────────────────────────────────────────────────────
+    def to_bytes(self) -> bytes:
+        """Gzipped JSON (vocabulary, idf, weights, temperature, metrics)."""
+        payload = {
+            "version": MODEL_VERSION,
+            "trained_at": self.trained_at,
+            "labels": self.labels,
+            "vocab": self.vocab,
+            "idf": [round(v, 5) for v in self.idf],
+            "weights": [[float(f"{w:.5g}") for w in row] for row in self.weights],
+            "beta": self.beta,
+            "metrics": self.metrics,
+        }
+        return gzip.compress(json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "SectorClassifier":
+        payload = json.loads(gzip.decompress(data).decode("utf-8"))
+        if payload.get("version") != MODEL_VERSION:
+            raise ValueError(f"unsupported sector model version {payload.get('version')}")
+        return cls(payload["labels"], payload["vocab"], payload["idf"], payload["weights"],
+                   payload.get("beta", 1.0), payload.get("metrics"), payload.get("trained_at"))
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(self.to_bytes())
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "SectorClassifier":
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
+
+
+# ─── Training ────────────────────────────────────────────────────────────────
+def _softmax(scores: List[float], beta: float) -> List[float]:
+    top = max(scores)
+    exps = [math.exp(beta * (s - top)) for s in scores]
+    total = sum(exps)
+    return [e / total for e in exps]
+
+
+def _fit(docs: List[Counter], labels: List[str]) -> SectorClassifier:
+    """Vocabulary, idf and CNB weights from feature counts (temperature is fitted separately)."""
+    classes = sorted(set(labels))
+    df: Counter = Counter()
+    for counts in docs:
+        df.update(counts.keys())
+    vocab = [t for t, n in df.most_common() if n >= MIN_DF][:MAX_FEATURES]
+    n_docs = len(docs)
+    idf = [math.log((1 + n_docs) / (1 + df[t])) + 1.0 for t in vocab]
+    model = SectorClassifier(classes, vocab, idf, [])
+
+    class_of = {c: k for k, c in enumerate(classes)}
+    per_class = [[0.0] * len(vocab) for _ in classes]
+    totals = [0.0] * len(vocab)
+    for counts, label in zip(docs, labels):
+        row = per_class[class_of[label]]
+        for i, value in _vectorize_counts(model, counts).items():
+            row[i] += value
+            totals[i] += value
+
+    # Complement NB: weights from the feature mass of all *other* classes, L1 normalised per class
+    columns = []
+    for k in range(len(classes)):
+        complement = [totals[i] - per_class[k][i] + SMOOTHING for i in range(len(vocab))]
+        mass = sum(complement)
+        logs = [math.log(v / mass) for v in complement]
+        norm = sum(abs(v) for v in logs) or 1.0
+        columns.append([v / norm for v in logs])
+    model.weights = [list(row) for row in zip(*columns)]
+    return model
+
+
+def _vectorize_counts(model: SectorClassifier, counts: Counter) -> Dict[int, float]:
+    vec: Dict[int, float] = {}
+    for term, count in counts.items():
+        i = model.index.get(term)
+        if i is not None:
+            vec[i] = (1.0 + math.log(count)) * model.idf[i]
+    norm = math.sqrt(sum(v * v for v in vec.values()))
+    return {i: v / norm for i, v in vec.items()} if norm > 0 else vec
+
+
+def _nll(scored: List[Tuple[List[float], int]], beta: float) -> float:
+    loss = 0.0
+    for scores, truth in scored:
+        p = _softmax(scores, beta)[truth]
+        loss -= math.log(max(p, 1e-12))
+    return loss / len(scored)
+
+
+def _fit_temperature(scored: List[Tuple[List[float], int]]) -> float:
+    """Inverse temperature minimising held-out log loss (convex in beta: ternary search)."""
+    if not scored:
+        return 1.0
+    hi = 1.0
+    while hi < 1e9 and _nll(scored, hi * 2) < _nll(scored, hi):
+        hi *= 2
+    lo, hi = 0.0, hi * 2
+    for _ in range(60):
+        m1, m2 = lo + (hi - lo) / 3, hi - (hi - lo) / 3
+        if _nll(scored, m1) <= _nll(scored, m2):
+            hi = m2
+        else:
+            lo = m1
+    return (lo + hi) / 2
+
+
+def _heldout_metrics(model: SectorClassifier, scored: List[Tuple[List[float], int]]) -> Dict[str, Any]:
+    threshold = min_confidence()
+    correct = covered = covered_correct = 0
+    bins: Dict[int, List[int]] = defaultdict(lambda: [0, 0])
+    for scores, truth in scored:
+        probs = _softmax(scores, model.beta)
+        best = max(range(len(probs)), key=probs.__getitem__)
+        hit = int(best == truth)
+        correct += hit
+        bucket = bins[min(int(probs[best] * 10), 9)]
+        bucket[0] += 1
+        bucket[1] += hit
+        if probs[best] >= threshold:
+            covered += 1
+            covered_correct += hit
+    n = len(scored)
+    ece = sum(abs(b[1] / b[0] - (k + 0.5) / 10) * b[0] for k, b in bins.items()) / n if n else 0.0
+    return {
+        "samples": n,
+        "accuracy": round(correct / n, 4) if n else 0.0,
+        "threshold": threshold,
+        "coverage_at_threshold": round(covered / n, 4) if n else 0.0,
+        "accuracy_at_threshold": round(covered_correct / covered, 4) if covered else 0.0,
+        "ece": round(ece, 4),
+    }
+
+
+def train(samples: Sequence[Tuple[str, str, str]]) -> SectorClassifier:
+    """
+    Train from (text, title, slug) samples. Every HOLDOUT_EVERY-th sample is held
+    out to fit the temperature and report metrics; the final model uses all samples.
+    """
+    by_class = Counter(slug for _, _, slug in samples)
+    kept = [s for s in samples if s[2] in TRAINABLE_SLUGS and by_class[s[2]] >= MIN_CLASS_SAMPLES]
+    if len(set(s[2] for s in kept)) < 2:
+        raise ValueError("not enough labelled campaigns to train a sector classifier")
+    docs = [features(text, title) for text, title, _ in kept]
+    labels = [slug for _, _, slug in kept]
+
+    train_idx = [i for i in range(len(kept)) if i % HOLDOUT_EVERY]
+    held_idx = [i for i in range(len(kept)) if not i % HOLDOUT_EVERY]
+    probe = _fit([docs[i] for i in train_idx], [labels[i] for i in train_idx])
+    class_of = {c: k for k, c in enumerate(probe.labels)}
+    scored = [(probe._scores(_vectorize_counts(probe, docs[i])), class_of[labels[i]])
+              for i in held_idx if labels[i] in class_of]
+    probe.beta = _fit_temperature(scored)
+    metrics = _heldout_metrics(probe, scored)
+
+    model = _fit(docs, labels)
+    model.beta = probe.beta
+    metrics["train_samples"] = len(kept)
+    metrics["per_class"] = dict(Counter(labels).most_common())
+    model.metrics = metrics
+    model.trained_at = time.time()
+    return model
+
+
+def load_training_data(limit: int = 50000) -> List[Tuple[str, str, str]]:
+    """(clean_text, title, sector slug) of stored campaigns with a real sector."""
+    from src.database import get_db_session # type: ignore
+    from src.models import Campaign, Sector # type: ignore
+
+    with get_db_session() as db:
+        rows = (
+            db.query(Campaign.clean_text, Campaign.title, Sector.slug)
+            .join(Sector, Sector.id == Campaign.sector_id)
+            .filter(Campaign.clean_text.isnot(None), Sector.slug != "diger")
+            .order_by(Campaign.id.desc())
+            .limit(limit)
+            .all()
+        )
+    return [(text, title or "", slug) for text, title, slug in rows if text and len(text.strip()) >= 50]
+
+
+def train_from_db(limit: int = 50000, path: Optional[str] = None) -> SectorClassifier:
+    global _classifier_instance, _classifier_loaded
+    samples = load_training_data(limit)
+    print(f"📚 Training sector classifier on {len(samples)} labelled campaigns...")
+    model = train(samples)
+    path = path or model_path()
+    model.save(path)
+    if publish_model(model):
+        print("✅ Sector model published to the ai_models table")
+    with _classifier_lock:
+        _classifier_instance, _classifier_loaded = model, True
+    print(f"✅ Sector model → {path}")
+    print(json.dumps(model.metrics, ensure_ascii=False, indent=1))
+    return model
+
+
+# ─── Shared model store ──────────────────────────────────────────────────────
+# GitHub Actions runners start empty, so the model file trained in one workflow is not
+# there for the scrapers. The trained model is also kept in DATABASE_URL and fetched
+# when it is newer than the local file (or there is none).
+_MODEL_NAME = "sector_classifier"
+
+
+def publish_model(model: SectorClassifier) -> bool:
+    """Upsert the model into ai_models; False when there is no shared store or it failed."""
+    try:
+        store = model_store("AI_SECTOR_MODEL_STORE")
+        if store is None:
+            return False
+        publish_model_payload(store, _MODEL_NAME, model.trained_at,
+                              base64.b64encode(model.to_bytes()).decode("ascii"))
+        return True
+    except Exception as e:
+        print(f"[WARN] Sector model could not be published to the DB: {e}")
+        return False
+
+
+def _fetch_newer(trained_at: Optional[float]) -> Optional[SectorClassifier]:
+    """The stored model if it is newer than trained_at, else None."""
+    try:
+        store = model_store("AI_SECTOR_MODEL_STORE")
+        if store is None:
+            return None
+        stored = fetch_newer_model_payload(store, _MODEL_NAME, trained_at)
+        if stored is None:
+            return None
+        return SectorClassifier.from_bytes(base64.b64decode(stored[1]))
+    except Exception as e:
+        print(f"[WARN] Sector model could not be fetched from the DB: {e}")
+        return None
+
+
+# ─── Process-wide instance ───────────────────────────────────────────────────
+_classifier_instance: Optional[SectorClassifier] = None
+_classifier_loaded = False
+_classifier_lock = threading.Lock()
+
+
+def model_path() -> str:
+    return os.getenv("AI_SECTOR_MODEL_PATH", os.path.join(".cache", "sector_model.json.gz"))
+
+
+def get_sector_classifier() -> Optional[SectorClassifier]:
+    """
+    Trained classifier (local file, or the newer copy in the ai_models table),
+    or None when AI_SECTOR_CLASSIFIER is off or no model has been trained.
+    """
+    global _classifier_instance, _classifier_loaded
+    if not is_classifier_enabled():
+        return None
+    if _classifier_loaded:
+        return _classifier_instance
+    with _classifier_lock:
+        if not _classifier_loaded:
+            path = model_path()
+            if os.path.exists(path):
+                try:
+                    _classifier_instance = SectorClassifier.load(path)
+                except (OSError, ValueError, KeyError) as e:
+                    print(f"[WARN] Sector model could not be loaded ({path}): {e}")
+            newer = _fetch_newer(_classifier_instance.trained_at if _classifier_instance is not None else None)
+            if newer is not None:
+                _classifier_instance = newer
+                try:
+                    newer.save(path)  # later processes on the same runner skip the download
+                except OSError:
+                    pass
+            _classifier_loaded = True
+    return _classifier_instance
+
+
+def get_sector_stats() -> Dict[str, Any]:
+    """Prediction counts, confident share and held-out metrics of the loaded model."""
+    return _classifier_instance.stats() if _classifier_instance is not None else {}
+
+
+if __name__ == "__main__":
+    import argparse
+    cli = argparse.ArgumentParser()
+    cli.add_argument("--train", action="store_true", help="Train from Campaign.clean_text / sector in the DB")
+    cli.add_argument("--limit", type=int, default=50000)
+    cli.add_argument("--stats", action="store_true", help="Print the model's held-out metrics")
+    args = cli.parse_args()
+
+    if args.train:
+        train_from_db(args.limit)
+    if args.stats:
+        classifier = get_sector_classifier()
+        print(json.dumps(classifier.stats() if classifier else {}, ensure_ascii=False, indent=1))
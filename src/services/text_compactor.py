@@ -0,0 +1,346 @@
+"""
+Token-budget-aware compaction of campaign text before it is sent to the AI.
+
+Instead of cutting the text blindly at N characters, lines are scored by how
+relevant they are to the extraction fields (dates, reward, cards, participation,
+conditions) and by the section they belong to ("Katılım Kriterleri", "Geçerli
+Kartlar" ...). Lines that appear in many campaigns of the same bank (footer,
+legal boilerplate) are learned from stored `Campaign.clean_text` and dropped.
+The highest scoring lines are kept until the token budget is filled and then
+emitted in their original order.
+
+The learned boilerplate is saved to BOILERPLATE_PATH and published to the
+ai_models table of DATABASE_URL (the GitHub Actions runners start empty); the
+scrapers fetch it from there when it is newer than their local file.
+
+Settings (env):
+    TEXT_BOILERPLATE_PATH   local model file (default .cache/bank_boilerplate.json)
+    TEXT_BOILERPLATE_STORE  auto | postgres | off (default auto: ai_models table when DATABASE_URL is set)
+
+Usage:
+    from src.services.text_compactor import compact_text
+
+    text = compact_text(raw_text, bank_name="Akbank", token_budget=2000)
+
+    # Learn bank boilerplate from the DB (writes BOILERPLATE_PATH and the ai_models row)
+    python -m src.services.text_compactor --learn
+    python -m src.services.text_compactor --report
+"""
+import os
+import re
+import json
+import time
+import threading
+from collections import defaultdict
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+from src.utils.rate_limiter import estimate_tokens # type: ignore
+from src.utils.sql_store import fetch_newer_model_payload, model_store, publish_model_payload # type: ignore
+
+BOILERPLATE_PATH = os.getenv("TEXT_BOILERPLATE_PATH", os.path.join(".cache", "bank_boilerplate.json"))
+# A line is boilerplate for a bank if it appears in at least this share of its campaigns
+BOILERPLATE_MIN_SHARE = 0.3
+BOILERPLATE_MIN_DOCS = 5
+
+# Keywords that signal a line carries data for one of the extraction fields
+_FIELD_PATTERNS = {
+    "dates": re.compile(
+        r"\b\d{1,2}[./]\d{1,2}[./]\d{2,4}\b|\b(ocak|şubat|mart|nisan|mayıs|haziran|temmuz|ağustos|eylül|ekim|kasım|aralık)\b|tarih",
+        re.IGNORECASE),
+    "reward": re.compile(r"\d[\d.,]*\s*(tl|₺)|%\s*\d+|\bpuan|worldpuan|maxipuan|chip-?para|bonus|\bmil\b|indirim|taksit|iade|hediye", re.IGNORECASE),
+    "participation": re.compile(r"\bsms\b|katıl|mobil|uygulama|jüzdan|juzdan|bonusflaş|\b\d{4}\b'?[ye]|hemen katıl|otomatik", re.IGNORECASE),
+    "cards": re.compile(r"\bkart|card|dahil|geçerli|hariç|ticari|sanal", re.IGNORECASE),
+    "conditions": re.compile(r"harcama|minimum|maksimum|en az|en fazla|üzeri|limit|sınır|koşul|şart", re.IGNORECASE),
+}
+
+# Section headers whose content is especially valuable
+_KEY_SECTION = re.compile(
+    r"katılım|nasıl faydalan|kampanya (koşul|detay)|koşullar|geçerli kart|dahil (olan )?kart|kampanyaya dahil|"
+    r"nelere dikkat|kampanya kodu|önemli bilgi",
+    re.IGNORECASE,
+)
+_HEADER_LIKE = re.compile(r"^(#{1,4}\s*)?[^.!?]{3,60}:$")
+
+
+def _normalize_line(line: str) -> str:
+    return re.sub(r"\s+", " ", line.strip().lower())
+
+
+def _bank_key(bank_name: Optional[str]) -> str:
+    return _normalize_line(bank_name or "") or "_default"
+
+
+class BoilerplateModel:
+    """Per-bank set of normalized lines that are considered boilerplate."""
+
+    def __init__(self, lines_by_bank: Optional[Dict[str, Iterable[str]]] = None,
+                 learned_at: Optional[float] = None):
+        self.lines_by_bank: Dict[str, set] = {k: set(v) for k, v in (lines_by_bank or {}).items()}
+        self.learned_at = learned_at
+
+    def is_boilerplate(self, bank_name: Optional[str], line: str) -> bool:
+        lines = self.lines_by_bank.get(_bank_key(bank_name))
+        return bool(lines) and _normalize_line(line) in lines
+
+    @classmethod
+    def learn(cls, docs: Iterable[Tuple[Optional[str], str]],
+              min_share: float = BOILERPLATE_MIN_SHARE, min_docs: int = BOILERPLATE_MIN_DOCS) -> "BoilerplateModel":
+        """docs: (bank_name, clean_text) pairs."""
+        doc_counts: Dict[str, int] = defaultdict(int)
+        line_counts: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        for bank_name, text in docs:
+            if not text:
+                continue
+            bank = _bank_key(bank_name)
+            doc_counts[bank] += 1
+            for norm in {_normalize_line(l) for l in text.split("\n") if len(l.strip()) >= 15}:
+                line_counts[bank][norm] += 1
+
+        learned = {}
+        for bank, total in doc_counts.items():
+            if total < min_docs:
+                continue
+            threshold = max(2, int(total * min_share))
+            learned[bank] = {line for line, n in line_counts[bank].items() if n >= threshold}
+        return cls(learned, learned_at=time.time())
+
+    def to_json(self) -> str:
+        return json.dumps({"learned_at": self.learned_at,
+                           "banks": {k: sorted(v) for k, v in self.lines_by_bank.items()}},
+                          ensure_ascii=False, indent=1)
+
+    @classmethod
+    def from_json(cls, data: str) -> "BoilerplateModel":
+        payload = json.loads(data)
+        if "banks" not in payload:
+            return cls(payload)  # older files: {bank: [lines]}
+        return cls(payload["banks"], learned_at=payload.get("learned_at"))
+
+    def save(self, path: str = BOILERPLATE_PATH) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.to_json())
+
+    @classmethod
+    def load(cls, path: str = BOILERPLATE_PATH) -> "BoilerplateModel":
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return cls.from_json(f.read())
+        except FileNotFoundError:
+            return cls()
+        except Exception as e:
+            print(f"[WARN] Boilerplate model could not be loaded ({path}): {e}")
+            return cls()
+
+
+# ─── Shared model store ──────────────────────────────────────────────────────
+_MODEL_NAME = "bank_boilerplate"
+
+
+def publish_boilerplate(model: BoilerplateModel) -> bool:
+    """Upsert the model into ai_models; False when there is no shared store or it failed."""
+    try:
+        store = model_store("TEXT_BOILERPLATE_STORE")
+        if store is None:
+            return False
+        publish_model_payload(store, _MODEL_NAME, model.learned_at or time.time(), model.to_json())
+        return True
+    except Exception as e:
+        print(f"[WARN] Boilerplate model could not be published to the DB: {e}")
+        return False
+
+
+def _fetch_newer(learned_at: Optional[float]) -> Optional[BoilerplateModel]:
+    """The stored model if it is newer than learned_at, else None."""
+    try:
+        store = model_store("TEXT_BOILERPLATE_STORE")
+        if store is None:
+            return None
+        stored = fetch_newer_model_payload(store, _MODEL_NAME, learned_at)
+        return BoilerplateModel.from_json(stored[1]) if stored is not None else None
+    except Exception as e:
+        print(f"[WARN] Boilerplate model could not be fetched from the DB: {e}")
+        return None
+
+
+def load_boilerplate(path: str = BOILERPLATE_PATH) -> BoilerplateModel:
+    """Local model file, replaced by the ai_models copy when that one is newer (and cached to the file)."""
+    model = BoilerplateModel.load(path)
+    newer = _fetch_newer(model.learned_at)
+    if newer is None:
+        return model
+    try:
+        newer.save(path)  # later processes on the same runner skip the download
+    except OSError:
+        pass
+    return newer
+
+
+def score_line(line: str, in_key_section: bool, position: int) -> float:
+    """Relevance of a line to the extraction fields."""
+    score = 0.0
+    for pattern in _FIELD_PATTERNS.values():
+        if pattern.search(line):
+            score += 1.0
+    if in_key_section:
+        score += 1.5
+    if position < 5:
+        # Title / lead paragraph usually carries the reward and the date range
+        score += 1.0
+    if len(line) < 20 and score == 0:
+        score -= 0.5
+    return score
+
+
+class TextCompactor:
+    """Scores, de-boilerplates and budget-fills campaign text; keeps per-bank savings stats."""
+
+    def __init__(self, boilerplate: Optional[BoilerplateModel] = None):
+        self._boilerplate = boilerplate
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = defaultdict(
+            lambda: {"docs": 0, "tokens_in": 0, "tokens_out": 0, "boilerplate_lines": 0, "dropped_lines": 0}
+        )
+
+    @property
+    def boilerplate(self) -> BoilerplateModel:
+        if self._boilerplate is None:
+            self._boilerplate = load_boilerplate()
+        return self._boilerplate
+
+    def compact(self, text: str, bank_name: Optional[str] = None, token_budget: int = 2000) -> str:
+        if not text:
+            return ""
+        lines = [l.strip() for l in text.split("\n")]
+        lines = [l for l in lines if l]
+        tokens_in = estimate_tokens(text)
+
+        kept: List[Tuple[int, float, str]] = []
+        boilerplate_lines = 0
+        in_key_section = False
+        for pos, line in enumerate(lines):
+            if len(line) <= 60 and (_HEADER_LIKE.match(line) or _KEY_SECTION.match(line)):
+                in_key_section = bool(_KEY_SECTION.search(line))
+            if self.boilerplate.is_boilerplate(bank_name, line):
+                boilerplate_lines += 1
+                continue
+            kept.append((pos, score_line(line, in_key_section, pos), line))
+
+        total = sum(estimate_tokens(l) for _, _, l in kept)
+        dropped = 0
+        if total > token_budget:
+            # Highest score first; earlier lines win ties
+            chosen = set()
+            used = 0
+            for pos, score, line in sorted(kept, key=lambda x: (-x[1], x[0])):
+                cost = estimate_tokens(line)
+                if used + cost > token_budget:
+                    continue
+                chosen.add(pos)
+                used += cost
+            dropped = len(kept) - len(chosen)
+            kept = [k for k in kept if k[0] in chosen]
+
+        result = "\n".join(line for _, _, line in kept)
+        with self._lock:
+            stats = self._stats[bank_name or "Bilinmiyor"]
+            stats["docs"] += 1
+            stats["tokens_in"] += tokens_in
+            stats["tokens_out"] += estimate_tokens(result)
+            stats["boilerplate_lines"] += boilerplate_lines
+            stats["dropped_lines"] += dropped
+        return result
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            report = {}
+            for bank, s in self._stats.items():
+                entry: Dict[str, Any] = dict(s)
+                entry["saved_pct"] = round(100.0 * (1 - s["tokens_out"] / s["tokens_in"]), 1) if s["tokens_in"] else 0.0
+                report[bank] = entry
+            return report
+
+    def print_report(self) -> None:
+        report = self.stats()
+        if not report:
+            print("📉 No compaction stats yet.")
+            return
+        print("📉 Input-token savings per bank:")
+        for bank, s in sorted(report.items(), key=lambda x: -x[1]["tokens_in"]):
+            print(f"   {bank:<20} docs={s['docs']:<5} tokens {s['tokens_in']:>8} → {s['tokens_out']:<8} "
+                  f"(-{s['saved_pct']}%) boilerplate_lines={s['boilerplate_lines']} dropped_lines={s['dropped_lines']}")
+
+
+_compactor_instance: Optional[TextCompactor] = None
+_compactor_lock = threading.Lock()
+
+
+def get_text_compactor() -> TextCompactor:
+    global _compactor_instance
+    if _compactor_instance is None:
+        with _compactor_lock:
+            if _compactor_instance is None:
+                _compactor_instance = TextCompactor()
+    return _compactor_instance
+
+
+def compact_text(text: str, bank_name: Optional[str] = None, token_budget: Optional[int] = None) -> str:
+    """Compact `text` to at most `token_budget` (env AI_INPUT_TOKEN_BUDGET, default 2000) estimated tokens."""
+    if token_budget is None:
+        token_budget = int(os.getenv("AI_INPUT_TOKEN_BUDGET", "2000"))
+    return get_text_compactor().compact(text, bank_name, token_budget)
+
+
+def learn_boilerplate_from_db(limit: int = 20000, path: str = BOILERPLATE_PATH) -> BoilerplateModel:
+    """Build the boilerplate model from stored Campaign.clean_text grouped by bank."""
+    from src.database import get_db_session # type: ignore
+    from src.models import Campaign, Card, Bank # type: ignore
+
+    with get_db_session() as db:
+        rows = (
+            db.query(Bank.name, Campaign.clean_text)
+            .join(Card, Card.bank_id == Bank.id)
+            .join(Campaign, Campaign.card_id == Card.id)
+            .filter(Campaign.clean_text.isnot(None))
+            .order_by(Campaign.id.desc())
+            .limit(limit)
+            .all()
+        )
+    model = BoilerplateModel.learn(rows)
+    model.save(path)
+    print(f"✅ Learned boilerplate for {len(model.lines_by_bank)} banks from {len(rows)} campaigns → {path}")
+    if publish_boilerplate(model):
+        print("✅ Boilerplate model published to the ai_models table")
+    for bank, lines in model.lines_by_bank.items():
+        print(f"   {bank:<20} {len(lines)} boilerplate lines")
+    return model
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--learn", action="store_true", help="Learn bank boilerplate from DB clean_text")
+    parser.add_argument("--limit", type=int, default=20000, help="Max campaigns to learn from")
+    parser.add_argument("--report", action="store_true",
+                        help="Compact stored clean_text with the current model and print per-bank savings")
+    args = parser.parse_args()
+
+    if args.learn:
+        learn_boilerplate_from_db(limit=args.limit)
+    if args.report:
+        from src.database import get_db_session # type: ignore
+        from src.models import Campaign, Card, Bank # type: ignore
+        with get_db_session() as db:
+            rows = (
+                db.query(Bank.name, Campaign.clean_text)
+                .join(Card, Card.bank_id == Bank.id)
+                .join(Campaign, Campaign.card_id == Card.id)
+                .filter(Campaign.clean_text.isnot(None))
+                .limit(args.limit)
+                .all()
+            )
+        for bank_name, text in rows:
+            compact_text(text, bank_name)
+        get_text_compactor().print_report()
@@ -0,0 +1,407 @@
+"""
+ai_providers.py
+---------------
+generate_with_rotation'ın arkasındaki sağlayıcı katmanı: Gemini, Groq ve yerel stub.
+
+Tüm Gemini anahtarları kotaya takıldığında çağrı hata verip scraper'lar yer tutucu
+kampanyaya (_get_fallback_data) düşmesin diye istekler sıradaki sağlayıcıya yönlendirilir:
+
+- Sıra AI_PROVIDERS ile verilir (varsayılan: gemini,groq). Yapılandırılmamış
+  sağlayıcı (anahtarı yok / paketi kurulu değil) atlanır.
+- Kota: her sağlayıcının kendi rate limiter bütçesi vardır; ilk sıradaki sağlayıcı
+  AI_PROVIDER_MAX_WAIT saniyeden uzun beklemeyecekse o seçilir, aksi halde en erken
+  hazır olan sonraki sağlayıcı.
+- Sağlık: art arda AI_PROVIDER_MAX_FAILURES hata veren sağlayıcı AI_PROVIDER_COOLDOWN_SEC
+  boyunca devre dışı kalır (circuit breaker); başarılı çağrı sayacı sıfırlar.
+- Prompt uyarlaması: Groq'ta system_instruction system mesajı olur, JSON istenen
+  çağrılarda response_format=json_object ve şema metin olarak system mesajına eklenir.
+- "local" stub ağsız çalışır (geliştirme / test); yalnızca AI_PROVIDERS içinde
+  açıkça yazılırsa kullanılır.
+
+record/replay modunda (GEMINI_BACKEND) yalnızca Gemini kullanılır.
+
+Ayarlar (env):
+    AI_PROVIDERS               virgülle ayrılmış sıra (gemini, groq, local)
+    AI_PROVIDER_MAX_WAIT       ilk sağlayıcı için kabul edilen bekleme (sn, varsayılan 5)
+    AI_PROVIDER_MAX_FAILURES   circuit breaker eşiği (varsayılan 3)
+    AI_PROVIDER_COOLDOWN_SEC   devre dışı kalma süresi (varsayılan 60)
+    GROQ_API_KEY / GROQ_API_KEYS, GROQ_MODEL, GROQ_RPM, GROQ_TPM, GROQ_RPD
+
+Kullanım:
+    from src.utils.ai_providers import get_provider_router, get_provider_stats
+
+    text = get_provider_router().generate(prompt, "gemini-2.0-flash-lite", config)
+    text, provider = get_provider_router().generate_with_provider(prompt, "gemini-2.0-flash-lite", config)
+    print(get_provider_stats())
+"""
+
+import os
+import json
+import time
+import threading
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from src.utils.rate_limiter import RateLimiter, RateLimitExhausted, estimate_tokens # type: ignore
+from src.utils.deadline import TimeoutException, current_deadline # type: ignore
+from src.utils.replay_backend import backend_mode # type: ignore
+from src.utils.ai_telemetry import current_record # type: ignore
+from src.utils.hedging import ClaimSet # type: ignore
+
+DEFAULT_PROVIDERS = "gemini,groq"
+DEFAULT_GROQ_MODEL = "llama-3.3-70b-versatile"
+
+
+class ProviderUnavailable(RuntimeError):
+    """Hiçbir sağlayıcı isteği karşılayamadı."""
+
+
+def _is_rate_limit(error: BaseException) -> bool:
+    err = str(error).lower()
+    return isinstance(error, RateLimitExhausted) or any(
+        token in err for token in ("429", "resourceexhausted", "quota", "rate_limit", "rateerror", "tükendi")
+    )
+
+
+class Provider:
+    """Sağlayıcı arayüzü: yapılandırma, kota durumu ve tek çağrı."""
+
+    name = "base"
+
+    def configured(self) -> bool:
+        raise NotImplementedError
+
+    def ready_in(self, tokens: int) -> float:
+        """Kaç saniye sonra çağrı yapılabilir (inf = kota bitti)."""
+        return 0.0
+
+    def generate(self, prompt: str, model: str, config: Any, retry_delay: float,
+                 claimed: Optional[ClaimSet] = None) -> str:
+        """
+        Tek çağrı. `claimed`: hedge kopyaları arasında paylaşılan anahtar etiketleri;
+        içindeki anahtarlar seçilmez, seçilen anahtar eklenir.
+        """
+        raise NotImplementedError
+
+
+class GeminiProvider(Provider):
+    """Mevcut anahtar havuzu / Vertex yolu (gemini_client._generate_uncached)."""
+
+    name = "gemini"
+
+    @staticmethod
+    def _use_vertex() -> bool:
+        return os.getenv("USE_VERTEX_AI", "False").lower() == "true"
+
+    def configured(self) -> bool:
+        if self._use_vertex():
+            return True
+        from src.utils.key_pool import load_api_keys # type: ignore
+        try:
+            return bool(load_api_keys())
+        except ValueError:
+            return False
+
+    def ready_in(self, tokens: int) -> float:
+        from src.utils.key_pool import get_key_pool # type: ignore
+        if self._use_vertex():
+            from src.utils.rate_limiter import get_rate_limiter # type: ignore
+            return get_rate_limiter().peek("vertex", tokens)
+        pool = get_key_pool()
+        return min((pool.limiter.peek(label, tokens) for label in pool.labels), default=float("inf"))
+
+    def generate(self, prompt: str, model: str, config: Any, retry_delay: float,
+                 claimed: Optional[ClaimSet] = None) -> str:
+        from src.utils.gemini_client import _generate_uncached # type: ignore
+        return _generate_uncached(prompt, model, config, self._use_vertex(), retry_delay, claimed)
+
+
+class GroqProvider(Provider):
+    """Groq chat completions; Gemini config'i OpenAI tarzı mesajlara uyarlanır."""
+
+    name = "groq"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clients: Dict[str, Any] = {}
+        self.limiter = RateLimiter(
+            rpm=int(os.getenv("GROQ_RPM", "30")),
+            tpm=int(os.getenv("GROQ_TPM", "6000")),
+            rpd=int(os.getenv("GROQ_RPD", "1000")),
+        )
+
+    @staticmethod
+    def _keys() -> List[str]:
+        keys = [os.getenv("GROQ_API_KEY", "").strip()]
+        keys += [k.strip() for k in os.getenv("GROQ_API_KEYS", "").split(",")]
+        unique: List[str] = []
+        for k in keys:
+            if k and k not in unique:
+                unique.append(k)
+        return unique
+
+    def configured(self) -> bool:
+        if not self._keys():
+            return False
+        try:
+            import groq # type: ignore  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def _labels(self) -> List[str]:
+        return [f"groq{i + 1}" for i in range(len(self._keys()))]
+
+    def ready_in(self, tokens: int) -> float:
+        return min((self.limiter.peek(label, tokens) for label in self._labels()), default=float("inf"))
+
+    def _client(self, key: str):
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                from groq import Groq # type: ignore
+                client = Groq(api_key=key)
+                self._clients[key] = client
+            return client
+
+    @staticmethod
+    def adapt(prompt: str, config: Any) -> Dict[str, Any]:
+        """Gemini GenerateContentConfig → Groq chat.completions.create argümanları."""
+        system = getattr(config, "system_instruction", None)
+        system = system if isinstance(system, str) else ""
+        request: Dict[str, Any] = {}
+        if getattr(config, "response_mime_type", None) == "application/json":
+            request["response_format"] = {"type": "json_object"}
+            schema = getattr(config, "response_schema", None)
+            if schema is not None:
+                if hasattr(schema, "model_dump"):
+                    schema = schema.model_dump(exclude_none=True)
+                system += "\n\nYanıt bu JSON şemasına uymalı:\n" + json.dumps(schema, ensure_ascii=False)
+            # json_object modu mesajlarda "json" kelimesinin geçmesini ister
+            if "json" not in (system + prompt).lower():
+                system += "\n\nYanıtı yalnızca geçerli JSON olarak ver."
+        messages = []
+        if system.strip():
+            messages.append({"role": "system", "content": system.strip()})
+        messages.append({"role": "user", "content": prompt})
+        request["messages"] = messages
+        for source, target in (("temperature", "temperature"), ("top_p", "top_p"),
+                               ("max_output_tokens", "max_tokens")):
+            value = getattr(config, source, None)
+            if value is not None:
+                request[target] = value
+        return request
+
+    def generate(self, prompt: str, model: str, config: Any, retry_delay: float,
+                 claimed: Optional[ClaimSet] = None) -> str:
+        request = self.adapt(prompt, config)
+        tokens = estimate_tokens(json.dumps(request["messages"], ensure_ascii=False))
+        keys = self._keys()
+        labels = [label for label in self._labels() if claimed is None or label not in claimed]
+        if not labels:
+            raise RateLimitExhausted("Denenecek başka Groq anahtarı kalmadı.")
+        label, _ = self.limiter.acquire_any(labels, tokens)
+        if claimed is not None and not claimed.claim(label):
+            raise RateLimitExhausted("Groq anahtarı diğer hedge kopyası tarafından alındı.")
+        key = keys[int(label[len("groq"):]) - 1]
+        groq_model = os.getenv("GROQ_MODEL", DEFAULT_GROQ_MODEL)
+        try:
+            response = self._client(key).chat.completions.create(model=groq_model, **request)
+        except Exception as e:
+            if _is_rate_limit(e):
+                from src.utils.key_pool import parse_retry_after # type: ignore
+                self.limiter.penalize(label, parse_retry_after(e) or retry_delay)
+            raise
+        record = current_record()
+        if record is not None:
+            record.model = groq_model
+            record.key_label = label
+            usage = getattr(response, "usage", None)
+            if usage is not None:
+                record.input_tokens = getattr(usage, "prompt_tokens", None)
+                record.output_tokens = getattr(usage, "completion_tokens", None)
+        return (response.choices[0].message.content or "").strip()
+
+
+class LocalStubProvider(Provider):
+    """Ağsız yer tutucu: JSON istenirse boş nesne, aksi halde boş metin döndürür."""
+
+    name = "local"
+
+    def configured(self) -> bool:
+        return True
+
+    def generate(self, prompt: str, model: str, config: Any, retry_delay: float,
+                 claimed: Optional[ClaimSet] = None) -> str:
+        record = current_record()
+        if record is not None:
+            record.model = "local-stub"
+            record.key_label = "local"
+        if getattr(config, "response_mime_type", None) == "application/json":
+            return "{}"
+        return ""
+
+
+_FACTORIES = {
+    "gemini": GeminiProvider,
+    "groq": GroqProvider,
+    "local": LocalStubProvider,
+}
+
+
+class ProviderHealth:
+    """Sağlayıcı başına sayaçlar ve circuit breaker durumu."""
+
+    __slots__ = ("successes", "errors", "rate_limits", "consecutive_errors", "disabled_until", "last_error")
+
+    def __init__(self):
+        self.successes = 0
+        self.errors = 0
+        self.rate_limits = 0
+        self.consecutive_errors = 0
+        self.disabled_until = 0.0
+        self.last_error: Optional[str] = None
+
+
+class ProviderRouter:
+    """Kota ve sağlık durumuna göre sağlayıcı seçip başarısızlıkta sıradakine geçer."""
+
+    def __init__(self, providers: List[Provider]):
+        self.providers = providers
+        self.max_wait = float(os.getenv("AI_PROVIDER_MAX_WAIT", "5"))
+        self.max_failures = int(os.getenv("AI_PROVIDER_MAX_FAILURES", "3"))
+        self.cooldown = float(os.getenv("AI_PROVIDER_COOLDOWN_SEC", "60"))
+        self._lock = threading.Lock()
+        self._health: Dict[str, ProviderHealth] = {p.name: ProviderHealth() for p in providers}
+
+    def _candidates(self, tokens: int, exclude: Set[str]) -> List[Provider]:
+        """Denenecek sağlayıcılar: önce bekleme sınırı içinde hazır olanlar (öncelik sırasıyla)."""
+        if backend_mode() != "live":
+            return [p for p in self.providers if p.name == "gemini" and p.name not in exclude]
+        now = time.monotonic()
+        ranked = []
+        for order, provider in enumerate(self.providers):
+            if provider.name in exclude or not provider.configured():
+                continue
+            with self._lock:
+                disabled = self._health[provider.name].disabled_until > now
+            if disabled:
+                continue
+            # Kotası bitmiş sağlayıcı (inf) en sona kalır; kendi hatasını verir
+            wait = provider.ready_in(tokens)
+            ranked.append(((0.0 if wait <= self.max_wait else wait), order, provider))
+        return [provider for _, _, provider in sorted(ranked, key=lambda r: (r[0], r[1]))]
+
+    def generate(self, prompt: str, model: str, config: Any, retry_delay: float = 5.0,
+                 claimed: Optional[ClaimSet] = None) -> str:
+        return self.generate_with_provider(prompt, model, config, retry_delay, claimed)[0]
+
+    def generate_with_provider(self, prompt: str, model: str, config: Any, retry_delay: float = 5.0,
+                               claimed: Optional[ClaimSet] = None) -> Tuple[str, str]:
+        """generate; yanıtla birlikte onu veren sağlayıcının adı (gemini yanıtı dışındakiler önbelleğe yazılmaz)."""
+        tokens = estimate_tokens(prompt) + estimate_tokens(getattr(config, "system_instruction", None) or "")
+        tried: Set[str] = set()
+        last_error: Optional[BaseException] = None
+        deadline = current_deadline()
+        while True:
+            candidates = self._candidates(tokens, tried)
+            if not candidates:
+                break
+            provider = candidates[0]
+            tried.add(provider.name)
+            if deadline is not None:
+                deadline.check()
+            try:
+                text = provider.generate(prompt, model, config, retry_delay, claimed)
+            except TimeoutException:
+                raise
+            except Exception as e:
+                last_error = e
+                self._report_failure(provider.name, e)
+                remaining = [p.name for p in self._candidates(tokens, tried)]
+                if remaining:
+                    print(f"[Providers] ⚠️  {provider.name} başarısız ({type(e).__name__}); {remaining[0]} deneniyor...")
+                continue
+            self._report_success(provider.name)
+            if len(tried) > 1:
+                print(f"[Providers] {provider.name} ile devam edildi.")
+            return text, provider.name
+
+        if last_error is not None and len(tried) == 1:
+            raise last_error
+        raise ProviderUnavailable(f"Kullanılabilir AI sağlayıcısı kalmadı. Son hata: {last_error}")
+
+    def _report_success(self, name: str) -> None:
+        with self._lock:
+            health = self._health[name]
+            health.successes += 1
+            health.consecutive_errors = 0
+
+    def _report_failure(self, name: str, error: BaseException) -> None:
+        with self._lock:
+            health = self._health[name]
+            health.last_error = str(error)[:200]
+            if _is_rate_limit(error):
+                # Kota durumu sağlayıcının kendi bütçesinde izlenir; breaker'ı tetiklemez
+                health.rate_limits += 1
+                return
+            health.errors += 1
+            health.consecutive_errors += 1
+            if health.consecutive_errors >= self.max_failures:
+                health.disabled_until = time.monotonic() + self.cooldown
+                health.consecutive_errors = 0
+                print(f"[Providers] {name} {self.cooldown:.0f}s devre dışı (art arda hata).")
+
+    def configured_names(self) -> List[str]:
+        """Anahtarı/kimliği tanımlı sağlayıcıların adları (öncelik sırasıyla)."""
+        return [p.name for p in self.providers if p.configured()]
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        now = time.monotonic()
+        result = {}
+        for provider in self.providers:
+            configured = provider.configured()
+            with self._lock:
+                health = self._health[provider.name]
+                entry: Dict[str, Any] = {
+                    "configured": configured,
+                    "successes": health.successes,
+                    "errors": health.errors,
+                    "rate_limits": health.rate_limits,
+                    "disabled_for_sec": round(max(health.disabled_until - now, 0.0), 1),
+                    "last_error": health.last_error,
+                }
+            if configured:
+                entry["ready_in_sec"] = round(provider.ready_in(0), 1)
+            result[provider.name] = entry
+        return result
+
+
+def provider_names() -> List[str]:
+    raw = os.getenv("AI_PROVIDERS", DEFAULT_PROVIDERS)
+    names = [n.strip().lower() for n in raw.split(",") if n.strip()]
+    unknown = [n for n in names if n not in _FACTORIES]
+    if unknown:
+        raise ValueError(f"Bilinmeyen AI sağlayıcısı: {', '.join(unknown)} (geçerli: {', '.join(_FACTORIES)})")
+    return names or ["gemini"]
+
+
+# ─── Süreç geneli tekil yönlendirici ─────────────────────────────────────────
+_router_instance: Optional[ProviderRouter] = None
+_router_names: Optional[List[str]] = None
+_router_lock = threading.Lock()
+
+
+def get_provider_router() -> ProviderRouter:
+    """AI_PROVIDERS sırasıyla kurulmuş tekil ProviderRouter (sıra değişirse yeniden kurulur)."""
+    global _router_instance, _router_names
+    names = provider_names()
+    with _router_lock:
+        if _router_instance is None or names != _router_names:
+            _router_instance = ProviderRouter([_FACTORIES[n]() for n in names])
+            _router_names = names
+    return _router_instance
+
+
+def get_provider_stats() -> Dict[str, Dict[str, Any]]:
+    """Sağlayıcı başına başarı / hata / kota durumu."""
+    return get_provider_router().stats()
@@ -0,0 +1,395 @@
+"""
+ai_telemetry.py
+---------------
+Gemini çağrıları için çağrı başına yapılandırılmış ölçüm kaydı.
+generate_with_rotation üzerinden geçen her çağrı için bir satır yazılır:
+çağıran, banka, prompt karakter / token, çıktı token, duvar saati gecikmesi,
+kullanılan anahtar, 429 sonrası anahtar değiştirme (retry) sayısı, yanıt önbelleği
+durumu (hit / miss / off), hata ve çağıranın fallback'e düşüp düşmediği.
+
+Çağıran / banka bilgisi contextvars ile taşınır (call_with_timeout bağlamı worker
+thread'e kopyalar); AIParser giriş noktaları `traced` dekoratörü ile kapsam açar.
+Token sayıları yanıttaki usage_metadata'dan alınır; yoksa (usage'sız eski kayıtlar, eski SDK)
+tahmin edilir ve `estimated=1` işaretlenir.
+
+Kayıtlar DATABASE_URL veritabanındaki ai_calls tablosuna yazılır; GitHub Actions
+runner'ları her çalışmada sıfırdan açıldığı için yerel dosya orada kaybolurdu.
+DATABASE_URL yoksa (yerel çalıştırma) veya tabloya ulaşılamazsa AI_TELEMETRY_PATH
+SQLite dosyası kullanılır.
+
+Ayarlar (env):
+    AI_TELEMETRY                 true/false (varsayılan: true)
+    AI_TELEMETRY_BACKEND         auto | postgres | sqlite (varsayılan: auto = DATABASE_URL varsa postgres)
+    AI_TELEMETRY_PATH            yerel dosya (varsayılan: .cache/ai_calls.sqlite3)
+    AI_TELEMETRY_RETENTION_DAYS  bu günden eski kayıtlar açılışta silinir (varsayılan: 30)
+
+Kullanım:
+    from src.utils.ai_telemetry import traced, mark_fallback
+
+    @traced("parse_api_campaign", bank_arg="bank_name")
+    def parse_api_campaign(...): ...
+
+    with capture() as calls:          # bloktaki çağrıların kayıtları (scripts/evaluate_prompts.py)
+        parse_api_campaign(...)
+
+    python -m src.utils.ai_telemetry --summary
+    python -m src.utils.ai_telemetry --summary --hours 24 --by caller
+"""
+
+import os
+import sys
+import time
+import uuid
+import inspect
+import functools
+import contextlib
+import threading
+import contextvars
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from src.utils.sql_store import backend_mode, open_backend # type: ignore
+
+_COLUMNS = (
+    "ts", "caller", "bank", "model", "backend", "prompt_chars", "system_chars", "input_tokens",
+    "cached_tokens", "output_tokens", "estimated", "latency_ms", "key_label", "retries",
+    "cache", "error", "fallback", "campaigns",
+)
+
+
+class CallScope:
+    """Bir parse işleminin bağlamı; içindeki tüm Gemini çağrıları bu bilgilerle kaydedilir."""
+
+    __slots__ = ("caller", "bank", "campaigns", "fallback", "in_flight", "record_ids")
+
+    def __init__(self, caller: str, bank: Optional[str] = None):
+        self.caller = caller
+        self.bank = bank
+        self.campaigns = 1
+        self.fallback = False  # fallback'e düşüldü ama çağrı kaydı henüz yazılmadı (zaman aşımı)
+        self.in_flight = 0
+        self.record_ids: List[str] = []
+
+
+class CallRecord:
+    """Tek Gemini çağrısının ölçümleri (generate_with_rotation içinde doldurulur)."""
+
+    __slots__ = _COLUMNS + ("_started", "_scope", "_token")
+
+    def __init__(self, model: str, prompt: str, system_instruction: Optional[str], backend: str):
+        scope = _scope.get()
+        self._scope = scope
+        self._token: Optional[contextvars.Token] = None
+        self._started = time.monotonic()
+        self.ts = time.time()
+        self.caller = scope.caller if scope else _guess_caller()
+        self.bank = scope.bank if scope else None
+        self.campaigns = scope.campaigns if scope else 1
+        if scope is not None:
+            scope.in_flight += 1
+        self.fallback = 0
+        self.model = model
+        self.backend = backend
+        self.prompt_chars = len(prompt or "")
+        self.system_chars = len(system_instruction or "")
+        self.input_tokens: Optional[int] = None
+        self.cached_tokens: Optional[int] = None
+        self.output_tokens: Optional[int] = None
+        self.estimated = 0
+        self.latency_ms: Optional[float] = None
+        self.key_label: Optional[str] = None
+        self.retries = 0
+        self.cache = "off"
+        self.error: Optional[str] = None
+
+    def set_usage(self, response: Any) -> None:
+        """usage_metadata varsa gerçek token sayılarını al."""
+        usage = getattr(response, "usage_metadata", None)
+        if usage is None:
+            return
+        self.input_tokens = getattr(usage, "prompt_token_count", None)
+        self.cached_tokens = getattr(usage, "cached_content_token_count", None)
+        self.output_tokens = getattr(usage, "candidates_token_count", None)
+
+    def finish(self, text: Optional[str], error: Optional[BaseException] = None) -> None:
+        self.close(text, error)
+        self.write()
+
+    def close(self, text: Optional[str], error: Optional[BaseException] = None) -> None:
+        """
+        Ölçümleri tamamlar ve kaydı etkin kayıt olmaktan çıkarır (I/O yok). start_record ile
+        aynı context'te çağrılmalı; async çağıranlar write()'ı ayrıca bir thread'de çalıştırır.
+        """
+        from src.utils.rate_limiter import estimate_tokens # type: ignore
+        self.latency_ms = round((time.monotonic() - self._started) * 1000, 1)
+        if error is not None:
+            self.error = f"{type(error).__name__}: {str(error)[:120]}"
+        if self.cache == "hit":
+            self.input_tokens = self.output_tokens = 0
+        elif self.input_tokens is None and self.error is None:
+            self.estimated = 1
+            self.input_tokens = (self.prompt_chars + self.system_chars) // 4
+            self.output_tokens = estimate_tokens(text or "")
+        if self._token is not None:
+            _record.reset(self._token)
+            self._token = None
+
+    def write(self) -> None:
+        """Kaydı capture() listesine ve telemetri deposuna yazar (depo: SQL I/O)."""
+        if self._scope is not None:
+            # fallback bayrağı yazılana kadar toplanır (mark_fallback in_flight > 0 iken bayrak bırakır)
+            self._scope.in_flight -= 1
+            if self._scope.fallback:
+                self.fallback = 1
+                self._scope.fallback = False
+        sink = _sink.get()
+        if sink is not None:
+            sink.append(dict(zip(_COLUMNS, self.to_row())))
+        store = get_telemetry_store()
+        if store is not None:
+            row_id = store.write(self)
+            if self._scope is not None and row_id is not None:
+                self._scope.record_ids.append(row_id)
+
+    def to_row(self) -> tuple:
+        return tuple(getattr(self, name) for name in _COLUMNS)
+
+
+_scope: contextvars.ContextVar = contextvars.ContextVar("ai_call_scope", default=None)
+_record: contextvars.ContextVar = contextvars.ContextVar("ai_call_record", default=None)
+_sink: contextvars.ContextVar = contextvars.ContextVar("ai_call_sink", default=None)
+
+
+def _guess_caller() -> str:
+    """Kapsam yoksa (SEO betikleri vb.) çağıran dosya adı."""
+    frame = sys._getframe(1)
+    while frame is not None:
+        name = os.path.basename(frame.f_code.co_filename)
+        if name not in ("gemini_client.py", "ai_telemetry.py", "deadline.py", "thread.py", "threading.py"):
+            return os.path.splitext(name)[0]
+        frame = frame.f_back
+    return "unknown"
+
+
+def traced(caller: str, bank_arg: Optional[str] = "bank_name") -> Callable:
+    """Fonksiyon çağrısı süresince ölçüm kapsamı açar (iç içe çağrılarda dış kapsam korunur)."""
+    def decorator(func: Callable) -> Callable:
+        signature = inspect.signature(func)
+
+        def new_scope(args, kwargs) -> CallScope:
+            bank = None
+            if bank_arg:
+                try:
+                    bank = signature.bind_partial(*args, **kwargs).arguments.get(bank_arg)
+                except TypeError:
+                    bank = None
+            return CallScope(caller, bank)
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if _scope.get() is not None:
+                    return await func(*args, **kwargs)
+                token = _scope.set(new_scope(args, kwargs))  # her asyncio görevi kendi context kopyasında
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    _scope.reset(token)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _scope.get() is not None:
+                return func(*args, **kwargs)
+            token = _scope.set(new_scope(args, kwargs))
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _scope.reset(token)
+        return wrapper
+    return decorator
+
+
+def set_campaigns(count: int) -> None:
+    """Sonraki çağrıların kaç kampanyayı kapsadığı (toplu istekler için)."""
+    scope = _scope.get()
+    if scope is not None:
+        scope.campaigns = max(1, count)
+
+
+def mark_fallback() -> None:
+    """Çağıran fallback sonucuna düştü: kapsamdaki son çağrının kaydını işaretle."""
+    scope = _scope.get()
+    if scope is None:
+        return
+    if scope.in_flight > 0:
+        scope.fallback = True  # zaman aşımına uğrayan çağrı bitince işaretlenerek yazılır
+        return
+    store = get_telemetry_store()
+    if store is not None and scope.record_ids:
+        store.mark_fallback(scope.record_ids[-1])
+
+
+@contextlib.contextmanager
+def capture() -> Iterator[List[Dict[str, Any]]]:
+    """
+    Blok içinde biten çağrıların kayıtlarını (sözlük olarak) listeye toplar; değerlendirme
+    betikleri çağrıları kampanyaya bağlamak için kullanır. AI_TELEMETRY=false iken de çalışır
+    (kayıtlar yalnızca listeye yazılır, depoya yazılmaz).
+    """
+    rows: List[Dict[str, Any]] = []
+    token = _sink.set(rows)
+    try:
+        yield rows
+    finally:
+        _sink.reset(token)
+
+
+def start_record(model: str, prompt: str, system_instruction: Optional[str], backend: str) -> Optional[CallRecord]:
+    if not is_telemetry_enabled() and _sink.get() is None:
+        return None
+    rec = CallRecord(model, prompt, system_instruction, backend)
+    rec._token = _record.set(rec)
+    return rec
+
+
+def current_record() -> Optional[CallRecord]:
+    """generate_with_rotation içindeki etkin kayıt (anahtar / retry / usage bilgisi için)."""
+    return _record.get()
+
+
+_DDL = (
+    "CREATE TABLE IF NOT EXISTS ai_calls ("
+    " call_id TEXT PRIMARY KEY,"
+    " ts DOUBLE PRECISION NOT NULL, caller TEXT, bank TEXT, model TEXT, backend TEXT,"
+    " prompt_chars INTEGER, system_chars INTEGER, input_tokens INTEGER, cached_tokens INTEGER,"
+    " output_tokens INTEGER, estimated INTEGER, latency_ms DOUBLE PRECISION, key_label TEXT, retries INTEGER,"
+    " cache TEXT, error TEXT, fallback INTEGER, campaigns INTEGER)",
+    "CREATE INDEX IF NOT EXISTS ai_calls_ts ON ai_calls (ts)",
+)
+
+
+class TelemetryStore:
+    """Çağrı kaydı deposu; arka uç DATABASE_URL tablosu ya da yerel SQLite dosyası (bkz. sql_store)."""
+
+    def __init__(self, backend: Any, retention_days: float = 30.0):
+        self.backend = backend
+        if retention_days > 0:
+            with self.backend.transaction() as query:
+                query("DELETE FROM ai_calls WHERE ts < :cutoff", cutoff=time.time() - retention_days * 86400)
+
+    def write(self, rec: CallRecord) -> Optional[str]:
+        call_id = uuid.uuid4().hex
+        params = dict(zip(_COLUMNS, rec.to_row()), call_id=call_id)
+        try:
+            with self.backend.transaction() as query:
+                query(
+                    f"INSERT INTO ai_calls (call_id, {', '.join(_COLUMNS)})"
+                    f" VALUES (:call_id, {', '.join(':' + c for c in _COLUMNS)})",
+                    **params,
+                )
+            return call_id
+        except Exception as e:
+            print(f"[AITelemetry] ⚠️ Kayıt yazılamadı: {e}")
+            return None
+
+    def mark_fallback(self, record_id: str) -> None:
+        try:
+            with self.backend.transaction() as query:
+                query("UPDATE ai_calls SET fallback = 1 WHERE call_id = :id", id=record_id)
+        except Exception as e:
+            print(f"[AITelemetry] ⚠️ Fallback işaretlenemedi: {e}")
+
+    def rows(self, since: float = 0.0) -> List[Dict[str, Any]]:
+        with self.backend.transaction() as query:
+            rows = query(f"SELECT {', '.join(_COLUMNS)} FROM ai_calls WHERE ts >= :since", since=since)
+        return [dict(zip(_COLUMNS, row)) for row in rows]
+
+
+def _percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[idx]
+
+
+def summarize(rows: List[Dict[str, Any]], by: str = "bank") -> List[Dict[str, Any]]:
+    """Gruplu özet: çağrı, kampanya, p50/p95 gecikme, kampanya başına token, hit/fallback oranı."""
+    groups: Dict[str, List[Dict[str, Any]]] = {}
+    for row in rows:
+        groups.setdefault(str(row.get(by) or "-"), []).append(row)
+    summary = []
+    for name, items in groups.items():
+        live = [r for r in items if r["cache"] != "hit"]
+        latencies = [r["latency_ms"] for r in live if r["latency_ms"] is not None and not r["error"]]
+        campaigns = sum(r["campaigns"] or 1 for r in live) or 1
+        summary.append({
+            by: name,
+            "calls": len(items),
+            "cache_hits": len(items) - len(live),
+            "errors": sum(1 for r in items if r["error"]),
+            "fallbacks": sum(1 for r in items if r["fallback"]),
+            "retries": sum(r["retries"] or 0 for r in items),
+            "p50_ms": _percentile(latencies, 50),
+            "p95_ms": _percentile(latencies, 95),
+            "in_tok_per_campaign": round(sum(r["input_tokens"] or 0 for r in live) / campaigns),
+            "out_tok_per_campaign": round(sum(r["output_tokens"] or 0 for r in live) / campaigns),
+            "total_tokens": sum((r["input_tokens"] or 0) + (r["output_tokens"] or 0) for r in live),
+        })
+    summary.sort(key=lambda s: s["total_tokens"], reverse=True)
+    return summary
+
+
+# ─── Süreç geneli tekil depo ─────────────────────────────────────────────────
+_store_instance: Optional[TelemetryStore] = None
+_store_lock = threading.Lock()
+_store_failed = False
+
+
+def is_telemetry_enabled() -> bool:
+    return os.getenv("AI_TELEMETRY", "true").lower() == "true"
+
+
+def get_telemetry_store() -> Optional[TelemetryStore]:
+    """Env ayarlarına göre tekil depo; kapalıysa veya dosya açılamazsa None."""
+    global _store_instance, _store_failed
+    if not is_telemetry_enabled() or _store_failed:
+        return None
+    if _store_instance is not None:
+        return _store_instance
+    with _store_lock:
+        if _store_instance is None and not _store_failed:
+            path = os.getenv("AI_TELEMETRY_PATH", os.path.join(".cache", "ai_calls.sqlite3"))
+            try:
+                backend = open_backend(backend_mode("AI_TELEMETRY_BACKEND"), path, _DDL, label="AITelemetry")
+                _store_instance = TelemetryStore(backend, float(os.getenv("AI_TELEMETRY_RETENTION_DAYS", "30")))
+            except Exception as e:
+                print(f"[AITelemetry] ⚠️ Depo açılamadı ({path}): {e}. Ölçüm kaydı kapalı.")
+                _store_failed = True
+    return _store_instance
+
+
+if __name__ == "__main__":
+    import argparse
+
+    cli = argparse.ArgumentParser()
+    cli.add_argument("--summary", action="store_true", help="Gecikme / token özetini yazdır")
+    cli.add_argument("--hours", type=float, default=0, help="Yalnızca son N saatin kayıtları (0 = tümü)")
+    cli.add_argument("--by", default="bank", choices=["bank", "caller", "model", "key_label", "backend"])
+    args = cli.parse_args()
+
+    store = get_telemetry_store()
+    if store is None:
+        print("Ölçüm kaydı kapalı (AI_TELEMETRY=false).")
+    elif args.summary:
+        since = time.time() - args.hours * 3600 if args.hours else 0.0
+        rows = store.rows(since)
+        print(f"{len(rows)} çağrı ({store.backend.name})")
+        header = f"{args.by:<28} {'calls':>6} {'hit':>5} {'err':>4} {'fb':>4} {'retry':>5} {'p50ms':>8} {'p95ms':>8} {'in/kmp':>7} {'out/kmp':>7} {'tokens':>9}"
+        print(header)
+        print("-" * len(header))
+        for s in summarize(rows, args.by):
+            fmt = lambda v: f"{v:.0f}" if v is not None else "-"
+            print(f"{s[args.by]:<28.28} {s['calls']:>6} {s['cache_hits']:>5} {s['errors']:>4} {s['fallbacks']:>4} "
+                  f"{s['retries']:>5} {fmt(s['p50_ms']):>8} {fmt(s['p95_ms']):>8} {s['in_tok_per_campaign']:>7} "
+                  f"{s['out_tok_per_campaign']:>7} {s['total_tokens']:>9}")
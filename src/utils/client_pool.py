@@ -0,0 +1,131 @@
+"""
+client_pool.py
+--------------
+Süreç geneli, uzun ömürlü genai.Client havuzu.
+Her API anahtarı / Vertex projesi için tek bir istemci oluşturulur ve tüm çağrılarda
+(thread'ler dahil) yeniden kullanılır; her çağrıda TLS el sıkışması ve bağlantı kurulumu
+tekrarlanmaz. İstemciler ilk kullanımda (lazy) oluşturulur.
+
+Ayarlar (env):
+    GEMINI_HTTP_MAX_CONNECTIONS   istemci başına en fazla eşzamanlı bağlantı (varsayılan: 20)
+    GEMINI_HTTP_KEEPALIVE_SEC     boştaki keep-alive bağlantı ömrü (varsayılan: 60)
+
+Kullanım:
+    from src.utils.client_pool import get_client_pool
+
+    client = get_client_pool().get(api_key="...")
+    client = get_client_pool().get_vertex(project="...", location="us-central1")
+"""
+
+import os
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+
+def _http_options() -> Any:
+    """
+    Keep-alive ve bağlantı limiti ayarlı HttpOptions.
+    Eski google-genai sürümlerinde client_args desteklenmezse None döner (SDK varsayılanı).
+    """
+    max_connections = int(os.getenv("GEMINI_HTTP_MAX_CONNECTIONS", "20"))
+    keepalive = float(os.getenv("GEMINI_HTTP_KEEPALIVE_SEC", "60"))
+    try:
+        import httpx # type: ignore
+        from google.genai import types as _types # type: ignore
+
+        limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=keepalive,
+        )
+        return _types.HttpOptions(client_args={"limits": limits}, async_client_args={"limits": limits})
+    except Exception:
+        return None
+
+
+class ClientPool:
+    """Anahtar / (proje, bölge) → genai.Client. Oluşturma kilitli, kullanım kilitsiz."""
+
+    def __init__(self):
+        self._clients: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+
+    def _get_or_create(self, pool_key: Tuple[str, ...], factory) -> Any:
+        client = self._clients.get(pool_key)
+        if client is not None:
+            self.reused += 1
+            return client
+        with self._lock:
+            client = self._clients.get(pool_key)
+            if client is None:
+                client = factory()
+                self._clients[pool_key] = client
+                self.created += 1
+            else:
+                self.reused += 1
+        return client
+
+    def get(self, api_key: str) -> Any:
+        """AI Studio anahtarı için paylaşılan istemci."""
+        def factory():
+            from google import genai as _sdk # type: ignore
+            options = _http_options()
+            if options is not None:
+                try:
+                    return _sdk.Client(api_key=api_key, http_options=options)
+                except TypeError:
+                    pass
+            return _sdk.Client(api_key=api_key)
+
+        return self._get_or_create(("key", api_key), factory)
+
+    def get_vertex(self, project: str, location: str) -> Any:
+        """Vertex AI projesi/bölgesi için paylaşılan istemci."""
+        def factory():
+            from google import genai as _sdk # type: ignore
+            options = _http_options()
+            if options is not None:
+                try:
+                    return _sdk.Client(vertexai=True, project=project, location=location, http_options=options)
+                except TypeError:
+                    pass
+            return _sdk.Client(vertexai=True, project=project, location=location)
+
+        return self._get_or_create(("vertex", project, location), factory)
+
+    def warm_up(self, api_keys) -> int:
+        """Verilen anahtarlar için istemcileri önceden oluşturur (ağ çağrısı yapmaz)."""
+        for key in api_keys:
+            self.get(key)
+        return len(self._clients)
+
+    def close(self) -> None:
+        """Tüm istemcileri bırakır (bağlantılar GC ile kapanır)."""
+        with self._lock:
+            for client in self._clients.values():
+                closer = getattr(client, "close", None)
+                if callable(closer):
+                    try:
+                        closer()
+                    except Exception:
+                        pass
+            self._clients.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"clients": len(self._clients), "created": self.created, "reused": self.reused}
+
+
+# ─── Süreç geneli tekil havuz ────────────────────────────────────────────────
+_pool_instance: Optional[ClientPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_client_pool() -> ClientPool:
+    global _pool_instance
+    if _pool_instance is None:
+        with _pool_lock:
+            if _pool_instance is None:
+                _pool_instance = ClientPool()
+    return _pool_instance
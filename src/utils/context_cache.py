@@ -0,0 +1,180 @@
+"""
+context_cache.py
+----------------
+Statik prompt önekleri (system instruction) için Gemini context caching.
+Banka kuralları + geçerli sektörler + alan kuralları bloğu her kampanyada aynıdır;
+sunucuda bir kez önbelleğe alınıp sonraki çağrılarda `cached_content` adıyla
+referans verilir, böylece statik kısım her istekte yeniden token'lanmaz.
+
+Önbellekler API anahtarına (veya Vertex projesine) bağlıdır; bu yüzden kayıtlar
+(anahtar etiketi, model, önek hash'i) ile tutulur ve süresi dolmadan yenilenir.
+
+Ayarlar (env):
+    GEMINI_CONTEXT_CACHE             off (varsayılan) | remote | local
+                                     local: ağ çağrısı yapmayan test taklidi; önek satır içi gönderilir
+    GEMINI_CONTEXT_CACHE_TTL_SEC     sunucu önbelleği ömrü (varsayılan: 3600)
+    GEMINI_CONTEXT_CACHE_MIN_TOKENS  bundan kısa önekler önbelleğe alınmaz (varsayılan: 1024)
+
+Kullanım:
+    from src.utils.context_cache import get_context_cache
+
+    manager = get_context_cache()
+    if manager is not None:
+        name = manager.resolve("key1", client, model, system_instruction)
+"""
+
+import os
+import time
+import hashlib
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from src.utils.rate_limiter import estimate_tokens # type: ignore
+
+# Süresi dolmak üzere olan önbellek bu kadar saniye önce yenilenir
+_REFRESH_MARGIN_SEC = 120
+# Önbellek oluşturma başarısız olursa aynı anahtar/model için bu süre tekrar denenmez
+_FAILURE_BACKOFF_SEC = 3600
+
+
+def prefix_hash(system_instruction: str) -> str:
+    return hashlib.sha256(system_instruction.encode("utf-8")).hexdigest()
+
+
+class ContextCacheBackend:
+    """Önbellek oluşturma arayüzü."""
+
+    #: True ise dönen ad gerçek bir sunucu önbelleği değildir; önek satır içi gönderilmeye devam eder
+    is_local = False
+
+    def create(self, client: Any, model: str, system_instruction: str, ttl_sec: int) -> str:
+        raise NotImplementedError
+
+
+class GenaiContextCacheBackend(ContextCacheBackend):
+    """google-genai `client.caches.create` ile gerçek sunucu önbelleği."""
+
+    def create(self, client: Any, model: str, system_instruction: str, ttl_sec: int) -> str:
+        from google.genai import types as _types # type: ignore
+        cache = client.caches.create(
+            model=model,
+            config=_types.CreateCachedContentConfig(
+                system_instruction=system_instruction,
+                ttl=f"{int(ttl_sec)}s",
+                display_name=f"kasaonu-{prefix_hash(system_instruction)[:12]}",
+            ),
+        )
+        return cache.name
+
+
+class LocalContextCacheBackend(ContextCacheBackend):
+    """Ağsız taklit: önbellek adı üretir ve oluşturma sayısını tutar (testler / benchmark için)."""
+
+    is_local = True
+
+    def __init__(self):
+        self.created: Dict[str, str] = {}
+
+    def create(self, client: Any, model: str, system_instruction: str, ttl_sec: int) -> str:
+        name = f"local/cachedContents/{prefix_hash(system_instruction)[:16]}"
+        self.created[name] = system_instruction
+        return name
+
+
+class ContextCacheManager:
+    """(hesap etiketi, model, önek) → sunucu önbellek adı; süresi dolmadan yenilenir."""
+
+    def __init__(self, backend: ContextCacheBackend, ttl_sec: int = 3600, min_tokens: int = 1024):
+        self.backend = backend
+        self.ttl_sec = ttl_sec
+        self.min_tokens = min_tokens
+        self._entries: Dict[Tuple[str, str, str], Tuple[str, float]] = {}
+        self._failed_until: Dict[Tuple[str, str], float] = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "creates": 0, "failures": 0, "skipped_small": 0, "cached_tokens": 0}
+
+    @property
+    def is_local(self) -> bool:
+        return self.backend.is_local
+
+    def resolve(self, label: str, client: Any, model: str, system_instruction: Optional[str]) -> Optional[str]:
+        """Önek için geçerli önbellek adı; önbelleğe alınamıyorsa None (önek satır içi gönderilir)."""
+        if not system_instruction:
+            return None
+        tokens = estimate_tokens(system_instruction)
+        if tokens < self.min_tokens:
+            self._bump("skipped_small")
+            return None
+
+        key = (label, model, prefix_hash(system_instruction))
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] - _REFRESH_MARGIN_SEC > now:
+                self._stats["hits"] += 1
+                self._stats["cached_tokens"] += tokens
+                return entry[0]
+            if self._failed_until.get((label, model), 0.0) > now:
+                return None
+
+        try:
+            name = self.backend.create(client, model, system_instruction, self.ttl_sec)
+        except Exception as e:
+            print(f"[ContextCache] ⚠️  Önbellek oluşturulamadı ({label}, {model}): {str(e)[:120]}")
+            with self._lock:
+                self._failed_until[(label, model)] = now + _FAILURE_BACKOFF_SEC
+                self._stats["failures"] += 1
+            return None
+
+        with self._lock:
+            self._entries[key] = (name, now + self.ttl_sec)
+            self._stats["creates"] += 1
+        return name
+
+    def invalidate(self, label: str, model: str, system_instruction: str) -> None:
+        """Sunucuda bulunamayan (silinmiş/süresi dolmuş) önbelleği unutur."""
+        with self._lock:
+            self._entries.pop((label, model, prefix_hash(system_instruction)), None)
+
+    def _bump(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats, entries=len(self._entries))
+
+
+def with_cached_content(config: Any, name: str) -> Any:
+    """config kopyası: system_instruction yerine cached_content referansı."""
+    from google.genai import types as _types # type: ignore
+    if hasattr(config, "model_copy"):
+        return config.model_copy(update={"cached_content": name, "system_instruction": None})
+    data = config.model_dump(exclude_none=True) if config is not None else {}
+    data.pop("system_instruction", None)
+    data["cached_content"] = name
+    return _types.GenerateContentConfig(**data)
+
+
+# ─── Süreç geneli tekil yönetici ─────────────────────────────────────────────
+_manager_instance: Optional[ContextCacheManager] = None
+_manager_mode: Optional[str] = None
+_manager_lock = threading.Lock()
+
+
+def get_context_cache() -> Optional[ContextCacheManager]:
+    """GEMINI_CONTEXT_CACHE moduna göre tekil yönetici; 'off' ise None."""
+    global _manager_instance, _manager_mode
+    mode = os.getenv("GEMINI_CONTEXT_CACHE", "off").strip().lower()
+    if mode not in ("remote", "local"):
+        return None
+    with _manager_lock:
+        if _manager_instance is None or _manager_mode != mode:
+            backend: ContextCacheBackend = GenaiContextCacheBackend() if mode == "remote" else LocalContextCacheBackend()
+            _manager_instance = ContextCacheManager(
+                backend,
+                ttl_sec=int(os.getenv("GEMINI_CONTEXT_CACHE_TTL_SEC", "3600")),
+                min_tokens=int(os.getenv("GEMINI_CONTEXT_CACHE_MIN_TOKENS", "1024")),
+            )
+            _manager_mode = mode
+    return _manager_instance
@@ -0,0 +1,192 @@
+"""
+deadline.py
+-----------
+Thread-safe zaman aşımı / bütçe mekanizması (signal.SIGALRM yerine).
+SIGALRM yalnızca ana thread'de çalıştığı için AIParser ThreadPoolExecutor, asyncio
+executor veya worker thread'lerinden kullanılamıyordu. Burada çağrı ayrı bir worker
+thread'de çalıştırılır ve sonucu süre sınırıyla beklenir; her thread'den ve async
+koddan kullanılabilir.
+
+İki seviye bütçe:
+    - Çağrı başına: call_with_timeout(..., timeout_sec=65)
+    - Çalıştırma başına: `with run_budget(900): ...` bloğu içindeki tüm çağrılar
+      toplamda bu süreyi aşamaz (contextvars ile thread/async görevlerine taşınır).
+
+Kullanım:
+    from src.utils.deadline import call_with_timeout, run_budget, TimeoutException
+
+    with run_budget(600, name="paraf"):
+        text = call_with_timeout(generate_with_rotation, kwargs={...}, timeout_sec=65)
+        text = await await_with_timeout(agenerate_with_rotation(...), timeout_sec=65)
+"""
+
+import os
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as _FutureTimeout
+from typing import Any, Callable, Dict, Iterator, Optional
+
+
+class TimeoutException(Exception):
+    pass
+
+
+class Deadline:
+    """Monotonic saate göre mutlak bitiş zamanı."""
+
+    __slots__ = ("expires_at", "name")
+
+    def __init__(self, seconds: float, name: str = "run"):
+        self.expires_at = time.monotonic() + seconds
+        self.name = name
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def check(self) -> None:
+        if self.expired():
+            raise TimeoutException(f"'{self.name}' çalıştırma bütçesi doldu")
+
+
+_current_deadline: contextvars.ContextVar = contextvars.ContextVar("ai_run_deadline", default=None)
+
+
+def current_deadline() -> Optional[Deadline]:
+    """Etkin çalıştırma bütçesi (yoksa None)."""
+    return _current_deadline.get()
+
+
+def remaining_budget(default: Optional[float] = None) -> Optional[float]:
+    """Etkin bütçede kalan saniye; bütçe yoksa `default`."""
+    deadline = _current_deadline.get()
+    return deadline.remaining() if deadline is not None else default
+
+
+@contextmanager
+def run_budget(seconds: float, name: str = "run") -> Iterator[Deadline]:
+    """Blok içindeki tüm call_with_timeout çağrılarına ortak üst süre uygular (iç içe: en dar olan geçerli)."""
+    outer = _current_deadline.get()
+    deadline = Deadline(seconds, name)
+    if outer is not None and outer.expires_at < deadline.expires_at:
+        deadline = outer
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+# ─── Zaman aşımı istatistikleri ──────────────────────────────────────────────
+_stats_lock = threading.Lock()
+_timeout_stats: Dict[str, int] = {"calls": 0, "timeouts": 0, "budget_exhausted": 0}
+
+
+def _record(name: str) -> None:
+    with _stats_lock:
+        _timeout_stats[name] += 1
+
+
+def get_timeout_stats() -> Dict[str, int]:
+    with _stats_lock:
+        return dict(_timeout_stats)
+
+
+# ─── Çağrı yürütücü ──────────────────────────────────────────────────────────
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=int(os.getenv("AI_TIMEOUT_WORKERS", "32")),
+                    thread_name_prefix="ai-deadline",
+                )
+    return _executor
+
+
+def _effective_timeout(timeout_sec: float) -> float:
+    remaining = remaining_budget()
+    if remaining is None:
+        return timeout_sec
+    if remaining <= 0:
+        _record("budget_exhausted")
+        raise TimeoutException(f"'{current_deadline().name}' çalıştırma bütçesi doldu")
+    return min(timeout_sec, remaining)
+
+
+def _run_bounded(func: Callable, timeout: float, args, kwargs) -> Any:
+    """
+    func'u worker thread'de çağrının kendi süresiyle sınırlı bir run_budget içinde çalıştırır.
+    Böylece current_deadline() worker'da da bu süreyi döndürür: gemini_client kalan süreyi
+    HTTP isteğinin zaman aşımı olarak geçirir ve yeni anahtar denemesi başlatmaz; süresi dolan
+    çağrı worker'ı istek dönene kadar değil, en geç bu süre kadar meşgul eder.
+    """
+    with run_budget(timeout, name="call"):
+        return func(*args, **kwargs)
+
+
+def call_with_timeout(func: Callable, args=(), kwargs=None, timeout_sec: float = 60) -> Any:
+    """
+    func(*args, **kwargs) çağrısını en fazla timeout_sec (ve etkin run_budget) kadar bekler.
+    Süre dolarsa TimeoutException fırlatır. Herhangi bir thread'den çağrılabilir.
+    Not: Süresi dolan çağrının sonucu yok sayılır; aynı süre worker'da da geçerli olduğu için
+    (bkz. _run_bounded) istek HTTP zaman aşımıyla kısa sürede sonlanır ve worker havuza döner.
+    """
+    if kwargs is None:
+        kwargs = {}
+    timeout = _effective_timeout(timeout_sec)
+    _record("calls")
+    ctx = contextvars.copy_context()  # run_budget worker thread'de de görünsün
+    future = _get_executor().submit(ctx.run, _run_bounded, func, timeout, args, kwargs)
+    try:
+        return future.result(timeout=timeout)
+    except _FutureTimeout:
+        future.cancel()
+        _record("timeouts")
+        raise TimeoutException(f"Gemini API call timed out after {timeout:.1f}s")
+
+
+async def async_call_with_timeout(func: Callable, args=(), kwargs=None, timeout_sec: float = 60) -> Any:
+    """Senkron func'u event loop'u bloklamadan, süre sınırıyla çalıştırır."""
+    import asyncio  # yalnızca async çağıranlar öder (import süresi)
+    if kwargs is None:
+        kwargs = {}
+    timeout = _effective_timeout(timeout_sec)
+    _record("calls")
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    try:
+        return await asyncio.wait_for(
+            loop.run_in_executor(_get_executor(), lambda: ctx.run(_run_bounded, func, timeout, args, kwargs)),
+            timeout=timeout,
+        )
+    except asyncio.TimeoutError:
+        _record("timeouts")
+        raise TimeoutException(f"Gemini API call timed out after {timeout:.1f}s")
+
+
+async def await_with_timeout(awaitable: Any, timeout_sec: float = 60) -> Any:
+    """Native coroutine'i süre sınırıyla (ve etkin run_budget ile) bekler; süre dolarsa iptal eder."""
+    import asyncio
+    try:
+        timeout = _effective_timeout(timeout_sec)
+    except TimeoutException:
+        close = getattr(awaitable, "close", None)
+        if close is not None:
+            close()  # hiç başlatılmayan coroutine için "never awaited" uyarısı verme
+        raise
+    _record("calls")
+    try:
+        return await asyncio.wait_for(awaitable, timeout=timeout)
+    except asyncio.TimeoutError:
+        _record("timeouts")
+        raise TimeoutException(f"Gemini API call timed out after {timeout:.1f}s")
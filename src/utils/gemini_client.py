@@ -1,33 +1,53 @@
 """
 gemini_client.py
 ----------------
-Merkezi Gemini API istemcisi. 3 anahtar ile otomatik key rotation yapar.
-Fallback sırası: GEMINI_API_KEY → GEMINI_API_KEY_1 → GEMINI_API_KEY_2
+Merkezi Gemini API istemcisi. Anahtar havuzu (key_pool) ile otomatik key rotation yapar.
+Anahtarlar: GEMINI_API_KEY, GEMINI_API_KEY_1..N, GEMINI_API_KEYS (virgülle ayrılmış).
+Her çağrıda cooldown/günlük kota/gecikme durumuna göre en sağlıklı anahtar önce denenir.
+
+Aynı (prompt, model, config, prompt_version) için yanıtlar response_cache ile
+önbelleğe alınır; tekrar çalıştırmalar API çağrısı yapmaz (GEMINI_CACHE_ENABLED=false ile kapatılır).
+İstekler rate_limiter üzerinden anahtar başına RPM/TPM/RPD bütçesiyle sınırlanır;
+429 alan anahtar global bekleme yerine kısa süre dinlendirilir.
+Statik önek `system_instruction` ile ayrı verilirse GEMINI_CONTEXT_CACHE açıkken
+sunucu tarafı context cache üzerinden gönderilir (bkz. context_cache).
+GEMINI_BACKEND=record/replay ile çağrılar kaydedilir ya da kayıttan, ağ olmadan
+sunulur (benchmark / yük testi; bkz. replay_backend).
+Her çağrı için gecikme / token / anahtar / önbellek durumu ai_telemetry'ye yazılır.
+Önbellek dışı çağrılar ai_providers yönlendiricisinden geçer: Gemini kotası
+tükendiğinde veya sağlıksızken istek Groq'a (AI_PROVIDERS sırası) aktarılır.
+AI_HEDGE=true ile p95 eşiğini aşan çağrının kopyası başka anahtara gönderilir (bkz. hedging).
+agenerate_with_rotation aynı akışın async karşılığıdır (genai client.aio; asyncio scraper'ları için).
 
 Kullanım:
     from src.utils.gemini_client import get_gemini_client, generate_with_rotation
     
     content = generate_with_rotation(prompt="...", model="gemini-2.0-flash-lite")
+    content = generate_with_rotation(prompt=kampanya_metni, system_instruction=statik_kurallar)
+    content = await agenerate_with_rotation(prompt="...")
 """
 
 import os
+import json
 import time
-from typing import Optional, Union
+import contextvars
+from typing import NoReturn, Optional, Union
+
+from src.utils.response_cache import get_response_cache, is_cache_enabled # type: ignore
+from src.utils.rate_limiter import get_rate_limiter, estimate_tokens, RateLimitExhausted # type: ignore
+from src.utils.key_pool import get_key_pool, load_api_keys, parse_retry_after # type: ignore
+from src.utils.quota_ledger import get_quota_ledger # type: ignore
+from src.utils.client_pool import get_client_pool # type: ignore
+from src.utils.deadline import current_deadline # type: ignore
+from src.utils.context_cache import get_context_cache, with_cached_content # type: ignore
+from src.utils.replay_backend import wrap_client, backend_mode # type: ignore
+from src.utils.ai_telemetry import start_record, current_record # type: ignore
+from src.utils.ai_providers import get_provider_router # type: ignore
+from src.utils.hedging import ClaimSet, get_hedger # type: ignore
 
 # ─── Key listesini ortam değişkenlerinden oku ───────────────────────────────
 def _load_keys() -> list[str]:
-    keys = []
-    for name in ["GEMINI_API_KEY", "GEMINI_API_KEY_1", "GEMINI_API_KEY_2"]:
-        k = os.getenv(name, "").strip()
-        if k:
-            keys.append(k)
-    if not keys:
-        raise ValueError(
-            "Hiç Gemini API anahtarı bulunamadı. "
-            "GEMINI_API_KEY, GEMINI_API_KEY_1 veya GEMINI_API_KEY_2 env değişkenlerinden "
-            "en az birini tanımlayın."
-        )
-    return keys
+    return load_api_keys()
 
 
 # ─── Tek bir generate çağrısı (key döngüsüyle) ──────────────────────────────
@@ -35,83 +55,445 @@ def generate_with_rotation(
     prompt: str,
     model: Optional[str] = None,
     retry_delay: float = 5.0,
+    prompt_version: Optional[str] = None,
+    use_cache: bool = True,
+    system_instruction: Optional[str] = None,
     **kwargs
 ) -> str:
     """
     Verilen prompt'u Gemini API'ye gönderir.
     USE_VERTEX_AI=True ise Vertex AI üzerinden, aksi halde key rotation ile çalışır.
+    Gemini kullanılamazsa AI_PROVIDERS içindeki sıradaki sağlayıcıya geçilir (bkz. ai_providers).
+
+    prompt_version: Prompt şablonu değiştiğinde eski önbellek kayıtlarını geçersiz kılmak için.
+    use_cache: False ise önbellek okunmaz/yazılmaz (ör. her seferinde farklı içerik istenen işler).
+    system_instruction: Çağrılar arasında değişmeyen statik önek (kurallar); context cache ile paylaşılır.
+    """
+    call = _PreparedCall(prompt, model, prompt_version, use_cache, system_instruction, kwargs)
+    cached = call.lookup()
+    if cached is not None:
+        return call.hit(cached)
+    try:
+        hedger = get_hedger()
+        if hedger is None:
+            text, provider = get_provider_router().generate_with_provider(prompt, call.model_name, call.config,
+                                                                           retry_delay)
+        else:
+            text, provider = hedger.run(call.model_name, lambda claimed: get_provider_router().generate_with_provider(
+                prompt, call.model_name, call.config, retry_delay, claimed))
+    except Exception as e:
+        call.fail(e)
+        raise
+    return call.complete(text, provider)
+
+
+async def agenerate_with_rotation(
+    prompt: str,
+    model: Optional[str] = None,
+    retry_delay: float = 5.0,
+    prompt_version: Optional[str] = None,
+    use_cache: bool = True,
+    system_instruction: Optional[str] = None,
+    **kwargs
+) -> str:
     """
-    from google import genai as _sdk # type: ignore
+    generate_with_rotation'ın async karşılığı (aynı önbellek, anahtar havuzu, limiter ve telemetri).
+    Gemini çağrısı genai async istemcisiyle (client.aio) yapılır; event loop bloklanmaz.
+    Groq failover, hedging veya record/replay açıksa senkron yol bir worker thread'de çalışır.
+    Önbellek okuma/yazma ve telemetri kaydı (DATABASE_URL'de SQL) da worker thread'de yapılır.
+    """
+    import asyncio  # yalnızca async çağıranlar öder (import süresi)
+
+    call = _PreparedCall(prompt, model, prompt_version, use_cache, system_instruction, kwargs)
+    cached = await asyncio.to_thread(call.lookup)
+    if cached is not None:
+        call.close(cached)
+        await asyncio.to_thread(call.persist, cached)
+        return cached
+    try:
+        if _native_async_available():
+            text, provider = await _agenerate_uncached(prompt, call.model_name, call.config, retry_delay), "gemini"
+        else:
+            ctx = contextvars.copy_context()  # telemetri kaydı / run_budget thread'de de görünsün
+            text, provider = await asyncio.to_thread(
+                ctx.run, get_provider_router().generate_with_provider, prompt, call.model_name, call.config,
+                retry_delay
+            )
+    except BaseException as e:  # zaman aşımında görev iptal edilir (CancelledError): kayıt yine kapanmalı
+        call.close(None, e)
+        # iptal edilen görevde beklenemez: kayıt arka planda yazılır
+        asyncio.get_running_loop().run_in_executor(None, contextvars.copy_context().run, call.persist, None)
+        raise
+    call.close(text)
+    await asyncio.to_thread(call.persist, text, provider)
+    return text
+
+
+class _PreparedCall:
+    """
+    Bir generate çağrısının config'i, telemetri kaydı ve yanıt önbelleği (sync / async ortak).
+    Kurulum ve close() bellek içidir; lookup() ve persist() SQL katmanına gidebilir
+    (async yol bunları worker thread'de çalıştırır).
+    """
+
+    def __init__(self, prompt: str, model: Optional[str], prompt_version: Optional[str], use_cache: bool,
+                 system_instruction: Optional[str], kwargs: dict):
+        from google.genai import types as _types # type: ignore
+
+        self.model_name = model or os.getenv("GEMINI_MODEL", "gemini-3.1-flash-lite-preview")
+
+        # Wrap direct parameters into config object
+        if "config" in kwargs:
+            config = kwargs.pop("config")
+        else:
+            config = _types.GenerateContentConfig(**kwargs) if kwargs else None
+        if system_instruction:
+            config = _with_system_instruction(config, system_instruction)
+        self.config = config
+
+        self.record = start_record(self.model_name, prompt, system_instruction, backend_mode())
+        self._prompt = prompt
+        self._prompt_version = prompt_version
+        # record/replay modunda her çağrı arka uçtan geçmeli (kayıt / benchmark)
+        self._use_cache = use_cache and is_cache_enabled() and backend_mode() == "live"
+        self.cache = None
+        self.cache_key = None
+        self.cached = False
+
+    def lookup(self) -> Optional[str]:
+        """Önbellekteki yanıt (yoksa None)."""
+        if not self._use_cache:
+            return None
+        self.cache = get_response_cache()
+        self.cache_key = self.cache.make_key(self._prompt, self.model_name, self.config, self._prompt_version)
+        cached = self.cache.get(self.cache_key)
+        self.cached = cached is not None
+        if self.record is not None:
+            self.record.cache = "hit" if self.cached else "miss"
+        return cached
+
+    def close(self, text: Optional[str], error: Optional[BaseException] = None) -> None:
+        if self.record is not None:
+            self.record.close(text, error)
+
+    def persist(self, text: Optional[str], provider: str = "gemini") -> None:
+        """
+        Yeni yanıtı önbelleğe, kaydı telemetri deposuna yazar. Anahtar istenen Gemini modeline
+        göre üretildiği için başka sağlayıcının (Groq failover) yanıtı önbelleğe yazılmaz.
+        """
+        if text is not None and provider == "gemini" and not self.cached and self.cache is not None \
+                and self.cache_key is not None and _is_cacheable(text, self.config):
+            self.cache.set(self.cache_key, text)
+        if self.record is not None:
+            self.record.write()
+
+    def hit(self, cached: str) -> str:
+        self.close(cached)
+        self.persist(cached)
+        return cached
+
+    def fail(self, error: BaseException) -> None:
+        self.close(None, error)
+        self.persist(None)
+
+    def complete(self, text: str, provider: str = "gemini") -> str:
+        self.close(text)
+        self.persist(text, provider)
+        return text
+
+
+def _with_system_instruction(config, system_instruction: str):
     from google.genai import types as _types # type: ignore
+    if config is None:
+        return _types.GenerateContentConfig(system_instruction=system_instruction)
+    if hasattr(config, "model_copy"):
+        return config.model_copy(update={"system_instruction": system_instruction})
+    data = config.model_dump(exclude_none=True)
+    data["system_instruction"] = system_instruction
+    return _types.GenerateContentConfig(**data)
+
+
+def _with_request_timeout(config):
+    """
+    Etkin deadline'da kalan süreyi isteğin HTTP zaman aşımı yapar (HttpOptions.timeout, ms).
+    Aksi halde call_with_timeout süresi dolan istek, SDK varsayılan zaman aşımına kadar
+    worker thread'i tutar. Deadline yoksa veya SDK desteklemiyorsa config aynen döner.
+    """
+    deadline = current_deadline()
+    if deadline is None:
+        return config
+    timeout_ms = max(1000, int(deadline.remaining() * 1000))
+    try:
+        from google.genai import types as _types # type: ignore
+        if config is None:
+            return _types.GenerateContentConfig(http_options=_types.HttpOptions(timeout=timeout_ms))
+        options = getattr(config, "http_options", None)
+        if options is not None and hasattr(options, "model_copy"):
+            options = options.model_copy(update={"timeout": timeout_ms})
+        else:
+            options = _types.HttpOptions(timeout=timeout_ms)
+        return config.model_copy(update={"http_options": options})
+    except Exception:
+        return config
+
+
+def _generate_content(client, label: str, model_name: str, prompt: str, config):
+    """generate_content; statik önek varsa ve context cache açıksa cached_content ile gönderir."""
+    client = wrap_client(client, label)
+    config = _with_request_timeout(config)
+    manager = get_context_cache()
+    system_instruction = getattr(config, "system_instruction", None)
+    name = None
+    if manager is not None and isinstance(system_instruction, str):
+        name = manager.resolve(label, client, model_name, system_instruction)
+    if name is None or manager.is_local:
+        return client.models.generate_content(model=model_name, contents=prompt, config=config)
+    try:
+        return client.models.generate_content(
+            model=model_name, contents=prompt, config=with_cached_content(config, name)
+        )
+    except Exception as e:
+        if _is_missing_cache(e):
+            # Önbellek sunucuda yok (süresi dolmuş/silinmiş): unut ve öneki satır içi gönder
+            manager.invalidate(label, model_name, system_instruction)
+            return client.models.generate_content(model=model_name, contents=prompt, config=config)
+        raise
+
+
+async def _agenerate_content(client, label: str, model_name: str, prompt: str, config):
+    """_generate_content'in async karşılığı (client.aio); yalnızca live modda kullanılır."""
+    import asyncio
+
+    manager = get_context_cache()
+    system_instruction = getattr(config, "system_instruction", None)
+    name = None
+    if manager is not None and isinstance(system_instruction, str):
+        # resolve ilk seferde önbelleği sunucuda oluşturur (senkron istek): loop'u bloklamasın
+        name = await asyncio.to_thread(manager.resolve, label, client, model_name, system_instruction)
+    models = client.aio.models
+    if name is None or manager.is_local:
+        return await models.generate_content(model=model_name, contents=prompt, config=config)
+    try:
+        return await models.generate_content(
+            model=model_name, contents=prompt, config=with_cached_content(config, name)
+        )
+    except Exception as e:
+        if _is_missing_cache(e):
+            manager.invalidate(label, model_name, system_instruction)
+            return await models.generate_content(model=model_name, contents=prompt, config=config)
+        raise
+
+
+def _is_missing_cache(error: Exception) -> bool:
+    err = str(error).lower().replace("_", "").replace(" ", "")
+    return "cachedcontent" in err or "notfound" in err or "404" in err
 
-    use_vertex = os.getenv("USE_VERTEX_AI", "False").lower() == "true"
-    model_name = model or os.getenv("GEMINI_MODEL", "gemini-3.1-flash-lite-preview")
-    
-    # Wrap direct parameters into config object
-    if "config" in kwargs:
-        config = kwargs.pop("config")
-    else:
-        config = _types.GenerateContentConfig(**kwargs) if kwargs else None
+
+def _is_cacheable(text: str, config) -> bool:
+    """JSON istenen çağrılarda bozuk yanıtı önbelleğe yazma (sonraki çalıştırma tekrar denesin)."""
+    if not text:
+        return False
+    if getattr(config, "response_mime_type", None) == "application/json":
+        try:
+            json.loads(text)
+        except ValueError:
+            return False
+    return True
+
+
+def _generate_uncached(prompt: str, model_name: str, config, use_vertex: bool, retry_delay: float,
+                       claimed: Optional[ClaimSet] = None) -> str:
+    """
+    Önbellek dışı gerçek API çağrısı (Vertex veya key rotation).
+    claimed: hedge kopyalarıyla paylaşılan anahtar etiketleri; bunlar seçilmez, seçilen eklenir.
+    """
+    limiter = get_rate_limiter()
+    tokens = estimate_tokens(prompt) + estimate_tokens(getattr(config, "system_instruction", None) or "")
 
     if use_vertex:
+        if claimed is not None and not claimed.claim("vertex"):
+            raise RateLimitExhausted("Vertex uç noktası zaten bu istek için kullanımda.")
+        # Vertex kotası proje geneli: ortak defterde proje kimliğiyle tutulur
+        ledger = get_quota_ledger()
+        vertex_id = f"vertex:{os.getenv('GOOGLE_CLOUD_PROJECT', '')}"
         try:
+            if ledger is not None:
+                ledger.reserve_any([("vertex", vertex_id)], tokens)
+            limiter.acquire("vertex", tokens)
             client = get_gemini_client()
-            response = client.models.generate_content(
-                model=model_name,
-                contents=prompt,
-                config=config
-            )
+            response = _generate_content(client, "vertex", model_name, prompt, config)
+            _note_response(response, "vertex", 0)
             return response.text.strip()
         except Exception as e:
+            if ledger is not None and "429" in str(e):
+                ledger.block(vertex_id, parse_retry_after(e) or retry_delay, "rate_limit")
             print(f"[VertexAI] Error: {e}")
             raise e
 
     # AI Studio / Key Rotation Mode
-    keys = _load_keys()
+    pool = get_key_pool()
+    tried: set = set()
+    busy = claimed.snapshot() if claimed is not None else set()
     last_error: Union[Exception, None] = None
 
-    for idx, key in enumerate(keys):
+    deadline = current_deadline()
+    while len(tried | busy) < len(pool):
+        if deadline is not None:
+            deadline.check()  # run_budget dolduysa yeni anahtar denemesi yapma
+        # En sağlıklı ve bütçesi en erken uygun olan anahtarı seç
         try:
-            client = _sdk.Client(api_key=key)
-            response = client.models.generate_content(
-                model=model_name,
-                contents=prompt,
-                config=config
-            )
-            if idx > 0:
-                print(f"[KeyRotation] Anahtar #{idx + 1} başarılı ({model_name}).")
+            state = pool.acquire(exclude=tried | busy, tokens=tokens)
+        except RateLimitExhausted as e:
+            last_error = last_error or e
+            break
+        if claimed is not None and not claimed.claim(state.label):
+            busy.add(state.label)  # diğer hedge kopyası bu arada aynı anahtarı aldı
+            continue
+        tried.add(state.label)
+        started = time.monotonic()
+        try:
+            client = get_client_pool().get(state.key)
+            response = _generate_content(client, state.label, model_name, prompt, config)
+            pool.report_success(state.label, time.monotonic() - started)
+            _note_response(response, state.label, len(tried) - 1)
+            if len(tried) > 1:
+                print(f"[KeyRotation] Anahtar #{state.index + 1} başarılı ({model_name}).")
             return response.text.strip()
 
         except Exception as e:
-            err_str = str(e).lower()
-            is_rate_limit = any(
-                token in err_str
-                for token in ["429", "resourceexhausted", "quota", "rate_limit", "rateerror"]
-            )
-            if is_rate_limit:
-                print(
-                    f"[KeyRotation] ⚠️  Anahtar #{idx + 1} limit doldu "
-                    f"({type(e).__name__}). "
-                    + (f"Anahtar #{idx + 2}'ye geçiliyor..." if idx + 1 < len(keys) else "Başka anahtar yok!")
-                )
+            if _report_key_error(pool, state, e, retry_delay, len(tried | busy) < len(pool), len(tried) - 1):
                 last_error = e
-                time.sleep(retry_delay)
                 continue  # sonraki key
-            else:
-                raise
-    
+            raise
+
+    _raise_exhausted(tried, last_error)
+
+
+def _report_key_error(pool, state, error: Exception, retry_delay: float, has_next: bool, retries: int) -> bool:
+    """Anahtar hatasını havuza bildirir; rate limit ise True (sonraki anahtara geç), değilse False."""
+    err_str = str(error).lower()
+    is_rate_limit = any(
+        token in err_str
+        for token in ["429", "resourceexhausted", "quota", "rate_limit", "rateerror"]
+    )
+    if not is_rate_limit:
+        pool.report_error(state.label, error)
+        _note_response(None, state.label, retries)
+        return False
+    cooldown = pool.report_rate_limit(state.label, error, default_cooldown=retry_delay)
+    print(
+        f"[KeyRotation] ⚠️  Anahtar #{state.index + 1} limit doldu "
+        f"({type(error).__name__}, "
+        + ("günlük kota" if cooldown == float("inf") else f"{cooldown:.0f}s dinlenecek")
+        + "). "
+        + ("Sonraki anahtara geçiliyor..." if has_next else "Başka anahtar yok!")
+    )
+    return True
+
+
+def _raise_exhausted(tried: set, last_error: Optional[Exception]) -> NoReturn:
+    record = current_record()
+    if record is not None:
+        record.retries = max(len(tried) - 1, 0)
     raise RuntimeError(f"Tüm Gemini API anahtarları tükendi. Son hata: {last_error}")
 
 
+def _native_async_available() -> bool:
+    """
+    Async yol yalnızca tek sağlayıcı Gemini, live mod ve hedging kapalıyken doğrudan client.aio kullanır.
+    Diğer durumlarda failover/hedge/replay mantığı senkron yolda kalır (worker thread).
+    """
+    if backend_mode() != "live" or get_hedger() is not None:
+        return False
+    names = get_provider_router().configured_names()
+    return names == ["gemini"]
+
+
+async def _agenerate_uncached(prompt: str, model_name: str, config, retry_delay: float) -> str:
+    """
+    _generate_uncached'in async karşılığı. Limiter/defter beklemeleri (time.sleep) ve defter
+    yazmaları worker thread'de yapılır; API çağrısı client.aio ile event loop üzerinde bekletilir.
+    """
+    import asyncio
+
+    limiter = get_rate_limiter()
+    tokens = estimate_tokens(prompt) + estimate_tokens(getattr(config, "system_instruction", None) or "")
+
+    if os.getenv("USE_VERTEX_AI", "False").lower() == "true":
+        ledger = get_quota_ledger()
+        vertex_id = f"vertex:{os.getenv('GOOGLE_CLOUD_PROJECT', '')}"
+        try:
+            if ledger is not None:
+                await asyncio.to_thread(ledger.reserve_any, [("vertex", vertex_id)], tokens)
+            await asyncio.to_thread(limiter.acquire, "vertex", tokens)
+            client = get_gemini_client()
+            response = await _agenerate_content(client, "vertex", model_name, prompt, config)
+            _note_response(response, "vertex", 0)
+            return response.text.strip()
+        except Exception as e:
+            if ledger is not None and "429" in str(e):
+                await asyncio.to_thread(ledger.block, vertex_id, parse_retry_after(e) or retry_delay, "rate_limit")
+            print(f"[VertexAI] Error: {e}")
+            raise e
+
+    pool = get_key_pool()
+    tried: set = set()
+    last_error: Union[Exception, None] = None
+
+    deadline = current_deadline()
+    while len(tried) < len(pool):
+        if deadline is not None:
+            deadline.check()
+        try:
+            state = await asyncio.to_thread(pool.acquire, set(tried), tokens)
+        except RateLimitExhausted as e:
+            last_error = last_error or e
+            break
+        tried.add(state.label)
+        started = time.monotonic()
+        try:
+            client = get_client_pool().get(state.key)
+            response = await _agenerate_content(client, state.label, model_name, prompt, config)
+            pool.report_success(state.label, time.monotonic() - started)
+            _note_response(response, state.label, len(tried) - 1)
+            if len(tried) > 1:
+                print(f"[KeyRotation] Anahtar #{state.index + 1} başarılı ({model_name}).")
+            return response.text.strip()
+        except Exception as e:
+            # 429'da anahtar ortak kota defterinde bloklanır (SQL): loop'u bloklamasın
+            if await asyncio.to_thread(_report_key_error, pool, state, e, retry_delay, len(tried) < len(pool),
+                                       len(tried) - 1):
+                last_error = e
+                continue
+            raise
+
+    _raise_exhausted(tried, last_error)
+
+
+def _note_response(response, label: str, retries: int) -> None:
+    """Etkin ölçüm kaydına anahtar, retry ve usage_metadata bilgisini yaz."""
+    record = current_record()
+    if record is None:
+        return
+    record.key_label = label
+    record.retries = retries
+    if response is not None:
+        record.set_usage(response)
+
+
+def get_key_stats() -> dict:
+    """Anahtar başına kullanım/sağlık istatistikleri (istek, 429, gecikme, bekleme)."""
+    return get_key_pool().stats()
+
+
 # ─── Vertex AI / AI Studio seçici istemci ────────────────────────────────────
 def get_gemini_client():
     """
     USE_VERTEX_AI=True ise Vertex AI istemcisi, aksi halde
     API anahtarı olan ilk key ile istemci döndürür.
+    İstemciler client_pool üzerinden paylaşılır; tekrar çağırmak yeni bağlantı açmaz.
     (generate_with_rotation kullanmak her zaman tercih edilmelidir.)
     """
-    from google import genai as _sdk # type: ignore
-
     use_vertex = os.getenv("USE_VERTEX_AI", "False").lower() == "true"
     if use_vertex:
         project = os.getenv("GOOGLE_CLOUD_PROJECT")
@@ -121,8 +503,8 @@ def get_gemini_client():
             raise ValueError("USE_VERTEX_AI=True ama GOOGLE_CLOUD_PROJECT tanımlanmamış.")
         if credentials and os.path.exists(credentials):
             os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = credentials
-        return _sdk.Client(vertexai=True, project=project, location=location)
+        return get_client_pool().get_vertex(project, location)
 
     # AI Studio: ilk geçerli anahtarı kullan
     key = _load_keys()[0]
-    return _sdk.Client(api_key=key)
+    return get_client_pool().get(key)
@@ -0,0 +1,250 @@
+"""
+hedging.py
+----------
+Gemini çağrılarında kuyruk gecikmesini kısaltmak için hedged request.
+
+Bazı çağrılar 65 sn'lik call_with_timeout dolana kadar asılı kalıyor ve scraper
+süresini bunlar belirliyor. Hedging açıkken:
+
+- Model başına son başarılı çağrıların gecikmesi tutulur; eşik bu pencerenin
+  AI_HEDGE_PERCENTILE yüzdeliğidir (varsayılan p95, en az AI_HEDGE_MIN_DELAY_SEC).
+- Çağrı eşiği aşarsa aynı istek farklı bir anahtara / sağlayıcıya ikinci kez
+  gönderilir (ilk çağrının tuttuğu anahtar, thread-safe `claimed` kümesiyle dışlanır).
+- İlk başarılı yanıt kazanır; diğeri iptal edilir (henüz başlamadıysa hiç
+  çalışmaz, başladıysa sonucu yok sayılır).
+- Bütçe: her çağrı AI_HEDGE_BUDGET kadar kredi biriktirir (varsayılan 0.05 →
+  en fazla ~%5 ek istek); kredi yoksa hedge gönderilmez, kota ikiye katlanmaz.
+- Pencerede AI_HEDGE_MIN_SAMPLES'tan az örnek varsa hedge yapılmaz.
+
+Ayarlar (env):
+    AI_HEDGE                 true/false (varsayılan: false)
+    AI_HEDGE_PERCENTILE      eşik yüzdeliği (varsayılan 95)
+    AI_HEDGE_MIN_DELAY_SEC   eşiğin alt sınırı (varsayılan 2)
+    AI_HEDGE_MIN_SAMPLES     eşik için gereken örnek sayısı (varsayılan 20)
+    AI_HEDGE_WINDOW          model başına tutulan gecikme sayısı (varsayılan 200)
+    AI_HEDGE_BUDGET          çağrı başına hedge kredisi (varsayılan 0.05)
+    AI_HEDGE_WORKERS         hedge thread havuzu boyutu (varsayılan 32)
+
+Kullanım:
+    from src.utils.hedging import get_hedger, get_hedge_stats
+
+    hedger = get_hedger()
+    text = hedger.run(model_name, lambda claimed: router.generate(..., claimed=claimed))
+    print(get_hedge_stats())
+"""
+
+import os
+import time
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as _FutureTimeout
+from typing import Any, Callable, Deque, Dict, Optional, Set
+
+
+def is_hedging_enabled() -> bool:
+    return os.getenv("AI_HEDGE", "false").lower() == "true"
+
+
+class LatencyWindow:
+    """Son N başarılı çağrının gecikmesi; yüzdelik eşik hesabı."""
+
+    def __init__(self, size: int):
+        self._samples: Deque[float] = deque(maxlen=size)
+
+    def add(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+        return ordered[index]
+
+
+class ClaimSet:
+    """
+    Hedge kopyaları arasında paylaşılan anahtar etiketleri. Kopyalar ayrı thread'lerde
+    çalıştığı için kontrol + ekleme tek kilit altında yapılır (claim).
+    """
+
+    def __init__(self):
+        self._labels: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def claim(self, label: str) -> bool:
+        """Etiketi al; diğer kopya daha önce aldıysa False."""
+        with self._lock:
+            if label in self._labels:
+                return False
+            self._labels.add(label)
+            return True
+
+    def snapshot(self) -> Set[str]:
+        with self._lock:
+            return set(self._labels)
+
+    def __contains__(self, label: object) -> bool:
+        with self._lock:
+            return label in self._labels
+
+
+class HedgeBudget:
+    """Çağrı başına `ratio` kredi biriktirir; hedge 1 kredi harcar (en fazla `burst` birikir)."""
+
+    def __init__(self, ratio: float, burst: float = 2.0):
+        self.ratio = ratio
+        self.burst = burst
+        self._credits = 0.0
+
+    def on_call(self) -> None:
+        self._credits = min(self.burst, self._credits + self.ratio)
+
+    def try_spend(self) -> bool:
+        if self._credits < 1.0:
+            return False
+        self._credits -= 1.0
+        return True
+
+
+class Hedger:
+    """Eşik aşılırsa çağrının ikinci kopyasını başlatır; ilk başarılı yanıtı döndürür."""
+
+    def __init__(self, percentile: float = 95.0, min_delay: float = 2.0, min_samples: int = 20,
+                 window: int = 200, budget: float = 0.05, workers: int = 32):
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self.window = window
+        self.budget = HedgeBudget(budget)
+        self._lock = threading.Lock()
+        self._windows: Dict[str, LatencyWindow] = {}
+        self._stats: Dict[str, int] = {
+            "calls": 0, "hedged": 0, "hedge_wins": 0, "primary_wins": 0, "budget_denied": 0,
+        }
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ai-hedge")
+
+    def _window(self, key: str) -> LatencyWindow:
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None:
+                window = LatencyWindow(self.window)
+                self._windows[key] = window
+            return window
+
+    def threshold(self, key: str) -> Optional[float]:
+        """Hedge eşiği (sn); yeterli örnek yoksa None."""
+        window = self._window(key)
+        with self._lock:
+            if len(window) < self.min_samples:
+                return None
+            value = window.percentile(self.percentile)
+        return max(self.min_delay, value) if value is not None else None
+
+    def _timed(self, key: str, attempt: Callable[[ClaimSet], Any], claimed: ClaimSet) -> Any:
+        started = time.monotonic()
+        result = attempt(claimed)
+        elapsed = time.monotonic() - started
+        window = self._window(key)
+        with self._lock:
+            window.add(elapsed)
+        return result
+
+    def _submit(self, key: str, attempt: Callable[[ClaimSet], Any], claimed: ClaimSet) -> Future:
+        ctx = contextvars.copy_context()  # telemetri kaydı / run_budget hedge thread'inde de görünsün
+        return self._executor.submit(ctx.run, self._timed, key, attempt, claimed)
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+    def run(self, key: str, attempt: Callable[[ClaimSet], Any]) -> Any:
+        """
+        attempt(claimed) çağrısını çalıştırır. `claimed` iki kopya arasında paylaşılır:
+        bir kopyanın aldığı anahtar etiketi claim() ile eklenir, diğeri onu seçmez.
+        """
+        claimed = ClaimSet()
+        threshold = self.threshold(key)
+        with self._lock:
+            self._stats["calls"] += 1
+            self.budget.on_call()
+        if threshold is None:
+            return self._timed(key, attempt, claimed)
+
+        primary = self._submit(key, attempt, claimed)
+        try:
+            return primary.result(timeout=threshold)
+        except _FutureTimeout:
+            pass
+        with self._lock:
+            allowed = self.budget.try_spend()
+        if not allowed:
+            self._count("budget_denied")
+            return primary.result()
+
+        self._count("hedged")
+        print(f"[Hedge] {key} çağrısı {threshold:.1f}s eşiğini aştı, ikinci istek gönderiliyor...")
+        hedge = self._submit(key, attempt, claimed)
+        pending = {primary, hedge}
+        first_error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                error = future.exception()
+                if error is None:
+                    self._count("hedge_wins" if future is hedge else "primary_wins")
+                    for loser in pending:
+                        loser.cancel()
+                    return future.result()
+                first_error = first_error or error
+        raise first_error  # type: ignore[misc]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            result: Dict[str, Any] = dict(self._stats)
+            calls = result["calls"]
+            result["hedge_rate"] = round(result["hedged"] / calls, 4) if calls else 0.0
+            result["hedge_win_rate"] = round(result["hedge_wins"] / result["hedged"], 3) if result["hedged"] else 0.0
+            keys = list(self._windows)
+        thresholds = {}
+        for key in keys:
+            value = self.threshold(key)
+            if value is not None:
+                thresholds[key] = round(value, 2)
+        result["thresholds_sec"] = thresholds
+        return result
+
+
+# ─── Süreç geneli tekil hedger ───────────────────────────────────────────────
+_hedger_instance: Optional[Hedger] = None
+_hedger_lock = threading.Lock()
+
+
+def get_hedger() -> Optional[Hedger]:
+    """AI_HEDGE=true ise env ayarlarıyla kurulmuş tekil Hedger, aksi halde None."""
+    global _hedger_instance
+    if not is_hedging_enabled():
+        return None
+    if _hedger_instance is not None:
+        return _hedger_instance
+    with _hedger_lock:
+        if _hedger_instance is None:
+            _hedger_instance = Hedger(
+                percentile=float(os.getenv("AI_HEDGE_PERCENTILE", "95")),
+                min_delay=float(os.getenv("AI_HEDGE_MIN_DELAY_SEC", "2")),
+                min_samples=int(os.getenv("AI_HEDGE_MIN_SAMPLES", "20")),
+                window=int(os.getenv("AI_HEDGE_WINDOW", "200")),
+                budget=float(os.getenv("AI_HEDGE_BUDGET", "0.05")),
+                workers=int(os.getenv("AI_HEDGE_WORKERS", "32")),
+            )
+    return _hedger_instance
+
+
+def get_hedge_stats() -> Dict[str, Any]:
+    """Hedge oranı, kazanan kopya sayıları ve model başına güncel eşikler."""
+    return _hedger_instance.stats() if _hedger_instance is not None else {}
@@ -0,0 +1,228 @@
+"""
+key_pool.py
+-----------
+Gemini API anahtar havuzu ve sağlık odaklı zamanlayıcı.
+
+- Herhangi sayıda anahtar: GEMINI_API_KEY, GEMINI_API_KEY_1 ... GEMINI_API_KEY_N
+  ve/veya virgülle ayrılmış GEMINI_API_KEYS.
+- Her anahtar için: 429 sonrası cooldown (sunucunun "retry in Ns" ipucuna uyar),
+  günlük kota bitişi (sıfırlanma saatine kadar kapalı), son gecikmelerin EWMA'sı.
+- Her çağrıda en sağlıklı anahtar önce seçilir; tükenmiş anahtar her seferinde
+  yeniden denenip 429 yemez.
+- AI_QUOTA_LEDGER açıksa rezervasyon ve 429 blokları diğer süreçlerle ortak
+  quota_ledger üzerinden yapılır (öncelik sınıfına göre pay).
+
+Kullanım:
+    from src.utils.key_pool import get_key_pool
+
+    pool = get_key_pool()
+    state = pool.acquire(exclude=set(), tokens=1200)
+    ...
+    pool.report_success(state.label, latency_sec)
+    pool.report_rate_limit(state.label, error, default_cooldown=5.0)
+    print(pool.stats())
+"""
+
+import os
+import re
+import time
+import threading
+from typing import Any, Dict, List, Optional, Set
+
+from src.utils.rate_limiter import get_rate_limiter, RateLimitExhausted # type: ignore
+from src.utils.quota_ledger import get_quota_ledger # type: ignore
+
+
+_KEY_ENV_PATTERN = re.compile(r"^GEMINI_API_KEY(?:_(\d+))?$")
+_RETRY_HINT_PATTERNS = [
+    re.compile(r"retry in (\d+(?:\.\d+)?)\s*s", re.IGNORECASE),
+    re.compile(r"retry[_ ]?delay['\"]?\s*[:=]\s*['\"]?(\d+(?:\.\d+)?)s", re.IGNORECASE),
+    re.compile(r"retry-after['\"]?\s*[:=]\s*['\"]?(\d+(?:\.\d+)?)", re.IGNORECASE),
+]
+# Gecikme EWMA katsayısı (son çağrıların ağırlığı)
+_LATENCY_ALPHA = 0.3
+
+
+def load_api_keys() -> List[str]:
+    """Ortamdaki tüm Gemini anahtarlarını sıralı ve tekilleştirilmiş olarak döndürür."""
+    numbered = []
+    for name, value in os.environ.items():
+        match = _KEY_ENV_PATTERN.match(name)
+        if match and value.strip():
+            order = int(match.group(1)) if match.group(1) else -1
+            numbered.append((order, value.strip()))
+    keys = [v for _, v in sorted(numbered)]
+    keys += [k.strip() for k in os.getenv("GEMINI_API_KEYS", "").split(",") if k.strip()]
+
+    unique: List[str] = []
+    for k in keys:
+        if k not in unique:
+            unique.append(k)
+    if not unique:
+        raise ValueError(
+            "Hiç Gemini API anahtarı bulunamadı. "
+            "GEMINI_API_KEY, GEMINI_API_KEY_1..N veya GEMINI_API_KEYS env değişkenlerinden "
+            "en az birini tanımlayın."
+        )
+    return unique
+
+
+def parse_retry_after(error: Any) -> Optional[float]:
+    """Hata mesajındaki 'retry in 37s' / retryDelay ipucunu saniye olarak çıkarır."""
+    text = str(error)
+    for pattern in _RETRY_HINT_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            try:
+                return float(match.group(1))
+            except ValueError:
+                continue
+    return None
+
+
+def is_daily_quota_error(error: Any) -> bool:
+    err = str(error).lower()
+    return "perday" in err or "per_day" in err or "requests per day" in err
+
+
+class KeyState:
+    """Tek anahtarın sağlık bilgisi."""
+
+    __slots__ = ("label", "index", "key", "latency_ewma", "successes", "errors",
+                 "rate_limits", "recent_rate_limits", "last_error", "last_used_at")
+
+    def __init__(self, label: str, index: int, key: str):
+        self.label = label
+        self.index = index
+        self.key = key
+        self.latency_ewma: Optional[float] = None
+        self.successes = 0
+        self.errors = 0
+        self.rate_limits = 0
+        self.recent_rate_limits = 0.0
+        self.last_error: Optional[str] = None
+        self.last_used_at = 0.0
+
+    def health_score(self) -> float:
+        """Düşük = daha sağlıklı. Hiç kullanılmamış anahtar önce denenir."""
+        latency = self.latency_ewma if self.latency_ewma is not None else 0.0
+        return latency + 5.0 * self.recent_rate_limits
+
+
+class KeyPool:
+    """Anahtarları sağlık skoruna ve rate limiter bütçesine göre sıralayan havuz."""
+
+    def __init__(self, keys: List[str]):
+        self._lock = threading.Lock()
+        self.limiter = get_rate_limiter()
+        self._states: List[KeyState] = [KeyState(f"key{i + 1}", i, k) for i, k in enumerate(keys)]
+        self._by_label: Dict[str, KeyState] = {s.label: s for s in self._states}
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    @property
+    def labels(self) -> List[str]:
+        return [s.label for s in self._states]
+
+    def get(self, label: str) -> KeyState:
+        return self._by_label[label]
+
+    def acquire(self, exclude: Optional[Set[str]] = None, tokens: int = 0) -> KeyState:
+        """
+        En sağlıklı uygun anahtarı seçer ve rate limiter bütçesinden pay ayırır.
+        Önce en kısa sürede hazır olan anahtarlar, eşitlikte en düşük sağlık skoru seçilir.
+        """
+        exclude = exclude or set()
+        with self._lock:
+            candidates = [s for s in self._states if s.label not in exclude]
+            if not candidates:
+                raise RateLimitExhausted("Denenecek başka Gemini anahtarı kalmadı.")
+            ranked = sorted(
+                candidates,
+                # Skor 0.5s'lik dilimlere yuvarlanır; benzer sağlıktaki anahtarlar sırayla (round-robin) kullanılır
+                key=lambda s: (round(self.limiter.peek(s.label, tokens), 1), round(s.health_score() * 2) / 2, s.last_used_at),
+            )
+            chosen = ranked[0]
+            if self.limiter.peek(chosen.label, tokens) == float("inf"):
+                raise RateLimitExhausted("Tüm Gemini anahtarlarının günlük kotası doldu.")
+            chosen.last_used_at = time.monotonic()
+        ledger = get_quota_ledger()
+        if ledger is not None:
+            # Süreçler arası ortak bütçe: sırayla ilk uygun anahtar (gerekirse öncelik sınıfına göre bekler)
+            usable = [s for s in ranked if self.limiter.peek(s.label, tokens) != float("inf")]
+            label = ledger.reserve_any([(s.label, s.key) for s in usable], tokens)
+            chosen = self._by_label[label]
+            chosen.last_used_at = time.monotonic()
+        self.limiter.acquire(chosen.label, tokens)
+        return chosen
+
+    def report_success(self, label: str, latency_sec: float) -> None:
+        with self._lock:
+            state = self._by_label[label]
+            state.successes += 1
+            state.recent_rate_limits /= 2.0
+            if state.latency_ewma is None:
+                state.latency_ewma = latency_sec
+            else:
+                state.latency_ewma = _LATENCY_ALPHA * latency_sec + (1 - _LATENCY_ALPHA) * state.latency_ewma
+
+    def report_rate_limit(self, label: str, error: Any, default_cooldown: float = 5.0) -> float:
+        """429 sonrası anahtarı dinlendirir; uygulanan cooldown süresini döndürür."""
+        with self._lock:
+            state = self._by_label[label]
+            state.rate_limits += 1
+            state.recent_rate_limits += 1.0
+            state.last_error = str(error)[:200]
+        ledger = get_quota_ledger()
+        if is_daily_quota_error(error):
+            self.limiter.mark_day_exhausted(label)
+            if ledger is not None:
+                ledger.block(state.key, float("inf"), "daily_quota")
+            return float("inf")
+        cooldown = parse_retry_after(error) or default_cooldown
+        self.limiter.penalize(label, cooldown)
+        if ledger is not None:
+            ledger.block(state.key, cooldown, "rate_limit")
+        return cooldown
+
+    def report_error(self, label: str, error: Any) -> None:
+        with self._lock:
+            state = self._by_label[label]
+            state.errors += 1
+            state.last_error = str(error)[:200]
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        limiter_stats = self.limiter.stats()
+        with self._lock:
+            result = {}
+            for s in self._states:
+                entry: Dict[str, Any] = {
+                    "successes": s.successes,
+                    "errors": s.errors,
+                    "rate_limits": s.rate_limits,
+                    "latency_ewma_sec": round(s.latency_ewma, 2) if s.latency_ewma is not None else None,
+                    "health_score": round(s.health_score(), 2),
+                    "ready_in_sec": round(self.limiter.peek(s.label, 0), 1),
+                    "last_error": s.last_error,
+                }
+                entry.update(limiter_stats.get(s.label, {}))
+                result[s.label] = entry
+            return result
+
+
+# ─── Süreç geneli tekil havuz ────────────────────────────────────────────────
+_pool_instance: Optional[KeyPool] = None
+_pool_keys: Optional[List[str]] = None
+_pool_lock = threading.Lock()
+
+
+def get_key_pool() -> KeyPool:
+    """Ortamdaki anahtarlarla kurulmuş tekil KeyPool (anahtarlar değişirse yeniden kurulur)."""
+    global _pool_instance, _pool_keys
+    keys = load_api_keys()
+    with _pool_lock:
+        if _pool_instance is None or keys != _pool_keys:
+            _pool_instance = KeyPool(keys)
+            _pool_keys = keys
+    return _pool_instance
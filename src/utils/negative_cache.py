@@ -0,0 +1,245 @@
+"""
+negative_cache.py
+-----------------
+AI ayrıştırmasında tekrar tekrar başarısız olan içerikler için negatif önbellek.
+Gemini bir sayfa için hata / bozuk JSON / boş yanıt döndürdüğünde içerik hash'i ile
+başarısızlık nedeni, deneme sayısı ve bir sonraki deneme zamanı kaydedilir.
+Bekleme süresi her başarısızlıkta katlanır (üstel geri çekilme); süre dolmadan aynı
+içerik tekrar gelirse AI çağrısı yapılmaz, çağıran kural tabanlı yola / fallback'e geçer.
+Başarılı bir ayrıştırma kaydı siler.
+
+Yalnızca içerikten kaynaklanan hatalar kaydedilir; 429 / kota / 503 hataları içeriğin
+suçu olmadığı için kaydedilmez.
+
+Kayıtlar DATABASE_URL veritabanındaki ai_negative_cache tablosunda tutulur; GitHub
+Actions runner'ları her çalışmada sıfırdan açıldığı için yerel dosya orada bir sonraki
+çalışmaya taşınmaz. DATABASE_URL yoksa (yerel çalıştırma) veya tabloya ulaşılamazsa
+AI_NEGATIVE_CACHE_PATH SQLite dosyası kullanılır.
+
+Ayarlar (env):
+    AI_NEGATIVE_CACHE             true/false (varsayılan: true)
+    AI_NEGATIVE_CACHE_BACKEND     auto | postgres | sqlite (varsayılan: auto = DATABASE_URL varsa postgres)
+    AI_NEGATIVE_CACHE_PATH        yerel dosya (varsayılan: .cache/ai_failures.sqlite3)
+    AI_NEGATIVE_CACHE_BASE_HOURS  ilk başarısızlık sonrası bekleme (varsayılan: 6)
+    AI_NEGATIVE_CACHE_MAX_HOURS   bekleme üst sınırı (varsayılan: 336 = 14 gün)
+
+Kullanım:
+    from src.utils.negative_cache import get_negative_cache, content_key
+
+    neg = get_negative_cache()
+    key = content_key("html", clean_text)
+    entry = neg.check(key)
+    if entry is not None and entry.blocked:
+        ...  # AI'yi atla
+    neg.record_failure(key, "malformed_json")
+    neg.record_success(key)
+
+    python -m src.utils.negative_cache --list
+    python -m src.utils.negative_cache --clear
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+from typing import Any, Dict, List, Optional
+
+from src.utils.sql_store import backend_mode, open_backend # type: ignore
+
+
+def content_key(kind: str, *parts: Optional[str]) -> str:
+    """İçerik hash'i: tür ('html' / 'api') + temizlenmiş metin parçaları."""
+    payload = "\x1f".join([kind] + [p or "" for p in parts])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def failure_reason(error: Any) -> str:
+    """İstisnadan kısa, gruplanabilir başarısızlık nedeni."""
+    if isinstance(error, str):
+        return error
+    name = type(error).__name__
+    if isinstance(error, ValueError):  # json.JSONDecodeError dahil
+        return "empty_response" if str(error) == "empty_response" else "malformed_json"
+    if "timeout" in name.lower():
+        return "timeout"
+    return f"{name}: {str(error)[:80]}"
+
+
+def is_transient_error(error: Any) -> bool:
+    """Kota / geçici sunucu hataları içerikten bağımsızdır; negatif önbelleğe yazılmaz."""
+    err = str(error).lower()
+    return any(t in err for t in ("429", "resource exhausted", "resourceexhausted", "quota", "rate_limit",
+                                   "503", "unavailable", "overloaded", "tüm gemini api anahtarları tükendi"))
+
+
+class FailureEntry:
+    """Tek içeriğin başarısızlık kaydı."""
+
+    __slots__ = ("key", "reason", "attempts", "first_failed_at", "last_failed_at", "retry_at", "label")
+
+    def __init__(self, key: str, reason: str, attempts: int, first_failed_at: float,
+                 last_failed_at: float, retry_at: float, label: Optional[str] = None):
+        self.key = key
+        self.reason = reason
+        self.attempts = attempts
+        self.first_failed_at = first_failed_at
+        self.last_failed_at = last_failed_at
+        self.retry_at = retry_at
+        self.label = label
+
+    @property
+    def blocked(self) -> bool:
+        """Tekrar deneme zamanı gelmedi mi?"""
+        return self.retry_at > time.time()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+_DDL = (
+    "CREATE TABLE IF NOT EXISTS ai_negative_cache ("
+    " content_key TEXT PRIMARY KEY,"
+    " reason TEXT NOT NULL,"
+    " attempts INTEGER NOT NULL,"
+    " first_failed_at DOUBLE PRECISION NOT NULL,"
+    " last_failed_at DOUBLE PRECISION NOT NULL,"
+    " retry_at DOUBLE PRECISION NOT NULL,"
+    " label TEXT)",
+)
+
+_COLUMNS = "content_key, reason, attempts, first_failed_at, last_failed_at, retry_at, label"
+
+
+class NegativeCache:
+    """Başarısızlık deposu; arka uç DATABASE_URL tablosu ya da yerel SQLite dosyası."""
+
+    def __init__(self, backend: Any, base_hours: float = 6.0, max_hours: float = 336.0):
+        self.backend = backend
+        self.base_sec = base_hours * 3600
+        self.max_sec = max_hours * 3600
+        self._lock = threading.Lock()
+        self._counters = {"checks": 0, "blocked": 0, "failures": 0, "recoveries": 0}
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
+
+    def backoff(self, attempts: int) -> float:
+        """attempts. başarısızlıktan sonra beklenecek süre (saniye)."""
+        return min(self.base_sec * (2 ** max(attempts - 1, 0)), self.max_sec)
+
+    def check(self, key: str) -> Optional[FailureEntry]:
+        """Kayıt varsa döndürür (engelli olmasa da); yoksa None."""
+        self._count("checks")
+        with self.backend.transaction() as query:
+            rows = query(f"SELECT {_COLUMNS} FROM ai_negative_cache WHERE content_key = :k", k=key)
+        if not rows:
+            return None
+        entry = FailureEntry(*rows[0])
+        if entry.blocked:
+            self._count("blocked")
+        return entry
+
+    def record_failure(self, key: str, reason: str, label: Optional[str] = None) -> FailureEntry:
+        now = time.time()
+        # Aynı içeriği aynı anda işleyen runner'lar deneme sayısını birlikte artırsın
+        with self.backend.transaction(lock_key=f"neg:{key}") as query:
+            rows = query("SELECT attempts, first_failed_at FROM ai_negative_cache WHERE content_key = :k", k=key)
+            attempts = (rows[0][0] if rows else 0) + 1
+            first = rows[0][1] if rows else now
+            retry_at = now + self.backoff(attempts)
+            query(
+                f"INSERT INTO ai_negative_cache ({_COLUMNS})"
+                " VALUES (:k, :reason, :attempts, :first, :now, :retry_at, :label)"
+                " ON CONFLICT (content_key) DO UPDATE SET"
+                " reason = excluded.reason, attempts = excluded.attempts,"
+                " last_failed_at = excluded.last_failed_at, retry_at = excluded.retry_at,"
+                " label = excluded.label",
+                k=key, reason=reason[:200], attempts=attempts, first=first, now=now,
+                retry_at=retry_at, label=label,
+            )
+        self._count("failures")
+        return FailureEntry(key, reason, attempts, first, now, retry_at, label)
+
+    def record_success(self, key: str) -> None:
+        with self.backend.transaction() as query:
+            rows = query("DELETE FROM ai_negative_cache WHERE content_key = :k RETURNING content_key", k=key)
+        if rows:
+            self._count("recoveries")
+
+    def entries(self, limit: int = 100) -> List[FailureEntry]:
+        with self.backend.transaction() as query:
+            rows = query(f"SELECT {_COLUMNS} FROM ai_negative_cache ORDER BY last_failed_at DESC LIMIT :n", n=limit)
+        return [FailureEntry(*row) for row in rows]
+
+    def clear(self) -> None:
+        with self.backend.transaction() as query:
+            query("DELETE FROM ai_negative_cache")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters: Dict[str, Any] = dict(self._counters)
+        counters["backend"] = self.backend.name
+        with self.backend.transaction() as query:
+            counters["entries"] = query("SELECT COUNT(*) FROM ai_negative_cache")[0][0]
+            counters["by_reason"] = {reason: n for reason, n in query(
+                "SELECT reason, COUNT(*) FROM ai_negative_cache GROUP BY reason ORDER BY COUNT(*) DESC LIMIT 10"
+            )}
+        return counters
+
+
+# ─── Süreç geneli tekil depo ─────────────────────────────────────────────────
+_neg_instance: Optional[NegativeCache] = None
+_neg_lock = threading.Lock()
+
+
+def is_negative_cache_enabled() -> bool:
+    return os.getenv("AI_NEGATIVE_CACHE", "true").lower() == "true"
+
+
+def get_negative_cache() -> Optional[NegativeCache]:
+    """Env ayarlarına göre tekil NegativeCache; kapalıysa veya depo açılamazsa None."""
+    global _neg_instance
+    if not is_negative_cache_enabled():
+        return None
+    if _neg_instance is not None:
+        return _neg_instance
+    with _neg_lock:
+        if _neg_instance is None:
+            path = os.getenv("AI_NEGATIVE_CACHE_PATH", os.path.join(".cache", "ai_failures.sqlite3"))
+            try:
+                backend = open_backend(backend_mode("AI_NEGATIVE_CACHE_BACKEND"), path, _DDL, label="NegativeCache")
+                _neg_instance = NegativeCache(
+                    backend,
+                    base_hours=float(os.getenv("AI_NEGATIVE_CACHE_BASE_HOURS", "6")),
+                    max_hours=float(os.getenv("AI_NEGATIVE_CACHE_MAX_HOURS", "336")),
+                )
+            except Exception as e:
+                print(f"[NegativeCache] ⚠️ Depo açılamadı ({path}): {e}. Negatif önbellek kapalı.")
+                return None
+    return _neg_instance
+
+
+if __name__ == "__main__":
+    import argparse
+    from datetime import datetime
+
+    cli = argparse.ArgumentParser()
+    cli.add_argument("--list", action="store_true", help="Son başarısızlıkları listele")
+    cli.add_argument("--limit", type=int, default=50)
+    cli.add_argument("--clear", action="store_true", help="Tüm kayıtları sil")
+    args = cli.parse_args()
+
+    neg = get_negative_cache()
+    if neg is None:
+        print("Negatif önbellek kapalı (AI_NEGATIVE_CACHE=false).")
+    else:
+        if args.list:
+            for e in neg.entries(args.limit):
+                retry = datetime.fromtimestamp(e.retry_at).strftime("%Y-%m-%d %H:%M")
+                print(f"{e.key[:12]}  x{e.attempts:<3} retry={retry}  {e.label or '-':<40.40}  {e.reason}")
+            print(json.dumps(neg.stats(), ensure_ascii=False, indent=1))
+        if args.clear:
+            neg.clear()
+            print("🧹 Negatif önbellek temizlendi.")
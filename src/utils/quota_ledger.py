@@ -0,0 +1,319 @@
+"""
+quota_ledger.py
+---------------
+Süreçler arası ortak Gemini kota defteri (öncelik sınıflı).
+
+Scraper'lar, data_quality_autofix, generate_seo_blog, auto_seo_pillar_generator ve
+generate_sector_comparisons ayrı cron süreçleri olarak aynı 2-3 anahtarı kullanıyor;
+rate_limiter yalnızca kendi sürecinin tüketimini bildiği için 429'larda çakışıyorlar.
+Defter her isteği ortak bir tabloya atomik olarak yazar ve anahtar başına RPM / TPM /
+RPD bütçesini tüm süreçler için birlikte uygular:
+
+- Öncelik sınıfları: scrape (yeni kampanyalar) > autofix > content (SEO içerikleri).
+  Düşük sınıf bütçenin yalnızca bir payını kullanabilir (AI_LEDGER_SHARE_*); kalan
+  pay yüksek önceliğe ayrılır.
+- Bütçe doluysa düşük öncelikli iş hata vermek yerine bekler (jitter'lı geri çekilme,
+  en fazla AI_LEDGER_MAX_WAIT_SEC); günlük payı bittiyse RateLimitExhausted.
+- Bir süreç 429 / günlük kota hatası alırsa anahtar defterde bloklanır; diğer süreçler
+  o anahtarı aynı hatayı yemeden atlar.
+- Anahtarlar defterde sha256 parmak iziyle tutulur (anahtarın kendisi yazılmaz).
+- Defter erişilemezse çağrılar engellenmez (fail-open), yalnızca uyarı basılır.
+
+Arka uçlar:
+    postgres  DATABASE_URL veritabanında ai_quota_ledger / ai_quota_blocks tabloları
+              (GitHub Actions runner'ları arasında paylaşılan tek ortak kaynak);
+              anahtar başına pg_advisory_xact_lock ile atomik rezervasyon.
+    sqlite    AI_LEDGER_PATH dosyası; aynı makinedeki süreçler için (BEGIN IMMEDIATE).
+
+Ayarlar (env):
+    AI_QUOTA_LEDGER           off | sqlite | postgres (varsayılan: off)
+    AI_LEDGER_PATH            sqlite dosyası (varsayılan: .cache/quota_ledger.sqlite3)
+    AI_PRIORITY               sürecin varsayılan sınıfı (scrape | autofix | content)
+    AI_LEDGER_SHARE_AUTOFIX   autofix'in kullanabileceği bütçe payı (varsayılan 0.8)
+    AI_LEDGER_SHARE_CONTENT   content'in kullanabileceği bütçe payı (varsayılan 0.5)
+    AI_LEDGER_MAX_WAIT_SEC    rezervasyon için en uzun bekleme (varsayılan 300)
+    GEMINI_RPM / GEMINI_TPM / GEMINI_RPD  anahtar başına toplam bütçe (rate_limiter ile aynı)
+
+Kullanım:
+    from src.utils.quota_ledger import get_quota_ledger, set_default_priority, use_priority
+
+    set_default_priority("content")          # SEO betiğinin main() başında
+    with use_priority("autofix"):
+        generate_with_rotation(...)          # key_pool rezervasyonu defterden geçer
+
+    python -m src.utils.quota_ledger --stats
+"""
+
+import os
+import time
+import random
+import hashlib
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Sequence, Tuple
+
+from src.utils.rate_limiter import RateLimitExhausted, next_quota_reset # type: ignore
+from src.utils.deadline import current_deadline # type: ignore
+from src.utils.sql_store import PostgresBackend, SqliteBackend # type: ignore
+
+PRIORITIES: Dict[str, int] = {"scrape": 0, "autofix": 1, "content": 2}
+_WINDOW_SEC = 60.0
+_RETENTION_SEC = 26 * 3600
+_FAIL_OPEN_RETRY_SEC = 60.0
+
+_DDL = (
+    "CREATE TABLE IF NOT EXISTS ai_quota_ledger ("
+    " key_id TEXT NOT NULL,"
+    " ts DOUBLE PRECISION NOT NULL,"
+    " tokens INTEGER NOT NULL,"
+    " priority INTEGER NOT NULL,"
+    " owner TEXT)",
+    "CREATE INDEX IF NOT EXISTS ai_quota_ledger_key_ts ON ai_quota_ledger (key_id, ts)",
+    "CREATE TABLE IF NOT EXISTS ai_quota_blocks ("
+    " key_id TEXT PRIMARY KEY,"
+    " until DOUBLE PRECISION NOT NULL,"
+    " reason TEXT)",
+)
+
+
+# ─── Öncelik sınıfı ──────────────────────────────────────────────────────────
+_priority: contextvars.ContextVar = contextvars.ContextVar("ai_priority", default=None)
+_default_priority: Optional[str] = None
+
+
+def _check_priority(name: str) -> str:
+    if name not in PRIORITIES:
+        raise ValueError(f"Bilinmeyen öncelik sınıfı: {name} (geçerli: {', '.join(PRIORITIES)})")
+    return name
+
+
+def set_default_priority(name: str) -> None:
+    """Sürecin varsayılan öncelik sınıfı (betiklerin main() başında çağrılır)."""
+    global _default_priority
+    _default_priority = _check_priority(name)
+
+
+@contextmanager
+def use_priority(name: str) -> Iterator[None]:
+    """Blok içindeki (ve oradan başlatılan thread/async) çağrıların öncelik sınıfı."""
+    token = _priority.set(_check_priority(name))
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority() -> str:
+    name = _priority.get() or _default_priority or os.getenv("AI_PRIORITY", "scrape")
+    return name if name in PRIORITIES else "scrape"
+
+
+def key_id(api_key: str) -> str:
+    """Deftere yazılan anahtar kimliği (anahtarın kendisi saklanmaz)."""
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+
+
+# ─── Defter ──────────────────────────────────────────────────────────────────
+class QuotaLedger:
+    """Anahtar başına ortak RPM / TPM / RPD bütçesi; öncelik sınıfına göre pay."""
+
+    def __init__(self, backend: Any, rpm: int, tpm: int, rpd: int,
+                 shares: Optional[Dict[str, float]] = None, max_wait: float = 300.0):
+        self.backend = backend
+        self.rpm = rpm
+        self.tpm = tpm
+        self.rpd = rpd
+        self.shares = {"scrape": 1.0, "autofix": 0.8, "content": 0.5}
+        self.shares.update(shares or {})
+        self.max_wait = max_wait
+        self.owner = f"{os.uname().nodename if hasattr(os, 'uname') else 'host'}:{os.getpid()}"
+        self._lock = threading.Lock()
+        self._disabled_until = 0.0
+        self._reservations = 0
+        self._counters: Dict[str, float] = {"reserved": 0, "waits": 0, "waited_sec": 0.0, "errors": 0}
+
+    def _limit(self, total: int, priority: str) -> float:
+        return float("inf") if total <= 0 else total * self.shares.get(priority, 1.0)
+
+    def try_reserve(self, kid: str, tokens: int, priority: str) -> float:
+        """Bütçe varsa rezervasyonu yazar ve 0 döndürür; yoksa beklenecek saniye (inf = günlük pay bitti)."""
+        now = time.time()
+        day_start = next_quota_reset(now) - 86400
+        with self.backend.transaction(lock_key=kid) as query:
+            block = query("SELECT until FROM ai_quota_blocks WHERE key_id = :k", k=kid)
+            if block and block[0][0] > now:
+                until = block[0][0]
+                return float("inf") if until >= next_quota_reset(now) else until - now
+            count, used_tokens, oldest = query(
+                "SELECT COUNT(*), COALESCE(SUM(tokens), 0), MIN(ts) FROM ai_quota_ledger"
+                " WHERE key_id = :k AND ts > :since", k=kid, since=now - _WINDOW_SEC
+            )[0]
+            today = query(
+                "SELECT COUNT(*) FROM ai_quota_ledger WHERE key_id = :k AND ts >= :since",
+                k=kid, since=day_start
+            )[0][0]
+            if today + 1 > self._limit(self.rpd, priority):
+                return float("inf")
+            if count + 1 > self._limit(self.rpm, priority) or \
+                    (count and used_tokens + tokens > self._limit(self.tpm, priority)):
+                return max(0.5, (oldest or now) + _WINDOW_SEC - now)
+            query(
+                "INSERT INTO ai_quota_ledger (key_id, ts, tokens, priority, owner)"
+                " VALUES (:k, :ts, :tokens, :priority, :owner)",
+                k=kid, ts=now, tokens=tokens, priority=PRIORITIES[priority], owner=self.owner
+            )
+            with self._lock:
+                self._reservations += 1
+                prune = self._reservations % 200 == 1
+            if prune:
+                query("DELETE FROM ai_quota_ledger WHERE ts < :before", before=now - _RETENTION_SEC)
+        return 0.0
+
+    def reserve_any(self, candidates: Sequence[Tuple[str, str]], tokens: int,
+                    priority: Optional[str] = None) -> str:
+        """
+        candidates: (etiket, api anahtarı) — tercih sırasıyla. Bütçesi olan ilk anahtar için
+        rezervasyon yapar ve etiketini döndürür; hiçbiri uygun değilse bekleyip tekrar dener.
+        """
+        priority = priority or current_priority()
+        waited = 0.0
+        deadline = current_deadline()
+        while True:
+            if time.monotonic() < self._disabled_until:
+                return candidates[0][0]
+            waits = []
+            try:
+                for label, api_key in candidates:
+                    wait = self.try_reserve(key_id(api_key), tokens, priority)
+                    if wait == 0.0:
+                        with self._lock:
+                            self._counters["reserved"] += 1
+                            self._counters["waited_sec"] += waited
+                        return label
+                    waits.append(wait)
+            except Exception as e:
+                # Defter erişilemiyor: çağrıları durdurma, bir süre yalnızca yerel limiter
+                with self._lock:
+                    self._counters["errors"] += 1
+                self._disabled_until = time.monotonic() + _FAIL_OPEN_RETRY_SEC
+                print(f"[QuotaLedger] ⚠️  Defter kullanılamıyor ({type(e).__name__}: {str(e)[:80]}); "
+                      f"{_FAIL_OPEN_RETRY_SEC:.0f}s yerel limitlerle devam.")
+                return candidates[0][0]
+
+            wait = min(waits)
+            if wait == float("inf"):
+                raise RateLimitExhausted(f"'{priority}' sınıfının günlük Gemini payı tüm anahtarlarda doldu.")
+            if waited + wait > self.max_wait:
+                raise RateLimitExhausted(
+                    f"'{priority}' sınıfı için {self.max_wait:.0f}s içinde ortak kota açılmadı."
+                )
+            if deadline is not None and deadline.remaining() < wait:
+                deadline.check()
+                raise RateLimitExhausted(f"Ortak kota beklemesi ({wait:.0f}s) çalıştırma bütçesini aşıyor.")
+            sleep = wait * random.uniform(1.0, 1.25)  # süreçler aynı anda uyanmasın
+            with self._lock:
+                self._counters["waits"] += 1
+            if sleep >= 1.0:
+                print(f"[QuotaLedger] '{priority}' ortak bütçesi dolu, {sleep:.1f}s bekleniyor...")
+            time.sleep(sleep)
+            waited += sleep
+
+    def block(self, api_key: str, seconds: float, reason: str) -> None:
+        """429 / günlük kota sonrası anahtarı tüm süreçler için blokla (inf = kota sıfırlanana kadar)."""
+        now = time.time()
+        until = next_quota_reset(now) if seconds == float("inf") else now + seconds
+        kid = key_id(api_key)
+        try:
+            with self.backend.transaction(lock_key=kid) as query:
+                current = query("SELECT until FROM ai_quota_blocks WHERE key_id = :k", k=kid)
+                if current:
+                    if current[0][0] < until:
+                        query("UPDATE ai_quota_blocks SET until = :until, reason = :reason WHERE key_id = :k",
+                              k=kid, until=until, reason=reason)
+                else:
+                    query("INSERT INTO ai_quota_blocks (key_id, until, reason) VALUES (:k, :until, :reason)",
+                          k=kid, until=until, reason=reason)
+        except Exception as e:
+            with self._lock:
+                self._counters["errors"] += 1
+            print(f"[QuotaLedger] ⚠️  Anahtar bloklanamadı: {type(e).__name__}: {str(e)[:80]}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Bu sürecin sayaçları ve defterdeki anahtar / sınıf başına son dakika ve bugünkü kullanım."""
+        now = time.time()
+        with self._lock:
+            result: Dict[str, Any] = dict(self._counters)
+        result["backend"] = self.backend.name
+        names = {v: k for k, v in PRIORITIES.items()}
+        with self.backend.transaction() as query:
+            rows = query(
+                "SELECT key_id, priority, COUNT(*), SUM(CASE WHEN ts > :minute THEN 1 ELSE 0 END)"
+                " FROM ai_quota_ledger WHERE ts >= :day GROUP BY key_id, priority",
+                minute=now - _WINDOW_SEC, day=next_quota_reset(now) - 86400
+            )
+            blocks = query("SELECT key_id, until, reason FROM ai_quota_blocks WHERE until > :now", now=now)
+        keys: Dict[str, Any] = {}
+        for kid, priority, today, minute in rows:
+            keys.setdefault(kid, {})[names.get(priority, str(priority))] = {"today": today, "last_minute": minute}
+        for kid, until, reason in blocks:
+            keys.setdefault(kid, {})["blocked_for_sec"] = round(until - now)
+            keys[kid]["block_reason"] = reason
+        result["keys"] = keys
+        return result
+
+
+# ─── Süreç geneli tekil defter ───────────────────────────────────────────────
+_ledger_instance: Optional[QuotaLedger] = None
+_ledger_failed = False
+_ledger_lock = threading.Lock()
+
+
+def ledger_mode() -> str:
+    return os.getenv("AI_QUOTA_LEDGER", "off").strip().lower()
+
+
+def get_quota_ledger() -> Optional[QuotaLedger]:
+    """AI_QUOTA_LEDGER açıksa tekil QuotaLedger; kapalıysa veya kurulamazsa None."""
+    global _ledger_instance, _ledger_failed
+    mode = ledger_mode()
+    if mode not in ("sqlite", "postgres") or _ledger_failed:
+        return None
+    if _ledger_instance is not None:
+        return _ledger_instance
+    with _ledger_lock:
+        if _ledger_instance is None and not _ledger_failed:
+            try:
+                if mode == "postgres":
+                    backend: Any = PostgresBackend(_DDL)
+                else:
+                    backend = SqliteBackend(os.getenv("AI_LEDGER_PATH", ".cache/quota_ledger.sqlite3"), _DDL)
+                _ledger_instance = QuotaLedger(
+                    backend,
+                    rpm=int(os.getenv("GEMINI_RPM", "15")),
+                    tpm=int(os.getenv("GEMINI_TPM", "250000")),
+                    rpd=int(os.getenv("GEMINI_RPD", "1000")),
+                    shares={
+                        "autofix": float(os.getenv("AI_LEDGER_SHARE_AUTOFIX", "0.8")),
+                        "content": float(os.getenv("AI_LEDGER_SHARE_CONTENT", "0.5")),
+                    },
+                    max_wait=float(os.getenv("AI_LEDGER_MAX_WAIT_SEC", "300")),
+                )
+            except Exception as e:
+                _ledger_failed = True
+                print(f"[QuotaLedger] ⚠️  Defter açılamadı ({type(e).__name__}: {str(e)[:80]}); yerel limitlerle devam.")
+    return _ledger_instance
+
+
+if __name__ == "__main__":
+    import json
+    import argparse
+
+    cli = argparse.ArgumentParser(description="Ortak Gemini kota defteri")
+    cli.add_argument("--stats", action="store_true", help="Anahtar / sınıf başına kullanım")
+    args = cli.parse_args()
+    ledger = get_quota_ledger()
+    if ledger is None:
+        print("Kota defteri kapalı (AI_QUOTA_LEDGER=sqlite|postgres ile açılır).")
+    else:
+        print(json.dumps(ledger.stats(), ensure_ascii=False, indent=2))
@@ -0,0 +1,239 @@
+"""
+rate_limiter.py
+---------------
+Gemini anahtarları için süreç geneli token-bucket hız sınırlayıcı.
+Her anahtarın kendi RPM (istek/dk), TPM (token/dk) ve RPD (istek/gün) bütçesi vardır.
+Sabit `time.sleep` yerine yalnızca bütçe gerçekten bittiğinde bekler; anahtar sayısı
+arttıkça toplam verim de artar.
+
+Ayarlar (env, anahtar başına; 0 = sınırsız):
+    GEMINI_RPM   (varsayılan: 15)
+    GEMINI_TPM   (varsayılan: 250000)
+    GEMINI_RPD   (varsayılan: 1000)
+
+Kullanım:
+    from src.utils.rate_limiter import get_rate_limiter
+
+    limiter = get_rate_limiter()
+    label, waited = limiter.acquire_any(["key1", "key2"], tokens=1200)
+    ...
+    limiter.penalize(label, 5.0)   # 429 alındıysa anahtarı kısa süre dinlendir
+    print(limiter.stats())
+"""
+
+import os
+import time
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+try:
+    from zoneinfo import ZoneInfo
+    _QUOTA_TZ = ZoneInfo("America/Los_Angeles")  # Gemini günlük kotası Pasifik gece yarısı sıfırlanır
+except Exception:  # tzdata yoksa UTC'ye düş
+    _QUOTA_TZ = None
+
+
+class RateLimitExhausted(RuntimeError):
+    """Hiçbir anahtarda günlük (RPD) bütçe kalmadığında fırlatılır."""
+    pass
+
+
+def next_quota_reset(now: Optional[float] = None) -> float:
+    """Bir sonraki günlük kota sıfırlanma zamanı (epoch saniye)."""
+    now = time.time() if now is None else now
+    if _QUOTA_TZ is not None:
+        local = datetime.fromtimestamp(now, _QUOTA_TZ)
+    else:
+        local = datetime.utcfromtimestamp(now)
+    midnight = (local + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    if _QUOTA_TZ is None:
+        return (midnight - datetime(1970, 1, 1)).total_seconds()
+    return midnight.timestamp()
+
+
+class TokenBucket:
+    """
+    Rezervasyonlu token bucket: bakiye negatife düşebilir, böylece eşzamanlı
+    çağıranlar sıraya girer ve her biri ne kadar beklemesi gerektiğini bilir.
+    """
+
+    def __init__(self, capacity: float, period_sec: float = 60.0):
+        self.capacity = float(capacity)
+        self.rate = self.capacity / period_sec if capacity > 0 else 0.0
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+
+    @property
+    def unlimited(self) -> bool:
+        return self.capacity <= 0
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """`amount` token için gereken bekleme (rezervasyon yapmadan)."""
+        if self.unlimited:
+            return 0.0
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        deficit = amount - self.tokens
+        return deficit / self.rate if deficit > 0 else 0.0
+
+    def reserve(self, amount: float, now: float) -> float:
+        wait = self.wait_time(amount, now)
+        if not self.unlimited:
+            self.tokens -= min(amount, self.capacity)
+        return wait
+
+
+class KeyBudget:
+    """Tek anahtarın RPM/TPM/RPD bütçesi ve istatistikleri."""
+
+    def __init__(self, rpm: int, tpm: int, rpd: int):
+        self.requests = TokenBucket(rpm, 60.0)
+        self.tokens = TokenBucket(tpm, 60.0)
+        self.rpd = rpd
+        self.day_count = 0
+        self.day_reset_at = next_quota_reset()
+        self.day_blocked = False        # sunucu günlük kotanın bittiğini bildirdi
+        self.cooldown_until = 0.0       # monotonic; 429 sonrası dinlenme
+        self.total_requests = 0
+        self.total_waited = 0.0
+        self.penalties = 0
+
+    def _roll_day(self) -> None:
+        if time.time() >= self.day_reset_at:
+            self.day_count = 0
+            self.day_blocked = False
+            self.day_reset_at = next_quota_reset()
+
+    def day_exhausted(self) -> bool:
+        self._roll_day()
+        return self.day_blocked or (self.rpd > 0 and self.day_count >= self.rpd)
+
+    def wait_time(self, tokens: int, now: float) -> float:
+        if self.day_exhausted():
+            return float("inf")
+        return max(
+            self.cooldown_until - now,
+            self.requests.wait_time(1, now),
+            self.tokens.wait_time(tokens, now),
+            0.0,
+        )
+
+    def reserve(self, tokens: int, now: float) -> float:
+        cooldown = max(self.cooldown_until - now, 0.0)
+        self.day_count += 1
+        self.total_requests += 1
+        return max(cooldown, self.requests.reserve(1, now), self.tokens.reserve(tokens, now))
+
+
+class RateLimiter:
+    """Anahtar etiketi → KeyBudget eşlemesi; tüm thread'ler arasında paylaşılır."""
+
+    def __init__(self, rpm: int = 15, tpm: int = 250000, rpd: int = 1000):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.rpd = rpd
+        self._budgets: Dict[str, KeyBudget] = {}
+        self._lock = threading.Lock()
+
+    def _budget(self, label: str) -> KeyBudget:
+        budget = self._budgets.get(label)
+        if budget is None:
+            budget = KeyBudget(self.rpm, self.tpm, self.rpd)
+            self._budgets[label] = budget
+        return budget
+
+    def peek(self, label: str, tokens: int = 0) -> float:
+        """Bütçe ayırmadan, `label` anahtarının kaç saniye sonra hazır olacağı (inf = günlük kota bitti)."""
+        with self._lock:
+            return self._budget(label).wait_time(tokens, time.monotonic())
+
+    def acquire(self, label: str, tokens: int = 0) -> float:
+        """Tek anahtar için bütçe ayırır; gerekirse bekler. Beklenen süreyi döndürür."""
+        return self.acquire_any([label], tokens)[1]
+
+    def acquire_any(self, labels: List[str], tokens: int = 0) -> Tuple[str, float]:
+        """
+        En kısa sürede uygun olan anahtarı seçip bütçe ayırır.
+        Dönen değer: (seçilen etiket, beklenen saniye).
+        """
+        if not labels:
+            raise ValueError("acquire_any: en az bir anahtar etiketi gerekli")
+        with self._lock:
+            now = time.monotonic()
+            best_label: Optional[str] = None
+            best_wait = float("inf")
+            for label in labels:
+                wait = self._budget(label).wait_time(tokens, now)
+                if wait < best_wait:
+                    best_label, best_wait = label, wait
+            if best_label is None:
+                raise RateLimitExhausted(
+                    f"Tüm anahtarların günlük istek bütçesi (RPD={self.rpd}) doldu."
+                )
+            budget = self._budget(best_label)
+            wait = budget.reserve(tokens, now)
+            budget.total_waited += wait
+
+        if wait > 0:
+            if wait >= 0.5:
+                print(f"[RateLimit] {best_label} bütçesi dolu, {wait:.1f}s bekleniyor...")
+            time.sleep(wait)
+        return best_label, wait
+
+    def penalize(self, label: str, seconds: float) -> None:
+        """429 sonrası anahtarı `seconds` boyunca kullanılmaz kıl (global sleep yerine)."""
+        with self._lock:
+            budget = self._budget(label)
+            budget.cooldown_until = max(budget.cooldown_until, time.monotonic() + seconds)
+            budget.penalties += 1
+
+    def mark_day_exhausted(self, label: str) -> None:
+        """Sunucu günlük kotanın bittiğini söylediyse anahtarı sıfırlanana kadar kapat."""
+        with self._lock:
+            self._budget(label).day_blocked = True
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {
+                label: {
+                    "requests": b.total_requests,
+                    "today": b.day_count,
+                    "waited_sec": round(b.total_waited, 2),
+                    "penalties": b.penalties,
+                }
+                for label, b in self._budgets.items()
+            }
+
+    def total_waited(self) -> float:
+        with self._lock:
+            return sum(b.total_waited for b in self._budgets.values())
+
+
+# ─── Süreç geneli tekil sınırlayıcı ──────────────────────────────────────────
+_limiter_instance: Optional[RateLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Env ayarlarına göre kurulmuş tekil RateLimiter döndürür."""
+    global _limiter_instance
+    if _limiter_instance is not None:
+        return _limiter_instance
+    with _limiter_lock:
+        if _limiter_instance is None:
+            _limiter_instance = RateLimiter(
+                rpm=int(os.getenv("GEMINI_RPM", "15")),
+                tpm=int(os.getenv("GEMINI_TPM", "250000")),
+                rpd=int(os.getenv("GEMINI_RPD", "1000")),
+            )
+    return _limiter_instance
+
+
+def estimate_tokens(text: str) -> int:
+    """Türkçe metin için kaba token tahmini (~4 karakter/token)."""
+    return len(text or "") // 4 + 1
@@ -0,0 +1,424 @@
+"""
+replay_backend.py
+-----------------
+generate_with_rotation için takılabilir kayıt/tekrar (record/replay) arka ucu.
+Scraper → AIParser → DB hattını gerçek kota harcamadan, tekrarlanabilir şekilde
+benchmark / yük testi yapmak için kullanılır.
+
+Modlar (env GEMINI_BACKEND):
+    live    (varsayılan) gerçek API, hiçbir şey kaydedilmez
+    record  gerçek API çağrılır; her (istek → yanıt, gecikme) çifti JSONL dosyasına eklenir
+    replay  ağ çağrısı yapılmaz; kayıtlı yanıtlar deterministik olarak döndürülür,
+            gecikme dağılımı, 429/503 enjeksiyonu ve verim sınırı uygulanır
+
+İstemci sarmalanır (client.models.generate_content); bu yüzden anahtar havuzu, rate
+limiter, context cache ve deadline mantığı replay modunda da aynen çalışır. Replay
+modunda da anahtar gerekir; sahte anahtarlar yeterlidir (GEMINI_API_KEYS=fake1,fake2).
+record/replay açıkken response_cache atlanır, böylece her çağrı arka uçtan geçer.
+
+Ayarlar (env):
+    GEMINI_RECORD_PATH           kayıt dosyası (varsayılan: .cache/gemini_recordings.jsonl)
+    GEMINI_REPLAY_LATENCY        recorded (varsayılan) | fixed:MS | uniform:MIN_MS,MAX_MS
+                                 | lognormal:MEDIAN_MS,SIGMA
+    GEMINI_REPLAY_LATENCY_SCALE  gecikme çarpanı (varsayılan: 1.0; 0 = beklemeden)
+    GEMINI_REPLAY_429_RATE       enjekte edilen 429 oranı (0..1, varsayılan: 0)
+    GEMINI_REPLAY_503_RATE       enjekte edilen 503 oranı (0..1, varsayılan: 0)
+    GEMINI_REPLAY_MAX_RPM        sunucu tarafı verim sınırı; aşılınca 429 (0 = sınırsız)
+    GEMINI_REPLAY_ON_MISS        error (varsayılan) | empty: kaydı olmayan istekte "{}" döndür
+    GEMINI_REPLAY_SEED           rastgelelik tohumu (varsayılan: 0)
+
+Kullanım:
+    GEMINI_BACKEND=record python -m src.scrapers.akbank          # bir kez gerçek API ile
+    GEMINI_BACKEND=replay GEMINI_API_KEYS=f1,f2 GEMINI_RPM=0 \\
+        GEMINI_REPLAY_LATENCY=lognormal:900,0.4 GEMINI_REPLAY_429_RATE=0.05 \\
+        python data_quality_autofix.py --limit 200
+
+    python -m src.utils.replay_backend --summary                  # kayıt özeti
+"""
+
+import os
+import json
+import math
+import time
+import random
+import hashlib
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.utils.rate_limiter import TokenBucket # type: ignore
+
+RECORD_PATH = os.getenv("GEMINI_RECORD_PATH", os.path.join(".cache", "gemini_recordings.jsonl"))
+
+_MODES = ("live", "record", "replay")
+
+
+def backend_mode() -> str:
+    mode = os.getenv("GEMINI_BACKEND", "live").strip().lower()
+    return mode if mode in _MODES else "live"
+
+
+def _config_value(config: Any, name: str) -> Any:
+    if config is None:
+        return None
+    if isinstance(config, dict):
+        return config.get(name)
+    return getattr(config, name, None)
+
+
+def request_key(model: str, contents: Any, config: Any, cached_prefixes: Optional[Dict[str, str]] = None) -> str:
+    """
+    İstek kimliği: model + system_instruction + prompt + yanıt biçimi (anahtar/önbellekten bağımsız).
+    Önek cached_content ile gönderildiyse cached_prefixes üzerinden asıl metne çözülür.
+    """
+    system_instruction = _config_value(config, "system_instruction")
+    if system_instruction is None and cached_prefixes:
+        system_instruction = cached_prefixes.get(_config_value(config, "cached_content"))
+    payload = json.dumps(
+        {
+            "model": model,
+            "system_instruction": system_instruction,
+            "contents": contents if isinstance(contents, str) else repr(contents),
+            "response_mime_type": _config_value(config, "response_mime_type"),
+        },
+        ensure_ascii=False,
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+_USAGE_FIELDS = ("prompt_token_count", "candidates_token_count", "cached_content_token_count")
+
+
+class _Response:
+    """generate_content yanıtının kullanılan kısmı (.text, kayıtta varsa .usage_metadata)."""
+
+    __slots__ = ("text", "usage_metadata")
+
+    def __init__(self, text: str, usage: Optional[Dict[str, Any]] = None):
+        self.text = text
+        self.usage_metadata = _Namespace(**{name: usage.get(name) for name in _USAGE_FIELDS}) if usage else None
+
+
+def _usage_dict(response: Any) -> Optional[Dict[str, Any]]:
+    """Yanıttaki token sayıları (replay'de telemetri tahmin yerine bunları kullanır)."""
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return None
+    values = {name: getattr(usage, name, None) for name in _USAGE_FIELDS}
+    return values if any(isinstance(v, int) for v in values.values()) else None
+
+
+class _Namespace:
+    def __init__(self, **attrs):
+        self.__dict__.update(attrs)
+
+
+# ─── Kayıt deposu ────────────────────────────────────────────────────────────
+class RecordingStore:
+    """JSONL kayıt dosyası: istek anahtarı → kayıtlı yanıtlar (aynı istek birden çok kez kaydedilebilir)."""
+
+    def __init__(self, path: str = RECORD_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: Optional[Dict[str, List[Dict[str, Any]]]] = None
+
+    def _load(self) -> Dict[str, List[Dict[str, Any]]]:
+        if self._entries is None:
+            entries: Dict[str, List[Dict[str, Any]]] = {}
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    for line in f:
+                        line = line.strip()
+                        if not line:
+                            continue
+                        try:
+                            rec = json.loads(line)
+                        except ValueError:
+                            continue  # yarım yazılmış son satır
+                        entries.setdefault(rec["key"], []).append(rec)
+            except FileNotFoundError:
+                pass
+            self._entries = entries
+        return self._entries
+
+    def lookup(self, key: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            return self._load().get(key, [])
+
+    def append(self, record: Dict[str, Any]) -> None:
+        with self._lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            if self._entries is not None:
+                self._entries.setdefault(record["key"], []).append(record)
+
+    def records(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [rec for recs in self._load().values() for rec in recs]
+
+
+# ─── Gecikme dağılımı ────────────────────────────────────────────────────────
+class LatencyModel:
+    """'recorded' | 'fixed:MS' | 'uniform:MIN,MAX' | 'lognormal:MEDIAN,SIGMA' → saniye."""
+
+    def __init__(self, spec: str = "recorded", scale: float = 1.0):
+        self.spec = spec.strip().lower() or "recorded"
+        self.scale = scale
+        kind, _, args = self.spec.partition(":")
+        self.kind = kind
+        self.args = [float(a) for a in args.split(",") if a.strip()]
+        if kind not in ("recorded", "fixed", "uniform", "lognormal"):
+            raise ValueError(f"Bilinmeyen gecikme dağılımı: {spec}")
+
+    def sample(self, rng: random.Random, recorded_sec: Optional[float]) -> float:
+        if self.kind == "fixed":
+            seconds = self.args[0] / 1000.0
+        elif self.kind == "uniform":
+            seconds = rng.uniform(self.args[0], self.args[1]) / 1000.0
+        elif self.kind == "lognormal":
+            median_ms, sigma = self.args[0], (self.args[1] if len(self.args) > 1 else 0.5)
+            seconds = rng.lognormvariate(math.log(median_ms), sigma) / 1000.0
+        else:
+            seconds = recorded_sec or 0.0
+        return max(seconds * self.scale, 0.0)
+
+
+class ReplayProfile:
+    """Replay davranışı: gecikme, hata enjeksiyonu, verim sınırı, kayıt dışı istek politikası."""
+
+    def __init__(self, latency: Optional[LatencyModel] = None, rate_429: float = 0.0, rate_503: float = 0.0,
+                 max_rpm: int = 0, on_miss: str = "error", seed: int = 0):
+        self.latency = latency or LatencyModel()
+        self.rate_429 = rate_429
+        self.rate_503 = rate_503
+        self.max_rpm = max_rpm
+        self.on_miss = on_miss
+        self.seed = seed
+
+    @classmethod
+    def from_env(cls) -> "ReplayProfile":
+        return cls(
+            latency=LatencyModel(os.getenv("GEMINI_REPLAY_LATENCY", "recorded"),
+                                 float(os.getenv("GEMINI_REPLAY_LATENCY_SCALE", "1.0"))),
+            rate_429=float(os.getenv("GEMINI_REPLAY_429_RATE", "0")),
+            rate_503=float(os.getenv("GEMINI_REPLAY_503_RATE", "0")),
+            max_rpm=int(os.getenv("GEMINI_REPLAY_MAX_RPM", "0")),
+            on_miss=os.getenv("GEMINI_REPLAY_ON_MISS", "error").strip().lower(),
+            seed=int(os.getenv("GEMINI_REPLAY_SEED", "0")),
+        )
+
+
+class ReplayMiss(KeyError):
+    """Kayıtlı yanıtı olmayan istek (GEMINI_REPLAY_ON_MISS=error)."""
+    pass
+
+
+# ─── Arka uç ─────────────────────────────────────────────────────────────────
+class RecordReplayBackend:
+    """Gerçek istemciyi kayıt için sarmalar ya da replay modunda onun yerine geçer."""
+
+    def __init__(self, mode: str, store: Optional[RecordingStore] = None, profile: Optional[ReplayProfile] = None):
+        self.mode = mode
+        self.store = store or RecordingStore()
+        self.profile = profile or ReplayProfile.from_env()
+        self._throughput = TokenBucket(self.profile.max_rpm, 60.0)
+        self._lock = threading.Lock()
+        self._seen: Dict[str, int] = {}
+        # context cache adı → önek metni (cached_content ile gönderilen istekleri aynı anahtara eşlemek için)
+        self._cached_prefixes: Dict[str, str] = {}
+        self._stats = {"calls": 0, "recorded": 0, "hits": 0, "misses": 0,
+                       "injected_429": 0, "injected_503": 0, "throttled_429": 0, "latency_sec": 0.0}
+
+    def wrap(self, client: Any, label: str) -> Any:
+        if self.mode == "record":
+            return _Namespace(models=_RecordingModels(self, client, label), caches=_TrackingCaches(self, client.caches))
+        if self.mode == "replay":
+            return _Namespace(models=_ReplayModels(self, label), caches=_TrackingCaches(self, None))
+        return client
+
+    def _bump(self, name: str, amount: float = 1) -> None:
+        with self._lock:
+            self._stats[name] += amount
+
+    def remember_prefix(self, name: str, system_instruction: Optional[str]) -> None:
+        if system_instruction:
+            with self._lock:
+                self._cached_prefixes[name] = system_instruction
+
+    def key_for(self, model: str, contents: Any, config: Any) -> str:
+        with self._lock:
+            prefixes = dict(self._cached_prefixes)
+        return request_key(model, contents, config, prefixes)
+
+    # --- record ---
+    def record(self, label: str, model: str, contents: Any, config: Any, text: Optional[str], latency_sec: float,
+               usage: Optional[Dict[str, Any]] = None) -> None:
+        self.store.append({
+            "key": self.key_for(model, contents, config),
+            "model": model,
+            "label": label,
+            "prompt_preview": (contents if isinstance(contents, str) else repr(contents))[:200],
+            "text": text,
+            "latency_sec": round(latency_sec, 4),
+            "usage": usage,
+            "recorded_at": time.time(),
+        })
+        self._bump("recorded")
+
+    # --- replay ---
+    def _rng(self, key: str) -> Tuple[random.Random, int]:
+        """İstek anahtarı + kaçıncı deneme → deterministik RNG (thread sırasından bağımsız)."""
+        with self._lock:
+            attempt = self._seen.get(key, 0)
+            self._seen[key] = attempt + 1
+            self._stats["calls"] += 1
+        return random.Random(f"{self.profile.seed}:{key}:{attempt}"), attempt
+
+    def replay(self, label: str, model: str, contents: Any, config: Any) -> _Response:
+        key = self.key_for(model, contents, config)
+        rng, attempt = self._rng(key)
+        profile = self.profile
+
+        with self._lock:
+            throttle = self._throughput.wait_time(1, time.monotonic())
+            if throttle <= 0:
+                self._throughput.reserve(1, time.monotonic())
+        if throttle > 0:
+            self._bump("throttled_429")
+            raise RuntimeError(
+                f"429 RESOURCE_EXHAUSTED (replay throughput cap {profile.max_rpm} RPM). "
+                f"Please retry in {throttle:.1f}s."
+            )
+
+        roll = rng.random()
+        if roll < profile.rate_429:
+            self._bump("injected_429")
+            raise RuntimeError(f"429 RESOURCE_EXHAUSTED (injected, {label}). Please retry in {rng.randint(2, 20)}s.")
+        if roll < profile.rate_429 + profile.rate_503:
+            self._bump("injected_503")
+            time.sleep(profile.latency.sample(rng, None))
+            raise RuntimeError(f"503 UNAVAILABLE (injected, {label}): The model is overloaded.")
+
+        records = self.store.lookup(key)
+        if not records:
+            self._bump("misses")
+            if profile.on_miss == "empty":
+                return _Response("{}")
+            raise ReplayMiss(f"Kayıtlı yanıt yok: {key[:16]} (model={model})")
+        rec = records[attempt % len(records)]
+        delay = profile.latency.sample(rng, rec.get("latency_sec"))
+        if delay > 0:
+            time.sleep(delay)
+        self._bump("hits")
+        self._bump("latency_sec", delay)
+        return _Response(rec.get("text") or "", rec.get("usage"))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._stats, mode=self.mode)
+        stats["latency_sec"] = round(stats["latency_sec"], 3)
+        return stats
+
+
+class _RecordingModels:
+    def __init__(self, backend: RecordReplayBackend, client: Any, label: str):
+        self._backend = backend
+        self._client = client
+        self._label = label
+
+    def generate_content(self, model: str, contents: Any, config: Any = None, **kwargs) -> Any:
+        started = time.monotonic()
+        response = self._client.models.generate_content(model=model, contents=contents, config=config, **kwargs)
+        self._backend.record(self._label, model, contents, config,
+                             getattr(response, "text", None), time.monotonic() - started, _usage_dict(response))
+        return response
+
+
+class _ReplayModels:
+    def __init__(self, backend: RecordReplayBackend, label: str):
+        self._backend = backend
+        self._label = label
+
+    def generate_content(self, model: str, contents: Any, config: Any = None, **kwargs) -> _Response:
+        return self._backend.replay(self._label, model, contents, config)
+
+
+class _TrackingCaches:
+    """client.caches: oluşturulan önbelleğin önekini hatırlar; replay modunda (inner=None) ağsız ad üretir."""
+
+    def __init__(self, backend: RecordReplayBackend, inner: Any):
+        self._backend = backend
+        self._inner = inner
+
+    def create(self, model: str, config: Any = None, **kwargs) -> Any:
+        system_instruction = _config_value(config, "system_instruction")
+        if self._inner is not None:
+            cache = self._inner.create(model=model, config=config, **kwargs)
+        else:
+            digest = hashlib.sha256(str(system_instruction).encode("utf-8")).hexdigest()
+            cache = _Namespace(name=f"replay/cachedContents/{digest[:16]}")
+        self._backend.remember_prefix(cache.name, system_instruction)
+        return cache
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._inner, name)
+
+
+# ─── Süreç geneli tekil arka uç ──────────────────────────────────────────────
+_backend_instance: Optional[RecordReplayBackend] = None
+_backend_lock = threading.Lock()
+
+
+def get_replay_backend() -> Optional[RecordReplayBackend]:
+    """GEMINI_BACKEND=record/replay ise tekil arka uç; live ise None."""
+    global _backend_instance
+    mode = backend_mode()
+    if mode == "live":
+        return None
+    with _backend_lock:
+        if _backend_instance is None or _backend_instance.mode != mode:
+            _backend_instance = RecordReplayBackend(mode)
+    return _backend_instance
+
+
+def wrap_client(client: Any, label: str) -> Any:
+    """live modda istemciyi olduğu gibi, record/replay modunda sarmalanmış halini döndürür."""
+    backend = get_replay_backend()
+    return client if backend is None else backend.wrap(client, label)
+
+
+def summarize(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Kayıt özeti: istek sayısı, tekil istek, model dağılımı, gecikme yüzdelikleri."""
+    latencies = sorted(r.get("latency_sec") or 0.0 for r in records)
+
+    def pct(p: float) -> float:
+        if not latencies:
+            return 0.0
+        return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))], 3)
+
+    models: Dict[str, int] = {}
+    for r in records:
+        models[r.get("model", "?")] = models.get(r.get("model", "?"), 0) + 1
+    return {
+        "records": len(records),
+        "unique_requests": len({r["key"] for r in records}),
+        "models": models,
+        "latency_p50": pct(0.50),
+        "latency_p95": pct(0.95),
+        "latency_p99": pct(0.99),
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    cli = argparse.ArgumentParser()
+    cli.add_argument("--summary", action="store_true", help="Kayıt dosyasının özetini yazdır")
+    cli.add_argument("--path", default=RECORD_PATH, help="Kayıt dosyası")
+    args = cli.parse_args()
+
+    if args.summary:
+        print(json.dumps(summarize(RecordingStore(args.path).records()), ensure_ascii=False, indent=1))
@@ -0,0 +1,324 @@
+"""
+response_cache.py
+-----------------
+Gemini yanıtları için içerik-adresli (content-addressed) önbellek.
+Anahtar: sha256(prompt, model, generation config, prompt_version).
+
+İki katman:
+    1. Bellek içi LRU (süreç ömrü boyunca, hızlı)
+    2. Kalıcı katman (çökme sonrası tekrar çalıştırmalarda, zorla yeniden taramalarda
+       sıfır API çağrısı): DATABASE_URL veritabanındaki ai_response_cache tablosu;
+       GitHub Actions runner'ları arasında paylaşılır. DATABASE_URL yoksa (yerel
+       çalıştırma) veya tabloya ulaşılamazsa GEMINI_CACHE_PATH SQLite dosyası.
+
+Her seferinde yeni içerik istenen işler (SEO blog / pillar / sektör karşılaştırma
+üreticileri) önbelleği varsayılan olarak kullanmaz; GEMINI_CACHE_CONTENT=true ile açılır.
+
+Ayarlar (env):
+    GEMINI_CACHE_ENABLED      true/false (varsayılan: true)
+    GEMINI_CACHE_BACKEND      auto | postgres | sqlite (varsayılan: auto = DATABASE_URL varsa postgres)
+    GEMINI_CACHE_PATH         yerel kalıcı katman dosyası (varsayılan: .cache/gemini_responses.sqlite3)
+    GEMINI_CACHE_CONTENT      içerik üreticilerinde önbellek (varsayılan: false)
+    GEMINI_CACHE_TTL_HOURS    kayıt ömrü (varsayılan: 168 = 7 gün)
+    GEMINI_CACHE_MEMORY_SIZE  LRU kapasitesi (varsayılan: 512)
+    GEMINI_CACHE_MAX_ENTRIES  kalıcı katman kapasitesi (varsayılan: 50000)
+
+Kullanım:
+    from src.utils.response_cache import get_response_cache
+
+    cache = get_response_cache()
+    key = cache.make_key(prompt, model_name, config, prompt_version="v1")
+    text = cache.get(key)
+    if text is None:
+        text = ...  # API çağrısı
+        cache.set(key, text)
+    print(cache.stats())
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from src.utils.sql_store import backend_mode, open_backend # type: ignore
+
+
+DEFAULT_PROMPT_VERSION = "v1"
+
+
+def _config_fingerprint(config: Any) -> Any:
+    """GenerateContentConfig / dict / None → JSON-serileştirilebilir değer."""
+    if config is None:
+        return None
+    if isinstance(config, dict):
+        return {k: v for k, v in config.items() if v is not None}
+    dump = getattr(config, "model_dump", None)  # pydantic (google-genai types)
+    if callable(dump):
+        try:
+            return dump(exclude_none=True, mode="json")
+        except TypeError:
+            return dump(exclude_none=True)
+    return repr(config)
+
+
+class CacheTier:
+    """Önbellek katmanı arayüzü."""
+
+    def get(self, key: str) -> Optional[str]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: str, expires_at: float) -> None:
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+
+class MemoryLRUTier(CacheTier):
+    """OrderedDict tabanlı, TTL destekli LRU."""
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._data: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at < time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str, expires_at: float) -> None:
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+_DDL = (
+    "CREATE TABLE IF NOT EXISTS ai_response_cache ("
+    " cache_key TEXT PRIMARY KEY,"
+    " value TEXT NOT NULL,"
+    " expires_at DOUBLE PRECISION NOT NULL,"
+    " accessed_at DOUBLE PRECISION NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS ai_response_cache_accessed ON ai_response_cache (accessed_at)",
+)
+
+
+class SqlTier(CacheTier):
+    """
+    Kalıcı katman; arka uç DATABASE_URL tablosu ya da yerel SQLite dosyası (bkz. sql_store).
+    Kapasite aşılırsa en eski erişilen kayıtlar silinir.
+    """
+
+    def __init__(self, backend: Any, max_entries: int = 50000):
+        self.backend = backend
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._writes_since_prune = 0
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self.backend.transaction() as query:
+            rows = query("SELECT value, expires_at FROM ai_response_cache WHERE cache_key = :k", k=key)
+            if not rows:
+                return None
+            value, expires_at = rows[0]
+            if expires_at < now:
+                query("DELETE FROM ai_response_cache WHERE cache_key = :k", k=key)
+                return None
+            query("UPDATE ai_response_cache SET accessed_at = :now WHERE cache_key = :k", now=now, k=key)
+            return value
+
+    def set(self, key: str, value: str, expires_at: float) -> None:
+        with self.backend.transaction() as query:
+            query(
+                "INSERT INTO ai_response_cache (cache_key, value, expires_at, accessed_at)"
+                " VALUES (:k, :value, :expires_at, :now)"
+                " ON CONFLICT (cache_key) DO UPDATE SET value = excluded.value,"
+                " expires_at = excluded.expires_at, accessed_at = excluded.accessed_at",
+                k=key, value=value, expires_at=expires_at, now=time.time(),
+            )
+        with self._lock:
+            self._writes_since_prune += 1
+            due = self._writes_since_prune >= 100
+            if due:
+                self._writes_since_prune = 0
+        if due:
+            self.prune()
+
+    def delete(self, key: str) -> None:
+        with self.backend.transaction() as query:
+            query("DELETE FROM ai_response_cache WHERE cache_key = :k", k=key)
+
+    def clear(self) -> None:
+        with self.backend.transaction() as query:
+            query("DELETE FROM ai_response_cache")
+
+    def prune(self) -> None:
+        # Aynı tabloyu budayan süreçler sıraya girer (postgres: advisory lock)
+        with self.backend.transaction(lock_key="ai_response_cache:prune") as query:
+            evicted = len(query(
+                "DELETE FROM ai_response_cache WHERE expires_at < :now RETURNING cache_key", now=time.time()
+            ))
+            overflow = query("SELECT COUNT(*) FROM ai_response_cache")[0][0] - self.max_entries
+            if overflow > 0:
+                evicted += len(query(
+                    "DELETE FROM ai_response_cache WHERE cache_key IN ("
+                    " SELECT cache_key FROM ai_response_cache ORDER BY accessed_at ASC LIMIT :n)"
+                    " RETURNING cache_key",
+                    n=overflow,
+                ))
+        with self._lock:
+            self.evictions += evicted
+
+
+class ResponseCache:
+    """Bellek + kalıcı katmanı birleştiren önbellek; hit/miss sayaçlarını tutar."""
+
+    def __init__(
+        self,
+        memory: Optional[MemoryLRUTier] = None,
+        persistent: Optional[CacheTier] = None,
+        ttl_seconds: float = 7 * 24 * 3600,
+    ):
+        self.memory = memory or MemoryLRUTier()
+        self.persistent = persistent
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._counters = {"memory_hits": 0, "persistent_hits": 0, "misses": 0, "stores": 0, "errors": 0}
+
+    @staticmethod
+    def make_key(prompt: str, model: str, config: Any = None, prompt_version: Optional[str] = None) -> str:
+        payload = json.dumps(
+            {
+                "prompt": prompt,
+                "model": model,
+                "config": _config_fingerprint(config),
+                "prompt_version": prompt_version or DEFAULT_PROMPT_VERSION,
+            },
+            sort_keys=True,
+            ensure_ascii=False,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
+
+    def get(self, key: str) -> Optional[str]:
+        value = self.memory.get(key)
+        if value is not None:
+            self._count("memory_hits")
+            return value
+
+        if self.persistent is not None:
+            try:
+                value = self.persistent.get(key)
+            except Exception as e:
+                self._count("errors")
+                print(f"[ResponseCache] ⚠️ Kalıcı katman okunamadı: {e}")
+                value = None
+            if value is not None:
+                self._count("persistent_hits")
+                # Sıcak tutmak için belleğe geri yükle
+                self.memory.set(key, value, time.time() + self.ttl_seconds)
+                return value
+
+        self._count("misses")
+        return None
+
+    def set(self, key: str, value: str) -> None:
+        if not value:
+            return
+        expires_at = time.time() + self.ttl_seconds
+        self.memory.set(key, value, expires_at)
+        if self.persistent is not None:
+            try:
+                self.persistent.set(key, value, expires_at)
+            except Exception as e:
+                self._count("errors")
+                print(f"[ResponseCache] ⚠️ Kalıcı katmana yazılamadı: {e}")
+        self._count("stores")
+
+    def invalidate(self, key: str) -> None:
+        self.memory.delete(key)
+        if self.persistent is not None:
+            self.persistent.delete(key)
+
+    def clear(self) -> None:
+        self.memory.clear()
+        if self.persistent is not None:
+            self.persistent.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+        hits = counters["memory_hits"] + counters["persistent_hits"]
+        lookups = hits + counters["misses"]
+        counters["hit_rate"] = round(hits / lookups, 3) if lookups else 0.0
+        counters["memory_entries"] = len(self.memory)
+        counters["evictions"] = self.memory.evictions + getattr(self.persistent, "evictions", 0)
+        return counters
+
+
+# ─── Süreç geneli tekil önbellek ─────────────────────────────────────────────
+_cache_instance: Optional[ResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def is_cache_enabled() -> bool:
+    return os.getenv("GEMINI_CACHE_ENABLED", "true").lower() == "true"
+
+
+def is_content_cache_enabled() -> bool:
+    """İçerik üreticileri (SEO blog / pillar / karşılaştırma) önbelleği kullansın mı? Varsayılan: hayır."""
+    return os.getenv("GEMINI_CACHE_CONTENT", "false").lower() == "true"
+
+
+def get_response_cache() -> ResponseCache:
+    """Env ayarlarına göre kurulmuş tekil ResponseCache döndürür."""
+    global _cache_instance
+    if _cache_instance is not None:
+        return _cache_instance
+    with _cache_lock:
+        if _cache_instance is None:
+            ttl = float(os.getenv("GEMINI_CACHE_TTL_HOURS", "168")) * 3600
+            memory = MemoryLRUTier(int(os.getenv("GEMINI_CACHE_MEMORY_SIZE", "512")))
+            persistent: Optional[CacheTier] = None
+            path = os.getenv("GEMINI_CACHE_PATH", os.path.join(".cache", "gemini_responses.sqlite3"))
+            try:
+                backend = open_backend(backend_mode("GEMINI_CACHE_BACKEND"), path, _DDL, label="ResponseCache")
+                persistent = SqlTier(backend, int(os.getenv("GEMINI_CACHE_MAX_ENTRIES", "50000")))
+            except Exception as e:
+                print(f"[ResponseCache] ⚠️ Kalıcı katman açılamadı ({path}): {e}. Sadece bellek kullanılacak.")
+            _cache_instance = ResponseCache(memory=memory, persistent=persistent, ttl_seconds=ttl)
+    return _cache_instance
@@ -0,0 +1,147 @@
+"""
+sql_store.py
+------------
+AI yardımcı tabloları (kota defteri, negatif önbellek, yanıt önbelleği, telemetri...)
+için ortak SQL arka uçları.
+
+GitHub Actions runner'ları her çalışmada sıfırdan açıldığı için .cache/ altındaki
+SQLite dosyaları bir sonraki çalışmaya taşınmaz; kalıcı olması gereken tablolar
+DATABASE_URL veritabanında tutulur. SQLite yalnızca yerel çalıştırmalar içindir.
+
+Her iki arka uç da aynı arayüzü sunar:
+
+    backend = open_backend("postgres", ".cache/x.sqlite3", ddl=(...))
+    with backend.transaction(lock_key="...") as query:
+        rows = query("SELECT a, b FROM t WHERE k = :k", k=key)
+
+SQL ifadeleri iki lehçede de çalışacak şekilde yazılmalıdır (:isim parametreleri,
+INSERT ... ON CONFLICT, DOUBLE PRECISION, DELETE ... RETURNING).
+
+Mod seçimi (backend_mode):
+    postgres  DATABASE_URL tabloları
+    sqlite    yerel dosya
+    auto      DATABASE_URL tanımlıysa postgres, değilse sqlite
+
+Bir iş akışında öğrenilip diğerlerinde kullanılan modeller (sektör sınıflandırıcı,
+banka boilerplate'i) ai_models tablosunda ada göre tutulur (publish_model_payload /
+fetch_newer_model_payload).
+"""
+
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, List, Optional, Sequence, Tuple
+
+Query = Callable[..., List[Tuple[Any, ...]]]
+
+
+class SqliteBackend:
+    name = "sqlite"
+
+    def __init__(self, path: str, ddl: Sequence[str] = ()):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._lock = threading.Lock()
+        for statement in ddl:
+            self._conn.execute(statement)
+
+    @contextmanager
+    def transaction(self, lock_key: Optional[str] = None) -> Iterator[Query]:
+        def query(sql: str, **params: Any) -> List[Tuple[Any, ...]]:
+            return self._conn.execute(sql, params).fetchall()
+
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")  # yazma kilidi: süreçler arası atomik
+            try:
+                yield query
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+
+class PostgresBackend:
+    name = "postgres"
+
+    def __init__(self, ddl: Sequence[str] = ()):
+        from sqlalchemy import text # type: ignore
+        from src.database import get_engine # type: ignore
+        self._text = text
+        self._engine = get_engine()
+        with self._engine.begin() as conn:
+            for statement in ddl:
+                conn.execute(text(statement))
+
+    @contextmanager
+    def transaction(self, lock_key: Optional[str] = None) -> Iterator[Query]:
+        with self._engine.begin() as conn:
+            def query(sql: str, **params: Any) -> List[Tuple[Any, ...]]:
+                result = conn.execute(self._text(sql), params)
+                return list(result.fetchall()) if result.returns_rows else []
+
+            if lock_key is not None:
+                # Aynı anahtara yazanlar sıraya girer; işlem bitince kilit bırakılır
+                query("SELECT pg_advisory_xact_lock(hashtext(:k))", k=lock_key)
+            yield query
+
+
+def backend_mode(env_name: str, default: str = "auto") -> str:
+    """env_name değerini postgres / sqlite / off olarak çözer (auto: DATABASE_URL varsa postgres)."""
+    mode = os.getenv(env_name, default).strip().lower()
+    if mode == "auto":
+        return "postgres" if os.getenv("DATABASE_URL") else "sqlite"
+    return mode
+
+
+def open_backend(mode: str, sqlite_path: str, ddl: Sequence[str] = (), label: str = "SQL") -> Any:
+    """
+    mode'a göre arka uç açar. Postgres açılamazsa uyarı basılır ve yerel SQLite'a düşülür;
+    SQLite da açılamazsa istisna çağırana bırakılır.
+    """
+    if mode == "postgres":
+        try:
+            return PostgresBackend(ddl)
+        except Exception as e:
+            print(f"[{label}] ⚠️  DATABASE_URL tablosu açılamadı ({type(e).__name__}: {str(e)[:80]}); "
+                  f"yerel dosyaya düşülüyor: {sqlite_path}")
+    return SqliteBackend(sqlite_path, ddl)
+
+
+# ─── Paylaşılan model deposu (ai_models) ─────────────────────────────────────
+AI_MODELS_DDL = (
+    "CREATE TABLE IF NOT EXISTS ai_models ("
+    " name TEXT PRIMARY KEY,"
+    " trained_at DOUBLE PRECISION,"
+    " payload TEXT NOT NULL)",
+)
+
+
+def model_store(env_name: str) -> Optional[PostgresBackend]:
+    """ai_models için DATABASE_URL arka ucu; yalnızca yerel çalıştırmalarda (mod postgres değilse) None."""
+    if backend_mode(env_name) != "postgres":
+        return None
+    return PostgresBackend(AI_MODELS_DDL)
+
+
+def publish_model_payload(store: Any, name: str, trained_at: float, payload: str) -> None:
+    """Modeli ada göre yazar (varsa üzerine)."""
+    with store.transaction() as query:
+        query(
+            "INSERT INTO ai_models (name, trained_at, payload) VALUES (:name, :trained_at, :payload)"
+            " ON CONFLICT (name) DO UPDATE SET trained_at = excluded.trained_at, payload = excluded.payload",
+            name=name, trained_at=trained_at, payload=payload,
+        )
+
+
+def fetch_newer_model_payload(store: Any, name: str, trained_at: Optional[float]) -> Optional[Tuple[float, str]]:
+    """Kayıtlı model trained_at'ten yeniyse (trained_at, payload), değilse None."""
+    with store.transaction() as query:
+        rows = query("SELECT trained_at FROM ai_models WHERE name = :name", name=name)
+        if not rows or (rows[0][0] or 0) <= (trained_at or 0):
+            return None
+        payload = query("SELECT payload FROM ai_models WHERE name = :name", name=name)[0][0]
+    return rows[0][0], payload